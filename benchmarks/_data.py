@@ -0,0 +1,87 @@
+"""
+Synthetic payloads shared by the benchmarks, in the raw API format.
+
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from datetime import datetime, timedelta, timezone
+
+import tests.api_responses as dtapiresponses
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def timestamp(i: int) -> str:
+    moment = START + timedelta(seconds=i)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def mixed_events(n: int) -> list[dict]:
+    """
+    A page of `n` events cycling through every event type.
+
+    """
+
+    types = dtapiresponses.event_history_each_type["events"]
+    events = []
+    for i in range(n):
+        event = copy.deepcopy(types[i % len(types)])
+        event["eventId"] = f"evt{i:017d}"
+        event["targetName"] = f"projects/project_id/devices/dev{i % 50:017d}"
+        event["timestamp"] = timestamp(i)
+        events.append(event)
+    return events
+
+
+def temperature_data(samples: int) -> dict:
+    """
+    Raw temperature event data with the given number of samples.
+
+    """
+
+    return {
+        "value": 21.5,
+        "isBackfilled": False,
+        "updateTime": timestamp(samples),
+        "samples": [
+            {"value": 20 + (i % 10) / 10, "sampleTime": timestamp(i)}
+            for i in range(samples)
+        ],
+    }
+
+
+def device_with_full_reported() -> dict:
+    """
+    A raw device whose reported field contains data of every event type.
+
+    """
+
+    reported = dict()
+    for event in dtapiresponses.event_history_each_type["events"]:
+        if event["eventType"] == "labelsChanged":
+            continue
+        reported.update(copy.deepcopy(event["data"]))
+
+    return {
+        "name": "projects/project_id/devices/c0pppd1qdqebrvv1iqp0",
+        "type": "co2",
+        "productNumber": "102081",
+        "labels": {"name": "benchmark", "room": "99"},
+        "reported": reported,
+    }
+
+
+def stream_lines(n: int) -> list[bytes]:
+    """
+    Newline-delimited JSON as received from the event stream.
+
+    """
+
+    return [
+        json.dumps({"result": {"event": event}}).encode()
+        for event in mixed_events(n)
+        if event["eventType"] != "labelsChanged"
+    ]
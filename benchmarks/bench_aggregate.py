@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from disruptive.events.events import Event
+from disruptive.resources.eventhistory import EventHistory
+
+from benchmarks import _data
+
+SAMPLES = 10_000_000
+DEVICES = 1000
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore
+    except ModuleNotFoundError as e:
+        raise NotImplementedError(str(e))
+    return numpy
+
+
+def _temperature_events(n: int, samples: int) -> list[dict]:
+    events = []
+    for i in range(n):
+        events.append(
+            {
+                "eventId": f"evt{i:017d}",
+                "targetName": f"projects/project_id/devices/dev{i % 50:017d}",
+                "eventType": "temperature",
+                "data": {"temperature": _data.temperature_data(samples)},
+                "timestamp": _data.timestamp(samples),
+            }
+        )
+    return events
+
+
+class TimeAggregateSamples:
+    items = {
+        "time_aggregate_ordered": SAMPLES,
+        "time_aggregate_shuffled": SAMPLES,
+    }
+
+    def setup(self) -> None:
+        np = _numpy()
+        rng = np.random.default_rng(1)
+
+        # One sample a minute per device, about a week of history each.
+        per_device = SAMPLES // DEVICES
+        names = np.array(
+            [f"dev{i:017d}" for i in range(DEVICES)],
+            dtype=object,
+        )
+        minutes = np.tile(np.arange(per_device), DEVICES)
+        self.ordered = {
+            "device_id": np.repeat(names, per_device),
+            "metric": np.full(SAMPLES, "temperature", dtype=object),
+            "time": np.datetime64("2022-01-01", "ns")
+            + minutes * np.timedelta64(60, "s"),
+            "value": rng.normal(20, 2, SAMPLES),
+        }
+
+        # As if the histories of many devices were concatenated unsorted.
+        order = rng.permutation(SAMPLES)
+        self.shuffled = {
+            name: column[order] for name, column in self.ordered.items()
+        }
+
+    def time_aggregate_ordered(self) -> None:
+        import disruptive.aggregate as dtaggregate
+
+        dtaggregate.aggregate_samples(
+            **self.ordered,
+            interval=timedelta(minutes=15),
+        )
+
+    def time_aggregate_shuffled(self) -> None:
+        import disruptive.aggregate as dtaggregate
+
+        dtaggregate.aggregate_samples(
+            **self.shuffled,
+            interval=timedelta(minutes=15),
+        )
+
+
+class TimeEventHistoryAggregate:
+    items = {"time_aggregate": 100_000}
+
+    def setup(self) -> None:
+        _numpy()
+
+        # Temperature events with 10 samples each, as after backfilling.
+        events = _temperature_events(10_000, samples=10)
+        self.history = EventHistory(Event.from_mixed_list(events))
+
+    def time_aggregate(self) -> None:
+        self.history.aggregate(interval=timedelta(minutes=5))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from disruptive.counters import CounterTracker
+from disruptive.events.events import Event
+
+READINGS = 1_000_000
+DEVICES = 1000
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore
+    except ModuleNotFoundError as e:
+        raise NotImplementedError(str(e))
+    return numpy
+
+
+class TimeCounterDeltas:
+    items = {"time_counter_deltas": READINGS}
+
+    def setup(self) -> None:
+        np = _numpy()
+        rng = np.random.default_rng(1)
+
+        # Touch counters read every 15 minutes, with occasional restarts.
+        per_device = READINGS // DEVICES
+        totals = np.cumsum(rng.integers(0, 5, (DEVICES, per_device)), axis=1)
+        restart = rng.random((DEVICES, per_device)) < 0.001
+        totals -= np.maximum.accumulate(np.where(restart, totals, 0), axis=1)
+        self.columns = {
+            "device_id": np.repeat(
+                np.array(
+                    [f"dev{i:017d}" for i in range(DEVICES)],
+                    dtype=object,
+                ),
+                per_device,
+            ),
+            "metric": np.full(READINGS, "touch_count", dtype=object),
+            "time": np.datetime64("2022-01-01", "ns")
+            + np.tile(np.arange(per_device), DEVICES)
+            * np.timedelta64(15, "m"),
+            "value": totals.ravel(),
+        }
+
+    def time_counter_deltas(self) -> None:
+        import disruptive.counters as dtcounters
+
+        dtcounters.counter_deltas(
+            **self.columns,
+            interval=timedelta(hours=1),
+            max_gap=timedelta(hours=2),
+        )
+
+
+class TimeCounterTracker:
+    items = {"time_add": 10_000}
+
+    def setup(self) -> None:
+        self.events = [
+            Event(
+                {
+                    "eventId": f"evt{i:017d}",
+                    "eventType": "touchCount",
+                    "targetName": "projects/project_id/devices/"
+                    f"dev{i % 50:017d}",
+                    "data": {
+                        "touchCount": {
+                            "total": i // 50,
+                            "updateTime": f"2022-01-01T{i // 3600 % 24:02d}"
+                            f":{i // 60 % 60:02d}:{i % 60:02d}Z",
+                        }
+                    },
+                    "timestamp": "2022-01-01T00:00:00Z",
+                }
+            )
+            for i in range(10_000)
+        ]
+
+    def time_add(self) -> None:
+        tracker = CounterTracker(interval=900)
+        for event in self.events:
+            tracker.add(event)
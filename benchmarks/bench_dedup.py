@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from disruptive.dedup import EventDeduplicator
+
+
+class TimeEventDeduplicator:
+    items = {"time_seen_unique": 100_000, "time_seen_duplicates": 100_000}
+
+    def setup(self) -> None:
+        self.ids = [f"evt{i:017d}" for i in range(100_000)]
+
+    def time_seen_unique(self) -> None:
+        # Bounded well below the number of IDs, such that it rotates.
+        dedup = EventDeduplicator(max_size=20_000)
+        for event_id in self.ids:
+            dedup.seen(event_id)
+
+    def time_seen_duplicates(self) -> None:
+        dedup = EventDeduplicator()
+        for event_id in self.ids[:1000]:
+            dedup.seen(event_id)
+        for i in range(100_000):
+            dedup.seen(self.ids[i % 1000])
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from disruptive.dispatch import Lane, PriorityDispatcher
+from disruptive.events.events import Event
+
+from benchmarks import _data
+
+EVENTS = 10_000
+
+
+class TimePriorityDispatcher:
+    # Events dispatched per second, through to the handler.
+    items = {"time_run": EVENTS, "time_run_lanes": EVENTS}
+
+    def setup(self) -> None:
+        self.events = [Event(event) for event in _data.mixed_events(EVENTS)]
+
+    def time_run(self) -> None:
+        with PriorityDispatcher(lambda event: None) as dispatcher:
+            dispatcher.run(self.events)
+
+    def time_run_lanes(self) -> None:
+        lanes = [
+            Lane("alerts", event_types=["waterPresent", "contact"]),
+            Lane("site", label_filters={"site": "oslo"}),
+        ]
+        with PriorityDispatcher(lambda event: None, lanes) as dispatcher:
+            dispatcher.run(self.events)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from disruptive.events.events import Event
+from disruptive.resources.eventhistory import EventHistory
+
+from benchmarks import _data
+
+
+def _history(n: int) -> EventHistory:
+    return EventHistory(Event.from_mixed_list(_data.mixed_events(n)))
+
+
+class TimePandas:
+    items = {"time_to_pandas": 5000}
+
+    def setup(self) -> None:
+        self.history = _history(5000)
+        try:
+            self.history.to_pandas()
+        except ModuleNotFoundError as e:
+            raise NotImplementedError(str(e))
+
+    def time_to_pandas(self) -> None:
+        self.history.to_pandas()
+
+
+class TimePolars:
+    items = {"time_to_polars": 5000}
+
+    def setup(self) -> None:
+        self.history = _history(5000)
+        try:
+            self.history.to_polars()
+        except Exception as e:
+            # Missing, or an incompatible version of, polars.
+            raise NotImplementedError(repr(e))
+
+    def time_to_polars(self) -> None:
+        self.history.to_polars()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import copy
+
+import disruptive.transforms as dttrans
+from disruptive.events.events import Event, Temperature
+from disruptive.resources.device import Device
+
+from benchmarks import _data
+
+
+class TimeEvents:
+    items = {
+        "time_from_mixed_list": 1000,
+        "time_temperature_from_raw": 1000,
+    }
+
+    def setup(self) -> None:
+        self.page = _data.mixed_events(1000)
+        self.temperature = _data.temperature_data(1000)
+
+    def time_from_mixed_list(self) -> None:
+        Event.from_mixed_list(self.page)
+
+    def time_temperature_from_raw(self) -> None:
+        Temperature._from_raw(self.temperature)
+
+
+class TimeDevice:
+    def setup(self) -> None:
+        self.device = _data.device_with_full_reported()
+
+    def time_device_full_reported(self) -> None:
+        # Devices are constructed from freshly decoded responses.
+        Device(copy.copy(self.device))
+
+
+class TimeTransforms:
+    items = {"time_to_datetime": 1000}
+
+    def setup(self) -> None:
+        self.timestamps = [_data.timestamp(i) for i in range(1000)]
+
+    def time_to_datetime(self) -> None:
+        for ts in self.timestamps:
+            dttrans.to_datetime(ts)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import copy
+from datetime import datetime, timezone
+
+from disruptive.inventory import InventorySnapshot
+
+DEVICES = 100_000
+
+
+def _snapshot() -> InventorySnapshot:
+    return InventorySnapshot(
+        datetime(2022, 1, 1, tzinfo=timezone.utc),
+        devices={
+            f"dev{i:017d}": {
+                "project": f"p{i % 100}",
+                "type": "temperature",
+                "product": "",
+                "labels": {"room": str(i % 500), "floor": str(i % 7)},
+            }
+            for i in range(DEVICES)
+        },
+    )
+
+
+class TimeInventorySnapshot:
+    items = {
+        "time_diff": DEVICES,
+        "time_to_bytes": DEVICES,
+        "time_from_bytes": DEVICES,
+    }
+
+    def setup(self) -> None:
+        self.old = _snapshot()
+        self.new = copy.deepcopy(self.old)
+
+        # A percent of devices relabelled, moved or replaced.
+        for i in range(0, DEVICES, 100):
+            device = self.new.devices[f"dev{i:017d}"]
+            device["labels"]["room"] = "moved"
+        for i in range(1, DEVICES, 100):
+            self.new.devices.pop(f"dev{i:017d}")
+            self.new.devices[f"new{i:017d}"] = {
+                "project": "p0",
+                "type": "touch",
+                "product": "",
+                "labels": {},
+            }
+        self.data = self.old.to_bytes()
+
+    def time_diff(self) -> None:
+        self.old.diff(self.new)
+
+    def time_to_bytes(self) -> None:
+        self.old.to_bytes()
+
+    def time_from_bytes(self) -> None:
+        InventorySnapshot.from_bytes(self.data)
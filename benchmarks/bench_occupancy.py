@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+CHANGES = 1_000_000
+DEVICES = 1000
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore
+    except ModuleNotFoundError as e:
+        raise NotImplementedError(str(e))
+    return numpy
+
+
+class TimeOccupancy:
+    items = {
+        "time_sessionize": CHANGES,
+        "time_utilization": CHANGES,
+    }
+
+    def setup(self) -> None:
+        import disruptive.occupancy as dtoccupancy
+
+        np = _numpy()
+        rng = np.random.default_rng(1)
+
+        # Desks changing state every few minutes, in arbitrary order.
+        seconds = np.cumsum(rng.integers(60, 600, CHANGES))
+        self.columns = {
+            "device_id": np.array(
+                [f"dev{i:017d}" for i in range(DEVICES)],
+                dtype=object,
+            )[rng.integers(0, DEVICES, CHANGES)],
+            "metric": np.full(CHANGES, "desk_occupancy", dtype=object),
+            "time": np.datetime64("2022-01-01", "ns")
+            + (seconds // DEVICES) * np.timedelta64(1, "s"),
+            "state": np.array(["OCCUPIED", "NOT_OCCUPIED"], dtype=object)[
+                rng.integers(0, 2, CHANGES)
+            ],
+        }
+        self.intervals = dtoccupancy.sessionize(**self.columns)
+
+    def time_sessionize(self) -> None:
+        import disruptive.occupancy as dtoccupancy
+
+        dtoccupancy.sessionize(**self.columns)
+
+    def time_utilization(self) -> None:
+        import disruptive.occupancy as dtoccupancy
+
+        dtoccupancy.utilization(self.intervals, timedelta(minutes=15))
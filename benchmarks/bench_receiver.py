@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import io
+import json
+import hashlib
+
+from disruptive.authentication import create_jwt
+from disruptive.receiver import PushReceiver
+
+from benchmarks import _data
+
+SECRET = "benchmark-secret"
+
+
+def _requests(n: int) -> list[tuple[bytes, str]]:
+    requests = []
+    for event in _data.mixed_events(n):
+        body = json.dumps({"event": event, "labels": {}}).encode()
+        signature = create_jwt(
+            payload={"checksum_sha256": hashlib.sha256(body).hexdigest()},
+            secret=SECRET,
+            algorithm="HS256",
+            headers={"alg": "HS256"},
+        )
+        requests.append((body, signature))
+    return requests
+
+
+class TimePushReceiver:
+    # Requests per second on a single core.
+    items = {
+        "time_handle": 1000,
+        "time_handle_raw": 1000,
+        "time_handle_duplicates": 1000,
+        "time_wsgi": 1000,
+    }
+
+    def setup(self) -> None:
+        self.requests = _requests(1000)
+
+    def _receiver(self, **kwargs: bool) -> PushReceiver:
+        receiver = PushReceiver(lambda batch: None, SECRET, **kwargs)
+        receiver.close()
+        return receiver
+
+    def time_handle(self) -> None:
+        receiver = self._receiver()
+        for body, signature in self.requests:
+            receiver.handle(body, signature)
+        receiver.flush()
+
+    def time_handle_raw(self) -> None:
+        receiver = self._receiver(decode=False)
+        for body, signature in self.requests:
+            receiver.handle(body, signature)
+        receiver.flush()
+
+    def time_handle_duplicates(self) -> None:
+        receiver = self._receiver()
+        receiver.handle(*self.requests[0])
+        for _ in self.requests:
+            receiver.handle(*self.requests[0])
+        receiver.flush()
+
+    def time_wsgi(self) -> None:
+        receiver = self._receiver()
+        for body, signature in self.requests:
+            environ = {
+                "REQUEST_METHOD": "POST",
+                "CONTENT_LENGTH": str(len(body)),
+                "HTTP_X_DT_SIGNATURE": signature,
+                "wsgi.input": io.BytesIO(body),
+            }
+            receiver.wsgi(environ, lambda status, headers: None)
+        receiver.flush()
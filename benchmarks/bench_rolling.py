@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from disruptive.events.events import Event
+from disruptive.rolling import RollingStats
+
+from benchmarks import _data
+
+
+class TimeRollingStats:
+    items = {"time_add": 10_000}
+
+    def setup(self) -> None:
+        self.events = Event.from_mixed_list(_data.mixed_events(10_000))
+
+    def time_add(self) -> None:
+        stats = RollingStats(window=600, max_samples=100)
+        for event in self.events:
+            stats.add(event)
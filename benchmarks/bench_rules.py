@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from disruptive.events.events import Event
+from disruptive.resources.device import Device
+from disruptive.rules import Rule, RuleEngine
+
+from benchmarks import _data
+
+DEVICES = 50
+
+
+def _engine(rules: int) -> RuleEngine:
+    # One temperature rule per room, spread over the devices.
+    engine = RuleEngine(
+        Rule(
+            f"room-{i}",
+            "temperature",
+            ">",
+            25,
+            duration=600,
+            label_filters={"room": str(i)},
+        )
+        for i in range(rules)
+    )
+    engine.seed(
+        Device(
+            {
+                "name": f"projects/project_id/devices/dev{i:017d}",
+                "type": "temperature",
+                "labels": {"room": str(i % rules)},
+                "reported": {},
+            }
+        )
+        for i in range(DEVICES)
+    )
+    return engine
+
+
+class TimeRuleEngine:
+    items = {
+        "time_evaluate_10_rules": 10_000,
+        "time_evaluate_1000_rules": 10_000,
+        "time_evaluate_10000_rules": 10_000,
+    }
+
+    def setup(self) -> None:
+        self.events = Event.from_mixed_list(_data.mixed_events(10_000))
+        self.engines = {n: _engine(n) for n in [10, 1000, 10_000]}
+
+    def _evaluate(self, engine: RuleEngine) -> None:
+        for event in self.events:
+            engine.evaluate(event)
+
+    def time_evaluate_10_rules(self) -> None:
+        self._evaluate(self.engines[10])
+
+    def time_evaluate_1000_rules(self) -> None:
+        self._evaluate(self.engines[1000])
+
+    def time_evaluate_10000_rules(self) -> None:
+        self._evaluate(self.engines[10_000])
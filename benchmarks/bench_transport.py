@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import itertools
+
+import disruptive
+import disruptive.requests as dtrequests
+from disruptive.events.events import Event
+
+from benchmarks import _data
+from tests.fakeserver import FakeServer
+
+
+class TimePaginatedGet:
+    items = {"time_paginated_get": 10000, "time_list_devices": 10000}
+
+    def setup(self) -> None:
+        self.server = FakeServer(page_size=1000, seed=1)
+        self.server.start()
+        self.server.add_devices("project_id", 10000, labels={"room": "1"})
+
+        self._auth = disruptive.default_auth
+        disruptive.default_auth = self.server.auth()
+
+    def teardown(self) -> None:
+        disruptive.default_auth = self._auth
+        self.server.stop()
+
+    def time_paginated_get(self) -> None:
+        dtrequests.DTRequest.paginated_get(
+            url="/projects/project_id/devices",
+            pagination_key="devices",
+            params={},
+            base_url=self.server.base_url,
+        )
+
+    def time_list_devices(self) -> None:
+        disruptive.Device.list_devices(
+            "project_id",
+            base_url=self.server.base_url,
+        )
+
+
+class TimeStream:
+    items = {"time_stream_decode": 1000, "time_stream_end_to_end": 1000}
+
+    def setup(self) -> None:
+        self.lines = _data.stream_lines(1000)
+
+        # Publish synthetic events as fast as the server is able to.
+        self.server = FakeServer(stream_rate=1e9, seed=1)
+        self.server.start()
+        self.server.add_devices("project_id", 100)
+
+        self._auth = disruptive.default_auth
+        disruptive.default_auth = self.server.auth()
+
+    def teardown(self) -> None:
+        disruptive.default_auth = self._auth
+        self.server.stop()
+
+    def time_stream_decode(self) -> None:
+        # The per-line work done by the client on each received event.
+        for line in self.lines:
+            Event(json.loads(line)["result"]["event"])
+
+    def time_stream_end_to_end(self) -> None:
+        stream = disruptive.Stream.event_stream(
+            "project_id",
+            base_url=self.server.base_url,
+        )
+        for _ in itertools.islice(stream, 1000):
+            pass
+        stream.close()
@@ -0,0 +1,245 @@
+"""
+Runs the benchmark suite and writes comparable results as JSON.
+
+Benchmarks are written in the style of asv. Each `bench_*.py` module in
+this package holds classes prefixed `Time`, whose methods prefixed `time_`
+are timed. An optional `setup` runs before the methods of a class and an
+optional `teardown` after. If `setup` raises NotImplementedError, such as
+when an optional dependency is missing, the class is skipped. A class may
+set `items` to the number of items each call processes, by method name,
+for results to also be reported per item.
+
+Usage
+-----
+    python -m benchmarks.run
+    python -m benchmarks.run -k pandas -o results.json
+    python -m benchmarks.run --compare baseline.json
+
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import disruptive
+
+BENCHMARK_DIR = Path(__file__).parent
+
+
+def _time(func: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+def _calibrate(func: Callable[[], Any], min_time: float) -> int:
+    # Find the number of calls per round that take at least min_time.
+    number = 1
+    while True:
+        elapsed = _time(func, number)
+        if elapsed >= min_time:
+            return number
+        if elapsed > 0:
+            scale = min_time / elapsed
+            number = max(number + 1, int(number * min(scale * 1.2, 10)))
+        else:
+            number *= 10
+
+
+def run_benchmark(
+    func: Callable[[], Any],
+    rounds: int,
+    min_time: float,
+    items: Optional[int] = None,
+) -> dict:
+    """
+    Times a function, returning statistics in seconds per call.
+
+    """
+
+    number = _calibrate(func, min_time)
+    times = [_time(func, number) / number for _ in range(rounds)]
+
+    result: dict[str, Any] = {
+        "unit": "seconds",
+        "number": number,
+        "rounds": rounds,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if rounds > 1 else 0.0,
+    }
+    if items is not None:
+        result["items"] = items
+        result["items_per_second"] = items / result["median"]
+    return result
+
+
+def discover() -> list[tuple[str, type]]:
+    """
+    Returns the benchmark classes of each module, by qualified name.
+
+    """
+
+    classes = []
+    for path in sorted(BENCHMARK_DIR.glob("bench_*.py")):
+        module = importlib.import_module(f"benchmarks.{path.stem}")
+        for name, obj in sorted(vars(module).items()):
+            if not (isinstance(obj, type) and name.startswith("Time")):
+                continue
+            if obj.__module__ != module.__name__:
+                continue
+            classes.append((f"{path.stem}.{name}", obj))
+    return classes
+
+
+def run(
+    pattern: Optional[str] = None,
+    rounds: int = 5,
+    min_time: float = 0.1,
+) -> dict:
+    """
+    Runs all benchmarks matching the pattern.
+
+    """
+
+    results: dict[str, Any] = dict()
+    for class_name, cls in discover():
+        methods = [
+            m
+            for m in sorted(dir(cls))
+            if m.startswith("time_")
+            and (pattern is None or pattern in f"{class_name}.{m}")
+        ]
+        if len(methods) == 0:
+            continue
+
+        instance = cls()
+        try:
+            if hasattr(instance, "setup"):
+                instance.setup()
+        except NotImplementedError as e:
+            for method in methods:
+                name = f"{class_name}.{method}"
+                results[name] = {"skipped": str(e) or "not available"}
+                print(f"{name:<60} skipped")
+            continue
+
+        try:
+            items = getattr(instance, "items", {})
+            for method in methods:
+                name = f"{class_name}.{method}"
+                result = run_benchmark(
+                    getattr(instance, method),
+                    rounds=rounds,
+                    min_time=min_time,
+                    items=items.get(method),
+                )
+                results[name] = result
+                print(f"{name:<60} {_format_seconds(result['median'])}")
+        finally:
+            if hasattr(instance, "teardown"):
+                instance.teardown()
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "disruptive": disruptive.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 1.1) -> bool:
+    """
+    Prints the ratio of current to baseline median times, returning False
+    if any benchmark is slower than the threshold.
+
+    """
+
+    ok = True
+    print(f"\n{'benchmark':<60} {'ratio':>7}")
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name, {})
+        if "median" not in result or "median" not in before:
+            continue
+        ratio = result["median"] / before["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  slower"
+            ok = False
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{name:<60} {ratio:>7.2f}{flag}")
+    return ok
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:>9.3f} {unit}"
+    return f"{seconds / 1e-9:>9.3f} ns"
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BENCHMARK_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-k", dest="pattern", help="Run matching names.")
+    parser.add_argument(
+        "-o",
+        dest="output",
+        default="benchmark-results.json",
+        help="Path of the JSON results.",
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1)
+    parser.add_argument(
+        "--compare",
+        help="Path of previous JSON results to compare against.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.1,
+        help="Slowdown ratio that fails the comparison.",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.rounds, args.min_time)
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    print(f"\nResults written to {args.output}.")
+
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,30 +15,192 @@ emulator_base_url = "https://emulator.disruptive-technologies.com/v2"
 request_timeout = 3  # seconds
 request_attempts = 3  # attempts
 
-# Authentication scheme.
-from disruptive.authentication import Auth as Auth  # noqa
-
-# Initialize package with environment variables authentication scheme.
-default_auth = Auth.init()
-
-# Additional helper modules.
-from disruptive import errors as errors  # noqa
-from disruptive import events as events  # noqa
-from disruptive import logging as logging  # noqa
-from disruptive import outputs as outputs  # noqa
-from disruptive.outputs import Member as Member  # noqa
-from disruptive.resources.claim import Claim as Claim  # noqa
-from disruptive.resources.data_connector import DataConnector as DataConnector  # noqa
-
-# Resources.
-from disruptive.resources.device import Device as Device  # noqa
-from disruptive.resources.emulator import Emulator as Emulator  # noqa
-from disruptive.resources.eventhistory import EventHistory as EventHistory  # noqa
-from disruptive.resources.organization import Organization as Organization  # noqa
-from disruptive.resources.project import Project as Project  # noqa
-from disruptive.resources.role import Role as Role  # noqa
-from disruptive.resources.service_account import Key as Key  # noqa
-from disruptive.resources.service_account import (  # noqa
-    ServiceAccount as ServiceAccount,
-)
-from disruptive.resources.stream import Stream as Stream  # noqa
+# Optional client-side limit on requests per second, shared by all threads.
+# Default value None sends requests as fast as they are made.
+request_rate_limit = None  # requests per second
+
+# Maximum number of requests in flight for methods that send them in parallel.
+request_concurrency = 8  # requests
+
+# Optional PermissionCache that serves permission listings and raises
+# Forbidden before sending requests the caller certainly lacks permission for.
+# Default value None sends every request.
+permission_cache = None
+
+import importlib as _importlib  # noqa
+import threading as _threading  # noqa
+from typing import TYPE_CHECKING as _TYPE_CHECKING, Any as _Any  # noqa
+
+if _TYPE_CHECKING:
+    # Authentication scheme.
+    from disruptive.authentication import Auth as Auth  # noqa
+    from disruptive.authentication import Unauthenticated, ServiceAccountAuth
+
+    # Package-wide authentication object, resolved on first use.
+    default_auth: Unauthenticated | ServiceAccountAuth
+
+    # Additional helper modules.
+    from disruptive import errors as errors  # noqa
+    from disruptive import events as events  # noqa
+    from disruptive import logging as logging  # noqa
+    from disruptive import outputs as outputs  # noqa
+    from disruptive import receiver as receiver  # noqa
+    from disruptive.outputs import Member as Member  # noqa
+
+    # Resources.
+    from disruptive.resources.claim import Claim as Claim  # noqa
+    from disruptive.resources.data_connector import (  # noqa
+        DataConnector as DataConnector,
+    )
+    from disruptive.resources.device import Device as Device  # noqa
+    from disruptive.resources.emulator import Emulator as Emulator  # noqa
+    from disruptive.resources.eventhistory import (  # noqa
+        EventHistory as EventHistory,
+    )
+    from disruptive.resources.organization import (  # noqa
+        Organization as Organization,
+    )
+    from disruptive.resources.project import Project as Project  # noqa
+    from disruptive.resources.role import Role as Role  # noqa
+    from disruptive.resources.service_account import Key as Key  # noqa
+    from disruptive.resources.service_account import (  # noqa
+        ServiceAccount as ServiceAccount,
+    )
+    from disruptive.resources.stream import Stream as Stream  # noqa
+
+    # Local state.
+    from disruptive.registry import DeviceRegistry as DeviceRegistry  # noqa
+    from disruptive.state import ReportedStore as ReportedStore  # noqa
+    from disruptive.cache import EventCache as EventCache  # noqa
+    from disruptive.permissions import (  # noqa
+        PermissionCache as PermissionCache,
+    )
+
+    # Bulk operations.
+    from disruptive.labels import LabelPlan as LabelPlan  # noqa
+    from disruptive.labels import LabelWriteBuffer as LabelWriteBuffer  # noqa
+    from disruptive.claims import ClaimPlan as ClaimPlan  # noqa
+    from disruptive.claims import ClaimOutcome as ClaimOutcome  # noqa
+    from disruptive.inventory import (  # noqa
+        InventorySnapshot as InventorySnapshot,
+    )
+    from disruptive.inventory import InventoryDiff as InventoryDiff  # noqa
+
+    # Load testing.
+    from disruptive.loadgen import LoadGenerator as LoadGenerator  # noqa
+
+    # Data Connector receiver.
+    from disruptive.receiver import PushReceiver as PushReceiver  # noqa
+    from disruptive.poller import MetricsPoller as MetricsPoller  # noqa
+
+    # Event processing.
+    from disruptive.dedup import EventDeduplicator as EventDeduplicator  # noqa
+    from disruptive.reorder import ReorderBuffer as ReorderBuffer  # noqa
+    from disruptive.rolling import RollingStats as RollingStats  # noqa
+    from disruptive.rules import Rule as Rule  # noqa
+    from disruptive.rules import RuleEngine as RuleEngine  # noqa
+    from disruptive.occupancy import (  # noqa
+        OccupancyTracker as OccupancyTracker,
+    )
+    from disruptive.counters import CounterTracker as CounterTracker  # noqa
+    from disruptive.dispatch import Lane as Lane  # noqa
+    from disruptive.dispatch import (  # noqa
+        PriorityDispatcher as PriorityDispatcher,
+    )
+
+
+# Helper modules that are imported the first time they are accessed.
+_LAZY_MODULES = [
+    "aggregate",
+    "counters",
+    "errors",
+    "events",
+    "logging",
+    "occupancy",
+    "outputs",
+    "receiver",
+]
+
+# Public names that are imported from their module on first access.
+# Keeping these lazy means `import disruptive` does not pay for the
+# events module nor the third-party requests package until they are used.
+_LAZY_ATTRIBUTES = {
+    # Authentication scheme.
+    "Auth": "disruptive.authentication",
+    # Outputs.
+    "Member": "disruptive.outputs",
+    # Resources.
+    "Claim": "disruptive.resources.claim",
+    "DataConnector": "disruptive.resources.data_connector",
+    "Device": "disruptive.resources.device",
+    "Emulator": "disruptive.resources.emulator",
+    "EventHistory": "disruptive.resources.eventhistory",
+    "Organization": "disruptive.resources.organization",
+    "Project": "disruptive.resources.project",
+    "Role": "disruptive.resources.role",
+    "Key": "disruptive.resources.service_account",
+    "ServiceAccount": "disruptive.resources.service_account",
+    "Stream": "disruptive.resources.stream",
+    # Local state.
+    "DeviceRegistry": "disruptive.registry",
+    "ReportedStore": "disruptive.state",
+    "EventCache": "disruptive.cache",
+    "PermissionCache": "disruptive.permissions",
+    # Bulk operations.
+    "LabelPlan": "disruptive.labels",
+    "LabelWriteBuffer": "disruptive.labels",
+    "ClaimPlan": "disruptive.claims",
+    "ClaimOutcome": "disruptive.claims",
+    "InventorySnapshot": "disruptive.inventory",
+    "InventoryDiff": "disruptive.inventory",
+    # Load testing.
+    "LoadGenerator": "disruptive.loadgen",
+    # Data Connector receiver.
+    "PushReceiver": "disruptive.receiver",
+    "MetricsPoller": "disruptive.poller",
+    # Event processing.
+    "EventDeduplicator": "disruptive.dedup",
+    "ReorderBuffer": "disruptive.reorder",
+    "RollingStats": "disruptive.rolling",
+    "Rule": "disruptive.rules",
+    "RuleEngine": "disruptive.rules",
+    "OccupancyTracker": "disruptive.occupancy",
+    "CounterTracker": "disruptive.counters",
+    "Lane": "disruptive.dispatch",
+    "PriorityDispatcher": "disruptive.dispatch",
+}
+
+# Guards the one-time resolution of default_auth between threads.
+_default_auth_lock = _threading.Lock()
+
+
+def __getattr__(name: str) -> _Any:
+    # Only called when `name` is not already a module global.
+    if name == "default_auth":
+        with _default_auth_lock:
+            # Another thread may have resolved it while we waited.
+            if "default_auth" not in globals():
+                from disruptive.authentication import Auth
+
+                # Initialize package with environment variables
+                # authentication scheme on first use.
+                globals()["default_auth"] = Auth.init()
+        return globals()["default_auth"]
+
+    if name in _LAZY_MODULES:
+        # Importing a submodule also binds it as a package attribute.
+        return _importlib.import_module("disruptive." + name)
+
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(_importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+
+        # Cache the attribute so that subsequent lookups are plain globals.
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    names = set(globals()) | set(_LAZY_MODULES) | set(_LAZY_ATTRIBUTES)
+    return sorted(names | {"default_auth"})
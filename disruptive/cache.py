@@ -0,0 +1,569 @@
+from __future__ import annotations
+
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+import disruptive.transforms as dttrans
+from disruptive.resources.eventhistory import EventHistory
+
+# Event type key of time ranges fetched without an event type filter,
+# which are complete for every type.
+_ALL_TYPES = "*"
+
+# Margin added to both ends of each requested time range.
+_PADDING = 0.001  # seconds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_time
+    ON events (project_id, device_id, event_type, timestamp);
+CREATE TABLE IF NOT EXISTS ranges (
+    project_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_by_device
+    ON ranges (project_id, device_id, event_type);
+CREATE TABLE IF NOT EXISTS devices (
+    project_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (project_id, device_id)
+);
+"""
+
+
+class EventCache:
+    """
+    On-disk cache of event history, backed by SQLite.
+
+    Events are indexed by project, device, event type and timestamp.
+    For each device and event type, the cache also tracks which time
+    ranges it holds completely, such that repeated or overlapping calls
+    to :code:`EventHistory.list_events` only request the sub-ranges it
+    is missing and read the rest from disk.
+
+    Events newer than `settle_time` are always fetched again, as they
+    may still be joined by late or backfilled events. When the stored
+    events exceed `max_size`, the least recently used devices are
+    evicted. Space freed by eviction is returned to the file system
+    by :code:`compact`.
+
+    Attributes
+    ----------
+    path : str
+        Path of the SQLite database file.
+    max_size : int
+        Maximum number of bytes of stored events.
+    settle_time : float
+        Number of seconds after which a time range is considered final.
+    fetches : int
+        Number of time ranges requested from the API.
+    evictions : int
+        Number of devices evicted to stay within `max_size`.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 1 << 30,
+        settle_time: float = 300,
+    ) -> None:
+        """
+        Opens, or creates, an EventCache at the given path.
+
+        Parameters
+        ----------
+        path : str
+            Path of the SQLite database file, or ":memory:" for a cache
+            that only lives as long as the object.
+        max_size : int, optional
+            Maximum number of bytes of stored events. Defaults to 1 GiB.
+        settle_time : float, optional
+            Number of seconds after which a time range is considered final.
+
+        Examples
+        --------
+        >>> cache = dt.EventCache('events.sqlite')
+        >>> history = dt.EventHistory.list_events(
+        ...     '<DEVICE_ID>',
+        ...     '<PROJECT_ID>',
+        ...     cache=cache,
+        ... )
+
+        """
+
+        if max_size < 0:
+            raise dterrors.ConfigurationError(
+                f"Cache max_size must not be negative, got {max_size}."
+            )
+
+        self.path = path
+        self.max_size = max_size
+        self.settle_time = settle_time
+
+        self.fetches = 0
+        self.evictions = 0
+
+        # Requests are sent without the lock, but writes are serialized.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self) -> EventCache:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """
+        Number of bytes of stored events.
+
+        """
+
+        with self._lock:
+            row = self._db.execute("SELECT SUM(bytes) FROM devices").fetchone()
+        return int(row[0] or 0)
+
+    def list_events(
+        self,
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        **kwargs: Any,
+    ) -> EventHistory:
+        """
+        Get the event history for a single device, through the cache.
+
+        Equivalent to :code:`EventHistory.list_events` with this cache,
+        except that the events are ordered by timestamp.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+        project_id : str
+            Unique ID of the target project.
+        event_types : list[str], optional
+            If provided, only the specified
+            :ref:`event types <event_types>` are fetched.
+        start_time : str, datetime, optional
+            Specifies from when event history is fetched.
+            Defaults to 24 hours ago.
+        end_time : str, datetime, optional
+            Specified until when event history is fetched.
+            Defaults to now.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        events : EventHistory[Event]
+            A list of all events in the time range.
+
+        """
+
+        return EventHistory.list_events(
+            device_id,
+            project_id,
+            event_types=event_types,
+            start_time=start_time,
+            end_time=end_time,
+            cache=self,
+            **kwargs,
+        )
+
+    def missing(
+        self,
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+    ) -> list[tuple[datetime, datetime]]:
+        """
+        Lists the time ranges that a call would request from the API.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+        project_id : str
+            Unique ID of the target project.
+        event_types : list[str], optional
+            The :ref:`event types <event_types>` of interest.
+            Defaults to all types.
+        start_time : str, datetime, optional
+            Start of the time range. Defaults to 24 hours ago.
+        end_time : str, datetime, optional
+            End of the time range. Defaults to now.
+
+        Returns
+        -------
+        ranges : list[tuple[datetime, datetime]]
+            Start and end of each missing time range, for any of the types.
+
+        """
+
+        start, end = _resolve_range(start_time, end_time)
+        with self._lock:
+            gaps = self._gaps(device_id, project_id, event_types, start, end)
+
+        out: set[tuple[float, float]] = set()
+        for ranges in gaps.values():
+            out.update(ranges)
+        return [(_to_datetime(s), _to_datetime(e)) for s, e in sorted(out)]
+
+    def evict(self, max_size: Optional[int] = None) -> int:
+        """
+        Evicts the least recently used devices until the stored events
+        take no more than `max_size` bytes.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Target number of bytes. Defaults to the `max_size` attribute.
+
+        Returns
+        -------
+        evicted : int
+            Number of devices evicted.
+
+        """
+
+        if max_size is None:
+            max_size = self.max_size
+
+        with self._lock:
+            return self._evict(max_size)
+
+    def compact(self) -> None:
+        """
+        Merges overlapping time ranges and returns the space freed by
+        evicted events to the file system.
+
+        This rewrites the database file, and should be called
+        periodically rather than after each eviction.
+
+        """
+
+        with self._lock:
+            keys = self._db.execute(
+                "SELECT DISTINCT project_id, device_id, event_type FROM ranges"
+            ).fetchall()
+            for project_id, device_id, event_type in keys:
+                self._merge_ranges(project_id, device_id, event_type)
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    def clear(self, project_id: Optional[str] = None) -> None:
+        """
+        Removes all cached events, or only those of a single project.
+
+        Parameters
+        ----------
+        project_id : str, optional
+            If provided, only events of this project are removed.
+
+        """
+
+        where, args = "", []
+        if project_id is not None:
+            where, args = " WHERE project_id = ?", [project_id]
+
+        with self._lock:
+            for table in ["events", "ranges", "devices"]:
+                self._db.execute(f"DELETE FROM {table}{where}", args)
+            self._db.commit()
+
+    def close(self) -> None:
+        """
+        Closes the underlying database.
+
+        """
+
+        with self._lock:
+            self._db.close()
+
+    def _list_raw_events(
+        self,
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        **kwargs: Any,
+    ) -> list[dict]:
+        start, end = _resolve_range(start_time, end_time)
+        with self._lock:
+            gaps = self._gaps(device_id, project_id, event_types, start, end)
+
+        # Types missing the same ranges share requests.
+        groups: dict[tuple, list[str]] = dict()
+        for key, ranges in gaps.items():
+            if len(ranges) > 0:
+                groups.setdefault(ranges, []).append(key)
+
+        settled = time.time() - self.settle_time
+        for ranges, keys in groups.items():
+            types = None if keys == [_ALL_TYPES] else sorted(keys)
+            for gap_start, gap_end in ranges:
+                dtlog.debug(
+                    "Fetching {} events of {} from {} to {}.".format(
+                        types or "all",
+                        device_id,
+                        _to_datetime(gap_start).isoformat(),
+                        _to_datetime(gap_end).isoformat(),
+                    )
+                )
+                # Padded, as boundaries are rounded to microseconds.
+                events = EventHistory._list_raw_events(
+                    device_id,
+                    project_id,
+                    event_types=types,
+                    start_time=_to_datetime(gap_start - _PADDING),
+                    end_time=_to_datetime(gap_end + _PADDING),
+                    **kwargs,
+                )
+                # Only ranges old enough to be final are recorded complete.
+                complete_end = min(gap_end, settled)
+                with self._lock:
+                    self.fetches += 1
+                    self._store(device_id, project_id, events)
+                    if complete_end > gap_start:
+                        for key in keys:
+                            self._add_range(
+                                project_id,
+                                device_id,
+                                key,
+                                gap_start,
+                                complete_end,
+                            )
+                    self._db.commit()
+
+        with self._lock:
+            rows = self._query(device_id, project_id, event_types, start, end)
+            self._db.execute(
+                "UPDATE devices SET accessed = ? "
+                "WHERE project_id = ? AND device_id = ?",
+                (time.time(), project_id, device_id),
+            )
+            self._evict(self.max_size)
+            self._db.commit()
+
+        return [json.loads(raw) for (raw,) in rows]
+
+    def _gaps(
+        self,
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]],
+        start: float,
+        end: float,
+    ) -> dict[str, tuple[tuple[float, float], ...]]:
+        # Must be called with the lock held.
+        # Ranges fetched for all types also cover each single type.
+        keys = [_ALL_TYPES] if event_types is None else list(event_types)
+        rows = self._db.execute(
+            "SELECT event_type, start_time, end_time FROM ranges "
+            "WHERE project_id = ? AND device_id = ? "
+            "AND end_time > ? AND start_time < ?",
+            (project_id, device_id, start, end),
+        ).fetchall()
+
+        gaps = dict()
+        for key in keys:
+            covered = sorted(
+                (s, e) for t, s, e in rows if t == key or t == _ALL_TYPES
+            )
+            missing = []
+            cursor = start
+            for s, e in covered:
+                if s > cursor:
+                    missing.append((cursor, min(s, end)))
+                cursor = max(cursor, e)
+                if cursor >= end:
+                    break
+            if cursor < end:
+                missing.append((cursor, end))
+            gaps[key] = tuple(missing)
+        return gaps
+
+    def _store(
+        self,
+        device_id: str,
+        project_id: str,
+        events: list[dict],
+    ) -> None:
+        # Must be called with the lock held.
+        self._db.executemany(
+            "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    event["eventId"],
+                    project_id,
+                    device_id,
+                    event["eventType"],
+                    _to_epoch(event["timestamp"]),
+                    json.dumps(event, separators=(",", ":")),
+                )
+                for event in events
+            ],
+        )
+
+        # Size is tracked per device for eviction.
+        self._db.execute(
+            "INSERT OR REPLACE INTO devices VALUES (?, ?, "
+            "(SELECT COALESCE(SUM(LENGTH(raw)), 0) FROM events "
+            "WHERE project_id = ? AND device_id = ?), ?)",
+            (project_id, device_id, project_id, device_id, time.time()),
+        )
+
+    def _add_range(
+        self,
+        project_id: str,
+        device_id: str,
+        event_type: str,
+        start: float,
+        end: float,
+    ) -> None:
+        # Must be called with the lock held.
+        self._db.execute(
+            "INSERT INTO ranges VALUES (?, ?, ?, ?, ?)",
+            (project_id, device_id, event_type, start, end),
+        )
+        self._merge_ranges(project_id, device_id, event_type)
+
+    def _merge_ranges(
+        self,
+        project_id: str,
+        device_id: str,
+        event_type: str,
+    ) -> None:
+        # Must be called with the lock held.
+        key = (project_id, device_id, event_type)
+        rows = self._db.execute(
+            "SELECT start_time, end_time FROM ranges "
+            "WHERE project_id = ? AND device_id = ? AND event_type = ? "
+            "ORDER BY start_time",
+            key,
+        ).fetchall()
+
+        merged: list[list[float]] = []
+        for s, e in rows:
+            if len(merged) > 0 and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        if len(merged) == len(rows):
+            return
+
+        self._db.execute(
+            "DELETE FROM ranges "
+            "WHERE project_id = ? AND device_id = ? AND event_type = ?",
+            key,
+        )
+        self._db.executemany(
+            "INSERT INTO ranges VALUES (?, ?, ?, ?, ?)",
+            [key + (s, e) for s, e in merged],
+        )
+
+    def _query(
+        self,
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]],
+        start: float,
+        end: float,
+    ) -> list[tuple[str]]:
+        # Must be called with the lock held.
+        sql = (
+            "SELECT raw FROM events WHERE project_id = ? AND device_id = ? "
+            "AND timestamp >= ? AND timestamp < ?"
+        )
+        args: list = [project_id, device_id, start, end]
+        if event_types is not None:
+            sql += " AND event_type IN ({})".format(
+                ",".join("?" * len(event_types))
+            )
+            args += event_types
+        return self._db.execute(sql + " ORDER BY timestamp", args).fetchall()
+
+    def _evict(self, max_size: int) -> int:
+        # Must be called with the lock held.
+        devices = self._db.execute(
+            "SELECT project_id, device_id, bytes FROM devices "
+            "ORDER BY accessed DESC"
+        ).fetchall()
+
+        # Keep the most recently used devices that fit.
+        total = 0
+        evicted = 0
+        for project_id, device_id, size in devices:
+            total += size
+            if total <= max_size:
+                continue
+            for table in ["events", "ranges", "devices"]:
+                self._db.execute(
+                    f"DELETE FROM {table} "
+                    "WHERE project_id = ? AND device_id = ?",
+                    (project_id, device_id),
+                )
+            evicted += 1
+
+        if evicted > 0:
+            dtlog.debug(f"Evicted {evicted} devices from the event cache.")
+            self.evictions += evicted
+        return evicted
+
+
+def _resolve_range(
+    start_time: Optional[str | datetime],
+    end_time: Optional[str | datetime],
+) -> tuple[float, float]:
+    # Defaults are the same as those of the API.
+    end = _to_epoch(end_time) if end_time is not None else time.time()
+    if start_time is not None:
+        start = _to_epoch(start_time)
+    else:
+        start = end - timedelta(hours=24).total_seconds()
+    return start, end
+
+
+def _to_epoch(ts: str | datetime) -> float:
+    moment = dttrans.to_datetime(ts)
+    if moment is None:
+        raise dterrors.FormatError(
+            "Got timestamp None, expected iso8601 <str> or <datetime>."
+        )
+
+    # Naive datetimes are sent to the API as UTC.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _to_datetime(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional, Union
+
+import disruptive.concurrency as dtconcurrency
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+from disruptive.resources.claim import Claim
+from disruptive.resources.device import ProgressCallback
+
+# Maximum number of kits and devices in a single claim request.
+DEFAULT_CHUNK_SIZE = 100
+
+
+class ClaimOutcome:
+    """
+    The result of claiming a single scanned identifier.
+
+    Attributes
+    ----------
+    identifier : str
+        The identifier as scanned, from a QR code or printed label.
+    project_id : str
+        Unique ID of the project the kit or device is claimed into.
+    status : str
+        One of "PENDING" until the plan is applied, "CLAIMABLE" if it
+        passed a dry run, "CLAIMED", or "FAILED".
+    type : str, optional
+        Whether the identifier is for a KIT or DEVICE, once resolved.
+    claim_id : str, optional
+        Unique ID of the kit or device, once resolved.
+    device_ids : list[str]
+        Unique IDs of the devices of the identifier, once resolved.
+    error : Exception, optional
+        Why the identifier could not be claimed. Identifiers that were
+        not found have a ClaimErrorDeviceNotFound with the identifier as
+        its device ID, and those rejected by the claim have a ClaimError.
+
+    """
+
+    PENDING = "PENDING"
+    CLAIMABLE = "CLAIMABLE"
+    CLAIMED = "CLAIMED"
+    FAILED = "FAILED"
+
+    def __init__(self, identifier: str, project_id: str) -> None:
+        self.identifier = identifier
+        self.project_id = project_id
+        self.status = ClaimOutcome.PENDING
+        self.type: Optional[str] = None
+        self.claim_id: Optional[str] = None
+        self.device_ids: list[str] = []
+        self.error: Optional[Exception] = None
+
+    def __repr__(self) -> str:
+        string = "{}.{}(identifier={}, status={}, error={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.identifier),
+            self.status,
+            repr(self.error),
+        )
+
+    def _fail(self, error: Exception) -> None:
+        self.status = ClaimOutcome.FAILED
+        self.error = error
+
+
+class ClaimPlan:
+    """
+    Kits and devices to claim, resolved from scanned identifiers and
+    grouped by the project they are claimed into.
+
+    Identifiers are resolved with :code:`Claim.claim_info` concurrently.
+    Those that cannot be resolved, or are devices that are already
+    claimed, fail without being submitted.
+
+    Attributes
+    ----------
+    outcomes : dict[str, ClaimOutcome]
+        Outcome of each identifier, in the order they were given.
+
+    """
+
+    def __init__(self, outcomes: dict[str, ClaimOutcome]) -> None:
+        self.outcomes = outcomes
+
+    def __repr__(self) -> str:
+        return "{}.{}({} kits, {} devices, {} failed)".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self._count(Claim.KIT),
+            self._count(Claim.DEVICE),
+            len(self.failed),
+        )
+
+    @property
+    def projects(self) -> dict[str, dict[str, list[str]]]:
+        """
+        Unique IDs of the kits and devices to claim, keyed by project ID,
+        then by claim type.
+
+        """
+
+        projects: dict[str, dict[str, list[str]]] = {}
+        for outcome in self._claimable():
+            group = projects.setdefault(
+                outcome.project_id,
+                {Claim.KIT: [], Claim.DEVICE: []},
+            )
+            group[str(outcome.type)].append(str(outcome.claim_id))
+        return projects
+
+    @property
+    def failed(self) -> list[ClaimOutcome]:
+        """
+        Outcomes of identifiers that can not be claimed.
+
+        """
+
+        return [
+            outcome
+            for outcome in self.outcomes.values()
+            if outcome.status == ClaimOutcome.FAILED
+        ]
+
+    @classmethod
+    def create(
+        cls,
+        identifiers: Union[Iterable[str], dict[str, str]],
+        target_project_id: Optional[str] = None,
+        organization_id: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        **kwargs: Any,
+    ) -> ClaimPlan:
+        """
+        Resolves identifiers into the kits and devices to claim.
+        Nothing is claimed until the plan is applied.
+
+        Parameters
+        ----------
+        identifiers : Iterable[str] | dict[str, str]
+            Scanned identifiers of kits and devices. If a dict, each
+            identifier is claimed into the project ID of its value.
+        target_project_id : str, optional
+            Unique ID of the project to claim into, if the identifiers
+            are not a dict.
+        organization_id : str, optional
+            The identifier of the organization that will claim the
+            devices or kits.
+        max_workers : int, optional
+            Maximum number of identifiers resolved at once.
+            Defaults to :code:`disruptive.request_concurrency`.
+        rate_limit : float, optional
+            Maximum number of identifiers resolved per second, in
+            addition to :code:`disruptive.request_rate_limit`.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        plan : ClaimPlan
+            The kits and devices to claim.
+
+        Raises
+        ------
+        ConfigurationError
+            If the identifiers are not a dict and no target project
+            is given.
+
+        Examples
+        --------
+        >>> plan = dt.ClaimPlan.create(scanned, '<PROJECT_ID>')
+        >>> outcomes = plan.apply()
+
+        """
+
+        if isinstance(identifiers, dict):
+            targets = dict(identifiers)
+        elif target_project_id is None:
+            raise dterrors.ConfigurationError(
+                "A target_project_id is required unless identifiers "
+                "map to their project."
+            )
+        else:
+            targets = dict.fromkeys(identifiers, target_project_id)
+
+        outcomes = {
+            identifier: ClaimOutcome(identifier, project_id)
+            for identifier, project_id in targets.items()
+        }
+
+        limiter = None
+        if rate_limit is not None:
+            limiter = dtconcurrency.RateLimiter(rate_limit)
+
+        def resolve(identifier: str) -> Claim:
+            if limiter is not None:
+                limiter.acquire()
+            return Claim.claim_info(identifier, organization_id, **kwargs)
+
+        dtlog.info(f"Resolving {len(outcomes)} claim identifiers.")
+
+        for identifier, claim, error in dtconcurrency.run_concurrently(
+            resolve,
+            list(outcomes),
+            max_workers,
+        ):
+            outcome = outcomes[identifier]
+            if isinstance(error, dterrors.NotFound):
+                # The identifier stands in for the unknown device ID.
+                outcome._fail(
+                    dterrors.ClaimErrorDeviceNotFound(
+                        {
+                            "deviceId": identifier,
+                            "code": "NOT_FOUND",
+                            "message": str(error),
+                        }
+                    )
+                )
+            elif error is not None:
+                outcome._fail(error)
+            elif claim is not None:
+                cls._resolve(outcome, claim)
+
+        return cls(outcomes)
+
+    def apply(
+        self,
+        dry_run: bool = False,
+        chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        **kwargs: Any,
+    ) -> dict[str, ClaimOutcome]:
+        """
+        Claims the kits and devices of the plan, in chunks per project.
+
+        Every chunk is first submitted as a dry run. Only the kits and
+        devices that pass it are then claimed, so a single rejected
+        identifier does not fail the claim of the others. Applying the
+        plan again skips the kits and devices it already claimed.
+
+        Parameters
+        ----------
+        dry_run : bool, optional
+            If True, stop after the dry run, marking the identifiers
+            that would be claimed as "CLAIMABLE".
+        chunk_size : int, optional
+            Maximum number of kits and devices per claim request.
+            If None, each project is claimed in a single request.
+        max_workers : int, optional
+            Maximum number of claim requests in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        progress_callback : Callable[[int, int], None], optional
+            Called with the number of identifiers submitted and the total
+            each time a claim request completes.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        outcomes : dict[str, ClaimOutcome]
+            Outcome of each identifier, in the order they were given.
+
+        Examples
+        --------
+        >>> outcomes = plan.apply()
+        >>> for outcome in outcomes.values():
+        ...     if outcome.error is not None:
+        ...         print(outcome.identifier, outcome.error)
+
+        """
+
+        dtlog.info(
+            "Claiming {} kits and {} devices into {} projects.".format(
+                self._count(Claim.KIT),
+                self._count(Claim.DEVICE),
+                len(self.projects),
+            )
+        )
+
+        self._submit(True, chunk_size, max_workers, None, **kwargs)
+        if not dry_run:
+            self._submit(
+                False,
+                chunk_size,
+                max_workers,
+                progress_callback,
+                **kwargs,
+            )
+
+        return self.outcomes
+
+    @staticmethod
+    def _resolve(outcome: ClaimOutcome, claim: Claim) -> None:
+        outcome.type = claim.type
+        item = claim.claimed_item
+        if isinstance(item, Claim.ClaimKit):
+            outcome.claim_id = item.kit_id
+            outcome.device_ids = [d.device_id for d in item.devices]
+            return
+
+        outcome.claim_id = item.device_id
+        outcome.device_ids = [item.device_id]
+        if item.is_claimed:
+            outcome._fail(
+                dterrors.ClaimErrorDeviceAlreadyClaimed(
+                    {
+                        "deviceId": item.device_id,
+                        "code": "ALREADY_CLAIMED",
+                        "message": "The device was previously claimed",
+                    }
+                )
+            )
+
+    def _claimable(self) -> list[ClaimOutcome]:
+        # Claimed outcomes are never resubmitted, which would fail them.
+        done = (ClaimOutcome.FAILED, ClaimOutcome.CLAIMED)
+        return [
+            outcome
+            for outcome in self.outcomes.values()
+            if outcome.status not in done and outcome.claim_id is not None
+        ]
+
+    def _count(self, claim_type: str) -> int:
+        return sum(1 for o in self._claimable() if o.type == claim_type)
+
+    def _submit(
+        self,
+        dry_run: bool,
+        chunk_size: Optional[int],
+        max_workers: Optional[int],
+        progress_callback: Optional[ProgressCallback],
+        **kwargs: Any,
+    ) -> None:
+        # Group the outcomes to submit into chunks per project.
+        by_project: dict[str, list[ClaimOutcome]] = {}
+        for outcome in self._claimable():
+            by_project.setdefault(outcome.project_id, []).append(outcome)
+        chunks = [
+            (project_id, chunk)
+            for project_id, outcomes in by_project.items()
+            for chunk in dtconcurrency.chunked(outcomes, chunk_size)
+        ]
+        total = sum(len(chunk) for _, chunk in chunks)
+
+        def claim(
+            item: tuple[str, list[ClaimOutcome]],
+        ) -> list[Exception]:
+            project_id, chunk = item
+            kit_ids = [o.claim_id for o in chunk if o.type == Claim.KIT]
+            device_ids = [o.claim_id for o in chunk if o.type != Claim.KIT]
+            _, errors = Claim.claim(
+                target_project_id=project_id,
+                kit_ids=[str(i) for i in kit_ids] or None,
+                device_ids=[str(i) for i in device_ids] or None,
+                dry_run=dry_run,
+                **kwargs,
+            )
+            return errors
+
+        completed = 0
+        for (_, chunk), errors, error in dtconcurrency.run_concurrently(
+            claim,
+            chunks,
+            max_workers,
+        ):
+            if error is not None:
+                for outcome in chunk:
+                    outcome._fail(error)
+            else:
+                self._apply_errors(chunk, errors or [], dry_run)
+
+            completed += len(chunk)
+            if progress_callback is not None:
+                progress_callback(completed, total)
+
+    @staticmethod
+    def _apply_errors(
+        chunk: list[ClaimOutcome],
+        errors: list[Exception],
+        dry_run: bool,
+    ) -> None:
+        # Errors name a kit, or a device that may be part of a kit.
+        by_id: dict[str, ClaimOutcome] = {}
+        for outcome in chunk:
+            for device_id in outcome.device_ids:
+                by_id[device_id] = outcome
+            by_id[str(outcome.claim_id)] = outcome
+
+        for error in errors:
+            raw = getattr(error, "raw", {})
+            failed = by_id.get(raw.get("kitId") or raw.get("deviceId", ""))
+            if failed is not None:
+                failed._fail(error)
+            else:
+                dtlog.warning(f"Claim error for unknown item {raw}.")
+
+        status = ClaimOutcome.CLAIMABLE if dry_run else ClaimOutcome.CLAIMED
+        for outcome in chunk:
+            if outcome.status != ClaimOutcome.FAILED:
+                outcome.status = status
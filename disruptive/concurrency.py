@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Generator, Iterable, Optional, TypeVar
+
+import disruptive
+import disruptive.errors as dterrors
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how often an action may happen across threads.
+
+    Attributes
+    ----------
+    rate : float
+        Number of acquisitions allowed per second on average.
+    burst : int
+        Number of acquisitions allowed back-to-back after idling.
+
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        Constructs the RateLimiter object.
+
+        Parameters
+        ----------
+        rate : float
+            Number of acquisitions allowed per second on average.
+        burst : int, optional
+            Number of acquisitions allowed back-to-back after idling.
+
+        """
+
+        if rate <= 0:
+            raise dterrors.ConfigurationError(
+                f"Rate limit has value {rate}, but must be greater than 0."
+            )
+        if burst < 1:
+            raise dterrors.ConfigurationError(
+                f"Rate limit burst has value {burst}, but must be at least 1."
+            )
+
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until an acquisition is allowed.
+
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+# The limiter shared by all requests, created to match request_rate_limit.
+_shared_limiter: Optional[RateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Returns the package-wide rate limiter, or None if
+    :code:`disruptive.request_rate_limit` is not set.
+
+    """
+
+    global _shared_limiter
+
+    rate = disruptive.request_rate_limit
+    if rate is None:
+        return None
+
+    with _shared_limiter_lock:
+        # Replace the limiter if the configured rate has changed.
+        if _shared_limiter is None or _shared_limiter.rate != rate:
+            _shared_limiter = RateLimiter(rate)
+        return _shared_limiter
+
+
+def chunked(items: list[T], chunk_size: Optional[int]) -> list[list[T]]:
+    """
+    Splits a list into consecutive chunks of at most `chunk_size` items.
+    If `chunk_size` is None, the entire list is a single chunk.
+
+    """
+
+    if chunk_size is None:
+        return [items]
+    if chunk_size < 1:
+        raise dterrors.ConfigurationError(
+            f"Chunk size has value {chunk_size}, but must be at least 1."
+        )
+    return [
+        items[i : i + chunk_size] for i in range(0, len(items), chunk_size)
+    ]
+
+
+def run_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: Optional[int] = None,
+) -> Generator[tuple[T, Optional[R], Optional[Exception]], None, None]:
+    """
+    Calls `func` for each item on a pool of threads, yielding each item
+    with either its result or the raised exception as they complete.
+
+    Parameters
+    ----------
+    func : Callable
+        Function called with a single item.
+    items : Iterable
+        Items to call the function with.
+    max_workers : int, optional
+        Maximum number of concurrent calls.
+        Defaults to :code:`disruptive.request_concurrency`.
+
+    Returns
+    -------
+    results : Generator
+        Yields tuples of (item, result, error) in order of completion.
+
+    """
+
+    if max_workers is None:
+        max_workers = disruptive.request_concurrency
+    if max_workers < 1:
+        raise dterrors.ConfigurationError(
+            f"Concurrency has value {max_workers}, but must be at least 1."
+        )
+
+    items = list(items)
+
+    # Avoid the overhead of a pool when there is nothing to overlap.
+    if max_workers == 1 or len(items) <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is None:
+                yield futures[future], future.result(), None
+            elif isinstance(error, Exception):
+                yield futures[future], None, error
+            else:
+                raise error
+    finally:
+        # If the caller stops early, do not start work that is not needed.
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,456 @@
+"""
+Per-interval deltas and rates of monotonic counters.
+
+`touchCount` and `objectPresentCount` events report the lifetime total of
+a counter, which restarts from zero when the device restarts. The
+increase between two consecutive readings is the difference of their
+totals, or the new total itself if the counter was reset in between, and
+is spread evenly over the time between the readings, such that sparse
+readings are attributed to the buckets in which the counts occurred.
+
+The vectorised functions require the installation of additional packages.
+>> pip install disruptive[extra]
+
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Generator, Iterable, Optional
+
+import disruptive.aggregate as dtaggregate
+import disruptive.errors as dterrors
+import disruptive.transforms as dttrans
+
+if TYPE_CHECKING:
+    from disruptive.events.events import Event
+
+# Names of the counter metrics in disruptive.aggregate.METRICS.
+COUNTERS = ["touch_count", "object_present_count"]
+
+# Output columns of counter_deltas(), in order.
+COLUMNS = [
+    "device_id",
+    "metric",
+    "bucket",
+    "delta",
+    "rate",
+    "covered",
+    "resets",
+]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def counter_deltas(
+    device_id: Any,
+    metric: Any,
+    time: Any,
+    value: Any,
+    interval: float | timedelta,
+    max_gap: Optional[float | timedelta] = None,
+) -> dict[str, Any]:
+    """
+    Computes the increase of counters per time bucket.
+
+    Buckets are aligned to the UNIX epoch. Every bucket between the
+    first and last reading of a device and metric is included.
+
+    Parameters
+    ----------
+    device_id : array_like
+        Device ID of each reading.
+    metric : array_like
+        Metric name of each reading.
+    time : array_like
+        Time of each reading, as datetime64.
+    value : array_like
+        Lifetime total of each reading.
+    interval : float, timedelta
+        Length of each bucket, in seconds if a number.
+    max_gap : float, timedelta, optional
+        Readings further apart than this, in seconds if a number, are
+        treated as a gap in the data. The increase across a gap is left
+        out, as it is unknown when in the gap it occurred.
+
+    Returns
+    -------
+    buckets : dict[str, numpy.ndarray]
+        Arrays named by `COLUMNS`, one element per bucket, sorted by
+        device, metric and bucket start time. `covered` is the number
+        of seconds of the bucket between readings that are not gaps,
+        and `rate` the increase per second of covered time, which is
+        NaN if nothing was covered. `resets` counts the readings in the
+        bucket that were lower than the previous one.
+
+    Raises
+    ------
+    ConfigurationError
+        If the interval or maximum gap is not positive.
+
+    Examples
+    --------
+    >>> columns = dt.aggregate.extract_samples(history, COUNTERS)
+    >>> buckets = counter_deltas(**columns, interval=3600)
+
+    """
+
+    np = dtaggregate._numpy()
+    interval_ns = dtaggregate._to_nanoseconds(interval, "interval")
+    gap_ns = None
+    if max_gap is not None:
+        gap_ns = dtaggregate._to_nanoseconds(max_gap, "max_gap")
+
+    time_ns = np.asarray(time, dtype="datetime64[ns]").view(np.int64)
+    value = np.asarray(value, dtype=np.float64)
+    if len(time_ns) == 0:
+        return _empty(np)
+
+    # Order by series, then time.
+    devices, device_index = dtaggregate._factorize(np, device_id)
+    names, name_index = dtaggregate._factorize(np, metric)
+    series = device_index * len(names) + name_index
+    order = np.lexsort((time_ns, series))
+    series = series[order]
+    time_ns = time_ns[order]
+    value = value[order]
+
+    # Pair each reading with the previous one of the same series.
+    same = series[1:] == series[:-1]
+    t0, t1 = time_ns[:-1][same], time_ns[1:][same]
+    v0, v1 = value[:-1][same], value[1:][same]
+    pair_series = series[1:][same]
+    reset = v1 < v0
+    delta = np.where(reset, v1, v1 - v0)
+    covered = np.ones(len(t0), dtype=bool)
+    if gap_ns is not None:
+        covered = (t1 - t0) <= gap_ns
+
+    # Every bucket from the first to the last reading of each series.
+    bucket = time_ns // interval_ns
+    run_starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+    run_ends = np.r_[run_starts[1:], len(series)] - 1
+    low = bucket[run_starts]
+    lengths = bucket[run_ends] - low + 1
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    total = int(lengths.sum())
+    run = np.repeat(np.arange(len(run_starts)), lengths)
+    position = np.full(int(series.max()) + 1, -1)
+    position[series[run_starts]] = np.arange(len(run_starts))
+
+    # Split each pair at the bucket boundaries it crosses.
+    b0 = t0 // interval_ns
+    b1 = np.maximum((t1 - 1) // interval_ns, b0)
+    counts = b1 - b0 + 1
+    piece = np.repeat(np.arange(len(t0)), counts)
+    piece_offsets = np.r_[0, np.cumsum(counts)[:-1]]
+    piece_bucket = b0[piece] + np.arange(int(counts.sum()))
+    piece_bucket -= piece_offsets[piece]
+    overlap = np.minimum(t1[piece], (piece_bucket + 1) * interval_ns)
+    overlap -= np.maximum(t0[piece], piece_bucket * interval_ns)
+    duration = (t1 - t0)[piece]
+    share = np.divide(
+        overlap,
+        duration,
+        out=np.ones(len(piece)),
+        where=duration > 0,
+    )
+
+    # Sum the pieces into the buckets of their series.
+    piece_run = position[pair_series[piece]]
+    slot = offsets[piece_run] + piece_bucket - low[piece_run]
+    keep = covered[piece]
+    delta_sum = np.bincount(
+        slot[keep],
+        weights=(delta[piece] * share)[keep],
+        minlength=total,
+    )
+    covered_ns = np.bincount(
+        slot[keep],
+        weights=overlap[keep],
+        minlength=total,
+    )
+
+    # Resets belong to the bucket of the reading that revealed them.
+    reset_run = position[pair_series[reset]]
+    reset_slot = offsets[reset_run] + t1[reset] // interval_ns
+    reset_slot -= low[reset_run]
+    resets = np.bincount(reset_slot, minlength=total)
+
+    covered_seconds = covered_ns / 1e9
+    rate = np.full(total, np.nan)
+    np.divide(delta_sum, covered_seconds, out=rate, where=covered_ns > 0)
+
+    run_series = series[run_starts][run]
+    grid_bucket = low[run] + np.arange(total) - offsets[run]
+    return {
+        "device_id": devices[run_series // len(names)],
+        "metric": names[run_series % len(names)],
+        "bucket": (grid_bucket * interval_ns).astype("datetime64[ns]"),
+        "delta": delta_sum,
+        "rate": rate,
+        "covered": covered_seconds,
+        "resets": resets,
+    }
+
+
+class CounterTracker:
+    """
+    Incremental counter deltas and rates of a stream.
+
+    The previous reading of each device and metric is kept, and the
+    increase to each new reading is spread over the buckets between
+    them, as by :code:`counter_deltas`. Only the most recent
+    `max_buckets` buckets are kept per device and metric.
+
+    Attributes
+    ----------
+    interval : timedelta
+        Length of each bucket.
+    max_gap : timedelta, None
+        Readings further apart than this are treated as a gap, and the
+        increase across it is left out.
+    readings : int
+        Number of readings added.
+    resets : int
+        Number of readings lower than the previous one.
+    skipped : int
+        Number of readings skipped as out of order.
+
+    """
+
+    def __init__(
+        self,
+        interval: float | timedelta = 3600,
+        metrics: Optional[list[str]] = None,
+        max_gap: Optional[float | timedelta] = None,
+        max_buckets: int = 168,
+    ) -> None:
+        """
+        Constructs an empty CounterTracker object.
+
+        Parameters
+        ----------
+        interval : float, timedelta, optional
+            Length of each bucket, in seconds if a number.
+        metrics : list[str], optional
+            Names of counter metrics in `COUNTERS` to track.
+            By default all.
+        max_gap : float, timedelta, optional
+            Readings further apart than this, in seconds if a number,
+            are treated as a gap.
+        max_buckets : int, optional
+            Number of buckets kept per device and metric. By default a
+            week of hourly buckets.
+
+        Raises
+        ------
+        ConfigurationError
+            If the interval, maximum gap or `max_buckets` is not
+            positive, or a metric is unknown.
+
+        Examples
+        --------
+        >>> tracker = dt.CounterTracker(interval=900)
+        >>> for event in tracker.follow(dt.Stream.event_stream('<ID>')):
+        ...     pass
+        >>> tracker.deltas()
+
+        """
+
+        if not isinstance(interval, timedelta):
+            interval = timedelta(seconds=interval)
+        if max_gap is not None and not isinstance(max_gap, timedelta):
+            max_gap = timedelta(seconds=max_gap)
+        if interval <= timedelta(0):
+            raise dterrors.ConfigurationError(
+                f"Counter interval must be positive, got {interval}."
+            )
+        if max_gap is not None and max_gap <= timedelta(0):
+            raise dterrors.ConfigurationError(
+                f"Counter max_gap must be positive, got {max_gap}."
+            )
+        if max_buckets < 1:
+            raise dterrors.ConfigurationError(
+                f"Counter max_buckets must be at least 1, got {max_buckets}."
+            )
+        for name in metrics or []:
+            if name not in COUNTERS:
+                raise dterrors.ConfigurationError(
+                    f"Unknown counter {name}, expected one of {COUNTERS}."
+                )
+
+        self.interval = interval
+        self.max_gap = max_gap
+        self.max_buckets = max_buckets
+        self.readings = 0
+        self.resets = 0
+        self.skipped = 0
+
+        self._by_type = {
+            dtaggregate.METRICS[name][0]: name
+            for name in (metrics or COUNTERS)
+        }
+        self._previous: dict[tuple[str, str], tuple[datetime, float]] = {}
+        self._buckets: dict[tuple[str, str], dict[int, list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: Event) -> Optional[float]:
+        """
+        Adds a counter reading.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        Returns
+        -------
+        delta : float, None
+            Increase since the previous reading of the device, or None
+            if it is the first, out of order, or after a gap.
+
+        """
+
+        metric = self._by_type.get(event.event_type)
+        if metric is None:
+            return None
+
+        data = event.raw["data"][event.event_type]
+        timestamp = dttrans.to_datetime(data["updateTime"])
+        if timestamp is None:
+            return None
+        total: float = data["total"]
+
+        key = (event.device_id, metric)
+        with self._lock:
+            previous = self._previous.get(key)
+            if previous is not None and timestamp < previous[0]:
+                self.skipped += 1
+                return None
+            self._previous[key] = (timestamp, total)
+            self.readings += 1
+            if previous is None:
+                return None
+
+            start, previous_total = previous
+            if total < previous_total:
+                self.resets += 1
+                delta = total
+            else:
+                delta = total - previous_total
+
+            if self.max_gap is not None and timestamp - start > self.max_gap:
+                return None
+            self._accumulate(key, start, timestamp, delta)
+            return delta
+
+    def follow(
+        self,
+        stream: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Adds each event in a stream, then yields it unchanged.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, after being added to the tracker.
+
+        """
+
+        for event in stream:
+            self.add(event)
+            yield event
+
+    def deltas(self) -> dict[tuple[str, str], dict[datetime, float]]:
+        """
+        Increase of each kept bucket.
+
+        Returns
+        -------
+        deltas : dict[tuple[str, str], dict[datetime, float]]
+            Keyed by (device ID, metric), then by bucket start.
+
+        """
+
+        return self._export(lambda delta, covered: delta)
+
+    def rates(self) -> dict[tuple[str, str], dict[datetime, float]]:
+        """
+        Increase per second of covered time of each kept bucket.
+
+        Returns
+        -------
+        rates : dict[tuple[str, str], dict[datetime, float]]
+            Keyed by (device ID, metric), then by bucket start. Buckets
+            without covered time are left out.
+
+        """
+
+        return self._export(
+            lambda delta, covered: delta / covered if covered > 0 else None
+        )
+
+    def _export(
+        self,
+        value: Any,
+    ) -> dict[tuple[str, str], dict[datetime, float]]:
+        exported: dict[tuple[str, str], dict[datetime, float]] = {}
+        with self._lock:
+            for key, kept in self._buckets.items():
+                values = {}
+                for bucket, (delta, covered) in sorted(kept.items()):
+                    result = value(delta, covered)
+                    if result is not None:
+                        values[_EPOCH + self.interval * bucket] = result
+                exported[key] = values
+        return exported
+
+    def _accumulate(
+        self,
+        key: tuple[str, str],
+        start: datetime,
+        end: datetime,
+        delta: float,
+    ) -> None:
+        # Must be called with the lock held.
+        kept = self._buckets.setdefault(key, {})
+        duration = (end - start).total_seconds()
+
+        # Readings at the same time add all of the increase at once.
+        bucket = (start - _EPOCH) // self.interval
+        if duration == 0:
+            kept.setdefault(bucket, [0.0, 0.0])[0] += delta
+
+        # Spread the increase at the bucket boundaries it crosses.
+        while start < end:
+            bucket_end = _EPOCH + self.interval * (bucket + 1)
+            seconds = (min(end, bucket_end) - start).total_seconds()
+            totals = kept.setdefault(bucket, [0.0, 0.0])
+            totals[0] += delta * seconds / duration
+            totals[1] += seconds
+            start = bucket_end
+            bucket += 1
+
+        # Forget the oldest buckets.
+        while len(kept) > self.max_buckets:
+            del kept[min(kept)]
+
+
+def _empty(np: Any) -> dict[str, Any]:
+    return {
+        "device_id": np.array([], dtype=object),
+        "metric": np.array([], dtype=object),
+        "bucket": np.array([], dtype="datetime64[ns]"),
+        "delta": np.array([]),
+        "rate": np.array([]),
+        "covered": np.array([]),
+        "resets": np.array([], dtype=np.int64),
+    }
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import time
+import threading
+from typing import Generator, Iterable
+
+import disruptive.errors as dterrors
+from disruptive.events.events import Event
+
+
+class EventDeduplicator:
+    """
+    Bounded store of recently seen event IDs for dropping duplicates.
+
+    Data Connectors deliver events at least once, and overlapping
+    history fetches return the same events again, so the same event ID
+    may be seen more than once. IDs are kept in two generations of hash
+    sets. The current generation becomes the previous one each window,
+    discarding the old previous generation in O(1), such that every ID
+    is remembered for at least one window. Memory is bounded by
+    `max_size` IDs regardless of event rate, as a generation is also
+    rotated early when it holds half of them. An ID seen again is kept
+    for another window.
+
+    A single deduplicator may be shared between a stream, history
+    fetches and a :code:`PushReceiver`, and is thread-safe.
+
+    Attributes
+    ----------
+    window : float
+        Minimum number of seconds an ID is remembered, unless evicted
+        early by `max_size`.
+    max_size : int
+        Maximum number of IDs remembered.
+    hits : int
+        Number of checked events that were duplicates.
+    misses : int
+        Number of checked events that were new.
+    rotations : int
+        Number of times a generation has been discarded.
+
+    """
+
+    def __init__(
+        self,
+        window: float = 3600,
+        max_size: int = 1_000_000,
+    ) -> None:
+        """
+        Constructs the EventDeduplicator object.
+
+        Parameters
+        ----------
+        window : float, optional
+            Minimum number of seconds an ID is remembered.
+        max_size : int, optional
+            Maximum number of IDs remembered. At roughly 100 bytes per
+            ID, the default caps memory use at about 100 MB.
+
+        Examples
+        --------
+        >>> dedup = dt.EventDeduplicator(window=600)
+        >>> for event in dt.Stream.event_stream(
+        ...     '<PROJECT_ID>',
+        ...     deduplicator=dedup,
+        ... ):
+        ...     print(event)
+
+        """
+
+        if window <= 0:
+            raise dterrors.ConfigurationError(
+                f"Deduplication window must be positive, got {window}."
+            )
+        if max_size < 2:
+            raise dterrors.ConfigurationError(
+                f"Deduplication max_size must be at least 2, got {max_size}."
+            )
+
+        self.window = window
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+        self._current: set[str] = set()
+        self._previous: set[str] = set()
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def __contains__(self, event_id: object) -> bool:
+        with self._lock:
+            self._expire()
+            return event_id in self._current or event_id in self._previous
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of checked events that were duplicates.
+
+        """
+
+        checked = self.hits + self.misses
+        return self.hits / checked if checked > 0 else 0.0
+
+    def seen(self, event_id: str) -> bool:
+        """
+        Checks whether an event ID has been seen before, and remembers it.
+
+        Parameters
+        ----------
+        event_id : str
+            Unique ID of the event.
+
+        Returns
+        -------
+        duplicate : bool
+            True if the ID has been seen before, otherwise False.
+
+        Examples
+        --------
+        >>> if not dedup.seen(event.event_id):
+        ...     process(event)
+
+        """
+
+        with self._lock:
+            self._expire()
+            duplicate = event_id in self._current or event_id in self._previous
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            # Repeated duplicates keep the ID in the current generation.
+            if event_id not in self._current:
+                self._current.add(event_id)
+                if len(self._current) >= self.max_size // 2:
+                    self._rotate(time.monotonic())
+            return duplicate
+
+    def discard(self, event_id: str) -> None:
+        """
+        Forgets an event ID, such that it is accepted if seen again.
+
+        Parameters
+        ----------
+        event_id : str
+            Unique ID of the event.
+
+        """
+
+        with self._lock:
+            self._current.discard(event_id)
+            self._previous.discard(event_id)
+
+    def filter(
+        self,
+        events: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Yields only the events that have not been seen before.
+
+        Parameters
+        ----------
+        events : Iterable[Event]
+            Events, typically from a stream or event history.
+
+        Returns
+        -------
+        events : Generator
+            The same events, without duplicates.
+
+        Examples
+        --------
+        >>> for event in dedup.filter(history):
+        ...     process(event)
+
+        """
+
+        for event in events:
+            if not self.seen(event.event_id):
+                yield event
+
+    def _expire(self) -> None:
+        # Must be called with the lock held.
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window:
+            self._rotate(now)
+
+    def _rotate(self, now: float) -> None:
+        # Must be called with the lock held.
+        self._previous = self._current
+        self._current = set()
+        self._rotated_at = now
+        self.rotations += 1
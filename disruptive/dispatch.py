@@ -0,0 +1,564 @@
+from __future__ import annotations
+
+import time
+import queue
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+import disruptive.transforms as dttrans
+from disruptive.events.events import Event
+from disruptive.reorder import Histogram
+from disruptive.resources.device import Device
+
+# Called with each dispatched event.
+EventHandler = Callable[[Event], None]
+
+# Called with each event and the labels of its device.
+LanePredicate = Callable[[Event, dict[str, str]], bool]
+
+# Upper bounds of the queueing latency histogram buckets.
+LATENCY_BOUNDS = [1, 5, 10, 50, 100, 500, 1000, 5000, 10000]  # milliseconds
+
+# Policies for an event that arrives at a full lane.
+OVERFLOW_POLICIES = ["block", "drop_oldest", "drop_newest"]
+
+# Name of the lane of events that match no other lane.
+BULK = "bulk"
+
+
+class Lane:
+    """
+    A queue of selected events with its own workers.
+
+    An event is selected if its type is one of `event_types`, its device
+    satisfies every label filter, or the predicate returns True. A lane
+    with no criteria selects every event.
+
+    Attributes
+    ----------
+    name : str
+        Name of the lane, unique within a dispatcher.
+    event_types : set[str]
+        Event types selected by the lane.
+    label_filters : dict[str, str]
+        Label filters selecting devices. A filter with an empty value
+        only requires the label to exist.
+    predicate : Callable, optional
+        Called with the event and the labels of its device.
+    handler : Callable, optional
+        Called with each event of the lane, instead of the handler of
+        the dispatcher.
+    workers : int
+        Number of threads handling events of the lane.
+    max_queue : int
+        Maximum number of events waiting in the lane.
+    overflow : str
+        What to do with an event that arrives at a full lane.
+        One of "block", "drop_oldest", or "drop_newest".
+    received : int
+        Number of events put in the lane.
+    handled : int
+        Number of events handed to the handler.
+    dropped : int
+        Number of events dropped from a full lane.
+    errors : int
+        Number of events for which the handler raised.
+    latency : Histogram
+        Milliseconds each event waited in the lane before it was handled.
+    max_latency : float
+        Longest wait of an event in the lane, in milliseconds.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        event_types: Iterable[str] = (),
+        label_filters: Optional[dict[str, Optional[str]]] = None,
+        predicate: Optional[LanePredicate] = None,
+        handler: Optional[EventHandler] = None,
+        workers: int = 1,
+        max_queue: int = 10_000,
+        overflow: str = "block",
+    ) -> None:
+        """
+        Constructs the Lane object.
+
+        Parameters
+        ----------
+        name : str
+            Name of the lane, unique within a dispatcher.
+        event_types : Iterable[str], optional
+            Event types selected by the lane, such as "waterPresent".
+        label_filters : dict[str, str], optional
+            Label filters selecting devices. A filter with value
+            None or "" only requires the label to exist.
+        predicate : Callable, optional
+            Called with the event and the labels of its device, and
+            returns True to select the event.
+        handler : Callable, optional
+            Called with each event of the lane. If not provided,
+            the handler of the dispatcher is used.
+        workers : int, optional
+            Number of threads handling events of the lane.
+        max_queue : int, optional
+            Maximum number of events waiting in the lane.
+        overflow : str, optional
+            What to do with an event that arrives at a full lane.
+            "block" waits for room, "drop_oldest" drops the event
+            that has waited the longest, and "drop_newest" drops
+            the arriving event.
+
+        Raises
+        ------
+        ConfigurationError
+            If `workers` or `max_queue` is less than 1, or `overflow`
+            is not a known policy.
+
+        Examples
+        --------
+        >>> leaks = dt.Lane('leaks', event_types=['waterPresent'])
+
+        """
+
+        if workers < 1:
+            raise dterrors.ConfigurationError(
+                f"Lane workers must be at least 1, got {workers}."
+            )
+        if max_queue < 1:
+            raise dterrors.ConfigurationError(
+                f"Lane max_queue must be at least 1, got {max_queue}."
+            )
+        if overflow not in OVERFLOW_POLICIES:
+            raise dterrors.ConfigurationError(
+                f"Unknown overflow policy {overflow}. "
+                f"Must be one of {', '.join(OVERFLOW_POLICIES)}."
+            )
+
+        self.name = name
+        self.event_types = set(event_types)
+        self.label_filters = dict(label_filters or {})
+        self.predicate = predicate
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.overflow = overflow
+
+        self.received = 0
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.max_latency = 0.0
+
+        self._elapsed = 0.0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        string = "{}.{}(name={}, event_types={}, workers={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.name),
+            sorted(self.event_types),
+            self.workers,
+        )
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of events currently waiting in the lane.
+
+        """
+
+        return self._queue.qsize()
+
+    @property
+    def mean_latency(self) -> float:
+        """
+        Average milliseconds an event waited in the lane.
+
+        """
+
+        return self._elapsed / self.handled if self.handled > 0 else 0.0
+
+    def matches(self, event: Event, labels: dict[str, str]) -> bool:
+        """
+        Checks whether an event is selected by the lane.
+
+        Parameters
+        ----------
+        event : Event
+            The event to check.
+        labels : dict[str, str]
+            Labels of the device of the event.
+
+        Returns
+        -------
+        match : bool
+            True if any of the criteria of the lane is satisfied.
+
+        """
+
+        if not (self.event_types or self.label_filters or self.predicate):
+            return True
+        if event.event_type in self.event_types:
+            return True
+        if self.label_filters and dttrans.match_labels(
+            labels,
+            self.label_filters,
+        ):
+            return True
+        return self.predicate is not None and self.predicate(event, labels)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Exports the counters and latency of the lane.
+
+        Returns
+        -------
+        stats : dict[str, Any]
+            Counters, current depth, and latency in milliseconds.
+
+        """
+
+        with self._lock:
+            return {
+                "received": self.received,
+                "handled": self.handled,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "depth": self.depth,
+                "mean_latency": self.mean_latency,
+                "max_latency": self.max_latency,
+                "latency": self.latency.to_dict(),
+            }
+
+    def _put(self, event: Event) -> bool:
+        item = (time.perf_counter(), event)
+        with self._lock:
+            self.received += 1
+        if self.overflow == "block":
+            self._queue.put(item)
+            return True
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+            if self.overflow == "drop_newest":
+                self._count_dropped()
+                return False
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count_dropped()
+            except queue.Empty:
+                pass
+
+    def _count_dropped(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def _record(self, enqueued: float) -> None:
+        latency = (time.perf_counter() - enqueued) * 1000
+        with self._lock:
+            self.handled += 1
+            self._elapsed += latency
+            self.latency.add(latency)
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+
+class PriorityDispatcher:
+    """
+    Dispatches events to handlers through lanes of separate queues.
+
+    Events are put in the first lane that selects them, or the bulk lane
+    if none does. Every lane has its own queue and worker threads, such
+    that critical events, like those of water leaks or opened doors,
+    are handled at once even when a flood of other events is waiting in
+    the bulk lane. Labels of devices, used by label filters and
+    predicates, are kept current by `labelsChanged` events.
+
+    Handlers run in the worker threads of their lane. Events of a lane
+    with a single worker are handled in the order they were submitted,
+    while order is not kept across lanes. A full lane with the "block"
+    overflow policy blocks :code:`submit`, which also holds back events
+    for other lanes, so the bulk lane should drop events where critical
+    events must never wait.
+
+    Attributes
+    ----------
+    lanes : list[Lane]
+        The lanes of the dispatcher in priority order, ending with
+        the bulk lane.
+    submitted : int
+        Number of events submitted.
+
+    """
+
+    def __init__(
+        self,
+        handler: EventHandler,
+        lanes: Iterable[Lane] = (),
+        bulk_workers: int = 1,
+        max_queue: int = 10_000,
+        overflow: str = "block",
+    ) -> None:
+        """
+        Constructs the PriorityDispatcher object.
+
+        Parameters
+        ----------
+        handler : Callable
+            Called with each event of lanes without their own handler.
+        lanes : Iterable[Lane], optional
+            Prioritised lanes, in the order they are matched.
+        bulk_workers : int, optional
+            Number of threads handling events of the bulk lane.
+        max_queue : int, optional
+            Maximum number of events waiting in the bulk lane.
+        overflow : str, optional
+            What to do with an event that arrives at a full bulk lane.
+            One of "block", "drop_oldest", or "drop_newest".
+
+        Raises
+        ------
+        ConfigurationError
+            If two lanes share a name.
+
+        Examples
+        --------
+        >>> leaks = dt.Lane('leaks', event_types=['waterPresent'])
+        >>> with dt.PriorityDispatcher(store, [leaks]) as dispatcher:
+        ...     dispatcher.run(dt.Stream.event_stream('<PROJECT_ID>'))
+
+        """
+
+        self.handler = handler
+        bulk = Lane(
+            BULK,
+            workers=bulk_workers,
+            max_queue=max_queue,
+            overflow=overflow,
+        )
+        self.lanes = list(lanes) + [bulk]
+
+        names = [lane.name for lane in self.lanes]
+        for name in names:
+            if names.count(name) > 1:
+                raise dterrors.ConfigurationError(
+                    f"A lane named {name} already exists."
+                )
+
+        self.submitted = 0
+
+        self._labels: dict[str, dict[str, str]] = {}
+        self._threads: list[threading.Thread] = []
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> PriorityDispatcher:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        string = "{}.{}(lanes={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            [lane.name for lane in self.lanes],
+        )
+
+    def lane(self, name: str) -> Lane:
+        """
+        Gets a lane by its name.
+
+        Parameters
+        ----------
+        name : str
+            Name of the lane. The bulk lane is named "bulk".
+
+        Raises
+        ------
+        ConfigurationError
+            If there is no lane of the given name.
+
+        """
+
+        for lane in self.lanes:
+            if lane.name == name:
+                return lane
+        raise dterrors.ConfigurationError(f"There is no lane named {name}.")
+
+    def seed(self, devices: Iterable[Device]) -> None:
+        """
+        Sets the labels of each device, used to select lanes.
+
+        Parameters
+        ----------
+        devices : Iterable[Device]
+            Devices, typically from :code:`Device.list_devices`.
+
+        """
+
+        with self._lock:
+            for device in devices:
+                self._labels[device.device_id] = dict(device.labels)
+
+    def start(self) -> None:
+        """
+        Starts the worker threads of every lane.
+
+        Called by the first submitted event if not called before.
+
+        """
+
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for lane in self.lanes:
+                for i in range(lane.workers):
+                    thread = threading.Thread(
+                        target=self._work,
+                        args=(lane,),
+                        name=f"PriorityDispatcher-{lane.name}-{i}",
+                        daemon=True,
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+
+    def submit(self, event: Event) -> Lane:
+        """
+        Puts an event in the first lane that selects it.
+
+        Parameters
+        ----------
+        event : Event
+            The event to dispatch.
+
+        Returns
+        -------
+        lane : Lane
+            The lane the event was put in.
+
+        Raises
+        ------
+        ConfigurationError
+            If the dispatcher is closed.
+
+        """
+
+        if self._closed:
+            raise dterrors.ConfigurationError(
+                "Cannot submit events to a closed PriorityDispatcher."
+            )
+        if not self._started:
+            self.start()
+
+        if event.event_type == "labelsChanged":
+            self._apply_labels(event)
+
+        labels = self._labels.get(event.device_id, {})
+        lane = self.lanes[-1]
+        for candidate in self.lanes[:-1]:
+            if candidate.matches(event, labels):
+                lane = candidate
+                break
+
+        with self._lock:
+            self.submitted += 1
+        lane._put(event)
+        return lane
+
+    def run(self, events: Iterable[Event]) -> None:
+        """
+        Submits every event of a stream, then waits for them to be handled.
+
+        Parameters
+        ----------
+        events : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        """
+
+        for event in events:
+            self.submit(event)
+        self.join()
+
+    def join(self) -> None:
+        """
+        Waits until every submitted event has been handled or dropped.
+
+        """
+
+        for lane in self.lanes:
+            lane._queue.join()
+
+    def close(self) -> None:
+        """
+        Handles every waiting event, then stops the worker threads.
+
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = self._threads
+            self._threads = []
+
+        self.join()
+        for lane in self.lanes:
+            for _ in range(lane.workers):
+                lane._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Exports the counters and latency of every lane.
+
+        Returns
+        -------
+        stats : dict[str, dict[str, Any]]
+            Stats of each lane, keyed by the name of the lane.
+
+        """
+
+        return {lane.name: lane.stats() for lane in self.lanes}
+
+    def _work(self, lane: Lane) -> None:
+        handler = lane.handler or self.handler
+        while True:
+            item = lane._queue.get()
+            if item is None:
+                lane._queue.task_done()
+                return
+            enqueued, event = item
+            lane._record(enqueued)
+            try:
+                handler(event)
+            except Exception as e:
+                with lane._lock:
+                    lane.errors += 1
+                dtlog.error(f"PriorityDispatcher handler raised {e!r}.")
+            finally:
+                lane._queue.task_done()
+
+    def _apply_labels(self, event: Event) -> None:
+        data = event.raw["data"]
+        with self._lock:
+            labels = self._labels.setdefault(event.device_id, {})
+            dttrans.apply_labels_changed(labels, data)
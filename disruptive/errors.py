@@ -2,8 +2,6 @@ from __future__ import annotations
 
 from typing import Any, Optional
 
-import requests
-
 import disruptive.outputs as dtoutputs
 import disruptive.logging as dtlog
 
@@ -344,6 +342,10 @@ def parse_request_error(
 
     """
 
+    # Imported here as the requests package is only needed once a request
+    # has actually been sent, keeping it out of the package import time.
+    import requests
+
     # Read Timeouts should be attempted again.
     if isinstance(caught_error, requests.exceptions.ReadTimeout):
         return (
@@ -2250,6 +2250,8 @@ class Event(dtoutputs.OutputBase):
         Unique ID of the source project.
     data : :ref:`Event Data <eventdata>`
         An object representing type-specific event data.
+    timestamp : datetime
+        Timestamp of the event, by which event history is ordered.
     raw : dict[str, str]
         Unmodified API response JSON.
 
@@ -2277,6 +2279,25 @@ class Event(dtoutputs.OutputBase):
             self.event_type,
         )
 
+        # Parsed on first access, as most uses never need it.
+        self._timestamp: Optional[datetime] = None
+
+    @property
+    def timestamp(self) -> Optional[datetime]:
+        """
+        Timestamp of the event, by which event history is ordered.
+
+        """
+
+        if self._timestamp is None:
+            if "timestamp" in self._raw:
+                self._timestamp = dttrans.to_datetime(self._raw["timestamp"])
+            else:
+                timestamp = getattr(self.data, "timestamp", None)
+                if isinstance(timestamp, datetime):
+                    self._timestamp = timestamp
+        return self._timestamp
+
     @classmethod
     def from_mixed_list(cls, events: list[dict]) -> list[Event]:
         """
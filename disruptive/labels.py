@@ -0,0 +1,512 @@
+from __future__ import annotations
+
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Any, Iterable, Optional
+
+import disruptive.concurrency as dtconcurrency
+import disruptive.logging as dtlog
+from disruptive.errors import LabelUpdateError
+from disruptive.resources.device import Device, ProgressCallback
+
+
+class LabelBatch:
+    """
+    A single :code:`Device.batch_update_labels` call in a :code:`LabelPlan`.
+
+    Attributes
+    ----------
+    device_ids : list[str]
+        Unique IDs of the devices that receive the same update.
+    set_labels : dict[str, str]
+        Label keys and values to add or update.
+    remove_labels : list[str]
+        Label keys to remove.
+
+    """
+
+    def __init__(
+        self,
+        device_ids: list[str],
+        set_labels: dict[str, str],
+        remove_labels: list[str],
+    ) -> None:
+        self.device_ids = device_ids
+        self.set_labels = set_labels
+        self.remove_labels = remove_labels
+
+    def __repr__(self) -> str:
+        return "{}.{}({} devices, set={}, remove={})".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            len(self.device_ids),
+            self.set_labels,
+            self.remove_labels,
+        )
+
+
+class LabelPlan:
+    """
+    The label updates needed to bring a set of devices to a desired state,
+    using as few :code:`Device.batch_update_labels` calls as possible.
+
+    Devices that need identical updates share a single call. As setting a
+    label to its current value, or removing one that does not exist, has
+    no effect, devices with identical desired labels may also share a call.
+    The plan uses whichever of the two groupings needs the fewest calls.
+
+    Attributes
+    ----------
+    project_id : str
+        Unique ID of the project the devices reside in.
+    batches : list[LabelBatch]
+        One entry per :code:`Device.batch_update_labels` call, largest first.
+    unchanged : list[str]
+        Unique IDs of devices already in their desired state.
+    missing : list[str]
+        Unique IDs of devices with desired labels that were not found in
+        the current state. These are not updated.
+
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        batches: list[LabelBatch],
+        unchanged: list[str],
+        missing: list[str],
+    ) -> None:
+        self.project_id = project_id
+        self.batches = batches
+        self.unchanged = unchanged
+        self.missing = missing
+
+    def __repr__(self) -> str:
+        return "{}.{}({} batches, {} devices)".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            len(self.batches),
+            self.device_count,
+        )
+
+    @property
+    def device_count(self) -> int:
+        """
+        Number of devices that will be updated by the plan.
+
+        """
+
+        return sum(len(batch.device_ids) for batch in self.batches)
+
+    @classmethod
+    def create(
+        cls,
+        desired: dict[str, dict[str, str]],
+        project_id: str,
+        current: Optional[Iterable[Device]] = None,
+        managed_keys: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> LabelPlan:
+        """
+        Diffs desired labels against the current state of the devices.
+        No updates are sent until the plan is applied.
+
+        Parameters
+        ----------
+        desired : dict[str, dict[str, str]]
+            Desired label keys and values, keyed by device ID.
+        project_id : str
+            Unique ID of the target project.
+        current : Iterable[Device], optional
+            Devices in their current state, such as from a
+            :code:`DeviceRegistry`. If not provided, the devices are
+            fetched using :code:`Device.list_devices`.
+        managed_keys : Iterable[str], optional
+            Label keys owned by the caller. Keys in this set that are not in
+            the desired labels of a device are removed from it. If not
+            provided, labels are only added or updated, never removed.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        plan : LabelPlan
+            The updates needed to reach the desired state.
+
+        Examples
+        --------
+        >>> plan = dt.LabelPlan.create(
+        ...     desired={
+        ...         '<DEVICE_ID_1>': {'room': '99', 'floor': '3'},
+        ...         '<DEVICE_ID_2>': {'room': '12'},
+        ...     },
+        ...     project_id='<PROJECT_ID>',
+        ...     managed_keys=['room', 'floor'],
+        ... )
+        >>> errors = plan.apply()
+
+        """
+
+        # Fetch the current state if not provided.
+        if current is None:
+            current = Device.list_devices(project_id, **kwargs)
+        current_labels = {d.device_id: d.labels for d in current}
+        managed = set(managed_keys) if managed_keys is not None else set()
+
+        # Group changed devices both by their diff and their desired state.
+        by_diff: dict[tuple, list[str]] = dict()
+        by_state: dict[tuple, list[str]] = dict()
+        unchanged: list[str] = []
+        missing: list[str] = []
+        for device_id, labels in desired.items():
+            if device_id not in current_labels:
+                missing.append(device_id)
+                continue
+            have = current_labels[device_id]
+
+            to_set = {k: v for k, v in labels.items() if have.get(k) != v}
+            to_remove = {k for k in have if k in managed and k not in labels}
+            if len(to_set) == 0 and len(to_remove) == 0:
+                unchanged.append(device_id)
+                continue
+
+            diff_key = (
+                tuple(sorted(to_set.items())),
+                tuple(sorted(to_remove)),
+            )
+            by_diff.setdefault(diff_key, []).append(device_id)
+
+            state_key = (
+                tuple(sorted(labels.items())),
+                tuple(sorted(managed - set(labels))),
+            )
+            by_state.setdefault(state_key, []).append(device_id)
+
+        groups = by_state if len(by_state) < len(by_diff) else by_diff
+        batches = [
+            LabelBatch(device_ids, dict(set_items), list(remove_keys))
+            for (set_items, remove_keys), device_ids in groups.items()
+        ]
+        batches.sort(key=lambda batch: len(batch.device_ids), reverse=True)
+
+        return cls(project_id, batches, unchanged, missing)
+
+    def apply(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_attempts: int = 1,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        **kwargs: Any,
+    ) -> list[LabelUpdateError]:
+        """
+        Sends the updates in the plan, one batch per call in parallel.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            If provided, each batch is split into chunks of at most this
+            many devices. See :code:`Device.batch_update_labels`.
+        chunk_attempts : int, optional
+            Number of times devices that fail with status code
+            "INTERNAL_ERROR" are submitted before the error is returned.
+        max_workers : int, optional
+            Maximum number of batches in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        progress_callback : Callable[[int, int], None], optional
+            Called with the number of updated devices and the total
+            each time a batch completes.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        errors : list[LabelUpdateError]
+            A list that contains one error object for each device that
+            could not be successfully updated.
+
+        """
+
+        def apply_batch(batch: LabelBatch) -> list[LabelUpdateError]:
+            return Device.batch_update_labels(
+                device_ids=batch.device_ids,
+                project_id=self.project_id,
+                set_labels=batch.set_labels or None,
+                remove_labels=batch.remove_labels or None,
+                chunk_size=chunk_size,
+                chunk_attempts=chunk_attempts,
+                # Batches are already sent in parallel.
+                max_workers=1,
+                **kwargs,
+            )
+
+        dtlog.info(
+            "Updating labels of {} devices in {} batches.".format(
+                self.device_count,
+                len(self.batches),
+            )
+        )
+
+        errors: list[LabelUpdateError] = []
+        completed = 0
+        for batch, batch_errors, error in dtconcurrency.run_concurrently(
+            apply_batch,
+            self.batches,
+            max_workers,
+        ):
+            if error is not None:
+                raise error
+
+            errors += batch_errors or []
+            completed += len(batch.device_ids)
+            if progress_callback is not None:
+                progress_callback(completed, self.device_count)
+
+        return errors
+
+
+class LabelWriteBuffer:
+    """
+    Buffers label changes and writes them in as few batch calls as possible.
+
+    Changes are held per project for a short window before they are sent.
+    Within the window, repeated changes to the same label of a device
+    collapse into the most recent, and devices with identical changes
+    are updated by a single :code:`Device.batch_update_labels` call.
+
+    Each change returns a future that resolves to the list of
+    :code:`LabelUpdateError` for its device, which is empty on success,
+    the same as :code:`Device.set_label`. Pending changes are flushed
+    when the buffer is closed, exits as a context manager, or when the
+    interpreter exits.
+
+    Attributes
+    ----------
+    window : float
+        Number of seconds changes are held before they are sent.
+
+    """
+
+    def __init__(self, window: float = 0.5, **kwargs: Any) -> None:
+        """
+        Constructs the LabelWriteBuffer object.
+
+        Parameters
+        ----------
+        window : float, optional
+            Number of seconds changes are held before they are sent.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Examples
+        --------
+        >>> with dt.LabelWriteBuffer(window=1) as buffer:
+        ...     for device_id in device_ids:
+        ...         buffer.set_label(device_id, '<PROJECT_ID>', 'seen', 'y')
+
+        """
+
+        self.window = window
+        self._kwargs = kwargs
+
+        # Pending changes per project and device. None removes the label.
+        self._changes: dict[str, dict[str, dict[str, Optional[str]]]] = {}
+        self._futures: dict[str, dict[str, list[Future]]] = {}
+        self._timers: dict[str, threading.Timer] = {}
+        self._flushing: dict[str, threading.Lock] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+        atexit.register(self.close)
+
+    def __enter__(self) -> LabelWriteBuffer:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def set_label(
+        self,
+        device_id: str,
+        project_id: str,
+        key: str,
+        value: str,
+    ) -> Future:
+        """
+        Buffers setting a label key and value for a single device.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+        project_id : str
+            Unique ID of the target project.
+        key : str
+            Label key to be added.
+        value : str
+            Label value to be added.
+
+        Returns
+        -------
+        future : Future
+            Resolves to a list of :code:`LabelUpdateError` for the device
+            once the change has been sent.
+
+        """
+
+        return self._buffer(device_id, project_id, key, value)
+
+    def remove_label(
+        self,
+        device_id: str,
+        project_id: str,
+        key: str,
+    ) -> Future:
+        """
+        Buffers removing a label (key and value) from a single device.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+        project_id : str
+            Unique ID of the target project.
+        key : str
+            Key of the label to be removed.
+
+        Returns
+        -------
+        future : Future
+            Resolves to a list of :code:`LabelUpdateError` for the device
+            once the change has been sent.
+
+        """
+
+        return self._buffer(device_id, project_id, key, None)
+
+    def flush(self, project_id: Optional[str] = None) -> None:
+        """
+        Sends pending changes immediately and waits for them, and any
+        changes already being sent, to complete.
+
+        Parameters
+        ----------
+        project_id : str, optional
+            Only flush changes in this project. Defaults to all projects.
+
+        """
+
+        # Projects being flushed by a window have no pending changes,
+        # but must still be waited for.
+        with self._lock:
+            project_ids = list(self._changes)
+            project_ids += [x for x in self._flushing if x not in project_ids]
+        for xid in project_ids:
+            if project_id is None or xid == project_id:
+                self._flush_project(xid)
+
+    def close(self) -> None:
+        """
+        Flushes pending changes and stops accepting new ones.
+
+        """
+
+        with self._lock:
+            self._closed = True
+        self.flush()
+        atexit.unregister(self.close)
+
+    def _buffer(
+        self,
+        device_id: str,
+        project_id: str,
+        key: str,
+        value: Optional[str],
+    ) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("LabelWriteBuffer is closed.")
+
+            changes = self._changes.setdefault(project_id, dict())
+            changes.setdefault(device_id, dict())[key] = value
+            futures = self._futures.setdefault(project_id, dict())
+            futures.setdefault(device_id, []).append(future)
+
+            # The first change in a project opens its window.
+            if project_id not in self._timers:
+                timer = threading.Timer(
+                    self.window,
+                    self._flush_project,
+                    args=(project_id,),
+                )
+                timer.daemon = True
+                self._timers[project_id] = timer
+                timer.start()
+
+        return future
+
+    def _flush_project(self, project_id: str) -> None:
+        with self._lock:
+            flushing = self._flushing.setdefault(project_id, threading.Lock())
+
+        # Flushes of a project are serialised, such that changes of a
+        # window are never sent before those of an earlier one.
+        with flushing:
+            self._send(project_id)
+
+    def _send(self, project_id: str) -> None:
+        # Take the pending changes, such that new ones open a new window.
+        with self._lock:
+            changes = self._changes.pop(project_id, dict())
+            futures = self._futures.pop(project_id, dict())
+            timer = self._timers.pop(project_id, None)
+        if timer is not None:
+            timer.cancel()
+        if len(changes) == 0:
+            return
+
+        # Group devices with identical changes.
+        groups: dict[tuple, list[str]] = dict()
+        for device_id, labels in changes.items():
+            key = tuple(sorted(labels.items(), key=lambda kv: kv[0]))
+            groups.setdefault(key, []).append(device_id)
+
+        def update_group(group: tuple) -> list[LabelUpdateError]:
+            set_labels = {k: v for k, v in group if v is not None}
+            remove_labels = [k for k, v in group if v is None]
+            return Device.batch_update_labels(
+                device_ids=groups[group],
+                project_id=project_id,
+                set_labels=set_labels or None,
+                remove_labels=remove_labels or None,
+                **self._kwargs,
+            )
+
+        dtlog.debug(
+            "Flushing label changes of {} devices in {} batches.".format(
+                len(changes),
+                len(groups),
+            )
+        )
+
+        for group, errors, error in dtconcurrency.run_concurrently(
+            update_group,
+            groups,
+        ):
+            # Resolve the futures of every device in the group.
+            by_device: dict[str, list[LabelUpdateError]] = dict()
+            for label_error in errors or []:
+                by_device.setdefault(label_error.device_id, []).append(
+                    label_error
+                )
+            for device_id in groups[group]:
+                for future in futures[device_id]:
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(by_device.get(device_id, []))
@@ -0,0 +1,533 @@
+from __future__ import annotations
+
+import math
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Iterable, Optional
+
+import disruptive
+import disruptive.concurrency as dtconcurrency
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+from disruptive.events import events
+from disruptive.resources.device import Device
+from disruptive.resources.emulator import Emulator
+
+# Called with a random generator and the previous data of the device,
+# or None for its first event, and returns the next event data.
+ValueGenerator = Callable[
+    [random.Random, Optional[events._EventData]],
+    events._EventData,
+]
+
+# Device type created to publish each supported event type.
+_DEVICE_TYPES = {
+    events.TOUCH: Device.TOUCH,
+    events.TEMPERATURE: Device.TEMPERATURE,
+    events.OBJECT_PRESENT: Device.PROXIMITY,
+    events.HUMIDITY: Device.HUMIDITY,
+    events.OBJECT_PRESENT_COUNT: Device.PROXIMITY_COUNTER,
+    events.TOUCH_COUNT: Device.TOUCH_COUNTER,
+    events.WATER_PRESENT: Device.WATER_DETECTOR,
+    events.CO2: Device.CO2,
+    events.PRESSURE: Device.CO2,
+    events.MOTION: Device.MOTION,
+    events.DESK_OCCUPANCY: Device.DESK_OCCUPANCY,
+    events.CONTACT: Device.CONTACT,
+}
+
+
+def _random_walk(
+    previous: Optional[float],
+    start: float,
+    step: float,
+    low: float,
+    high: float,
+    rng: random.Random,
+) -> float:
+    value = start if previous is None else previous + rng.gauss(0, step)
+    return round(min(max(value, low), high), 2)
+
+
+def _temperature(rng: random.Random, prev: Any) -> events.Temperature:
+    celsius = prev.celsius if prev is not None else None
+    return events.Temperature(_random_walk(celsius, 21, 0.2, -40, 85, rng))
+
+
+def _humidity(rng: random.Random, prev: Any) -> events.Humidity:
+    celsius = prev.celsius if prev is not None else None
+    humidity = prev.relative_humidity if prev is not None else None
+    return events.Humidity(
+        celsius=_random_walk(celsius, 21, 0.2, -40, 85, rng),
+        relative_humidity=_random_walk(humidity, 40, 0.5, 0, 100, rng),
+    )
+
+
+def _co2(rng: random.Random, prev: Any) -> events.Co2:
+    ppm = prev.ppm if prev is not None else None
+    return events.Co2(int(_random_walk(ppm, 600, 20, 400, 5000, rng)))
+
+
+def _pressure(rng: random.Random, prev: Any) -> events.Pressure:
+    pascal = prev.pascal if prev is not None else None
+    return events.Pressure(_random_walk(pascal, 101325, 10, 9e4, 1.1e5, rng))
+
+
+def _touch_count(rng: random.Random, prev: Any) -> events.TouchCount:
+    total = prev.total if prev is not None else 0
+    return events.TouchCount(total + rng.randint(0, 3))
+
+
+def _object_present_count(
+    rng: random.Random,
+    prev: Any,
+) -> events.ObjectPresentCount:
+    total = prev.total if prev is not None else 0
+    return events.ObjectPresentCount(total + rng.randint(0, 3))
+
+
+def _toggle(
+    cls: Callable[[str], events._EventData],
+    states: tuple[str, str],
+    probability: float = 0.3,
+) -> ValueGenerator:
+    # Binary states change with some probability on each event.
+    def generator(rng: random.Random, prev: Any) -> events._EventData:
+        state = prev.state if prev is not None else states[1]
+        if rng.random() < probability:
+            state = states[0] if state == states[1] else states[1]
+        return cls(state)
+
+    return generator
+
+
+# Default synthetic value generators for each supported event type.
+GENERATORS: dict[str, ValueGenerator] = {
+    events.TOUCH: lambda rng, prev: events.Touch(),
+    events.TEMPERATURE: _temperature,
+    events.HUMIDITY: _humidity,
+    events.CO2: _co2,
+    events.PRESSURE: _pressure,
+    events.TOUCH_COUNT: _touch_count,
+    events.OBJECT_PRESENT_COUNT: _object_present_count,
+    events.OBJECT_PRESENT: _toggle(
+        events.ObjectPresent,
+        (
+            events.ObjectPresent.STATE_PRESENT,
+            events.ObjectPresent.STATE_NOT_PRESENT,
+        ),
+    ),
+    events.WATER_PRESENT: _toggle(
+        events.WaterPresent,
+        (
+            events.WaterPresent.STATE_PRESENT,
+            events.WaterPresent.STATE_NOT_PRESENT,
+        ),
+        probability=0.05,
+    ),
+    events.MOTION: _toggle(
+        events.Motion,
+        (
+            events.Motion.STATE_MOTION_DETECTED,
+            events.Motion.STATE_NO_MOTION_DETECTED,
+        ),
+    ),
+    events.DESK_OCCUPANCY: _toggle(
+        events.DeskOccupancy,
+        (
+            events.DeskOccupancy.STATE_OCCUPIED,
+            events.DeskOccupancy.STATE_NOT_OCCUPIED,
+        ),
+    ),
+    events.CONTACT: _toggle(
+        events.Contact,
+        (events.Contact.STATE_OPEN, events.Contact.STATE_CLOSED),
+    ),
+}
+
+
+class LoadReport:
+    """
+    Summary of a :code:`LoadGenerator` run.
+
+    Attributes
+    ----------
+    target_rate : float
+        Requested number of events per second.
+    achieved_rate : float
+        Number of events completed per second, successful or not.
+    sent : int
+        Number of events successfully published.
+    failed : int
+        Number of events that raised an error.
+    duration : float
+        Seconds from the first event was scheduled to the last completed.
+    latency : dict[str, float]
+        Publish latency in seconds at the 50th, 90th, 99th percentile,
+        and the maximum, keyed by "p50", "p90", "p99", and "max".
+    max_lag : float
+        Largest number of seconds an event was scheduled behind its
+        target time, such as when all workers were busy.
+    errors : dict[str, int]
+        Number of failed events by error class name.
+
+    """
+
+    def __init__(
+        self,
+        target_rate: float,
+        latencies: list[float],
+        errors: dict[str, int],
+        duration: float,
+        max_lag: float,
+    ) -> None:
+        self.target_rate = target_rate
+        self.failed = sum(errors.values())
+        self.sent = len(latencies) - self.failed
+        self.duration = duration
+        self.max_lag = max_lag
+        self.errors = errors
+
+        if duration > 0:
+            self.achieved_rate = len(latencies) / duration
+        else:
+            self.achieved_rate = 0.0
+
+        ordered = sorted(latencies)
+        self.latency = {
+            "p50": _percentile(ordered, 50),
+            "p90": _percentile(ordered, 90),
+            "p99": _percentile(ordered, 99),
+            "max": ordered[-1] if ordered else 0.0,
+        }
+
+    def __repr__(self) -> str:
+        return "{}.{}(sent={}, failed={}, achieved_rate={:.1f})".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self.sent,
+            self.failed,
+            self.achieved_rate,
+        )
+
+
+def _percentile(ordered: list[float], percent: float) -> float:
+    # Nearest-rank percentile of an already sorted list.
+    if len(ordered) == 0:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class LoadGenerator:
+    """
+    Publishes emulated events at a target rate across a fleet of devices.
+
+    Events are scheduled at evenly spaced target times and published
+    concurrently, such that the rate is not limited by the latency of
+    each request. The event type of each event is drawn from a weighted
+    mix, and its data from a synthetic value generator for the type.
+
+    Attributes
+    ----------
+    project_id : str
+        Unique ID of the project the fleet resides in.
+    rate : float
+        Target number of events per second.
+    event_types : dict[str, float]
+        Relative weight of each :ref:`event type <event_types>`.
+    devices : dict[str, list[str]]
+        Unique IDs of the devices publishing each event type.
+
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        rate: float,
+        event_types: Optional[dict[str, float]] = None,
+        generators: Optional[dict[str, ValueGenerator]] = None,
+        max_workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Constructs the LoadGenerator object.
+        No requests are sent until the fleet is created or the run starts.
+
+        Parameters
+        ----------
+        project_id : str
+            Unique ID of the target project.
+        rate : float
+            Target number of events per second.
+        event_types : dict[str, float], optional
+            Relative weight of each :ref:`event type <event_types>`.
+            Defaults to temperature events only.
+        generators : dict[str, Callable], optional
+            Synthetic value generators overriding the defaults by event
+            type. Each is called with a :code:`random.Random` and the
+            previous data of the device, and returns new event data.
+        max_workers : int, optional
+            Maximum number of requests in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        seed : int, optional
+            Seed for reproducible event types, devices, and values.
+        **kwargs
+            Arbitrary keyword arguments passed to the emulator.
+            Use `base_url` to target an alternative emulator.
+            See the :ref:`Configuration <configuration>` page.
+
+        Examples
+        --------
+        >>> load = dt.LoadGenerator(
+        ...     project_id='<PROJECT_ID>',
+        ...     rate=500,
+        ...     event_types={'temperature': 4, 'touch': 1},
+        ... )
+        >>> load.create_fleet(100)
+        >>> report = load.run(duration=60)
+        >>> load.delete_fleet()
+
+        """
+
+        if rate <= 0:
+            raise dterrors.ConfigurationError(
+                f"Rate has value {rate}, but must be greater than 0."
+            )
+
+        self.project_id = project_id
+        self.rate = rate
+        self.event_types = event_types or {events.TEMPERATURE: 1}
+        self.generators = {**GENERATORS, **(generators or {})}
+        self.max_workers = max_workers
+        self.devices: dict[str, list[str]] = dict()
+        self._kwargs = kwargs
+
+        # Verify each event type can be emulated before sending anything.
+        for event_type in self.event_types:
+            if event_type not in _DEVICE_TYPES:
+                raise dterrors.ConfigurationError(
+                    f"Event type {event_type} can not be emulated."
+                )
+
+        self._rng = random.Random(seed)
+        self._previous: dict[tuple[str, str], events._EventData] = dict()
+        self._lock = threading.Lock()
+
+    def create_fleet(
+        self,
+        size: int,
+        labels: Optional[dict[str, str]] = None,
+    ) -> list[Device]:
+        """
+        Creates emulated devices in parallel, distributed over the event
+        types in proportion to their weight, with at least one per type.
+
+        Parameters
+        ----------
+        size : int
+            Total number of devices to create.
+        labels : dict[str, str], optional
+            Labels set on each created device.
+
+        Returns
+        -------
+        devices : list[Device]
+            The created emulated devices.
+
+        """
+
+        # Distribute devices by weight, with at least one per type.
+        total = sum(self.event_types.values())
+        counts = {
+            event_type: max(1, round(size * weight / total))
+            for event_type, weight in self.event_types.items()
+        }
+
+        def create(event_type: str) -> Device:
+            return Emulator.create_device(
+                project_id=self.project_id,
+                device_type=_DEVICE_TYPES[event_type],
+                labels=dict(labels or {}),
+                **self._kwargs,
+            )
+
+        jobs = [xt for xt, count in counts.items() for _ in range(count)]
+        devices = []
+        for event_type, device, error in dtconcurrency.run_concurrently(
+            create,
+            jobs,
+            self.max_workers,
+        ):
+            if error is not None:
+                raise error
+            if device is not None:
+                self.devices.setdefault(event_type, []).append(
+                    device.device_id
+                )
+                devices.append(device)
+
+        dtlog.info(f"Created emulated fleet of {len(devices)} devices.")
+        return devices
+
+    def use_devices(self, devices: Iterable[Device]) -> None:
+        """
+        Adds existing emulated devices to the fleet, assigning each to
+        the event types in the mix its device type can publish.
+
+        Parameters
+        ----------
+        devices : Iterable[Device]
+            Emulated devices, such as from :code:`Device.list_devices`.
+
+        """
+
+        for device in devices:
+            for event_type in self.event_types:
+                if _DEVICE_TYPES[event_type] == device.device_type:
+                    self.devices.setdefault(event_type, []).append(
+                        device.device_id
+                    )
+
+    def delete_fleet(self) -> None:
+        """
+        Deletes all devices in the fleet in parallel.
+
+        """
+
+        device_ids = {xid for ids in self.devices.values() for xid in ids}
+
+        def delete(device_id: str) -> None:
+            Emulator.delete_device(device_id, self.project_id, **self._kwargs)
+
+        for device_id, _, error in dtconcurrency.run_concurrently(
+            delete,
+            device_ids,
+            self.max_workers,
+        ):
+            if error is not None:
+                dtlog.warning(f"Failed to delete device {device_id}.")
+
+        self.devices = dict()
+
+    def run(
+        self,
+        duration: Optional[float] = None,
+        count: Optional[int] = None,
+    ) -> LoadReport:
+        """
+        Publishes events at the target rate until either the duration has
+        passed or the number of events has been scheduled.
+
+        Parameters
+        ----------
+        duration : float, optional
+            Number of seconds to publish events for.
+        count : int, optional
+            Number of events to publish.
+
+        Returns
+        -------
+        report : LoadReport
+            Achieved rate, latency percentiles, and errors of the run.
+
+        Raises
+        ------
+        ConfigurationError
+            If neither `duration` nor `count` is provided, or if the fleet
+            has no device for an event type in the mix.
+
+        """
+
+        if duration is None and count is None:
+            raise dterrors.ConfigurationError(
+                "Either duration or count must be provided."
+            )
+        for event_type in self.event_types:
+            if len(self.devices.get(event_type, [])) == 0:
+                raise dterrors.ConfigurationError(
+                    f"No device in fleet to publish {event_type} events."
+                )
+
+        types = list(self.event_types)
+        weights = [self.event_types[xt] for xt in types]
+
+        latencies: list[float] = []
+        errors: dict[str, int] = dict()
+        max_lag = 0.0
+
+        def publish(event_type: str, device_id: str) -> None:
+            # Generators may return any of the event data classes.
+            data: Any = self._next_data(event_type, device_id)
+            start = time.perf_counter()
+            try:
+                Emulator.publish_event(
+                    device_id,
+                    self.project_id,
+                    data,
+                    **self._kwargs,
+                )
+            except Exception as e:
+                with self._lock:
+                    name = e.__class__.__name__
+                    errors[name] = errors.get(name, 0) + 1
+            finally:
+                with self._lock:
+                    latencies.append(time.perf_counter() - start)
+
+        max_workers = self.max_workers or disruptive.request_concurrency
+
+        # Bound the backlog such that a slow target does not fill memory.
+        slots = threading.BoundedSemaphore(max_workers * 2)
+
+        def release(_: Future) -> None:
+            slots.release()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            nth = 0
+            while count is None or nth < count:
+                # Open loop pacing, each event has a fixed target time.
+                target = start + nth / self.rate
+                if duration is not None and target - start >= duration:
+                    break
+                wait = target - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+
+                slots.acquire()
+                max_lag = max(max_lag, time.perf_counter() - target)
+
+                event_type = self._rng.choices(types, weights)[0]
+                device_id = self._rng.choice(self.devices[event_type])
+                future = executor.submit(publish, event_type, device_id)
+                future.add_done_callback(release)
+                nth += 1
+
+        report = LoadReport(
+            target_rate=self.rate,
+            latencies=latencies,
+            errors=errors,
+            duration=time.perf_counter() - start,
+            max_lag=max_lag,
+        )
+        dtlog.info(f"Load generation finished with {report}.")
+        return report
+
+    def _next_data(
+        self,
+        event_type: str,
+        device_id: str,
+    ) -> events._EventData:
+        # Each device continues from its own previous value.
+        with self._lock:
+            key = (device_id, event_type)
+            data = self.generators[event_type](
+                self._rng,
+                self._previous.get(key),
+            )
+            self._previous[key] = data
+        return data
@@ -0,0 +1,684 @@
+"""
+Occupancy intervals and utilisation from state-change events.
+
+`objectPresent`, `deskOccupancy` and `motion` events report the new state
+of a sensor when it changes. The vectorised functions turn a history of
+such events into a table of intervals, one per state, and then into the
+fraction of each time bucket a device, or group of devices, was occupied.
+:code:`OccupancyTracker` does the same incrementally for a stream.
+
+The vectorised functions require the installation of additional packages.
+>> pip install disruptive[extra]
+
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Generator, Iterable, Optional
+
+import disruptive.aggregate as dtaggregate
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+import disruptive.transforms as dttrans
+
+if TYPE_CHECKING:
+    from disruptive.events.events import Event
+
+# Occupancy metric name: the state that counts as occupied.
+OCCUPIED = {
+    "object_present": "PRESENT",
+    "desk_occupancy": "OCCUPIED",
+    "motion": "MOTION_DETECTED",
+}
+
+# Output columns of sessionize(), in order.
+SESSION_COLUMNS = [
+    "device_id",
+    "metric",
+    "state",
+    "start",
+    "end",
+    "duration",
+]
+
+# Called with each session as it ends.
+SessionCallback = Callable[["Session"], None]
+
+# Occupied and observed seconds by (device or group, metric) and bucket.
+_Buckets = dict[tuple[str, str], dict[int, list[float]]]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def extract_states(
+    events: Iterable[Event],
+    metrics: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """
+    Collects the state changes of events into columnar arrays.
+
+    Parameters
+    ----------
+    events : Iterable[Event]
+        Events, typically an :code:`EventHistory`.
+    metrics : list[str], optional
+        Names of metrics in `OCCUPIED` to collect. By default all.
+
+    Returns
+    -------
+    columns : dict[str, numpy.ndarray]
+        Arrays `device_id`, `metric`, `time` (datetime64[ns]) and
+        `state`, one element per event.
+
+    Raises
+    ------
+    ConfigurationError
+        If an unknown metric is requested.
+
+    """
+
+    np = dtaggregate._numpy()
+    by_type = _metrics_by_type(metrics)
+
+    device_ids: list[str] = []
+    names: list[str] = []
+    times: list[str] = []
+    states: list[str] = []
+    for event in events:
+        name = by_type.get(event.event_type)
+        if name is None:
+            continue
+        data = event.raw["data"][event.event_type]
+        device_ids.append(event.device_id)
+        names.append(name)
+        times.append(data["updateTime"])
+        states.append(data["state"])
+
+    return {
+        "device_id": np.array(device_ids, dtype=object),
+        "metric": np.array(names, dtype=object),
+        "time": dtaggregate._parse_times(np, times),
+        "state": np.array(states, dtype=object),
+    }
+
+
+def sessionize(
+    device_id: Any,
+    metric: Any,
+    time: Any,
+    state: Any,
+    start_time: Optional[str | datetime] = None,
+    end_time: Optional[str | datetime] = None,
+) -> dict[str, Any]:
+    """
+    Turns columnar state changes into intervals of constant state.
+
+    Repeated reports of the same state are merged into one interval. Each
+    interval ends when the next one of the same device and metric starts,
+    and the last one ends at `end_time`, or is left open if not given.
+
+    Parameters
+    ----------
+    device_id : array_like
+        Device ID of each state change.
+    metric : array_like
+        Metric name of each state change.
+    time : array_like
+        Time of each state change, as datetime64.
+    state : array_like
+        New state of each state change.
+    start_time : str, datetime, optional
+        Intervals are clipped to start at this time.
+    end_time : str, datetime, optional
+        Intervals are clipped to end at this time, and state changes
+        at or after it are ignored.
+
+    Returns
+    -------
+    intervals : dict[str, numpy.ndarray]
+        Arrays named by `SESSION_COLUMNS`, one element per interval,
+        sorted by device, metric and start. Open intervals have an
+        `end` of NaT and a `duration` of NaN seconds.
+
+    Examples
+    --------
+    >>> columns = extract_states(history)
+    >>> intervals = sessionize(**columns, end_time=datetime.now())
+
+    """
+
+    np = dtaggregate._numpy()
+    time_ns = np.asarray(time, dtype="datetime64[ns]").view(np.int64)
+    start_ns = dtaggregate._epoch_nanoseconds(start_time)
+    end_ns = dtaggregate._epoch_nanoseconds(end_time)
+
+    device_id = np.asarray(device_id, dtype=object)
+    metric = np.asarray(metric, dtype=object)
+    state = np.asarray(state, dtype=object)
+    if end_ns is not None:
+        keep = time_ns < end_ns
+        time_ns, device_id = time_ns[keep], device_id[keep]
+        metric, state = metric[keep], state[keep]
+
+    if len(time_ns) == 0:
+        return {
+            "device_id": np.array([], dtype=object),
+            "metric": np.array([], dtype=object),
+            "state": np.array([], dtype=object),
+            "start": np.array([], dtype="datetime64[ns]"),
+            "end": np.array([], dtype="datetime64[ns]"),
+            "duration": np.array([]),
+        }
+
+    # Order by series, then time.
+    devices, device_index = dtaggregate._factorize(np, device_id)
+    names, name_index = dtaggregate._factorize(np, metric)
+    states, state_index = dtaggregate._factorize(np, state)
+    series = device_index * len(names) + name_index
+    order = np.lexsort((time_ns, series))
+    series = series[order]
+    time_ns = time_ns[order]
+    state_index = state_index[order]
+
+    # An interval starts at each change of series or state.
+    new_series = np.r_[True, series[1:] != series[:-1]]
+    change = new_series | np.r_[True, state_index[1:] != state_index[:-1]]
+    series = series[change]
+    starts = time_ns[change]
+    state_index = state_index[change]
+    last = np.r_[series[1:] != series[:-1], True]
+
+    # Each interval ends where the next of the same series starts.
+    nat = np.iinfo(np.int64).min
+    ends = np.r_[starts[1:], nat]
+    ends[last] = nat if end_ns is None else end_ns
+
+    # Drop intervals that ended before the start, and clip the rest.
+    if start_ns is not None:
+        keep = (ends == nat) | (ends > start_ns)
+        series, starts = series[keep], starts[keep]
+        ends, state_index = ends[keep], state_index[keep]
+        starts = np.maximum(starts, start_ns)
+
+    duration = (ends - starts) / 1e9
+    duration[ends == nat] = np.nan
+
+    return {
+        "device_id": devices[series // len(names)],
+        "metric": names[series % len(names)],
+        "state": states[state_index],
+        "start": starts.astype("datetime64[ns]"),
+        "end": ends.astype("datetime64[ns]"),
+        "duration": duration,
+    }
+
+
+def utilization(
+    intervals: dict[str, Any],
+    interval: float | timedelta,
+    start_time: Optional[str | datetime] = None,
+    end_time: Optional[str | datetime] = None,
+    groups: Optional[dict[str, str]] = None,
+) -> dict[str, Any]:
+    """
+    Computes the occupied fraction of time buckets from intervals.
+
+    Only time where the state is known, between the first state change
+    of a device and the end of its last interval, is observed. The
+    utilisation of a bucket is the occupied time divided by the observed
+    time, summed over every device of a group if `groups` is given.
+
+    Parameters
+    ----------
+    intervals : dict[str, numpy.ndarray]
+        Intervals, as returned by :code:`sessionize`.
+    interval : float, timedelta
+        Length of each bucket, in seconds if a number. Buckets are
+        aligned to the UNIX epoch.
+    start_time : str, datetime, optional
+        Start of the first bucket. Defaults to the earliest interval.
+    end_time : str, datetime, optional
+        End of the last bucket, and of open intervals. Defaults to the
+        latest start or end of an interval.
+    groups : dict[str, str], optional
+        Group name of each device ID, such as the value of a label.
+        Devices not in it are left out.
+
+    Returns
+    -------
+    buckets : dict[str, numpy.ndarray]
+        Arrays `device_id`, or `group` if grouped, `metric`, `bucket`
+        (datetime64[ns]), `occupied` and `observed` in seconds, and
+        `utilization`, which is NaN if nothing was observed. Every
+        bucket in range is included.
+
+    Raises
+    ------
+    ConfigurationError
+        If the interval is not positive.
+
+    Examples
+    --------
+    >>> # Hourly utilisation per floor.
+    >>> floors = {d.device_id: d.labels['floor'] for d in devices}
+    >>> buckets = utilization(intervals, 3600, groups=floors)
+
+    """
+
+    np = dtaggregate._numpy()
+    interval_ns = dtaggregate._to_nanoseconds(interval, "interval")
+    column = "device_id" if groups is None else "group"
+
+    device_id = np.asarray(intervals["device_id"], dtype=object)
+    metric = np.asarray(intervals["metric"], dtype=object)
+    state = np.asarray(intervals["state"], dtype=object)
+    starts = np.asarray(intervals["start"], dtype="datetime64[ns]").view(
+        np.int64
+    )
+    ends = np.asarray(intervals["end"], dtype="datetime64[ns]").view(np.int64)
+
+    # Resolve the group of each interval.
+    if groups is None:
+        keys = device_id
+    else:
+        keys = np.array([groups.get(d) for d in device_id], dtype=object)
+        keep = np.array([key is not None for key in keys], dtype=bool)
+        keys, metric, state = keys[keep], metric[keep], state[keep]
+        starts, ends = starts[keep], ends[keep]
+
+    # Open intervals end at the end of the range.
+    nat = np.iinfo(np.int64).min
+    open_ = ends == nat
+    low = dtaggregate._epoch_nanoseconds(start_time)
+    high = dtaggregate._epoch_nanoseconds(end_time)
+    if len(starts) > 0:
+        if low is None:
+            low = int(starts.min())
+        if high is None:
+            high = int(max(starts.max(), ends.max()))
+    if low is None or high is None or high <= low:
+        return _empty_utilization(np, column)
+    ends = np.where(open_, high, ends)
+    starts = np.maximum(starts, low)
+    ends = np.minimum(ends, high)
+    keep = ends > starts
+    keys, metric, state = keys[keep], metric[keep], state[keep]
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return _empty_utilization(np, column)
+
+    occupied = np.zeros(len(state), dtype=bool)
+    for name, value in OCCUPIED.items():
+        occupied |= (metric == name) & (state == value)
+
+    # Split every interval at the bucket boundaries it crosses.
+    first_bucket = low // interval_ns
+    span = (high - 1) // interval_ns - first_bucket + 1
+    b0 = starts // interval_ns
+    b1 = (ends - 1) // interval_ns
+    counts = b1 - b0 + 1
+    piece = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.r_[0, np.cumsum(counts)[:-1]]
+    bucket = b0[piece] + np.arange(int(counts.sum())) - offsets[piece]
+    overlap = np.minimum(ends[piece], (bucket + 1) * interval_ns)
+    overlap -= np.maximum(starts[piece], bucket * interval_ns)
+
+    # Sum the pieces into a dense grid of series and buckets.
+    group_names, group_index = dtaggregate._factorize(np, keys)
+    names, name_index = dtaggregate._factorize(np, metric)
+    series = group_index * len(names) + name_index
+    n_series = len(group_names) * len(names)
+    flat = series[piece] * span + (bucket - first_bucket)
+    size = n_series * span
+    observed = np.bincount(flat, weights=overlap, minlength=size)
+    occupied_ns = np.bincount(
+        flat,
+        weights=overlap * occupied[piece],
+        minlength=size,
+    )
+
+    grid_series = np.repeat(np.arange(n_series), span)
+    grid_bucket = np.tile(np.arange(span) + first_bucket, n_series)
+    ratio = np.full(size, np.nan)
+    np.divide(occupied_ns, observed, out=ratio, where=observed > 0)
+
+    return {
+        column: group_names[grid_series // len(names)],
+        "metric": names[grid_series % len(names)],
+        "bucket": (grid_bucket * interval_ns).astype("datetime64[ns]"),
+        "occupied": occupied_ns / 1e9,
+        "observed": observed / 1e9,
+        "utilization": ratio,
+    }
+
+
+class Session:
+    """
+    An interval in which a device reported the same state.
+
+    Attributes
+    ----------
+    device_id : str
+        Unique ID of the device.
+    metric : str
+        Name of the metric, as in `OCCUPIED`.
+    state : str
+        The state throughout the interval.
+    start_time : datetime
+        Time of the state change that started the interval.
+    end_time : datetime, None
+        Time of the state change that ended the interval, or None if
+        it is ongoing.
+
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        metric: str,
+        state: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+    ) -> None:
+        self.device_id = device_id
+        self.metric = metric
+        self.state = state
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __repr__(self) -> str:
+        string = "{}.{}(device_id={}, metric={}, state={}, start_time={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.device_id),
+            repr(self.metric),
+            repr(self.state),
+            repr(dttrans.to_iso8601(self.start_time)),
+        )
+
+    @property
+    def occupied(self) -> bool:
+        """
+        Whether the state counts as occupied.
+
+        """
+
+        return OCCUPIED.get(self.metric) == self.state
+
+
+class OccupancyTracker:
+    """
+    Incremental occupancy sessions and utilisation of a stream.
+
+    The current session of each device is kept open until its state
+    changes, at which point it is closed and its duration is added to the
+    occupied and observed time of the buckets it spans. Only the most
+    recent `max_buckets` buckets are kept per device or group.
+
+    State changes older than the start of the current session of their
+    device, such as backfilled ones, are skipped.
+
+    Attributes
+    ----------
+    interval : timedelta
+        Length of each utilisation bucket.
+    groups : dict[str, str], None
+        Group name of each device ID. If set, utilisation is summed per
+        group, and devices not in it are ignored.
+    sessions : int
+        Number of sessions closed.
+    skipped : int
+        Number of state changes skipped as out of order.
+
+    """
+
+    def __init__(
+        self,
+        interval: float | timedelta = 3600,
+        metrics: Optional[list[str]] = None,
+        groups: Optional[dict[str, str]] = None,
+        on_session: Optional[SessionCallback] = None,
+        max_buckets: int = 168,
+    ) -> None:
+        """
+        Constructs an empty OccupancyTracker object.
+
+        Parameters
+        ----------
+        interval : float, timedelta, optional
+            Length of each utilisation bucket, in seconds if a number.
+        metrics : list[str], optional
+            Names of metrics in `OCCUPIED` to track. By default all.
+        groups : dict[str, str], optional
+            Group name of each device ID, such as the value of a label.
+        on_session : Callable, optional
+            Called with each session as it is closed.
+        max_buckets : int, optional
+            Number of buckets kept per device or group. By default a
+            week of hourly buckets.
+
+        Raises
+        ------
+        ConfigurationError
+            If the interval or `max_buckets` is not positive, or a
+            metric is unknown.
+
+        Examples
+        --------
+        >>> tracker = dt.OccupancyTracker(interval=900)
+        >>> for event in tracker.follow(dt.Stream.event_stream('<ID>')):
+        ...     pass
+
+        """
+
+        if not isinstance(interval, timedelta):
+            interval = timedelta(seconds=interval)
+        if interval <= timedelta(0):
+            raise dterrors.ConfigurationError(
+                f"Occupancy interval must be positive, got {interval}."
+            )
+        if max_buckets < 1:
+            raise dterrors.ConfigurationError(
+                f"Occupancy max_buckets must be at least 1, got {max_buckets}."
+            )
+
+        self.interval = interval
+        self.groups = groups
+        self.on_session = on_session
+        self.max_buckets = max_buckets
+        self.sessions = 0
+        self.skipped = 0
+
+        self._by_type = _metrics_by_type(metrics)
+        self._current: dict[tuple[str, str], Session] = {}
+        self._buckets: _Buckets = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: Event) -> Optional[Session]:
+        """
+        Applies a state change, closing the current session if changed.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        Returns
+        -------
+        session : Session, None
+            The session closed by the event, if any.
+
+        """
+
+        metric = self._by_type.get(event.event_type)
+        if metric is None:
+            return None
+        if self.groups is not None and event.device_id not in self.groups:
+            return None
+
+        data = event.raw["data"][event.event_type]
+        timestamp = dttrans.to_datetime(data["updateTime"])
+        if timestamp is None:
+            return None
+        state = data["state"]
+
+        key = (event.device_id, metric)
+        with self._lock:
+            current = self._current.get(key)
+            if current is not None and timestamp < current.start_time:
+                self.skipped += 1
+                return None
+            if current is not None and current.state == state:
+                return None
+
+            self._current[key] = Session(
+                event.device_id,
+                metric,
+                state,
+                timestamp,
+            )
+            if current is None:
+                return None
+            current.end_time = timestamp
+            self._accumulate(current, timestamp)
+            self.sessions += 1
+
+        self._route_session(current)
+        return current
+
+    def follow(
+        self,
+        stream: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Applies each event in a stream, then yields it unchanged.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, after being applied to the tracker.
+
+        """
+
+        for event in stream:
+            self.add(event)
+            yield event
+
+    def current(self) -> list[Session]:
+        """
+        The ongoing session of every device and metric.
+
+        """
+
+        with self._lock:
+            return list(self._current.values())
+
+    def utilization(
+        self,
+        now: Optional[datetime] = None,
+    ) -> dict[tuple[str, str], dict[datetime, float]]:
+        """
+        Occupied fraction of the observed time of each kept bucket.
+
+        Parameters
+        ----------
+        now : datetime, optional
+            If provided, ongoing sessions are counted until this time.
+
+        Returns
+        -------
+        utilization : dict[tuple[str, str], dict[datetime, float]]
+            Keyed by (device ID or group, metric), then by bucket start.
+            Buckets without observed time are left out.
+
+        """
+
+        with self._lock:
+            buckets = {
+                key: {b: list(totals) for b, totals in kept.items()}
+                for key, kept in self._buckets.items()
+            }
+            if now is not None:
+                for session in self._current.values():
+                    self._accumulate(session, now, buckets)
+
+        interval = self.interval
+        return {
+            key: {
+                _EPOCH + interval * b: occupied / observed
+                for b, (occupied, observed) in sorted(kept.items())
+                if observed > 0
+            }
+            for key, kept in buckets.items()
+        }
+
+    def _accumulate(
+        self,
+        session: Session,
+        end: datetime,
+        buckets: Optional[_Buckets] = None,
+    ) -> None:
+        # Must be called with the lock held.
+        if buckets is None:
+            buckets = self._buckets
+        group = session.device_id
+        if self.groups is not None:
+            group = self.groups[session.device_id]
+        kept = buckets.setdefault((group, session.metric), {})
+
+        # Split the session at the bucket boundaries it crosses.
+        start = session.start_time
+        bucket = (start - _EPOCH) // self.interval
+        while start < end:
+            bucket_end = _EPOCH + self.interval * (bucket + 1)
+            seconds = (min(end, bucket_end) - start).total_seconds()
+            totals = kept.setdefault(bucket, [0.0, 0.0])
+            if session.occupied:
+                totals[0] += seconds
+            totals[1] += seconds
+            start = bucket_end
+            bucket += 1
+
+        # Forget the oldest buckets.
+        while len(kept) > self.max_buckets:
+            del kept[min(kept)]
+
+    def _route_session(self, session: Session) -> None:
+        if self.on_session is None:
+            return
+        try:
+            self.on_session(session)
+        except Exception as e:
+            dtlog.error(f"OccupancyTracker session callback raised {e!r}.")
+
+
+def _metrics_by_type(metrics: Optional[list[str]]) -> dict[str, str]:
+    if metrics is None:
+        metrics = list(OCCUPIED)
+    by_type = {}
+    for name in metrics:
+        if name not in OCCUPIED:
+            raise dterrors.ConfigurationError(
+                f"Unknown metric {name}, expected one of {list(OCCUPIED)}."
+            )
+        by_type[dtaggregate.STATES[name]] = name
+    return by_type
+
+
+def _empty_utilization(np: Any, column: str) -> dict[str, Any]:
+    return {
+        column: np.array([], dtype=object),
+        "metric": np.array([], dtype=object),
+        "bucket": np.array([], dtype="datetime64[ns]"),
+        "occupied": np.array([]),
+        "observed": np.array([]),
+        "utilization": np.array([]),
+    }
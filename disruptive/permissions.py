@@ -0,0 +1,422 @@
+from __future__ import annotations
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import disruptive as dt
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+
+# Permission prefix of each collection in a resource URL.
+_COLLECTIONS = {
+    "devices": "sensor",
+    "dataconnectors": "dataconnector",
+    "members": "membership",
+    "serviceaccounts": "serviceaccount",
+}
+
+# Permission action of each request method.
+_ACTIONS = {
+    "GET": "read",
+    "POST": "create",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+
+def required_permission(method: str, url: str) -> Optional[tuple[str, str]]:
+    """
+    Finds the permission a REST API request certainly requires.
+
+    Parameters
+    ----------
+    method : str
+        Request method, such as "GET".
+    url : str
+        Request URL relative to the base URL, such as
+        "/projects/<PROJECT_ID>/devices".
+
+    Returns
+    -------
+    requirement : tuple[str, str], optional
+        The resource, such as "projects/<PROJECT_ID>", and the permission
+        required in it, such as "sensor.read". None if the request is not
+        known to require a single permission.
+
+    """
+
+    action = _ACTIONS.get(method)
+    parts = url.partition("?")[0].strip("/").split("/")
+    if action is None or len(parts) < 2:
+        return None
+    if parts[0] not in ("projects", "organizations") or parts[1] == "-":
+        return None
+
+    resource = "/".join(parts[:2])
+    rest = parts[2:]
+    verb = ""
+    if len(rest) > 0:
+        rest[-1], _, verb = rest[-1].partition(":")
+
+    # The project or organization itself.
+    if len(rest) == 0:
+        if parts[0] == "organizations" and action in ("create", "delete"):
+            return None
+        return resource, f"{parts[0][:-1]}.{action}"
+
+    prefix = _COLLECTIONS.get(rest[0])
+    if prefix is None:
+        return None
+    if parts[0] == "organizations" and prefix != "membership":
+        return None
+
+    if prefix == "sensor":
+        # Devices are created by claiming or emulating them, not by posting.
+        if action == "create":
+            if verb in ("batchUpdate", "transfer"):
+                return resource, "sensor.update"
+            return None
+        return resource, f"sensor.{action}"
+
+    if prefix == "serviceaccount" and len(rest) > 2 and rest[2] == "keys":
+        return resource, f"serviceaccount.key.{action}"
+
+    if verb == "sync":
+        action = "update"
+    return resource, f"{prefix}.{action}"
+
+
+def _identity(auth: Any) -> str:
+    # Service Account keys are stable across auth objects, others are not.
+    key_id = getattr(auth, "key_id", None)
+    if key_id is not None:
+        return f"serviceaccounts/keys/{key_id}"
+    return f"{auth.__class__.__name__}/{id(auth)}"
+
+
+def active_cache(kwargs: dict[str, Any]) -> Optional[PermissionCache]:
+    """
+    Returns the cache of a call, which is the `permission_cache` keyword
+    argument if given, otherwise :code:`disruptive.permission_cache`.
+
+    """
+
+    cache: Optional[PermissionCache] = kwargs.get(
+        "permission_cache",
+        dt.permission_cache,
+    )
+    return cache
+
+
+class PermissionCache:
+    """
+    Permissions of each caller in each project and organization.
+
+    Permissions are fetched once per auth identity and resource, then
+    kept for `ttl` seconds or until invalidated. When set as
+    :code:`disruptive.permission_cache`, or passed to a method as the
+    `permission_cache` keyword argument, it both serves
+    :code:`Project.list_permissions` and
+    :code:`Organization.list_permissions`, and prechecks other requests.
+    A request that requires a permission missing from the cached
+    permissions raises :code:`Forbidden` without being sent.
+
+    Prechecks only raise for requests known to require one permission,
+    such as "sensor.read" to list devices, and let every other request
+    through. An unexpected Forbidden response invalidates the
+    permissions of the caller in that resource.
+
+    Attributes
+    ----------
+    ttl : float
+        Number of seconds permissions are kept.
+    max_size : int
+        Maximum number of identity and resource pairs kept.
+    prefetch : bool
+        Whether a precheck fetches permissions that are not cached.
+    hits : int
+        Number of lookups served from the cache.
+    misses : int
+        Number of lookups that fetched permissions.
+    avoided : int
+        Number of requests that raised Forbidden without being sent.
+
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_size: int = 10_000,
+        prefetch: bool = True,
+    ) -> None:
+        """
+        Constructs the PermissionCache object.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Number of seconds permissions are kept.
+        max_size : int, optional
+            Maximum number of identity and resource pairs kept.
+            The least recently used are evicted first.
+        prefetch : bool, optional
+            If True, a precheck fetches the permissions of a resource
+            that are not cached, at the cost of one request per caller
+            and resource each `ttl`. If False, only permissions cached
+            by calls to `list_permissions` are checked.
+
+        Raises
+        ------
+        ConfigurationError
+            If `ttl` is not positive, or `max_size` is less than 1.
+
+        Examples
+        --------
+        >>> dt.permission_cache = dt.PermissionCache(ttl=600)
+        >>> dt.Project.list_permissions('<PROJECT_ID>')  # cached
+        >>> dt.Device.list_devices('<PROJECT_ID>')  # prechecked
+
+        """
+
+        if ttl <= 0:
+            raise dterrors.ConfigurationError(
+                f"Permission cache ttl has value {ttl}, but must be "
+                "greater than 0."
+            )
+        if max_size < 1:
+            raise dterrors.ConfigurationError(
+                f"Permission cache max_size has value {max_size}, but must "
+                "be at least 1."
+            )
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.prefetch = prefetch
+
+        self.hits = 0
+        self.misses = 0
+        self.avoided = 0
+
+        self._entries: OrderedDict[tuple[str, str], tuple[float, frozenset]]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return "{}.{}(ttl={}, entries={}, hit_rate={:.2f})".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self.ttl,
+            len(self._entries),
+            self.hit_rate,
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of lookups served from the cache.
+
+        """
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get(self, resource: str, **kwargs: Any) -> list[str]:
+        """
+        Gets the permissions of the caller in a resource, fetching
+        them if not cached.
+
+        Parameters
+        ----------
+        resource : str
+            Resource name, such as "projects/<PROJECT_ID>" or
+            "organizations/<ORGANIZATION_ID>".
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        permissions : list[str]
+            Permissions available to the caller, sorted.
+
+        """
+
+        key = (_identity(kwargs.get("auth", dt.default_auth)), resource)
+        permissions = self._lookup(key)
+        if permissions is None:
+            permissions = self._fetch(key, resource, **kwargs)
+        return sorted(permissions)
+
+    def put(
+        self,
+        resource: str,
+        permissions: list[str],
+        auth: Optional[Any] = None,
+    ) -> None:
+        """
+        Caches permissions of a caller in a resource fetched elsewhere.
+
+        Parameters
+        ----------
+        resource : str
+            Resource name, such as "projects/<PROJECT_ID>".
+        permissions : list[str]
+            Permissions available to the caller.
+        auth : Auth, optional
+            The caller. Defaults to :code:`disruptive.default_auth`.
+
+        """
+
+        if auth is None:
+            auth = dt.default_auth
+        self._store((_identity(auth), resource), frozenset(permissions))
+
+    def invalidate(
+        self,
+        resource: Optional[str] = None,
+        auth: Optional[Any] = None,
+    ) -> None:
+        """
+        Drops cached permissions, such as after roles have changed.
+
+        Parameters
+        ----------
+        resource : str, optional
+            Only drop the permissions in this resource.
+        auth : Auth, optional
+            Only drop the permissions of this caller.
+
+        """
+
+        identity = _identity(auth) if auth is not None else None
+        with self._lock:
+            for key in list(self._entries):
+                if identity is not None and key[0] != identity:
+                    continue
+                if resource is not None and key[1] != resource:
+                    continue
+                del self._entries[key]
+
+    def precheck(
+        self,
+        method: str,
+        url: str,
+        auth: Any,
+        **kwargs: Any,
+    ) -> Optional[str]:
+        """
+        Raises Forbidden if a request certainly lacks its permission.
+
+        Parameters
+        ----------
+        method : str
+            Request method, such as "GET".
+        url : str
+            Request URL relative to the base URL.
+        auth : Auth
+            The caller.
+        **kwargs
+            Arbitrary keyword arguments, used to fetch permissions.
+
+        Returns
+        -------
+        resource : str, optional
+            Resource name whose permissions were checked, if any.
+
+        Raises
+        ------
+        Forbidden
+            If the cached permissions of the caller do not include
+            the permission the request requires.
+
+        """
+
+        requirement = required_permission(method, url)
+        if requirement is None:
+            return None
+        resource, permission = requirement
+
+        key = (_identity(auth), resource)
+        permissions = self._lookup(key)
+        if permissions is None:
+            if not self.prefetch:
+                return None
+            try:
+                permissions = self._fetch(key, resource, auth=auth, **kwargs)
+            except dterrors.DTApiError as e:
+                # Without permissions to check, let the request decide.
+                dtlog.warning(f"Fetching permissions raised {e!r}.")
+                return None
+
+        if permission not in permissions:
+            with self._lock:
+                self.avoided += 1
+            raise dterrors.Forbidden(
+                f"Permission {permission} in {resource} is not granted to "
+                "the caller. The request was not sent."
+            )
+        return resource
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Exports the counters of the cache.
+
+        Returns
+        -------
+        stats : dict[str, Any]
+            Number of entries, hits, misses, avoided requests and
+            the hit rate.
+
+        """
+
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "avoided": self.avoided,
+                "hit_rate": self.hit_rate,
+            }
+
+    def _lookup(self, key: tuple[str, str]) -> Optional[frozenset]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _fetch(
+        self,
+        key: tuple[str, str],
+        resource: str,
+        **kwargs: Any,
+    ) -> frozenset:
+        # Imported here, as the requests module imports this one.
+        import disruptive.requests as dtrequests
+
+        # Fetched without the cache, so the fetch is never prechecked.
+        kwargs["permission_cache"] = None
+        permissions = frozenset(
+            dtrequests.DTRequest.paginated_get(
+                url=f"/{resource}/permissions",
+                pagination_key="permissions",
+                **kwargs,
+            )
+        )
+        self._store(key, permissions)
+        return permissions
+
+    def _store(self, key: tuple[str, str], permissions: frozenset) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, permissions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
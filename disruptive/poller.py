@@ -0,0 +1,612 @@
+from __future__ import annotations
+
+import math
+import time
+import array
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import disruptive.concurrency as dtconcurrency
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+from disruptive.resources.data_connector import DataConnector, Metric
+from disruptive.resources.project import Project
+
+
+def _to_seconds(latency: Any) -> float:
+    # Latency is reported as a duration string, such as "0.411s".
+    try:
+        return float(str(latency).rstrip("s"))
+    except ValueError:
+        return math.nan
+
+
+class MetricSample:
+    """
+    The metrics of a Data Connector as polled at one time.
+
+    Each sample covers the 3 hours before it was polled, such that
+    consecutive samples overlap.
+
+    Attributes
+    ----------
+    time : datetime
+        When the metrics were polled.
+    success_count : int
+        Number of 2xx responses in the 3 hours before.
+    error_count : int
+        Number of non-2xx responses in the 3 hours before.
+    latency : float
+        99th percentile latency in seconds, or NaN if not reported.
+
+    """
+
+    __slots__ = ["time", "success_count", "error_count", "latency"]
+
+    def __init__(
+        self,
+        time: datetime,
+        success_count: int,
+        error_count: int,
+        latency: float,
+    ) -> None:
+        self.time = time
+        self.success_count = success_count
+        self.error_count = error_count
+        self.latency = latency
+
+    def __repr__(self) -> str:
+        string = "{}.{}(time={}, success_count={}, error_count={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self.time.isoformat(),
+            self.success_count,
+            self.error_count,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MetricSample):
+            return NotImplemented
+        return all(
+            getattr(self, key) == getattr(other, key) for key in self.__slots__
+        )
+
+    @property
+    def error_rate(self) -> float:
+        """
+        Fraction of responses that were errors, or NaN without responses.
+
+        """
+
+        total = self.success_count + self.error_count
+        return self.error_count / total if total > 0 else math.nan
+
+
+class _Ring:
+    # Fixed capacity history in flat arrays, about 28 bytes per sample.
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.times = array.array("d", [0.0] * capacity)
+        self.success = array.array("q", [0] * capacity)
+        self.errors = array.array("q", [0] * capacity)
+        self.latency = array.array("d", [0.0] * capacity)
+        self.size = 0
+        self.next = 0
+
+    def append(
+        self,
+        t: float,
+        success: int,
+        errors: int,
+        latency: float,
+    ) -> None:
+        i = self.next
+        self.times[i] = t
+        self.success[i] = success
+        self.errors[i] = errors
+        self.latency[i] = latency
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def indices(self, last: Optional[int] = None) -> list[int]:
+        # Oldest first, optionally only the last few.
+        n = self.size if last is None else min(last, self.size)
+        start = self.next - n
+        return [(start + k) % self.capacity for k in range(n)]
+
+    def sample(self, i: int) -> MetricSample:
+        return MetricSample(
+            datetime.fromtimestamp(self.times[i], timezone.utc),
+            self.success[i],
+            self.errors[i],
+            self.latency[i],
+        )
+
+
+class _Connector:
+    def __init__(self, project_id: str, display_name: str, capacity: int):
+        self.project_id = project_id
+        self.display_name = display_name
+        self.ring = _Ring(capacity)
+        self.failures = 0
+        self.last_error: Optional[Exception] = None
+
+
+class MetricsPoller:
+    """
+    Polls the metrics of every Data Connector in projects on a schedule.
+
+    Each poll fetches the metrics of all Data Connectors concurrently,
+    and keeps a fixed number of samples per Data Connector in memory.
+    Histories, deltas and error rate trends are computed from the kept
+    samples, without further requests. The Data Connectors of the
+    projects are listed again every `discover_interval`, where those
+    that are gone are dropped with their history.
+
+    Attributes
+    ----------
+    interval : float
+        Number of seconds between polls when running on a schedule.
+    max_samples : int
+        Maximum number of samples kept per Data Connector.
+    polls : int
+        Number of polls completed.
+    requests : int
+        Number of metrics requests sent.
+    failures : int
+        Number of metrics requests that failed.
+
+    """
+
+    def __init__(
+        self,
+        project_ids: Optional[Iterable[str]] = None,
+        organization_id: Optional[str] = None,
+        interval: float = 300,
+        max_samples: int = 288,
+        discover_interval: float = 3600,
+        max_workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Constructs the MetricsPoller object.
+
+        Parameters
+        ----------
+        project_ids : Iterable[str], optional
+            Unique IDs of the projects to poll the Data Connectors of.
+        organization_id : str, optional
+            Unique ID of an organization to poll the Data Connectors of
+            every project in, if no project IDs are given.
+        interval : float, optional
+            Number of seconds between polls when running on a schedule.
+        max_samples : int, optional
+            Maximum number of samples kept per Data Connector. The
+            default keeps a day of samples at the default interval.
+        discover_interval : float, optional
+            Number of seconds before the Data Connectors of the projects
+            are listed again.
+        max_workers : int, optional
+            Maximum number of requests in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Raises
+        ------
+        ConfigurationError
+            If neither project IDs nor an organization ID are given, or
+            `interval` is not positive, or `max_samples` is less than 2.
+
+        Examples
+        --------
+        >>> with dt.MetricsPoller(organization_id='<ORG_ID>') as poller:
+        ...     poller.start()
+        ...     serve_dashboard(poller.summary)
+
+        """
+
+        if project_ids is None and organization_id is None:
+            raise dterrors.ConfigurationError(
+                "Either project_ids or organization_id must be given."
+            )
+        if interval <= 0:
+            raise dterrors.ConfigurationError(
+                f"Poll interval has value {interval}, but must be "
+                "greater than 0."
+            )
+        if max_samples < 2:
+            raise dterrors.ConfigurationError(
+                f"Poll max_samples has value {max_samples}, but must be "
+                "at least 2."
+            )
+
+        self.project_ids: Optional[list[str]] = None
+        if project_ids is not None:
+            self.project_ids = list(project_ids)
+        self.organization_id = organization_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.discover_interval = discover_interval
+        self.max_workers = max_workers
+        self._kwargs = kwargs
+
+        self.polls = 0
+        self.requests = 0
+        self.failures = 0
+
+        self._connectors: dict[str, _Connector] = {}
+        self._discovered: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> MetricsPoller:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self._connectors)
+
+    def __repr__(self) -> str:
+        return "{}.{}({} connectors, {} polls)".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            len(self._connectors),
+            self.polls,
+        )
+
+    def discover(self) -> list[str]:
+        """
+        Lists the Data Connectors of the projects.
+
+        Returns
+        -------
+        data_connector_ids : list[str]
+            Unique IDs of the Data Connectors that are polled.
+
+        """
+
+        project_ids = self.project_ids
+        if project_ids is None:
+            project_ids = [
+                p.project_id
+                for p in Project.list_projects(
+                    self.organization_id,
+                    **self._kwargs,
+                )
+            ]
+
+        def list_connectors(project_id: str) -> list[DataConnector]:
+            return DataConnector.list_data_connectors(
+                project_id,
+                **self._kwargs,
+            )
+
+        found: dict[str, DataConnector] = {}
+        failed: set[str] = set()
+        for project_id, connectors, error in dtconcurrency.run_concurrently(
+            list_connectors,
+            project_ids,
+            self.max_workers,
+        ):
+            if error is not None:
+                dtlog.warning(
+                    f"Listing Data Connectors of project {project_id} "
+                    f"raised {error!r}."
+                )
+                failed.add(project_id)
+                continue
+            for connector in connectors or []:
+                found[connector.data_connector_id] = connector
+
+        with self._lock:
+            for xid, state in list(self._connectors.items()):
+                # Keep the history of projects that could not be listed.
+                if xid not in found and state.project_id not in failed:
+                    del self._connectors[xid]
+            for xid, connector in found.items():
+                known = self._connectors.get(xid)
+                if known is None:
+                    self._connectors[xid] = _Connector(
+                        connector.project_id,
+                        connector.display_name,
+                        self.max_samples,
+                    )
+                else:
+                    known.display_name = connector.display_name
+            self._discovered = time.monotonic()
+            return list(self._connectors)
+
+    def poll(self) -> dict[str, MetricSample]:
+        """
+        Fetches the metrics of every Data Connector once.
+
+        The Data Connectors are listed first on the first poll, and
+        whenever the last listing is older than `discover_interval`.
+
+        Returns
+        -------
+        samples : dict[str, MetricSample]
+            New sample of each Data Connector whose metrics were fetched,
+            keyed by Data Connector ID.
+
+        """
+
+        if (
+            self._discovered is None
+            or time.monotonic() - self._discovered > self.discover_interval
+        ):
+            self.discover()
+
+        with self._lock:
+            targets = [
+                (xid, state.project_id)
+                for xid, state in self._connectors.items()
+            ]
+
+        def get_metrics(target: tuple[str, str]) -> Metric:
+            return DataConnector.get_metrics(*target, **self._kwargs)
+
+        samples: dict[str, MetricSample] = {}
+        for (xid, _), metric, error in dtconcurrency.run_concurrently(
+            get_metrics,
+            targets,
+            self.max_workers,
+        ):
+            now = time.time()
+            with self._lock:
+                self.requests += 1
+                state = self._connectors.get(xid)
+                if state is None:
+                    continue
+                if error is not None or metric is None:
+                    self.failures += 1
+                    state.failures += 1
+                    state.last_error = error
+                    continue
+
+                state.failures = 0
+                state.ring.append(
+                    now,
+                    metric.success_count,
+                    metric.error_count,
+                    _to_seconds(metric.latency),
+                )
+                samples[xid] = state.ring.sample(
+                    state.ring.indices(1)[0],
+                )
+
+        with self._lock:
+            self.polls += 1
+        return samples
+
+    def start(self) -> None:
+        """
+        Polls every `interval` seconds in a background thread until
+        stopped.
+
+        """
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="MetricsPoller",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops polling on a schedule. The history is kept.
+
+        """
+
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def history(
+        self,
+        data_connector_id: str,
+        last: Optional[int] = None,
+    ) -> list[MetricSample]:
+        """
+        Gets the kept samples of a Data Connector.
+
+        Parameters
+        ----------
+        data_connector_id : str
+            Unique ID of the Data Connector.
+        last : int, optional
+            Only get this many of the most recent samples.
+
+        Returns
+        -------
+        samples : list[MetricSample]
+            Samples, oldest first. Empty for unknown Data Connectors.
+
+        """
+
+        with self._lock:
+            state = self._connectors.get(data_connector_id)
+            if state is None:
+                return []
+            ring = state.ring
+            return [ring.sample(i) for i in ring.indices(last)]
+
+    def latest(self) -> dict[str, MetricSample]:
+        """
+        Gets the most recent sample of every Data Connector.
+
+        Returns
+        -------
+        samples : dict[str, MetricSample]
+            Latest sample, keyed by Data Connector ID. Data Connectors
+            without samples are left out.
+
+        """
+
+        with self._lock:
+            return {
+                xid: state.ring.sample(state.ring.indices(1)[0])
+                for xid, state in self._connectors.items()
+                if state.ring.size > 0
+            }
+
+    def deltas(
+        self,
+        data_connector_id: str,
+        last: Optional[int] = None,
+    ) -> list[tuple[datetime, int, int]]:
+        """
+        Gets the change in counts between consecutive samples.
+
+        As each sample counts the 3 hours before it, a delta is the
+        change of the rolling 3 hour counts, not the number of new
+        responses. A rise in errors shows as a positive error delta.
+
+        Parameters
+        ----------
+        data_connector_id : str
+            Unique ID of the Data Connector.
+        last : int, optional
+            Only use this many of the most recent samples.
+
+        Returns
+        -------
+        deltas : list[tuple[datetime, int, int]]
+            Time of the later sample, and the change of the success and
+            error counts, oldest first.
+
+        """
+
+        samples = self.history(data_connector_id, last)
+        return [
+            (
+                b.time,
+                b.success_count - a.success_count,
+                b.error_count - a.error_count,
+            )
+            for a, b in zip(samples, samples[1:])
+        ]
+
+    def error_rates(
+        self,
+        data_connector_id: str,
+        last: Optional[int] = None,
+    ) -> list[tuple[datetime, float]]:
+        """
+        Gets the error rate of each sample with responses.
+
+        Parameters
+        ----------
+        data_connector_id : str
+            Unique ID of the Data Connector.
+        last : int, optional
+            Only use this many of the most recent samples.
+
+        Returns
+        -------
+        rates : list[tuple[datetime, float]]
+            Time and error rate of each sample, oldest first.
+
+        """
+
+        return [
+            (sample.time, sample.error_rate)
+            for sample in self.history(data_connector_id, last)
+            if not math.isnan(sample.error_rate)
+        ]
+
+    def trend(self, data_connector_id: str, last: int = 12) -> float:
+        """
+        Estimates how fast the error rate is changing.
+
+        Parameters
+        ----------
+        data_connector_id : str
+            Unique ID of the Data Connector.
+        last : int, optional
+            Number of the most recent samples to fit.
+
+        Returns
+        -------
+        trend : float
+            Least squares slope of the error rate, per hour. Positive
+            when errors are increasing, and 0 with fewer than two
+            samples with responses.
+
+        """
+
+        rates = self.error_rates(data_connector_id, last)
+        if len(rates) < 2:
+            return 0.0
+
+        hours = [(t - rates[0][0]).total_seconds() / 3600 for t, _ in rates]
+        values = [rate for _, rate in rates]
+        mean_x = sum(hours) / len(hours)
+        mean_y = sum(values) / len(values)
+        sxx = sum((x - mean_x) ** 2 for x in hours)
+        if sxx == 0:
+            return 0.0
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(hours, values))
+        return sxy / sxx
+
+    def summary(self, last: int = 12) -> dict[str, dict[str, Any]]:
+        """
+        Exports the current state of every Data Connector.
+
+        Parameters
+        ----------
+        last : int, optional
+            Number of the most recent samples to fit trends to.
+
+        Returns
+        -------
+        summary : dict[str, dict[str, Any]]
+            Project ID, display name, latest counts, error rate and
+            latency, error rate trend per hour, number of samples, and
+            consecutive failed polls, keyed by Data Connector ID.
+
+        """
+
+        with self._lock:
+            states = list(self._connectors.items())
+
+        summary = {}
+        for xid, state in states:
+            samples = self.history(xid, 1)
+            latest = samples[0] if samples else None
+            summary[xid] = {
+                "project_id": state.project_id,
+                "display_name": state.display_name,
+                "success_count": latest.success_count if latest else None,
+                "error_count": latest.error_count if latest else None,
+                "error_rate": latest.error_rate if latest else math.nan,
+                "latency": latest.latency if latest else math.nan,
+                "trend": self.trend(xid, last),
+                "samples": state.ring.size,
+                "failures": state.failures,
+            }
+        return summary
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                dtlog.error(f"MetricsPoller poll raised {e!r}.")
+            self._stop.wait(self.interval)
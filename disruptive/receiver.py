@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import json
+import hmac
+import atexit
+import asyncio
+import hashlib
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import disruptive.logging as dtlog
+from disruptive.authentication import base64url_decode
+from disruptive.dedup import EventDeduplicator
+from disruptive.events.events import Event
+
+# Called with each batch of received events, as Event objects,
+# or as the raw forwarded payloads if the receiver does not decode.
+BatchCallback = Callable[[list], None]
+
+# Header in which Data Connectors forward the signed JWT.
+SIGNATURE_HEADER = "X-Dt-Signature"
+
+# Forwarded events are small, so larger bodies are rejected unread.
+MAX_BODY_SIZE = 1 << 20  # bytes
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+}
+
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    """
+    Verifies the signature of a request forwarded by a Data Connector.
+
+    The signature is a JWT signed with the signature secret of the Data
+    Connector, containing a checksum of the request body.
+
+    Parameters
+    ----------
+    body : bytes
+        Unmodified body of the forwarded request.
+    signature : str
+        Value of the `X-Dt-Signature` request header.
+    secret : str
+        Signature secret of the Data Connector.
+
+    Returns
+    -------
+    valid : bool
+        True if the signature is valid for the body, otherwise False.
+
+    Examples
+    --------
+    >>> valid = dt.receiver.verify_signature(
+    ...     body=request.body,
+    ...     signature=request.headers['X-Dt-Signature'],
+    ...     secret='<SIGNATURE_SECRET>',
+    ... )
+
+    """
+
+    parts = signature.split(".")
+    if len(parts) != 3:
+        return False
+    header, payload, token_signature = parts
+
+    # Verify the HS256 signature of the token itself.
+    expected = hmac.new(
+        key=secret.encode("utf-8"),
+        msg=f"{header}.{payload}".encode("utf-8"),
+        digestmod=hashlib.sha256,
+    ).digest()
+    try:
+        received = base64url_decode(token_signature)
+        if not hmac.compare_digest(expected, received):
+            return False
+        claims = json.loads(base64url_decode(payload))
+    except ValueError:
+        return False
+    if not isinstance(claims, dict):
+        return False
+
+    # Prefer the SHA-256 checksum, falling back to the legacy SHA-1.
+    if "checksum_sha256" in claims:
+        checksum = hashlib.sha256(body).hexdigest()
+        return hmac.compare_digest(checksum, str(claims["checksum_sha256"]))
+    if "checksum" in claims:
+        checksum = hashlib.sha1(body).hexdigest()
+        return hmac.compare_digest(checksum, str(claims["checksum"]))
+    return False
+
+
+class PushReceiver:
+    """
+    Receives events forwarded by an HTTP_PUSH Data Connector.
+
+    Each request has its signature verified before the body is decoded
+    into an :ref:`Event <event>`. Data Connectors deliver events at least
+    once, so events already received are acknowledged but dropped.
+    Received events are collected into batches that are handed to a
+    callback when full, or when the oldest event has waited for the
+    batch window.
+
+    The receiver can be mounted in any web framework as a WSGI or ASGI
+    application, or run as a standalone asyncio server. Requests are
+    acknowledged once the event is batched, and the callback runs in the
+    thread that completes a batch. The ASGI application and the server
+    handle requests in the default executor of the event loop, such that
+    a slow callback does not stall it. If the callback raises, the IDs of
+    the batch are forgotten, such that redelivered events are accepted.
+
+    Attributes
+    ----------
+    received : int
+        Number of events received, including duplicates.
+    duplicates : int
+        Number of received events that were dropped as duplicates.
+    rejected : int
+        Number of requests rejected for their signature or body.
+    batches : int
+        Number of batches handed to the callback.
+
+    """
+
+    def __init__(
+        self,
+        callback: BatchCallback,
+        signature_secret: Optional[str] = None,
+        batch_size: int = 100,
+        batch_window: float = 0.1,
+        decode: bool = True,
+        deduplicator: Optional[EventDeduplicator] = None,
+    ) -> None:
+        """
+        Constructs the PushReceiver object.
+
+        Parameters
+        ----------
+        callback : Callable
+            Called with each batch of events.
+        signature_secret : str, optional
+            Signature secret of the Data Connector. If not provided,
+            signatures are not verified.
+        batch_size : int, optional
+            Maximum number of events in a batch.
+        batch_window : float, optional
+            Maximum number of seconds an event waits for its batch to fill.
+        decode : bool, optional
+            If True, batches contain Event objects. If False, batches
+            contain the raw forwarded payloads, which also hold the
+            `labels` and `metadata` fields, without the cost of decoding.
+        deduplicator : EventDeduplicator, optional
+            Store of seen event IDs, which may be shared with other
+            sources of events. If not provided, a new one remembering
+            up to 200 000 IDs for an hour is used.
+
+        Examples
+        --------
+        >>> def on_batch(events):
+        ...     database.insert(events)
+        >>> receiver = dt.PushReceiver(on_batch, '<SIGNATURE_SECRET>')
+        >>> receiver.serve(port=8080)
+
+        """
+
+        self.callback = callback
+        self.signature_secret = signature_secret
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.decode = decode
+        if deduplicator is None:
+            deduplicator = EventDeduplicator(max_size=200_000)
+        self.deduplicator = deduplicator
+
+        self.received = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.batches = 0
+
+        self._batch: list = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+        atexit.register(self.close)
+
+    def __enter__(self) -> PushReceiver:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def handle(self, body: bytes, signature: Optional[str] = None) -> int:
+        """
+        Handles the body of a single forwarded request.
+
+        This is the framework-independent core of the receiver, for use
+        where neither the WSGI nor ASGI application fits.
+
+        Parameters
+        ----------
+        body : bytes
+            Unmodified body of the forwarded request.
+        signature : str, optional
+            Value of the `X-Dt-Signature` request header.
+
+        Returns
+        -------
+        status_code : int
+            HTTP status code with which to respond.
+
+        """
+
+        if self.signature_secret is not None:
+            if signature is None or not verify_signature(
+                body, signature, self.signature_secret
+            ):
+                return self._reject(401, "invalid signature")
+
+        try:
+            payload = json.loads(body)
+            event_id = payload["event"]["eventId"]
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reject(400, f"malformed body, {e!r}")
+
+        # Redelivered events are dropped before paying for decoding.
+        duplicate = self.deduplicator.seen(event_id)
+        with self._lock:
+            self.received += 1
+            if duplicate:
+                self.duplicates += 1
+        if duplicate:
+            return 200
+
+        try:
+            item = Event(payload["event"]) if self.decode else payload
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            # Let a corrected redelivery through.
+            self.deduplicator.discard(event_id)
+            return self._reject(400, f"malformed event, {e!r}")
+
+        batch = None
+        with self._lock:
+            self._batch.append(item)
+            if len(self._batch) >= self.batch_size:
+                batch = self._take_batch()
+            elif self._timer is None:
+                # The first event in a batch opens its window.
+                self._timer = threading.Timer(self.batch_window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch is not None:
+            self._deliver(batch)
+        return 200
+
+    def flush(self) -> None:
+        """
+        Hands pending events to the callback without waiting for the
+        batch to fill.
+
+        """
+
+        with self._lock:
+            batch = self._take_batch()
+        if len(batch) > 0:
+            self._deliver(batch)
+
+    def close(self) -> None:
+        """
+        Hands pending events to the callback.
+
+        """
+
+        self.flush()
+        atexit.unregister(self.close)
+
+    def wsgi(
+        self,
+        environ: dict,
+        start_response: Callable,
+    ) -> Iterable[bytes]:
+        """
+        WSGI application receiving forwarded requests on any path.
+
+        Examples
+        --------
+        >>> from wsgiref.simple_server import make_server
+        >>> receiver = dt.PushReceiver(on_batch, '<SIGNATURE_SECRET>')
+        >>> make_server('', 8080, receiver.wsgi).serve_forever()
+
+        """
+
+        if environ["REQUEST_METHOD"] != "POST":
+            status = 405
+        else:
+            try:
+                length = int(environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = -1
+
+            if length < 0:
+                status = 411
+            elif length > MAX_BODY_SIZE:
+                status = 413
+            else:
+                status = self.handle(
+                    environ["wsgi.input"].read(length),
+                    environ.get("HTTP_X_DT_SIGNATURE"),
+                )
+
+        start_response(
+            f"{status} {_REASONS[status]}",
+            [("Content-Type", "text/plain"), ("Content-Length", "0")],
+        )
+        return [b""]
+
+    async def asgi(
+        self,
+        scope: dict,
+        receive: Callable,
+        send: Callable,
+    ) -> None:
+        """
+        ASGI application receiving forwarded requests on any path.
+
+        Examples
+        --------
+        >>> import uvicorn
+        >>> receiver = dt.PushReceiver(on_batch, '<SIGNATURE_SECRET>')
+        >>> uvicorn.run(receiver.asgi, port=8080)
+
+        """
+
+        loop = asyncio.get_running_loop()
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await loop.run_in_executor(None, self.flush)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        signature = None
+        for name, value in scope["headers"]:
+            if name == b"x-dt-signature":
+                signature = value.decode("latin-1")
+
+        if scope["method"] != "POST":
+            status = 405
+        else:
+            chunks = []
+            size = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                more_body = message.get("more_body", False)
+                if size > MAX_BODY_SIZE:
+                    break
+            if size > MAX_BODY_SIZE:
+                status = 413
+            else:
+                status = await loop.run_in_executor(
+                    None,
+                    self.handle,
+                    b"".join(chunks),
+                    signature,
+                )
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-length", b"0")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+    async def start_server(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+    ) -> asyncio.AbstractServer:
+        """
+        Starts a standalone asyncio HTTP server in the running event loop.
+
+        The server implements only what Data Connectors require, such
+        that no web framework is needed. TLS should be terminated by a
+        proxy in front of it, as Data Connectors only forward to HTTPS.
+
+        Parameters
+        ----------
+        host : str, optional
+            Interface on which to listen.
+        port : int, optional
+            Port on which to listen. If 0, a free port is chosen.
+
+        Returns
+        -------
+        server : asyncio.AbstractServer
+            The listening server.
+
+        """
+
+        return await asyncio.start_server(self._connection, host, port)
+
+    def serve(self, host: str = "0.0.0.0", port: int = 8080) -> None:
+        """
+        Runs a standalone asyncio HTTP server until interrupted.
+
+        Parameters
+        ----------
+        host : str, optional
+            Interface on which to listen.
+        port : int, optional
+            Port on which to listen.
+
+        """
+
+        async def serve_forever() -> None:
+            server = await self.start_server(host, port)
+            dtlog.info(f"PushReceiver listening on {host}:{port}.")
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    async def _connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            # Connections are kept alive for as long as the client wants.
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                method, _, version = lines[0].partition(" ")
+                headers = dict()
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if version.endswith("HTTP/1.0"):
+                    keep_alive = (
+                        headers.get("connection", "").lower() == "keep-alive"
+                    )
+
+                length = headers.get("content-length")
+                if method != "POST":
+                    # The body is not read, so the connection can't be reused.
+                    status = 405
+                    keep_alive = False
+                elif length is None or not length.isdigit():
+                    status = 411
+                    keep_alive = False
+                elif int(length) > MAX_BODY_SIZE:
+                    status = 413
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(int(length))
+                    status = await loop.run_in_executor(
+                        None,
+                        self.handle,
+                        body,
+                        headers.get("x-dt-signature"),
+                    )
+
+                writer.write(
+                    "HTTP/1.1 {} {}\r\nContent-Length: 0\r\n{}\r\n".format(
+                        status,
+                        _REASONS[status],
+                        "" if keep_alive else "Connection: close\r\n",
+                    ).encode("latin-1")
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _reject(self, status: int, reason: str) -> int:
+        with self._lock:
+            self.rejected += 1
+        dtlog.warning(f"PushReceiver rejected request, {reason}.")
+        return status
+
+    def _take_batch(self) -> list:
+        # Must be called with the lock held.
+        batch = self._batch
+        self._batch = []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _deliver(self, batch: list) -> None:
+        with self._lock:
+            self.batches += 1
+        try:
+            self.callback(batch)
+        except Exception as e:
+            dtlog.error(f"PushReceiver callback raised {e!r}.")
+
+            # The batch was lost, so let redeliveries of it through.
+            for item in batch:
+                if isinstance(item, Event):
+                    self.deduplicator.discard(item.event_id)
+                else:
+                    self.deduplicator.discard(item["event"]["eventId"])
@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import time
+import threading
+from typing import Any, Generator, Iterable, Optional
+
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+import disruptive.transforms as dttrans
+from disruptive.events import events
+from disruptive.resources.device import Device
+from disruptive.resources.stream import Stream
+
+
+class _DeviceIndex:
+    """
+    In-memory indexes of a set of devices.
+
+    Each index maps a key to the set of device IDs that share it, allowing
+    queries to be answered by intersecting a few sets.
+
+    """
+
+    def __init__(self) -> None:
+        self.devices: dict[str, Device] = dict()
+        self.by_project: dict[str, set[str]] = dict()
+        self.by_type: dict[str, set[str]] = dict()
+        self.by_label_key: dict[str, set[str]] = dict()
+        self.by_label: dict[tuple[str, str], set[str]] = dict()
+
+    def add(self, device: Device) -> None:
+        # Replace any previous version of the device.
+        if device.device_id in self.devices:
+            self.remove(device.device_id)
+
+        self.devices[device.device_id] = device
+        xid = device.device_id
+        self.by_project.setdefault(device.project_id, set()).add(xid)
+        self.by_type.setdefault(device.device_type, set()).add(xid)
+        for key, value in device.labels.items():
+            self._add_label(xid, key, value)
+
+    def remove(self, device_id: str) -> None:
+        device = self.devices.pop(device_id)
+        self._discard(self.by_project, device.project_id, device_id)
+        self._discard(self.by_type, device.device_type, device_id)
+        for key, value in device.labels.items():
+            self._remove_label(device_id, key, value)
+
+    def set_label(self, device_id: str, key: str, value: str) -> None:
+        device = self.devices[device_id]
+        if key in device.labels:
+            self._remove_label(device_id, key, device.labels[key])
+        device.labels[key] = value
+        self._add_label(device_id, key, value)
+
+        if key == "name":
+            device.display_name = value
+
+    def remove_label(self, device_id: str, key: str) -> None:
+        device = self.devices[device_id]
+        if key not in device.labels:
+            return
+        self._remove_label(device_id, key, device.labels.pop(key))
+
+        if key == "name":
+            device.display_name = None
+
+    def _add_label(self, device_id: str, key: str, value: str) -> None:
+        self.by_label_key.setdefault(key, set()).add(device_id)
+        self.by_label.setdefault((key, value), set()).add(device_id)
+
+    def _remove_label(self, device_id: str, key: str, value: str) -> None:
+        self._discard(self.by_label_key, key, device_id)
+        self._discard(self.by_label, (key, value), device_id)
+
+    @staticmethod
+    def _discard(index: dict, key: Any, device_id: str) -> None:
+        # Drop empty sets so that the indexes do not grow with churn.
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(device_id)
+            if len(ids) == 0:
+                del index[key]
+
+
+class DeviceRegistry:
+    """
+    A local registry of devices kept current by the event stream.
+
+    The registry is seeded from :code:`Device.list_devices` and thereafter
+    updated by applying events, in particular `labelsChanged`, so that
+    queries by project, device type, and labels are answered locally.
+
+    If the stream reconnects, some events may have been lost, and the
+    registry is resynchronized before answering the next query. The same
+    happens if no sync or event has been seen for `max_staleness` seconds.
+
+    Attributes
+    ----------
+    project_id : str
+        Unique ID of the project the registry is seeded from.
+    max_staleness : float, None
+        Maximum number of seconds without a sync or event before the
+        next query triggers a resync. If None, staleness is not bounded.
+    fetch_unknown : bool
+        If True, events from devices not in the registry cause the
+        device to be fetched, and added if it passes the filters of the
+        registry. A failed fetch marks a gap rather than raising.
+    last_sync : float
+        Unixtime of the most recent sync. 0 if never synchronized.
+    last_event : float
+        Unixtime of the most recently applied event. 0 if none.
+
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        device_types: Optional[list[str]] = None,
+        label_filters: Optional[dict[str, str]] = None,
+        max_staleness: Optional[float] = None,
+        fetch_unknown: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Constructs the DeviceRegistry object.
+        No requests are sent until the first sync or query.
+
+        Parameters
+        ----------
+        project_id : str
+            Unique ID of the target project.
+        device_types : list[str], optional
+            Only track devices of the specified
+            :ref:`device types <device_type_constants>`.
+        label_filters : dict[str, str], optional
+            Only track devices with the specified label keys and values.
+        max_staleness : float, optional
+            Resync if no sync or event has been seen for this many seconds.
+        fetch_unknown : bool, optional
+            Fetch devices that are first seen in the event stream.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        """
+
+        # Set parameter attributes.
+        self.project_id = project_id
+        self.device_types = device_types
+        self.label_filters = label_filters
+        self.max_staleness = max_staleness
+        self.fetch_unknown = fetch_unknown
+        self._kwargs = kwargs
+
+        # Set default attributes.
+        self.last_sync: float = 0
+        self.last_event: float = 0
+        self._index = _DeviceIndex()
+        self._has_gap = False
+
+        # Events applied while a resync is in flight are replayed after it.
+        self._replay: Optional[list[events.Event]] = None
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index.devices)
+
+    def __contains__(self, device_id: object) -> bool:
+        return device_id in self._index.devices
+
+    @property
+    def staleness(self) -> float:
+        """
+        Seconds since the registry last saw a sync or an event.
+
+        """
+
+        return time.time() - max(self.last_sync, self.last_event)
+
+    def sync(self) -> None:
+        """
+        Rebuilds the registry from :code:`Device.list_devices`.
+
+        """
+
+        with self._sync_lock:
+            with self._lock:
+                self._replay = []
+                self._has_gap = False
+
+            try:
+                devices = Device.list_devices(
+                    project_id=self.project_id,
+                    device_types=self.device_types,
+                    label_filters=self.label_filters,
+                    **self._kwargs,
+                )
+            except BaseException:
+                with self._lock:
+                    self._replay = None
+                    self._has_gap = True
+                raise
+
+            # Build the new index without blocking queries.
+            index = _DeviceIndex()
+            for device in devices:
+                index.add(device)
+
+            with self._lock:
+                self._index = index
+                replay, self._replay = self._replay, None
+                for event in replay or []:
+                    self._apply(event)
+                self.last_sync = time.time()
+
+            dtlog.debug(f"Synchronized registry of {len(devices)} devices.")
+
+    def mark_gap(self) -> None:
+        """
+        Flags that events may have been missed, such as after a
+        reconnect, so that the next query triggers a resync.
+
+        """
+
+        with self._lock:
+            self._has_gap = True
+
+    def apply(self, event: events.Event) -> None:
+        """
+        Updates the registry with a single event.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        """
+
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(event)
+            known = self._apply(event)
+            self.last_event = time.time()
+
+        # Fetch devices we have not seen before outside the lock.
+        if not known and self.fetch_unknown:
+            self._fetch_device(event.device_id, event.project_id)
+
+    def follow(
+        self,
+        stream: Iterable[events.Event],
+    ) -> Generator[events.Event, None, None]:
+        """
+        Applies each event in a stream, then yields it unchanged.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, after being applied to the registry.
+
+        Examples
+        --------
+        >>> registry = dt.DeviceRegistry('<PROJECT_ID>')
+        >>> registry.sync()
+        >>> for event in registry.follow(dt.Stream.event_stream(...)):
+        ...     pass
+
+        """
+
+        for event in stream:
+            self.apply(event)
+            yield event
+
+    def event_stream(
+        self,
+        **kwargs: Any,
+    ) -> Generator[events.Event, None, None]:
+        """
+        Streams events for the devices in the registry, applying each
+        before it is yielded. Reconnects are flagged as gaps, before any
+        `on_reconnect` callback of the caller is called.
+
+        Parameters
+        ----------
+        **kwargs
+            Arbitrary keyword arguments passed to
+            :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            A generator that yields each new event in the stream.
+
+        Examples
+        --------
+        >>> # Keep the registry current in a background thread.
+        >>> registry = dt.DeviceRegistry('<PROJECT_ID>')
+        >>> for event in registry.event_stream():
+        ...     pass
+
+        """
+
+        if self.last_sync == 0:
+            self.sync()
+
+        # The stream expects None rather than "" to match any label value.
+        label_filters: Optional[dict] = None
+        if self.label_filters is not None:
+            label_filters = {
+                key: value if value != "" else None
+                for key, value in self.label_filters.items()
+            }
+
+        options = {**self._kwargs, **kwargs}
+        on_reconnect = options.pop("on_reconnect", None)
+
+        def reconnected() -> None:
+            self.mark_gap()
+            if on_reconnect is not None:
+                on_reconnect()
+
+        stream = Stream.event_stream(
+            project_id=self.project_id,
+            device_types=self.device_types,
+            label_filters=label_filters,
+            on_reconnect=reconnected,
+            **options,
+        )
+        yield from self.follow(stream)
+
+    def get(self, device_id: str) -> Optional[Device]:
+        """
+        Gets a single device from the registry.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+
+        Returns
+        -------
+        device : Device, None
+            The device if it is in the registry, otherwise None.
+
+        """
+
+        self._ensure_fresh()
+        with self._lock:
+            return self._index.devices.get(device_id)
+
+    def query(
+        self,
+        device_types: Optional[list[str]] = None,
+        label_filters: Optional[dict[str, Optional[str]]] = None,
+        project_id: Optional[str] = None,
+    ) -> list[Device]:
+        """
+        Gets the devices that match all provided filters.
+        Has the same semantics as :code:`Device.list_devices`.
+
+        Parameters
+        ----------
+        device_types : list[str], optional
+            Filter by :ref:`device types <device_type_constants>`.
+        label_filters : dict[str, str], optional
+            Specify devices by label keys and values (i.e. {"key": "value"}).
+            If only a key is provided (i.e. {"key": ""} or {"key": None}),
+            all devices with that key are matched.
+        project_id : str, optional
+            Filter by project ID.
+
+        Returns
+        -------
+        devices : list[Device]
+            List of objects each representing a matching device.
+
+        Examples
+        --------
+        >>> # All temperature sensors in room 99.
+        >>> devices = registry.query(
+        ...     device_types=[dt.Device.TEMPERATURE],
+        ...     label_filters={'room-number': '99'},
+        ... )
+
+        """
+
+        self._ensure_fresh()
+
+        with self._lock:
+            index = self._index
+            candidates: list[set[str]] = []
+
+            if project_id is not None:
+                candidates.append(index.by_project.get(project_id, set()))
+
+            if device_types is not None:
+                ids: set[str] = set()
+                for device_type in device_types:
+                    ids |= index.by_type.get(device_type, set())
+                candidates.append(ids)
+
+            for key, value in (label_filters or {}).items():
+                if value is None or value == "":
+                    candidates.append(index.by_label_key.get(key, set()))
+                else:
+                    candidates.append(index.by_label.get((key, value), set()))
+
+            # Without filters, every device matches.
+            if len(candidates) == 0:
+                return list(index.devices.values())
+
+            # Intersecting from the smallest set keeps the work minimal.
+            candidates.sort(key=len)
+            matches = set(candidates[0])
+            for ids in candidates[1:]:
+                matches &= ids
+                if len(matches) == 0:
+                    break
+
+            return [index.devices[xid] for xid in matches]
+
+    def _ensure_fresh(self) -> None:
+        # Resync at first use, after a gap, or once too stale.
+        should_sync = self.last_sync == 0 or self._has_gap
+        if self.max_staleness is not None:
+            should_sync |= self.staleness > self.max_staleness
+        if should_sync:
+            self.sync()
+
+    def _apply(self, event: events.Event) -> bool:
+        # Returns False if the event came from an unknown device.
+        if event.device_id not in self._index.devices:
+            return False
+
+        data = event.data
+        if isinstance(data, events.LabelsChanged):
+            for key, value in {**data.added, **data.modified}.items():
+                self._index.set_label(event.device_id, key, value)
+            for key in data.removed:
+                self._index.remove_label(event.device_id, key)
+
+        return True
+
+    def _fetch_device(self, device_id: str, project_id: str) -> None:
+        # Events of other projects can not match the registry.
+        if project_id != self.project_id:
+            return
+
+        try:
+            device = Device.get_device(device_id, project_id, **self._kwargs)
+        except dterrors.NotFound:
+            dtlog.warning(f"Device {device_id} in stream was not found.")
+            return
+        except dterrors.DTApiError as e:
+            # Let the next query resync rather than end the stream.
+            dtlog.warning(f"Fetching device {device_id} raised {e!r}.")
+            self.mark_gap()
+            return
+
+        if not self._tracks(device):
+            return
+        with self._lock:
+            self._index.add(device)
+
+    def _tracks(self, device: Device) -> bool:
+        # Whether a device passes the filters the registry syncs with.
+        if self.device_types is not None:
+            if device.device_type not in self.device_types:
+                return False
+        if self.label_filters is not None:
+            return dttrans.match_labels(device.labels, self.label_filters)
+        return True
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import heapq
+import bisect
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Generator, Iterable, Optional, Sequence
+
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+from disruptive.events.events import Event
+
+# Called with each event that arrives after the watermark has passed it.
+LateCallback = Callable[[Event], None]
+
+# Upper bounds of the lateness histogram buckets.
+LATENESS_BOUNDS = [0, 1, 5, 10, 30, 60, 300, 900, 3600]  # seconds
+
+# Upper bounds of the buffer depth histogram buckets.
+DEPTH_BOUNDS = [0, 1, 10, 100, 1000, 10_000, 100_000]  # events
+
+
+class Histogram:
+    """
+    Counts of observed values in buckets of fixed upper bounds.
+
+    Attributes
+    ----------
+    bounds : list[float]
+        Inclusive upper bound of each bucket, in increasing order.
+        Values above the last bound are counted in an overflow bucket.
+    counts : list[int]
+        Number of observed values per bucket, including the overflow.
+    total : int
+        Number of observed values.
+
+    """
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        """
+        Constructs an empty Histogram object.
+
+        Parameters
+        ----------
+        bounds : Sequence[float]
+            Inclusive upper bound of each bucket, in increasing order.
+
+        """
+
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+
+    def __repr__(self) -> str:
+        return "{}.{}({})".format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self.to_dict(),
+        )
+
+    def add(self, value: float) -> None:
+        """
+        Counts a single observed value.
+
+        """
+
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+
+    def to_dict(self) -> dict[str, int]:
+        """
+        Exports the counts keyed by the upper bound of each bucket.
+
+        Returns
+        -------
+        counts : dict[str, int]
+            Count per bucket, where the overflow bucket is keyed "inf".
+
+        """
+
+        keys = [f"{bound:g}" for bound in self.bounds] + ["inf"]
+        return dict(zip(keys, self.counts))
+
+
+class ReorderBuffer:
+    """
+    Reorders a stream of events by event time, within an allowed lateness.
+
+    Events from many devices arrive out of timestamp order, and
+    backfilled events may arrive minutes late. The buffer holds events
+    until the watermark, which trails the newest timestamp seen by the
+    allowed lateness, has passed them, then emits them in timestamp
+    order. Events that arrive behind the watermark can no longer be
+    emitted in order, and are routed to a side channel instead.
+
+    Attributes
+    ----------
+    allowed_lateness : timedelta
+        How far behind the newest timestamp seen events are accepted.
+    max_depth : int, None
+        If set, the oldest events are emitted early to keep at most
+        this many events buffered.
+    emitted : int
+        Number of events emitted in order.
+    late : int
+        Number of events routed to the side channel.
+    late_events : collections.deque
+        The most recent late events, if no `on_late` callback is set.
+    lateness : Histogram
+        Seconds each accepted event lagged the newest timestamp seen.
+    depth : Histogram
+        Number of buffered events, observed as each event arrives.
+
+    """
+
+    def __init__(
+        self,
+        allowed_lateness: float | timedelta = 60,
+        on_late: Optional[LateCallback] = None,
+        max_depth: Optional[int] = None,
+        late_history: int = 1000,
+    ) -> None:
+        """
+        Constructs an empty ReorderBuffer object.
+
+        Parameters
+        ----------
+        allowed_lateness : float, timedelta, optional
+            How far behind the newest timestamp seen, in seconds if a
+            number, events are still accepted and emitted in order.
+        on_late : Callable, optional
+            Called with each event that arrives too late. If not
+            provided, late events are kept in `late_events`.
+        max_depth : int, optional
+            Maximum number of buffered events. By default unbounded.
+        late_history : int, optional
+            Number of late events kept in `late_events`.
+
+        Examples
+        --------
+        >>> buffer = dt.ReorderBuffer(allowed_lateness=120)
+        >>> for event in buffer.follow(dt.Stream.event_stream('<ID>')):
+        ...     window.add(event)
+
+        """
+
+        if not isinstance(allowed_lateness, timedelta):
+            allowed_lateness = timedelta(seconds=allowed_lateness)
+        if allowed_lateness < timedelta(0):
+            raise dterrors.ConfigurationError(
+                "Allowed lateness must not be negative, "
+                f"got {allowed_lateness}."
+            )
+        if max_depth is not None and max_depth < 1:
+            raise dterrors.ConfigurationError(
+                f"Reorder max_depth must be at least 1, got {max_depth}."
+            )
+
+        self.allowed_lateness = allowed_lateness
+        self.on_late = on_late
+        self.max_depth = max_depth
+
+        self.emitted = 0
+        self.late = 0
+        self.late_events: deque[Event] = deque(maxlen=late_history)
+        self.lateness = Histogram(LATENESS_BOUNDS)
+        self.depth = Histogram(DEPTH_BOUNDS)
+
+        # Heap of (timestamp, arrival, event), where arrival breaks ties.
+        self._heap: list[tuple[datetime, int, Event]] = []
+        self._arrival = itertools.count()
+        self._newest: Optional[datetime] = None
+        self._emitted_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        """
+        Timestamp before which no more events are accepted, or None if
+        no events have been seen.
+
+        """
+
+        with self._lock:
+            return self._watermark()
+
+    def push(self, event: Event) -> list[Event]:
+        """
+        Adds an event, returning the events that are now ready.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        Returns
+        -------
+        events : list[Event]
+            Events passed by the watermark, in timestamp order.
+
+        """
+
+        timestamp = event.timestamp
+
+        with self._lock:
+            # Events without a timestamp can not be ordered.
+            if timestamp is None:
+                self.emitted += 1
+                return [event]
+
+            watermark = self._watermark()
+            if watermark is not None and timestamp < watermark:
+                self.late += 1
+                late = True
+            else:
+                late = False
+                self.depth.add(len(self._heap))
+                if self._newest is None or timestamp > self._newest:
+                    self._newest = timestamp
+                lag = self._newest - timestamp
+                self.lateness.add(lag.total_seconds())
+                heapq.heappush(
+                    self._heap,
+                    (timestamp, next(self._arrival), event),
+                )
+                ready = self._pop_until(self._watermark())
+
+        if late:
+            self._route_late(event)
+            return []
+        return ready
+
+    def flush(self) -> list[Event]:
+        """
+        Emits every buffered event, in timestamp order, such as when the
+        stream has ended.
+
+        Returns
+        -------
+        events : list[Event]
+            Every buffered event, in timestamp order.
+
+        """
+
+        with self._lock:
+            return self._pop_until(None)
+
+    def follow(
+        self,
+        stream: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Yields the events of a stream in timestamp order.
+
+        Buffered events are flushed when the stream ends.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The accepted events, in timestamp order.
+
+        """
+
+        for event in stream:
+            yield from self.push(event)
+        yield from self.flush()
+
+    def _watermark(self) -> Optional[datetime]:
+        # Must be called with the lock held.
+        if self._newest is None:
+            return self._emitted_until
+        watermark = self._newest - self.allowed_lateness
+
+        # Events emitted early for max_depth also hold the watermark.
+        if self._emitted_until is not None:
+            watermark = max(watermark, self._emitted_until)
+        return watermark
+
+    def _pop_until(self, watermark: Optional[datetime]) -> list[Event]:
+        # Must be called with the lock held.
+        ready = []
+        heap = self._heap
+        while len(heap) > 0:
+            if watermark is not None and heap[0][0] > watermark:
+                if self.max_depth is None or len(heap) <= self.max_depth:
+                    break
+            timestamp, _, event = heapq.heappop(heap)
+            ready.append(event)
+            self._emitted_until = timestamp
+
+        self.emitted += len(ready)
+        return ready
+
+    def _route_late(self, event: Event) -> None:
+        if self.on_late is None:
+            self.late_events.append(event)
+            return
+        try:
+            self.on_late(event)
+        except Exception as e:
+            dtlog.error(f"ReorderBuffer late callback raised {e!r}.")
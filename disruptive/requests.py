@@ -10,6 +10,8 @@ import requests
 import disruptive as dt
 import disruptive.logging as dtlog
 import disruptive.errors as dterrors
+import disruptive.concurrency as dtconcurrency
+import disruptive.permissions as dtpermissions
 
 
 USER_AGENT = "DisruptivePythonAPI/{} Python/{}".format(
@@ -32,6 +34,10 @@ class DTRequest:
         self.data = None
         self.request_timeout = dt.request_timeout
         self.request_attempts = dt.request_attempts
+        self.session: Optional[requests.Session] = None
+        self.auth: Optional[Any] = None
+        self.permission_cache: Optional[dtpermissions.PermissionCache] = None
+        self._checked_resource: Optional[str] = None
 
         # Unpack kwargs and set attributes thereafter.
         self._unpack_kwargs(**kwargs)
@@ -64,14 +70,22 @@ class DTRequest:
         if "base_url" in kwargs:
             self.base_url = kwargs["base_url"]
 
+        # A shared session reuses connections between many requests.
+        if "session" in kwargs:
+            self.session = kwargs["session"]
+
         # Add authorization header to request except when explicitly otherwise.
         if "skip_auth" not in kwargs or kwargs["skip_auth"] is False:
             # If provided, override the package-wide auth with provided object.
             if "auth" in kwargs:
-                self.headers["Authorization"] = kwargs["auth"].get_token()
+                self.auth = kwargs["auth"]
             # If not, use package-wide auth object.
             else:
-                self.headers["Authorization"] = dt.default_auth.get_token()
+                self.auth = dt.default_auth
+            self.headers["Authorization"] = self.auth.get_token()
+
+            # Requests without auth have no permissions to check.
+            self.permission_cache = dtpermissions.active_cache(kwargs)
 
     def _sanitize_arguments(self) -> None:
         # Check that request_timeout > 0.
@@ -107,7 +121,10 @@ class DTRequest:
         # Attempt to send the request.
         try:
             # Use the requests package to send the request.
-            res = requests.request(
+            send = requests.request
+            if self.session is not None:
+                send = self.session.request
+            res = send(
                 method=method,
                 url=url,
                 params=params,
@@ -151,6 +168,15 @@ class DTRequest:
             "Request [{}] to {}.".format(self.method, self.base_url + self.url)
         )
 
+        # Raise before sending if the caller certainly lacks permission.
+        if nth_attempt == 0:
+            self._precheck_permission()
+
+        # Wait for our turn if a client-side rate limit is configured.
+        rate_limiter = dtconcurrency.shared_rate_limiter()
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+
         res, req_error = self._request_wrapper(
             method=self.method,
             url=self.full_url,
@@ -198,11 +224,36 @@ class DTRequest:
         else:
             # If set, raise the error chosen by dterrors.parse_error().
             if error is not None:
+                # Cached permissions that allowed the request are outdated.
+                if (
+                    isinstance(error, dterrors.Forbidden)
+                    and self._checked_resource is not None
+                    and self.permission_cache is not None
+                ):
+                    self.permission_cache.invalidate(
+                        self._checked_resource,
+                        self.auth,
+                    )
                 raise error
 
         data: dict = res.data
         return data
 
+    def _precheck_permission(self) -> None:
+        # Only requests to the REST API have permissions to check.
+        if self.permission_cache is None or self.base_url != dt.base_url:
+            return
+
+        self._checked_resource = self.permission_cache.precheck(
+            self.method,
+            self.url,
+            self.auth,
+            base_url=self.base_url,
+            request_timeout=self.request_timeout,
+            request_attempts=self.request_attempts,
+            session=self.session,
+        )
+
     @classmethod
     def get(cls, url: str, **kwargs: Any) -> dict:
         req = cls("GET", url, **kwargs)
@@ -235,21 +286,30 @@ class DTRequest:
         params: dict[str, str] = {},
         **kwargs: Any,
     ) -> list:
-        # Initialize output list.
-        results = []
+        return list(cls.paginated_iter(url, pagination_key, params, **kwargs))
 
-        # Loop until paging has finished.
+    @classmethod
+    def paginated_iter(
+        cls,
+        url: str,
+        pagination_key: str,
+        params: dict[str, str] = {},
+        **kwargs: Any,
+    ) -> Generator:
+        # Copy, as the page token is updated in place.
+        params = dict(params)
+
+        # Loop until paging has finished, requesting each page only
+        # once the items of the previous page have been consumed.
         while True:
             response = cls.get(url, params=params, **kwargs)
-            results += response[pagination_key]
+            yield from response[pagination_key]
 
             if len(response["nextPageToken"]) > 0:
                 params["pageToken"] = response["nextPageToken"]
             else:
                 break
 
-        return results
-
     @staticmethod
     def stream(url: str, **kwargs: Any) -> Generator:
         """
@@ -266,8 +326,8 @@ class DTRequest:
         PING_INTERVAL = 10
         PING_JITTER = 2
 
-        # Expand url with base_url.
-        url = dt.base_url + url
+        # Expand url with base_url, which may be overridden as for requests.
+        url = kwargs.get("base_url", dt.base_url) + url
 
         # Set error variable that if not None, raise it.
         error = None
@@ -367,6 +427,11 @@ class DTRequest:
                             request_attempts,
                         )
                     )
+
+                    # Events published while reconnecting are lost.
+                    # Let the caller know, should they want to recover them.
+                    if "on_reconnect" in kwargs:
+                        kwargs["on_reconnect"]()
                 else:
                     # To avoid printing the entire chain of re-raised
                     # exceptions, limit the traceback.
@@ -394,6 +459,11 @@ class DTRequest:
                         )
                     )
 
+                    # Events published while reconnecting are lost.
+                    # Let the caller know, should they want to recover them.
+                    if "on_reconnect" in kwargs:
+                        kwargs["on_reconnect"]()
+
                 else:
                     # To avoid printing the entire chain of re-raised
                     # exceptions, limit the traceback.
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import time
 import warnings
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TypeVar
 
+import disruptive.concurrency as dtconcurrency
+import disruptive.errors as dterrors
 import disruptive.logging as dtlog
 import disruptive.outputs as dtoutputs
 import disruptive.requests as dtrequests
 from disruptive.errors import LabelUpdateError, TransferDeviceError
 from disruptive.events import events
 
+# Called with the number of devices completed and the total.
+ProgressCallback = Callable[[int, int], None]
+
+_BatchErrorType = TypeVar(
+    "_BatchErrorType",
+    LabelUpdateError,
+    TransferDeviceError,
+)
+
 
 class Device(dtoutputs.OutputBase):
     """
@@ -300,6 +312,10 @@ class Device(dtoutputs.OutputBase):
         device_ids: list[str],
         source_project_id: str,
         target_project_id: str,
+        chunk_size: Optional[int] = None,
+        chunk_attempts: int = 1,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
         **kwargs: Any,
     ) -> list[TransferDeviceError]:
         """
@@ -316,6 +332,21 @@ class Device(dtoutputs.OutputBase):
             Unique ID of the source project.
         target_project_id : str
             Unique ID of the target project.
+        chunk_size : int, optional
+            If provided, devices are transferred in chunks of at most this many
+            devices, sent in parallel. A chunk that fails after all
+            request attempts reports each of its devices as an error with
+            status code "INTERNAL_ERROR" rather than raising, such that
+            the outcome of other chunks is kept.
+        chunk_attempts : int, optional
+            Number of times devices that fail with status code
+            "INTERNAL_ERROR" are submitted before the error is returned.
+        max_workers : int, optional
+            Maximum number of chunks in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        progress_callback : Callable[[int, int], None], optional
+            Called with the number of completed devices and the total
+            each time a chunk completes.
         **kwargs
             Arbitrary keyword arguments.
             See the :ref:`Configuration <configuration>` page.
@@ -338,24 +369,47 @@ class Device(dtoutputs.OutputBase):
         ...     target_project_id='<TARGET_PROJECT_ID>',
         ... )
 
+        >>> # Transfer a large fleet in parallel chunks of 500 devices.
+        >>> err = dt.Device.transfer_devices(
+        ...     device_ids=device_ids,
+        ...     source_project_id='<SOURCE_PROJECT_ID>',
+        ...     target_project_id='<TARGET_PROJECT_ID>',
+        ...     chunk_size=500,
+        ...     chunk_attempts=3,
+        ... )
+
         """
 
-        # Construct list of devices.
-        name = "projects/{}/devices/{}"
-        devices = [name.format(source_project_id, xid) for xid in device_ids]
+        def transfer_chunk(chunk: list[str]) -> list[TransferDeviceError]:
+            # Construct list of devices.
+            name = "projects/{}/devices/{}"
+            devices = [name.format(source_project_id, xid) for xid in chunk]
 
-        # Construct request body dictionary.
-        body = {"devices": devices}
+            # Construct request body dictionary.
+            body = {"devices": devices}
 
-        # Sent POST request.
-        response = dtrequests.DTRequest.post(
-            url="/projects/{}/devices:transfer".format(target_project_id),
-            body=body,
-            **kwargs,
-        )
+            # Sent POST request.
+            response = dtrequests.DTRequest.post(
+                url="/projects/{}/devices:transfer".format(target_project_id),
+                body=body,
+                **kwargs,
+            )
 
-        # Return any transferErrors found in response.
-        return [TransferDeviceError(err) for err in response["transferErrors"]]
+            # Return any transferErrors found in response.
+            return [
+                TransferDeviceError(err) for err in response["transferErrors"]
+            ]
+
+        return _submit_in_chunks(
+            submit=transfer_chunk,
+            error_type=TransferDeviceError,
+            device_ids=device_ids,
+            project_id=source_project_id,
+            chunk_size=chunk_size,
+            chunk_attempts=chunk_attempts,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+        )
 
     @staticmethod
     def set_label(
@@ -475,6 +529,10 @@ class Device(dtoutputs.OutputBase):
         project_id: str,
         set_labels: Optional[dict[str, str]] = None,
         remove_labels: Optional[list[str]] = None,
+        chunk_size: Optional[int] = None,
+        chunk_attempts: int = 1,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
         **kwargs: Any,
     ) -> list[LabelUpdateError]:
         """
@@ -495,6 +553,21 @@ class Device(dtoutputs.OutputBase):
             already exists, the value is updated.
         remove_labels : list[str], optional
             Label keys to be removed.
+        chunk_size : int, optional
+            If provided, devices are updated in chunks of at most this many
+            devices, sent in parallel. A chunk that fails after all
+            request attempts reports each of its devices as an error with
+            status code "INTERNAL_ERROR" rather than raising, such that
+            the outcome of other chunks is kept.
+        chunk_attempts : int, optional
+            Number of times devices that fail with status code
+            "INTERNAL_ERROR" are submitted before the error is returned.
+        max_workers : int, optional
+            Maximum number of chunks in flight.
+            Defaults to :code:`disruptive.request_concurrency`.
+        progress_callback : Callable[[int, int], None], optional
+            Called with the number of completed devices and the total
+            each time a chunk completes.
         **kwargs
             Arbitrary keyword arguments.
             See the :ref:`Configuration <configuration>` page.
@@ -531,28 +604,50 @@ class Device(dtoutputs.OutputBase):
         ...     ],
         ... )
 
-        """
-
-        # Construct list of devices.
-        name = "projects/{}/devices/{}"
-        devices = [name.format(project_id, xid) for xid in device_ids]
+        >>> # Label a large fleet in parallel chunks of 500 devices.
+        >>> err = dt.Device.batch_update_labels(
+        ...     device_ids=device_ids,
+        ...     project_id='<PROJECT_ID>',
+        ...     set_labels={'building': 'north'},
+        ...     chunk_size=500,
+        ...     chunk_attempts=3,
+        ...     progress_callback=lambda done, total: print(done, total),
+        ... )
 
-        # Construct request body dictionary.
-        body: dict = dict()
-        body["devices"] = devices
-        if set_labels is not None:
-            body["addLabels"] = set_labels
-        if remove_labels is not None:
-            body["removeLabels"] = remove_labels
+        """
 
         # Construct URL.
         url = "/projects/{}/devices:batchUpdate".format(project_id)
 
-        # Sent POST request.
-        response = dtrequests.DTRequest.post(url, body=body, **kwargs)
-
-        # Return any batchErrors found in response.
-        return [LabelUpdateError(err) for err in response["batchErrors"]]
+        def update_chunk(chunk: list[str]) -> list[LabelUpdateError]:
+            # Construct list of devices.
+            name = "projects/{}/devices/{}"
+            devices = [name.format(project_id, xid) for xid in chunk]
+
+            # Construct request body dictionary.
+            body: dict = dict()
+            body["devices"] = devices
+            if set_labels is not None:
+                body["addLabels"] = set_labels
+            if remove_labels is not None:
+                body["removeLabels"] = remove_labels
+
+            # Sent POST request.
+            response = dtrequests.DTRequest.post(url, body=body, **kwargs)
+
+            # Return any batchErrors found in response.
+            return [LabelUpdateError(err) for err in response["batchErrors"]]
+
+        return _submit_in_chunks(
+            submit=update_chunk,
+            error_type=LabelUpdateError,
+            device_ids=device_ids,
+            project_id=project_id,
+            chunk_size=chunk_size,
+            chunk_attempts=chunk_attempts,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+        )
 
 
 class Reported(dtoutputs.OutputBase):
@@ -669,3 +764,96 @@ class Reported(dtoutputs.OutputBase):
                 )
             else:
                 dtlog.warning("Skipping unknown reported type {}.".format(key))
+
+
+def _submit_in_chunks(
+    submit: Callable[[list[str]], list[_BatchErrorType]],
+    error_type: type[_BatchErrorType],
+    device_ids: list[str],
+    project_id: str,
+    chunk_size: Optional[int],
+    chunk_attempts: int,
+    max_workers: Optional[int],
+    progress_callback: Optional[ProgressCallback],
+) -> list[_BatchErrorType]:
+    """
+    Submits a batch-style request per chunk of devices in parallel,
+    merging the errors of all chunks into a single list.
+
+    """
+
+    if chunk_attempts < 1:
+        raise dterrors.ConfigurationError(
+            f"Chunk attempts has value {chunk_attempts}, "
+            "but must be at least 1."
+        )
+
+    def submit_chunk(chunk: list[str]) -> list[_BatchErrorType]:
+        errors: list[_BatchErrorType] = []
+        pending = chunk
+        for nth_attempt in range(chunk_attempts):
+            if nth_attempt > 0:
+                dtlog.warning(
+                    "Resubmitting {} devices. Attempt {} of {}.".format(
+                        len(pending),
+                        nth_attempt + 1,
+                        chunk_attempts,
+                    )
+                )
+                # Exponential backoff, as for request retries.
+                time.sleep(nth_attempt**2)
+
+            try:
+                chunk_errors = submit(pending)
+            except dterrors.UsageError:
+                raise
+            except dterrors.DTApiError as e:
+                # Unchunked calls raise, as they always have.
+                if chunk_size is None:
+                    raise
+                # Report the chunk as failed without losing other chunks.
+                return errors + [
+                    error_type(
+                        {
+                            "device": f"projects/{project_id}/devices/{xid}",
+                            "status": {
+                                "code": "INTERNAL_ERROR",
+                                "message": str(e),
+                            },
+                        }
+                    )
+                    for xid in pending
+                ]
+
+            # Only internal errors are worth trying again.
+            retry = []
+            for chunk_error in chunk_errors:
+                if chunk_error.status_code == "INTERNAL_ERROR":
+                    retry.append(chunk_error)
+                else:
+                    errors.append(chunk_error)
+            pending = [e.device_id for e in retry]
+            if len(pending) == 0:
+                return errors
+
+        return errors + retry
+
+    chunks = dtconcurrency.chunked(device_ids, chunk_size)
+
+    errors: list[_BatchErrorType] = []
+    completed = 0
+    for chunk, chunk_errors, error in dtconcurrency.run_concurrently(
+        submit_chunk,
+        chunks,
+        max_workers,
+    ):
+        # Stop remaining chunks, as they would fail the same way.
+        if error is not None:
+            raise error
+
+        errors += chunk_errors or []
+        completed += len(chunk)
+        if progress_callback is not None:
+            progress_callback(completed, len(device_ids))
+
+    return errors
@@ -73,11 +73,14 @@ class Emulator:
         if display_name is not None:
             body["labels"]["name"] = display_name
 
+        # The emulator may be substituted, such as by a local stand-in.
+        base_url = kwargs.pop("base_url", disruptive.emulator_base_url)
+
         # Return Device object of GET request response.
         return Device(
             dtrequests.DTRequest.post(
                 url=url,
-                base_url=disruptive.emulator_base_url,
+                base_url=base_url,
                 body=body,
                 **kwargs,
             )
@@ -112,10 +115,13 @@ class Emulator:
         # Construct URL
         url = "/projects/{}/devices/{}".format(project_id, device_id)
 
+        # The emulator may be substituted, such as by a local stand-in.
+        base_url = kwargs.pop("base_url", disruptive.emulator_base_url)
+
         # Send DELETE request, but return nothing.
         dtrequests.DTRequest.delete(
             url=url,
-            base_url=disruptive.emulator_base_url,
+            base_url=base_url,
             **kwargs,
         )
 
@@ -179,10 +185,13 @@ class Emulator:
         # Construct URL
         url = "/projects/{}/devices/{}:publish".format(project_id, device_id)
 
+        # The emulator may be substituted, such as by a local stand-in.
+        base_url = kwargs.pop("base_url", disruptive.emulator_base_url)
+
         # Send POST request, but return nothing.
         dtrequests.DTRequest.post(
             url=url,
-            base_url=disruptive.emulator_base_url,
+            base_url=base_url,
             body={data.event_type: data._raw},
             **kwargs,
         )
@@ -1,12 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional, Any
-from datetime import datetime
+import heapq
+from typing import TYPE_CHECKING, Generator, Iterable, Optional, Any
+from datetime import datetime, timedelta, timezone
+
+import requests
 
 import disruptive
+import disruptive.aggregate as dtaggregate
+import disruptive.concurrency as dtconcurrency
+import disruptive.counters as dtcounters
+import disruptive.errors as dterrors
+import disruptive.occupancy as dtoccupancy
 import disruptive.requests as dtrequests
 import disruptive.transforms as dttrans
 from disruptive.events.events import Event
+from disruptive.resources.device import Device
+
+if TYPE_CHECKING:
+    from disruptive.cache import EventCache
+    from disruptive.dedup import EventDeduplicator
 
 
 class EventHistory(list):
@@ -14,8 +27,22 @@ class EventHistory(list):
     Namespacing type of event history methods.
     Inherits list, with some extra functionality.
 
+    Attributes
+    ----------
+    errors : dict[str, DTApiError]
+        Errors of devices whose history could not be fetched,
+        keyed by device ID. Only set by :code:`list_events_many`.
+
     """
 
+    def __init__(
+        self,
+        events: Iterable[Event] = (),
+        errors: Optional[dict[str, dterrors.DTApiError]] = None,
+    ) -> None:
+        super().__init__(events)
+        self.errors = errors if errors is not None else dict()
+
     @staticmethod
     def list_events(
         device_id: str,
@@ -23,6 +50,8 @@ class EventHistory(list):
         event_types: Optional[list[str]] = None,
         start_time: Optional[str | datetime] = None,
         end_time: Optional[str | datetime] = None,
+        deduplicator: Optional[EventDeduplicator] = None,
+        cache: Optional[EventCache] = None,
         **kwargs: Any,
     ) -> EventHistory:
         """
@@ -43,6 +72,12 @@ class EventHistory(list):
         end_time : str, datetime, optional
             Specified until when event history is fetched.
             Defaults to now.
+        deduplicator : EventDeduplicator, optional
+            If provided, events already seen by it are left out, such as
+            when recovering events missed by a reconnecting stream.
+        cache : EventCache, optional
+            If provided, events in time ranges already fetched are read
+            from the cache, and only the missing ranges are requested.
         **kwargs
             Arbitrary keyword arguments.
             See the :ref:`Configuration <configuration>` page.
@@ -74,6 +109,511 @@ class EventHistory(list):
 
         """
 
+        # Serve what is cached, fetching only the missing time ranges.
+        if cache is not None:
+            res = cache._list_raw_events(
+                device_id,
+                project_id,
+                event_types,
+                start_time,
+                end_time,
+                **kwargs,
+            )
+        else:
+            res = EventHistory._list_raw_events(
+                device_id,
+                project_id,
+                event_types,
+                start_time,
+                end_time,
+                **kwargs,
+            )
+
+        # Leave out events already seen, before paying for decoding.
+        if deduplicator is not None:
+            res = [e for e in res if not deduplicator.seen(e["eventId"])]
+
+        # Return list of Event objects of paginated GET response.
+        return EventHistory(Event.from_mixed_list(res))
+
+    @staticmethod
+    def iter_events(
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        **kwargs: Any,
+    ) -> Generator[Event, None, None]:
+        """
+        Get the event history for a single device, one page at a time.
+
+        Takes the same parameters as :code:`list_events`, but yields
+        each event as it is decoded, and only requests the next page
+        once the events of the previous page have been consumed.
+
+        Returns
+        -------
+        events : Generator[Event]
+            Yields each event of the device, in the order of the API.
+
+        Examples
+        --------
+        >>> for event in dt.EventHistory.iter_events(
+        ...     device_id='<DEVICE_ID>',
+        ...     project_id='<PROJECT_ID>',
+        ... ):
+        ...     print(event)
+
+        """
+
+        url, params = EventHistory._events_request(
+            device_id,
+            project_id,
+            event_types,
+            start_time,
+            end_time,
+        )
+        for event in dtrequests.DTRequest.paginated_iter(
+            url=url,
+            pagination_key="events",
+            params=params,
+            **kwargs,
+        ):
+            yield Event(event)
+
+    @staticmethod
+    def list_events_many(
+        project_id: str,
+        device_ids: Optional[list[str]] = None,
+        label_filters: Optional[dict[str, str]] = None,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[EventCache] = None,
+        **kwargs: Any,
+    ) -> EventHistory:
+        """
+        Get the event history for many devices, fetched concurrently.
+
+        Devices are fetched by a bounded number of workers sharing one
+        connection pool. Devices that fail do not fail the call, but
+        are instead reported in the `errors` attribute of the result.
+
+        Parameters
+        ----------
+        project_id : str
+            Unique ID of the target project.
+        device_ids : list[str], optional
+            Unique IDs of the target devices. If not provided, the
+            devices are found by `label_filters`.
+        label_filters : dict[str, str], optional
+            Target devices with these labels. Takes the form
+            :code:`{"key": "value"}`. If neither this nor `device_ids`
+            is provided, every device in the project is targeted.
+        event_types : list[str], optional
+            If provided, only the specified
+            :ref:`event types <event_types>` are fetched.
+        start_time : str, datetime, optional
+            Specifies from when event history is fetched.
+            Defaults to 24 hours ago.
+        end_time : str, datetime, optional
+            Specified until when event history is fetched.
+            Defaults to now.
+        max_workers : int, optional
+            Maximum number of devices fetched at the same time.
+            Defaults to :ref:`request_concurrency <configuration>`.
+        cache : EventCache, optional
+            If provided, only time ranges missing from the cache are
+            requested.
+        **kwargs
+            Arbitrary keyword arguments.
+            See the :ref:`Configuration <configuration>` page.
+
+        Returns
+        -------
+        events : EventHistory[Event]
+            The events of every device, grouped by device, with the
+            errors of devices that failed in its `errors` attribute.
+
+        Examples
+        --------
+        >>> # Fetch the last 24h of every device in a room.
+        >>> history = dt.EventHistory.list_events_many(
+        ...     project_id='<PROJECT_ID>',
+        ...     label_filters={'room': '99'},
+        ... )
+        >>> for device_id, error in history.errors.items():
+        ...     print(device_id, error)
+
+        """
+
+        history = EventHistory()
+        for device_id, events, error in EventHistory.iter_events_many(
+            project_id=project_id,
+            device_ids=device_ids,
+            label_filters=label_filters,
+            event_types=event_types,
+            start_time=start_time,
+            end_time=end_time,
+            max_workers=max_workers,
+            cache=cache,
+            **kwargs,
+        ):
+            if error is not None:
+                history.errors[device_id] = error
+            elif events is not None:
+                history += events
+
+        return history
+
+    @staticmethod
+    def iter_events_many(
+        project_id: str,
+        device_ids: Optional[list[str]] = None,
+        label_filters: Optional[dict[str, str]] = None,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[EventCache] = None,
+        **kwargs: Any,
+    ) -> Generator[
+        tuple[str, Optional[EventHistory], Optional[dterrors.DTApiError]],
+        None,
+        None,
+    ]:
+        """
+        Get the event history for many devices, fetched concurrently,
+        yielding the result of each device as soon as it completes.
+
+        Takes the same parameters as :code:`list_events_many`.
+
+        Returns
+        -------
+        results : Generator
+            Yields tuples of (device_id, events, error) in order of
+            completion, where either `events` or `error` is None.
+
+        Examples
+        --------
+        >>> for device_id, events, error in dt.EventHistory.iter_events_many(
+        ...     project_id='<PROJECT_ID>',
+        ...     device_ids=device_ids,
+        ... ):
+        ...     if error is None:
+        ...         database.insert(events)
+
+        """
+
+        # Resolve the target devices.
+        if device_ids is None:
+            devices = Device.list_devices(
+                project_id,
+                label_filters=label_filters,
+                **kwargs,
+            )
+            device_ids = [device.device_id for device in devices]
+
+        # Reuse connections between workers, unless given a session.
+        session = kwargs.pop("session", None)
+        owns_session = session is None
+        if session is None:
+            if max_workers is None:
+                max_workers = disruptive.request_concurrency
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        def fetch(device_id: str) -> EventHistory:
+            return EventHistory.list_events(
+                device_id,
+                project_id,
+                event_types=event_types,
+                start_time=start_time,
+                end_time=end_time,
+                cache=cache,
+                session=session,
+                **kwargs,
+            )
+
+        try:
+            for device_id, events, error in dtconcurrency.run_concurrently(
+                fetch,
+                device_ids,
+                max_workers,
+            ):
+                # Only errors from the API are isolated to their device.
+                if error is not None:
+                    if not isinstance(error, dterrors.DTApiError):
+                        raise error
+                    yield device_id, None, error
+                else:
+                    yield device_id, events, None
+        finally:
+            if owns_session:
+                session.close()
+
+    @staticmethod
+    def merge(
+        histories: Iterable[Iterable[Event]],
+        reverse: bool = False,
+    ) -> Generator[Event, None, None]:
+        """
+        Merges histories that are each ordered by time into one
+        time-ordered stream of events.
+
+        A heap holds only the next event of each history, so memory
+        grows with the number of histories rather than events. A history
+        is only advanced when its next event is yielded, such that lazy
+        histories from :code:`iter_events` request their next page only
+        when their current page runs dry. Events with equal timestamps
+        are yielded in the order of their histories.
+
+        Parameters
+        ----------
+        histories : Iterable[Iterable[Event]]
+            Histories, typically of one device each, ordered by time.
+        reverse : bool, optional
+            Set to True if the histories are ordered newest first.
+
+        Returns
+        -------
+        events : Generator[Event]
+            Yields the events of every history, ordered by time.
+
+        Examples
+        --------
+        >>> events = dt.EventHistory.merge(
+        ...     dt.EventHistory.iter_events(device_id, '<PROJECT_ID>')
+        ...     for device_id in device_ids
+        ... )
+        >>> for event in events:
+        ...     print(event.timestamp, event.device_id)
+
+        """
+
+        yield from heapq.merge(*histories, key=_event_time, reverse=reverse)
+
+    def aggregate(
+        self,
+        interval: float | timedelta,
+        metrics: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        sample_interval: Optional[float | timedelta] = None,
+        fill_gaps: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Resamples the events into fixed time buckets per device and metric.
+
+        Every sample of temperature and humidity events is included, not
+        only the latest value. See :code:`disruptive.aggregate` for the
+        metrics available and how coverage and gaps are reported.
+
+        Requires the installation of additional packages.
+        >> pip install disruptive[extra]
+
+        Parameters
+        ----------
+        interval : float, timedelta
+            Length of each bucket, in seconds if a number.
+        metrics : list[str], optional
+            Names of metrics to aggregate, such as "temperature" or
+            "co2". By default all.
+        start_time : str, datetime, optional
+            Samples before this time are ignored, and gaps are reported
+            from this time if given.
+        end_time : str, datetime, optional
+            Samples at or after this time are ignored, and gaps are
+            reported until this time if given.
+        sample_interval : float, timedelta, optional
+            Expected time between samples, in seconds if a number. By
+            default inferred per device and metric.
+        fill_gaps : bool, optional
+            If True, include buckets without samples.
+
+        Returns
+        -------
+        buckets : dict[str, numpy.ndarray]
+            Columns `device_id`, `metric`, `bucket`, `count`, `min`,
+            `max`, `mean`, `last` and `coverage`, one row per bucket.
+
+        Raises
+        ------
+        ModuleNotFoundError
+            If the numpy package is not installed.
+
+        Examples
+        --------
+        >>> history = dt.EventHistory.list_events(
+        ...     device_id='<DEVICE_ID>',
+        ...     project_id='<PROJECT_ID>',
+        ...     event_types=[dt.events.TEMPERATURE],
+        ... )
+        >>> buckets = history.aggregate(interval=timedelta(minutes=15))
+        >>> pandas.DataFrame(buckets)
+
+        """
+
+        columns = dtaggregate.extract_samples(self, metrics)
+        return dtaggregate.aggregate_samples(
+            **columns,
+            interval=interval,
+            start_time=start_time,
+            end_time=end_time,
+            sample_interval=sample_interval,
+            fill_gaps=fill_gaps,
+        )
+
+    def counter_deltas(
+        self,
+        interval: float | timedelta,
+        metrics: Optional[list[str]] = None,
+        max_gap: Optional[float | timedelta] = None,
+    ) -> dict[str, Any]:
+        """
+        Computes the increase of counters per time bucket and device.
+
+        Includes `touchCount` and `objectPresentCount` events, and
+        accounts for counters that reset when a device restarts. See
+        :code:`disruptive.counters` for how increases are attributed.
+
+        Requires the installation of additional packages.
+        >> pip install disruptive[extra]
+
+        Parameters
+        ----------
+        interval : float, timedelta
+            Length of each bucket, in seconds if a number.
+        metrics : list[str], optional
+            Names of counters to include, such as "touch_count".
+            By default all.
+        max_gap : float, timedelta, optional
+            Readings further apart than this, in seconds if a number,
+            are treated as a gap, and the increase across it left out.
+
+        Returns
+        -------
+        buckets : dict[str, numpy.ndarray]
+            Columns `device_id`, `metric`, `bucket`, `delta`, `rate`,
+            `covered` and `resets`, one row per bucket.
+
+        Raises
+        ------
+        ModuleNotFoundError
+            If the numpy package is not installed.
+
+        Examples
+        --------
+        >>> buckets = history.counter_deltas(interval=3600, max_gap=7200)
+
+        """
+
+        for name in metrics or []:
+            if name not in dtcounters.COUNTERS:
+                raise dterrors.ConfigurationError(
+                    f"Unknown counter {name}, "
+                    f"expected one of {dtcounters.COUNTERS}."
+                )
+
+        columns = dtaggregate.extract_samples(
+            self,
+            metrics or dtcounters.COUNTERS,
+        )
+        return dtcounters.counter_deltas(
+            **columns,
+            interval=interval,
+            max_gap=max_gap,
+        )
+
+    def sessionize(
+        self,
+        metrics: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+    ) -> dict[str, Any]:
+        """
+        Turns occupancy state changes into intervals of constant state.
+
+        Includes `objectPresent`, `deskOccupancy` and `motion` events.
+        See :code:`disruptive.occupancy` for computing utilisation from
+        the intervals.
+
+        Requires the installation of additional packages.
+        >> pip install disruptive[extra]
+
+        Parameters
+        ----------
+        metrics : list[str], optional
+            Names of metrics to include, such as "desk_occupancy".
+            By default all.
+        start_time : str, datetime, optional
+            Intervals are clipped to start at this time.
+        end_time : str, datetime, optional
+            Intervals are clipped to end at this time. If not provided,
+            the last interval of each device is left open.
+
+        Returns
+        -------
+        intervals : dict[str, numpy.ndarray]
+            Columns `device_id`, `metric`, `state`, `start`, `end` and
+            `duration`, one row per interval.
+
+        Raises
+        ------
+        ModuleNotFoundError
+            If the numpy package is not installed.
+
+        Examples
+        --------
+        >>> intervals = history.sessionize(end_time=datetime.now())
+        >>> buckets = dt.occupancy.utilization(intervals, 3600)
+
+        """
+
+        columns = dtoccupancy.extract_states(self, metrics)
+        return dtoccupancy.sessionize(
+            **columns,
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+    @staticmethod
+    def _list_raw_events(
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]] = None,
+        start_time: Optional[str | datetime] = None,
+        end_time: Optional[str | datetime] = None,
+        **kwargs: Any,
+    ) -> list[dict]:
+        url, params = EventHistory._events_request(
+            device_id,
+            project_id,
+            event_types,
+            start_time,
+            end_time,
+        )
+
+        # Send paginated GET request.
+        return dtrequests.DTRequest.paginated_get(
+            url=url,
+            pagination_key="events",
+            params=params,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _events_request(
+        device_id: str,
+        project_id: str,
+        event_types: Optional[list[str]],
+        start_time: Optional[str | datetime],
+        end_time: Optional[str | datetime],
+    ) -> tuple[str, dict]:
         # Construct URL.
         url = "/projects/{}/devices/{}/events".format(project_id, device_id)
 
@@ -90,16 +630,7 @@ class EventHistory(list):
         if end_time_iso8601 is not None:
             params["endTime"] = end_time_iso8601
 
-        # Send paginated GET request.
-        res = dtrequests.DTRequest.paginated_get(
-            url=url,
-            pagination_key="events",
-            params=params,
-            **kwargs,
-        )
-
-        # Return list of Event objects of paginated GET response.
-        return EventHistory(Event.from_mixed_list(res))
+        return url, params
 
     def _to_dataframe_format(self) -> list[dict]:
         """
@@ -224,3 +755,8 @@ class EventHistory(list):
             )
 
         return df
+
+
+def _event_time(event: Event) -> datetime:
+    # Events without a timestamp are ordered first.
+    return event.timestamp or datetime.min.replace(tzinfo=timezone.utc)
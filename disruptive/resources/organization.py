@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
+import disruptive.permissions as dtpermissions
 import disruptive.requests as dtrequests
 from disruptive.outputs import OutputBase, Member
 
@@ -387,6 +388,11 @@ class Organization(OutputBase):
 
         """
 
+        # Serve from the permission cache if one is in use.
+        cache = dtpermissions.active_cache(kwargs)
+        if cache is not None:
+            return cache.get(f"organizations/{organization_id}", **kwargs)
+
         # Construct URL
         url = "/organizations/{}/permissions".format(organization_id)
 
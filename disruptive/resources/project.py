@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Optional, Any
 
+import disruptive.permissions as dtpermissions
 import disruptive.requests as dtrequests
 from disruptive.outputs import OutputBase, Member
 
@@ -627,6 +628,11 @@ class Project(OutputBase):
 
         """
 
+        # Serve from the permission cache if one is in use.
+        cache = dtpermissions.active_cache(kwargs)
+        if cache is not None:
+            return cache.get(f"projects/{project_id}", **kwargs)
+
         # Construct URL
         url = "/projects/{}/permissions".format(project_id)
 
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Generator, Optional, Any
+from typing import TYPE_CHECKING, Generator, Optional, Any
 
 import disruptive.requests as dtrequests
 from disruptive.events.events import Event
 
+if TYPE_CHECKING:
+    from disruptive.dedup import EventDeduplicator
+
 
 class Stream:
     """
@@ -20,6 +23,7 @@ class Stream:
         label_filters: Optional[dict] = None,
         device_types: Optional[list[str]] = None,
         event_types: Optional[list[str]] = None,
+        deduplicator: Optional[EventDeduplicator] = None,
         **kwargs: Any,
     ) -> Generator:
         """
@@ -27,7 +31,9 @@ class Stream:
 
         Implements a basic retry-routine. If connection is lost, the stream
         will attempt to reconnect with an exponential backoff. Events that
-        are published during reconnection are not accounted for.
+        are published during reconnection are not accounted for, but a
+        callable keyword argument `on_reconnect` is called at each
+        reconnect to let the caller recover them if needed.
 
         If you want to forward your data in a server-to-server
         integration, consider using Data Connectors for a simpler
@@ -48,6 +54,9 @@ class Stream:
             :ref:`type(s) <device_type_constants>`.
         event_types : list[str], optional
             Only includes events of the specified :ref:`type(s) <event_types>`.
+        deduplicator : EventDeduplicator, optional
+            If provided, events already seen by it are skipped,
+            such as those also recovered from the event history.
         **kwargs
             Arbitrary keyword arguments.
             See the :ref:`Configuration <configuration>` page.
@@ -106,4 +115,8 @@ class Stream:
         # Relay generator output.
         url = "/projects/{}/devices:stream".format(project_id)
         for event in dtrequests.DTRequest.stream(url, params=params, **kwargs):
+            # Duplicates are skipped before paying for decoding.
+            if deduplicator is not None:
+                if deduplicator.seen(event["eventId"]):
+                    continue
             yield Event(event)
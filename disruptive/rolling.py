@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Generator, Iterable, Optional
+
+import disruptive.aggregate as dtaggregate
+import disruptive.errors as dterrors
+import disruptive.transforms as dttrans
+from disruptive.events.events import Event
+
+
+class WindowStats:
+    """
+    Statistics of the samples of one device and metric in a time window.
+
+    Attributes
+    ----------
+    device_id : str
+        Unique ID of the device.
+    metric : str
+        Name of the metric, as in :code:`disruptive.aggregate.METRICS`.
+    count : int
+        Number of samples in the window.
+    mean : float
+        Mean of the samples.
+    min : float
+        Smallest sample.
+    max : float
+        Largest sample.
+    stddev : float
+        Population standard deviation of the samples.
+    last : float
+        Most recent sample.
+    start_time : datetime
+        Time of the oldest sample in the window.
+    end_time : datetime
+        Time of the most recent sample.
+
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        metric: str,
+        count: int,
+        mean: float,
+        min: float,
+        max: float,
+        stddev: float,
+        last: float,
+        start_time: datetime,
+        end_time: datetime,
+    ) -> None:
+        self.device_id = device_id
+        self.metric = metric
+        self.count = count
+        self.mean = mean
+        self.min = min
+        self.max = max
+        self.stddev = stddev
+        self.last = last
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __repr__(self) -> str:
+        string = "{}.{}(device_id={}, metric={}, count={}, mean={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.device_id),
+            repr(self.metric),
+            self.count,
+            self.mean,
+        )
+
+
+class _Window:
+    # Sliding window over the samples of one series, in time order.
+    #
+    # Sums are kept relative to the first value ever seen, which keeps
+    # the variance numerically stable for values far from zero, such as
+    # pressure in pascal. Minimum and maximum are kept in monotonic
+    # deques, so every update is amortised O(1).
+
+    def __init__(self, shift: float) -> None:
+        self.shift = shift
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.samples: deque[tuple[int, datetime, float]] = deque()
+        self.minima: deque[tuple[int, float]] = deque()
+        self.maxima: deque[tuple[int, float]] = deque()
+        self.sequence = 0
+
+    def add(self, timestamp: datetime, value: float) -> None:
+        sequence = self.sequence
+        self.sequence += 1
+
+        self.samples.append((sequence, timestamp, value))
+        offset = value - self.shift
+        self.sum += offset
+        self.sum_squares += offset * offset
+
+        while len(self.minima) > 0 and self.minima[-1][1] >= value:
+            self.minima.pop()
+        self.minima.append((sequence, value))
+        while len(self.maxima) > 0 and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        self.maxima.append((sequence, value))
+
+    def evict(self, start: Optional[datetime], max_samples: int) -> None:
+        samples = self.samples
+        while len(samples) > 0 and (
+            len(samples) > max_samples
+            or (start is not None and samples[0][1] <= start)
+        ):
+            sequence, _, value = samples.popleft()
+            offset = value - self.shift
+            self.sum -= offset
+            self.sum_squares -= offset * offset
+            if self.minima[0][0] == sequence:
+                self.minima.popleft()
+            if self.maxima[0][0] == sequence:
+                self.maxima.popleft()
+
+        # Recover exactly from accumulated rounding once emptied.
+        if len(samples) == 0:
+            self.sum = 0.0
+            self.sum_squares = 0.0
+
+    def stats(self, device_id: str, metric: str) -> Optional[WindowStats]:
+        count = len(self.samples)
+        if count == 0:
+            return None
+        mean_offset = self.sum / count
+        variance = max(0.0, self.sum_squares / count - mean_offset**2)
+        return WindowStats(
+            device_id=device_id,
+            metric=metric,
+            count=count,
+            mean=self.shift + mean_offset,
+            min=self.minima[0][1],
+            max=self.maxima[0][1],
+            stddev=math.sqrt(variance),
+            last=self.samples[-1][2],
+            start_time=self.samples[0][1],
+            end_time=self.samples[-1][1],
+        )
+
+
+class RollingStats:
+    """
+    Rolling statistics per device and metric over a sliding time window.
+
+    Each sample updates the mean, minimum, maximum and standard deviation
+    of its window in amortised constant time, instead of recomputing them
+    from every sample in the window. The window of each device trails the
+    most recent sample of that device, and holds at most `max_samples`
+    samples, such that memory is bounded per device and metric.
+
+    Every sample of temperature and humidity events is included. Samples
+    older than the most recent sample of their device and metric can not
+    be inserted into the window and are skipped, so streams that may
+    arrive out of order should first pass through a
+    :code:`ReorderBuffer`.
+
+    Attributes
+    ----------
+    window : timedelta
+        Length of the sliding window.
+    max_samples : int
+        Maximum number of samples kept per device and metric.
+    samples : int
+        Number of samples added.
+    skipped : int
+        Number of samples skipped as out of order.
+
+    """
+
+    def __init__(
+        self,
+        window: float | timedelta = 300,
+        metrics: Optional[list[str]] = None,
+        max_samples: int = 1000,
+    ) -> None:
+        """
+        Constructs an empty RollingStats object.
+
+        Parameters
+        ----------
+        window : float, timedelta, optional
+            Length of the sliding window, in seconds if a number.
+        metrics : list[str], optional
+            Names of metrics in :code:`disruptive.aggregate.METRICS` to
+            track, such as "temperature" or "touch_count". By default all.
+        max_samples : int, optional
+            Maximum number of samples kept per device and metric. Older
+            samples are dropped early once reached.
+
+        Raises
+        ------
+        ConfigurationError
+            If the window or `max_samples` is not positive, or a metric
+            is unknown.
+
+        Examples
+        --------
+        >>> stats = dt.RollingStats(window=600, metrics=['temperature'])
+        >>> for event in stats.follow(dt.Stream.event_stream('<ID>')):
+        ...     window = stats.get(event.device_id, 'temperature')
+        ...     if window is not None and window.mean > 8:
+        ...         alert(window)
+
+        """
+
+        if not isinstance(window, timedelta):
+            window = timedelta(seconds=window)
+        if window <= timedelta(0):
+            raise dterrors.ConfigurationError(
+                f"Rolling window must be positive, got {window}."
+            )
+        if max_samples < 1:
+            raise dterrors.ConfigurationError(
+                f"Rolling max_samples must be at least 1, got {max_samples}."
+            )
+
+        self.window = window
+        self.max_samples = max_samples
+        self.samples = 0
+        self.skipped = 0
+
+        self._by_type = dtaggregate._metrics_by_type(metrics)
+        self._windows: dict[str, dict[str, _Window]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(windows) for windows in self._windows.values())
+
+    def add(self, event: Event) -> int:
+        """
+        Adds the samples of an event to the window of its device.
+
+        Events of types without a tracked metric are ignored.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        Returns
+        -------
+        added : int
+            Number of samples added.
+
+        """
+
+        fields = self._by_type.get(event.event_type)
+        if fields is None:
+            return 0
+
+        data = event.raw["data"][event.event_type]
+        samples = data.get("samples") or []
+
+        added = 0
+        with self._lock:
+            windows = self._windows.setdefault(event.device_id, {})
+            for name, value_field, sample_field in fields:
+                if sample_field is not None and len(samples) > 0:
+                    points = [
+                        (_parse(s["sampleTime"]), s[sample_field])
+                        for s in samples
+                    ]
+                    points.sort(key=lambda point: point[0])
+                else:
+                    points = [(_parse(data["updateTime"]), data[value_field])]
+
+                window = windows.get(name)
+                if window is None:
+                    window = _Window(shift=points[0][1])
+                    windows[name] = window
+                added += self._add_points(window, points)
+        return added
+
+    def follow(
+        self,
+        stream: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Yields the events of a stream after adding each to its window.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, such that the windows are up to date when
+            each is received.
+
+        """
+
+        for event in stream:
+            self.add(event)
+            yield event
+
+    def get(self, device_id: str, metric: str) -> Optional[WindowStats]:
+        """
+        Statistics of the current window of a device and metric.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the device.
+        metric : str
+            Name of the metric.
+
+        Returns
+        -------
+        stats : WindowStats, None
+            Statistics of the window, or None if it holds no samples.
+
+        """
+
+        with self._lock:
+            window = self._windows.get(device_id, {}).get(metric)
+            if window is None:
+                return None
+            return window.stats(device_id, metric)
+
+    def snapshot(
+        self,
+        now: Optional[datetime] = None,
+    ) -> dict[str, dict[str, WindowStats]]:
+        """
+        Statistics of the current window of every device and metric.
+
+        Parameters
+        ----------
+        now : datetime, optional
+            If provided, samples older than one window before it are
+            expired first, such that devices that stopped reporting
+            are left out instead of showing stale statistics.
+
+        Returns
+        -------
+        snapshot : dict[str, dict[str, WindowStats]]
+            Statistics keyed by device ID, then by metric name.
+
+        """
+
+        start = None if now is None else now - self.window
+
+        snapshot: dict[str, dict[str, WindowStats]] = {}
+        with self._lock:
+            for device_id, windows in self._windows.items():
+                for name, window in windows.items():
+                    if start is not None:
+                        window.evict(start, self.max_samples)
+                    stats = window.stats(device_id, name)
+                    if stats is not None:
+                        snapshot.setdefault(device_id, {})[name] = stats
+        return snapshot
+
+    def remove(self, device_id: str) -> None:
+        """
+        Forgets every window of a device, such as when it is removed.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the device.
+
+        """
+
+        with self._lock:
+            self._windows.pop(device_id, None)
+
+    def _add_points(
+        self,
+        window: _Window,
+        points: list[tuple[datetime, float]],
+    ) -> int:
+        # Must be called with the lock held.
+        added = 0
+        for timestamp, value in points:
+            if len(window.samples) > 0 and timestamp < window.samples[-1][1]:
+                self.skipped += 1
+                continue
+            window.add(timestamp, value)
+            added += 1
+        if added > 0:
+            window.evict(
+                window.samples[-1][1] - self.window,
+                self.max_samples,
+            )
+        self.samples += added
+        return added
+
+
+def _parse(timestamp: str) -> datetime:
+    moment = dttrans.to_datetime(timestamp)
+    if moment is None:
+        raise dterrors.FormatError(f"Missing sample time {timestamp}.")
+    return moment
@@ -0,0 +1,662 @@
+from __future__ import annotations
+
+import time
+import operator
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Generator, Iterable, Optional
+
+import disruptive.aggregate as dtaggregate
+import disruptive.errors as dterrors
+import disruptive.logging as dtlog
+import disruptive.transforms as dttrans
+from disruptive.events.events import Event
+from disruptive.reorder import Histogram
+from disruptive.resources.device import Device
+
+# Called with each alert that fires or resolves.
+AlertCallback = Callable[["Alert"], None]
+
+# Comparison operators of rule conditions.
+OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Upper bounds of the evaluation time histogram buckets.
+EVALUATION_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 1000]  # microseconds
+
+
+class Rule:
+    """
+    A threshold condition on a metric of devices selected by labels.
+
+    The rule fires for a device once the condition has held for at least
+    `duration`, measured by event time, and resolves once the value is
+    back past the threshold by more than the `hysteresis`, such that a
+    value hovering around the threshold does not fire repeatedly.
+
+    Attributes
+    ----------
+    name : str
+        Unique name of the rule.
+    metric : str
+        Name of a numeric metric in :code:`disruptive.aggregate.METRICS`,
+        or of a state metric in :code:`disruptive.aggregate.STATES`.
+    op : str
+        Comparison operator, one of ">", ">=", "<", "<=", "==" and "!=".
+        State metrics only support "==" and "!=".
+    threshold : float, str
+        Value compared against, such as "PRESENT" for a state metric.
+    duration : timedelta
+        How long the condition must hold before the rule fires.
+    hysteresis : float
+        How far past the threshold the value must return to resolve.
+    label_filters : dict[str, str | None]
+        Only devices with these labels are evaluated. Takes the form
+        :code:`{"key": "value"}`, or :code:`{"key": None}` to allow any
+        label value.
+    event_type : str
+        The :ref:`event type <event_types>` of the metric.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        metric: str,
+        op: str,
+        threshold: float | str,
+        duration: float | timedelta = 0,
+        hysteresis: float = 0,
+        label_filters: Optional[dict[str, Optional[str]]] = None,
+    ) -> None:
+        """
+        Constructs the Rule object.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the rule.
+        metric : str
+            Name of the metric to evaluate.
+        op : str
+            Comparison operator.
+        threshold : float, str
+            Value compared against.
+        duration : float, timedelta, optional
+            How long the condition must hold before the rule fires, in
+            seconds if a number. By default it fires immediately.
+        hysteresis : float, optional
+            How far past the threshold the value must return to resolve.
+        label_filters : dict[str, str | None], optional
+            Only devices with these labels are evaluated.
+
+        Raises
+        ------
+        ConfigurationError
+            If the metric or operator is unknown, or the duration or
+            hysteresis is negative or does not apply to the metric.
+
+        Examples
+        --------
+        >>> # Fridges warmer than 8°C for 10 minutes.
+        >>> rule = dt.Rule(
+        ...     'warm-fridge', 'temperature', '>', 8,
+        ...     duration=600,
+        ...     hysteresis=0.5,
+        ...     label_filters={'fridge': 'true'},
+        ... )
+
+        """
+
+        if metric in dtaggregate.METRICS:
+            event_type, field, _ = dtaggregate.METRICS[metric]
+            operators = list(OPERATORS)
+        elif metric in dtaggregate.STATES:
+            event_type, field = dtaggregate.STATES[metric], "state"
+            operators = ["==", "!="]
+        else:
+            raise dterrors.ConfigurationError(
+                f"Unknown rule metric {metric}, expected one of "
+                f"{list(dtaggregate.METRICS) + list(dtaggregate.STATES)}."
+            )
+        if op not in operators:
+            raise dterrors.ConfigurationError(
+                f"Rule operator {op} is not supported for {metric}, "
+                f"expected one of {operators}."
+            )
+
+        if not isinstance(duration, timedelta):
+            duration = timedelta(seconds=duration)
+        if duration < timedelta(0):
+            raise dterrors.ConfigurationError(
+                f"Rule duration must not be negative, got {duration}."
+            )
+        if hysteresis < 0 or (hysteresis > 0 and op in ["==", "!="]):
+            raise dterrors.ConfigurationError(
+                f"Rule hysteresis {hysteresis} is invalid for operator {op}."
+            )
+
+        # Set parameter attributes.
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.duration = duration
+        self.hysteresis = hysteresis
+        self.label_filters = label_filters or {}
+        self.event_type = event_type
+
+        # The value must be back past this to resolve.
+        if op in [">", ">="]:
+            clear_threshold: Any = threshold - hysteresis  # type: ignore
+        elif op in ["<", "<="]:
+            clear_threshold = threshold + hysteresis  # type: ignore
+        else:
+            clear_threshold = threshold
+
+        self._field = field
+        self._compare = OPERATORS[op]
+        self._clear_threshold = clear_threshold
+
+    def __repr__(self) -> str:
+        string = "{}.{}({}, {}, {}, {})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.name),
+            repr(self.metric),
+            repr(self.op),
+            repr(self.threshold),
+        )
+
+    def matches(self, labels: dict[str, str]) -> bool:
+        """
+        Checks whether a device with the given labels is selected.
+
+        Parameters
+        ----------
+        labels : dict[str, str]
+            Labels of the device.
+
+        Returns
+        -------
+        match : bool
+            True if every label filter is satisfied.
+
+        """
+
+        return dttrans.match_labels(labels, self.label_filters)
+
+
+class Alert:
+    """
+    A rule that started or stopped firing for a device.
+
+    Attributes
+    ----------
+    rule : Rule
+        The rule that changed state.
+    device_id : str
+        Unique ID of the device.
+    firing : bool
+        True if the rule started firing, False if it resolved.
+    value : float, str, optional
+        Value of the event that changed the state. None if the rule
+        resolved because the labels of the device no longer match it.
+    timestamp : datetime
+        Time of the event that changed the state.
+    since : datetime
+        Time the condition started to hold, if firing, or the rule
+        started firing, if resolved.
+
+    """
+
+    def __init__(
+        self,
+        rule: Rule,
+        device_id: str,
+        firing: bool,
+        value: Any,
+        timestamp: datetime,
+        since: datetime,
+    ) -> None:
+        self.rule = rule
+        self.device_id = device_id
+        self.firing = firing
+        self.value = value
+        self.timestamp = timestamp
+        self.since = since
+
+    def __repr__(self) -> str:
+        string = "{}.{}(rule={}, device_id={}, firing={}, value={})"
+        return string.format(
+            self.__class__.__module__,
+            self.__class__.__name__,
+            repr(self.rule.name),
+            repr(self.device_id),
+            self.firing,
+            repr(self.value),
+        )
+
+
+class _TypeIndex:
+    # Rules of one event type, indexed by one filter of their selector.
+    #
+    # A device only needs to be checked against the rules without label
+    # filters, and those indexed under one of its own labels.
+
+    def __init__(self) -> None:
+        self.any: list[Rule] = []
+        self.by_label: dict[tuple[str, str], list[Rule]] = {}
+        self.by_label_key: dict[str, list[Rule]] = {}
+
+    def add(self, rule: Rule) -> None:
+        if len(rule.label_filters) == 0:
+            self.any.append(rule)
+            return
+
+        # Prefer a filter on a value, as it selects the fewest devices.
+        for key, value in rule.label_filters.items():
+            if value is not None and value != "":
+                self.by_label.setdefault((key, value), []).append(rule)
+                return
+        key = next(iter(rule.label_filters))
+        self.by_label_key.setdefault(key, []).append(rule)
+
+    def candidates(self, labels: dict[str, str]) -> list[Rule]:
+        rules = list(self.any)
+        for key, value in labels.items():
+            rules += self.by_label.get((key, value), [])
+            rules += self.by_label_key.get(key, [])
+        return rules
+
+
+class _RuleState:
+    # Condition state of one rule for one device.
+
+    def __init__(self) -> None:
+        self.pending_since: datetime
+        self.firing_since: Optional[datetime] = None
+
+
+class RuleEngine:
+    """
+    Evaluates threshold rules against a stream of events.
+
+    Rules are indexed by event type and label selector, and the rules
+    that apply to each device and event type are resolved once and
+    cached until the rules or the labels of the device change. Each
+    event is therefore only checked against the rules that can match it,
+    instead of against every rule.
+
+    Device labels are seeded from :code:`Device.list_devices` and kept
+    current by `labelsChanged` events. Rules with label filters never
+    match devices whose labels are unknown.
+
+    Durations are measured by event time, so a rule fires on the first
+    event received after its condition has held long enough.
+
+    Attributes
+    ----------
+    events : int
+        Number of events evaluated.
+    evaluations : int
+        Number of rule conditions checked.
+    alerts : int
+        Number of alerts raised, firing or resolved.
+    elapsed : float
+        Total seconds spent evaluating events.
+    evaluation_time : Histogram
+        Microseconds spent evaluating each event of a type with rules.
+
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Rule] = (),
+        on_alert: Optional[AlertCallback] = None,
+    ) -> None:
+        """
+        Constructs the RuleEngine object.
+
+        Parameters
+        ----------
+        rules : Iterable[Rule], optional
+            Rules to evaluate. More can be added later.
+        on_alert : Callable, optional
+            Called with each alert as it fires or resolves.
+
+        Examples
+        --------
+        >>> engine = dt.RuleEngine(rules, on_alert=notify)
+        >>> engine.seed(dt.Device.list_devices('<PROJECT_ID>'))
+        >>> for event in engine.follow(dt.Stream.event_stream('<ID>')):
+        ...     pass
+
+        """
+
+        self.on_alert = on_alert
+
+        self.events = 0
+        self.evaluations = 0
+        self.alerts = 0
+        self.elapsed = 0.0
+        self.evaluation_time = Histogram(EVALUATION_BOUNDS)
+
+        self._rules: dict[str, Rule] = {}
+        self._index: dict[str, _TypeIndex] = {}
+        self._order: dict[str, int] = {}
+        self._labels: dict[str, dict[str, str]] = {}
+        self._matched: dict[str, dict[str, list[Rule]]] = {}
+        self._states: dict[tuple[str, str], _RuleState] = {}
+        self._lock = threading.Lock()
+
+        for rule in rules:
+            self.add_rule(rule)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def rules(self) -> list[Rule]:
+        """
+        Every rule of the engine, in the order they were added.
+
+        """
+
+        return list(self._rules.values())
+
+    @property
+    def evaluations_per_event(self) -> float:
+        """
+        Average number of rule conditions checked per event.
+
+        """
+
+        return self.evaluations / self.events if self.events > 0 else 0.0
+
+    @property
+    def seconds_per_event(self) -> float:
+        """
+        Average number of seconds spent evaluating each event.
+
+        """
+
+        return self.elapsed / self.events if self.events > 0 else 0.0
+
+    def add_rule(self, rule: Rule) -> None:
+        """
+        Adds a rule to be evaluated against subsequent events.
+
+        Parameters
+        ----------
+        rule : Rule
+            The rule to add.
+
+        Raises
+        ------
+        ConfigurationError
+            If a rule of the same name already exists.
+
+        """
+
+        with self._lock:
+            if rule.name in self._rules:
+                raise dterrors.ConfigurationError(
+                    f"A rule named {rule.name} already exists."
+                )
+            self._rules[rule.name] = rule
+            self._order[rule.name] = len(self._order)
+            self._index.setdefault(rule.event_type, _TypeIndex()).add(rule)
+            self._matched = {}
+
+    def remove_rule(self, name: str) -> None:
+        """
+        Removes a rule, along with its state for every device.
+
+        Parameters
+        ----------
+        name : str
+            Name of the rule.
+
+        """
+
+        with self._lock:
+            if self._rules.pop(name, None) is None:
+                return
+            self._states = {
+                key: state
+                for key, state in self._states.items()
+                if key[0] != name
+            }
+            self._rebuild()
+
+    def seed(self, devices: Iterable[Device]) -> None:
+        """
+        Sets the labels of each device, used to select rules.
+        Rules firing for a device its labels no longer match resolve.
+
+        Parameters
+        ----------
+        devices : Iterable[Device]
+            Devices, typically from :code:`Device.list_devices`.
+
+        """
+
+        now = datetime.now(timezone.utc)
+        alerts = []
+        with self._lock:
+            for device in devices:
+                self._labels[device.device_id] = dict(device.labels)
+                alerts += self._invalidate(device.device_id, now)
+            self.alerts += len(alerts)
+
+        for alert in alerts:
+            self._route_alert(alert)
+
+    def evaluate(self, event: Event) -> list[Alert]:
+        """
+        Evaluates the rules that apply to an event.
+
+        A labelsChanged event resolves the rules firing for the device
+        that its new labels no longer match.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        Returns
+        -------
+        alerts : list[Alert]
+            Rules that started or stopped firing for the device.
+
+        """
+
+        if event.event_type == "labelsChanged":
+            return self._apply_labels(event)
+        if event.event_type not in self._index:
+            return []
+
+        start = time.perf_counter()
+        alerts = []
+        with self._lock:
+            rules = self._rules_for(event.device_id, event.event_type)
+            if len(rules) > 0:
+                data = event.raw["data"][event.event_type]
+                timestamp = dttrans.to_datetime(data["updateTime"])
+                for rule in rules:
+                    alert = self._check(rule, event.device_id, data, timestamp)
+                    if alert is not None:
+                        alerts.append(alert)
+                self.evaluations += len(rules)
+            self.alerts += len(alerts)
+
+            self.events += 1
+            elapsed = time.perf_counter() - start
+            self.elapsed += elapsed
+            self.evaluation_time.add(elapsed * 1e6)
+
+        for alert in alerts:
+            self._route_alert(alert)
+        return alerts
+
+    def follow(
+        self,
+        stream: Iterable[Event],
+    ) -> Generator[Event, None, None]:
+        """
+        Evaluates each event in a stream, then yields it unchanged.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, after being evaluated.
+
+        """
+
+        for event in stream:
+            self.evaluate(event)
+            yield event
+
+    def firing(self) -> list[tuple[str, str]]:
+        """
+        Every rule currently firing, as (rule name, device ID) pairs.
+
+        """
+
+        with self._lock:
+            return [
+                key
+                for key, state in self._states.items()
+                if state.firing_since is not None
+            ]
+
+    def _rebuild(self) -> None:
+        # Must be called with the lock held.
+        self._index = {}
+        self._order = {name: i for i, name in enumerate(self._rules)}
+        for rule in self._rules.values():
+            self._index.setdefault(rule.event_type, _TypeIndex()).add(rule)
+        self._matched = {}
+
+    def _invalidate(
+        self,
+        device_id: str,
+        timestamp: datetime,
+    ) -> list[Alert]:
+        # Must be called with the lock held.
+        self._matched.pop(device_id, None)
+
+        # Drop the state of rules the device no longer matches,
+        # resolving those that were firing.
+        labels = self._labels.get(device_id, {})
+        alerts = []
+        for key, state in list(self._states.items()):
+            rule = self._rules[key[0]]
+            if key[1] != device_id or rule.matches(labels):
+                continue
+            del self._states[key]
+            if state.firing_since is not None:
+                alerts.append(
+                    Alert(
+                        rule,
+                        device_id,
+                        False,
+                        None,
+                        timestamp,
+                        state.firing_since,
+                    )
+                )
+        return alerts
+
+    def _rules_for(self, device_id: str, event_type: str) -> list[Rule]:
+        # Must be called with the lock held.
+        matched = self._matched.setdefault(device_id, {})
+        rules = matched.get(event_type)
+        if rules is None:
+            labels = self._labels.get(device_id, {})
+            candidates = self._index[event_type].candidates(labels)
+            rules = sorted(
+                {id(rule): rule for rule in candidates}.values(),
+                key=lambda rule: self._order[rule.name],
+            )
+            rules = [rule for rule in rules if rule.matches(labels)]
+            matched[event_type] = rules
+        return rules
+
+    def _check(
+        self,
+        rule: Rule,
+        device_id: str,
+        data: dict,
+        timestamp: Optional[datetime],
+    ) -> Optional[Alert]:
+        # Must be called with the lock held.
+        value = data.get(rule._field)
+        if value is None or timestamp is None:
+            return None
+
+        # State is only kept while a rule is pending or firing.
+        key = (rule.name, device_id)
+        state = self._states.get(key)
+
+        if state is not None and state.firing_since is not None:
+            if rule._compare(value, rule._clear_threshold):
+                return None
+            del self._states[key]
+            since = state.firing_since
+            return Alert(rule, device_id, False, value, timestamp, since)
+
+        if not rule._compare(value, rule.threshold):
+            if state is not None:
+                del self._states[key]
+            return None
+
+        if state is None:
+            state = _RuleState()
+            self._states[key] = state
+            state.pending_since = timestamp
+        if timestamp - state.pending_since < rule.duration:
+            return None
+        state.firing_since = timestamp
+        return Alert(
+            rule,
+            device_id,
+            True,
+            value,
+            timestamp,
+            state.pending_since,
+        )
+
+    def _apply_labels(self, event: Event) -> list[Alert]:
+        data = event.raw["data"]
+        timestamp = event.timestamp or datetime.now(timezone.utc)
+        with self._lock:
+            labels = self._labels.setdefault(event.device_id, {})
+            dttrans.apply_labels_changed(labels, data)
+            alerts = self._invalidate(event.device_id, timestamp)
+            self.alerts += len(alerts)
+
+        for alert in alerts:
+            self._route_alert(alert)
+        return alerts
+
+    def _route_alert(self, alert: Alert) -> None:
+        if self.on_alert is None:
+            return
+        try:
+            self.on_alert(alert)
+        except Exception as e:
+            dtlog.error(f"RuleEngine alert callback raised {e!r}.")
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Callable, Generator, Iterable, Optional
+
+import disruptive.logging as dtlog
+from disruptive.events import events
+from disruptive.resources.device import Device, Reported
+
+# Called with device ID, event type, previous data, and new data.
+ChangeCallback = Callable[
+    [str, str, Optional[events._EventType], events._EventType],
+    None,
+]
+
+
+class ReportedStore:
+    """
+    Latest-value store of the most recent event data per device and type.
+
+    The store is seeded from the :ref:`Reported <device>` field of devices
+    and thereafter updated incrementally by events from the stream, such
+    that the current state of many devices can be read without requests.
+
+    Values are keyed by device ID and :ref:`event type <event_types>`, and
+    older events, like backfilled ones, never overwrite newer values.
+
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructs an empty ReportedStore object.
+
+        """
+
+        # Values are grouped by event type for fast per-type snapshots.
+        self._values: dict[str, dict[str, events._EventType]] = dict()
+        self._subscribers: list[tuple[ChangeCallback, Optional[set]]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self._values.values())
+
+    @classmethod
+    def from_devices(cls, devices: Iterable[Device]) -> ReportedStore:
+        """
+        Constructs a ReportedStore seeded from a list of devices.
+
+        Parameters
+        ----------
+        devices : Iterable[Device]
+            Devices, typically from :code:`Device.list_devices`.
+
+        Returns
+        -------
+        store : ReportedStore
+            A store containing the reported data of each device.
+
+        Examples
+        --------
+        >>> store = dt.ReportedStore.from_devices(
+        ...     dt.Device.list_devices('<PROJECT_ID>'),
+        ... )
+
+        """
+
+        store = cls()
+        store.seed(devices)
+        return store
+
+    def seed(self, devices: Iterable[Device]) -> None:
+        """
+        Updates the store with the reported data of each device.
+
+        Parameters
+        ----------
+        devices : Iterable[Device]
+            Devices, typically from :code:`Device.list_devices`.
+
+        """
+
+        for device in devices:
+            if device.reported is None:
+                continue
+            for event_type in device.reported.raw:
+                # Use the same event map as Reported to find attributes.
+                type_names = events._EVENTS_MAP._api_names.get(event_type)
+                if type_names is None:
+                    continue
+                data = getattr(device.reported, type_names.attr_name, None)
+                if data is not None:
+                    self._update(device.device_id, event_type, data)
+
+    def apply(self, event: events.Event) -> None:
+        """
+        Updates the store with a single event.
+
+        Events of types not found in :ref:`Reported <device>`,
+        such as `labelsChanged`, are ignored.
+
+        Parameters
+        ----------
+        event : Event
+            Event received from the stream.
+
+        """
+
+        type_names = events._EVENTS_MAP._api_names.get(event.event_type)
+        if type_names is None or not hasattr(Reported, type_names.attr_name):
+            return
+
+        if event.data is not None:
+            self._update(event.device_id, event.event_type, event.data)
+
+    def follow(
+        self,
+        stream: Iterable[events.Event],
+    ) -> Generator[events.Event, None, None]:
+        """
+        Applies each event in a stream, then yields it unchanged.
+
+        Parameters
+        ----------
+        stream : Iterable[Event]
+            Events, typically from :code:`Stream.event_stream`.
+
+        Returns
+        -------
+        stream : Generator
+            The same events, after being applied to the store.
+
+        """
+
+        for event in stream:
+            self.apply(event)
+            yield event
+
+    def get(
+        self,
+        device_id: str,
+        event_type: str,
+    ) -> Optional[events._EventType]:
+        """
+        Gets the most recent event data of a type for a single device.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+        event_type : str
+            The :ref:`event type <event_types>` to look up.
+
+        Returns
+        -------
+        data : :ref:`Event Data <eventdata>`, None
+            The most recent data, or None if never reported.
+
+        Examples
+        --------
+        >>> temperature = store.get('<DEVICE_ID>', dt.events.TEMPERATURE)
+
+        """
+
+        with self._lock:
+            return self._values.get(event_type, {}).get(device_id)
+
+    def reported(self, device_id: str) -> Optional[Reported]:
+        """
+        Gets the most recent data of each type for a single device,
+        in the same format as :code:`Device.reported`.
+
+        Parameters
+        ----------
+        device_id : str
+            Unique ID of the target device.
+
+        Returns
+        -------
+        reported : Reported, None
+            Object containing the most recent data of each event type,
+            or None if the device has not reported anything.
+
+        """
+
+        with self._lock:
+            raw = {
+                event_type: values[device_id].raw
+                for event_type, values in self._values.items()
+                if device_id in values
+            }
+
+        if len(raw) == 0:
+            return None
+        return Reported(raw)
+
+    def snapshot(self, event_type: str) -> dict[str, events._EventType]:
+        """
+        Exports the most recent data of one type for all devices.
+
+        Parameters
+        ----------
+        event_type : str
+            The :ref:`event type <event_types>` to export.
+
+        Returns
+        -------
+        snapshot : dict[str, Event Data]
+            Copy of the most recent data, keyed by device ID.
+
+        Examples
+        --------
+        >>> # Current temperature of all sensors, without any requests.
+        >>> snapshot = store.snapshot(dt.events.TEMPERATURE)
+        >>> celsius = {xid: data.celsius for xid, data in snapshot.items()}
+
+        """
+
+        with self._lock:
+            return dict(self._values.get(event_type, {}))
+
+    def to_raw(self) -> dict[str, dict]:
+        """
+        Exports the entire store in the raw API reported format.
+
+        Returns
+        -------
+        raw : dict[str, dict]
+            Raw reported dictionary for each device, keyed by device ID.
+
+        """
+
+        out: dict[str, dict] = dict()
+        with self._lock:
+            for event_type, values in self._values.items():
+                for device_id, data in values.items():
+                    out.setdefault(device_id, dict())[event_type] = data.raw
+        return out
+
+    def subscribe(
+        self,
+        callback: ChangeCallback,
+        event_types: Optional[list[str]] = None,
+    ) -> Callable[[], None]:
+        """
+        Registers a callback that is called each time a value changes.
+
+        Parameters
+        ----------
+        callback : Callable
+            Called with the device ID, event type, previous data
+            (None if not seen before), and new data.
+        event_types : list[str], optional
+            If provided, only changes to these types are notified.
+
+        Returns
+        -------
+        unsubscribe : Callable
+            Call to stop receiving notifications.
+
+        Examples
+        --------
+        >>> def on_change(device_id, event_type, old, new):
+        ...     print(device_id, new)
+        >>> unsubscribe = store.subscribe(on_change, [dt.events.CONTACT])
+
+        """
+
+        entry = (callback, set(event_types) if event_types else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    def _update(
+        self,
+        device_id: str,
+        event_type: str,
+        data: events._EventType,
+    ) -> None:
+        with self._lock:
+            values = self._values.setdefault(event_type, dict())
+            previous = values.get(device_id)
+
+            # Late events, like backfilled ones, must not overwrite newer.
+            if _is_older(data, previous):
+                return
+
+            values[device_id] = data
+            subscribers = [
+                callback
+                for callback, types in self._subscribers
+                if types is None or event_type in types
+            ]
+
+        # Notify outside the lock so that callbacks may read the store.
+        for callback in subscribers:
+            try:
+                callback(device_id, event_type, previous, data)
+            except Exception as e:
+                dtlog.error(f"ReportedStore subscriber raised {e!r}.")
+
+
+def _is_older(
+    data: events._EventType,
+    previous: Optional[events._EventType],
+) -> bool:
+    # Data without comparable timestamps is always considered newer.
+    new_timestamp = getattr(data, "timestamp", None)
+    old_timestamp = getattr(previous, "timestamp", None)
+    if not isinstance(new_timestamp, datetime):
+        return False
+    if not isinstance(old_timestamp, datetime):
+        return False
+    return new_timestamp < old_timestamp
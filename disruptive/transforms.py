@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 import base64
 from datetime import datetime
-from typing import Optional
+from typing import Any, Mapping, Optional
 
 import disruptive.errors as dterrors
 
@@ -128,3 +128,53 @@ def _celsius_to_fahrenheit(celsius: float) -> float:
 
 def camel_to_snake_case(x: str) -> str:
     return re.sub(r"(?<!^)(?=[A-Z])", "_", x).lower()
+
+
+def match_labels(
+    labels: Mapping[str, str],
+    label_filters: Mapping[str, Optional[str]],
+) -> bool:
+    """
+    Checks whether labels satisfy every label filter.
+
+    Parameters
+    ----------
+    labels : dict[str, str]
+        Labels of a device.
+    label_filters : dict[str, str | None]
+        Label keys and values, as for `Device.list_devices`. A key with
+        None or "" as value matches any value of the key.
+
+    Returns
+    -------
+    match : bool
+        True if every label filter is satisfied.
+
+    """
+
+    for key, value in label_filters.items():
+        if key not in labels:
+            return False
+        if value is not None and value != "" and labels[key] != value:
+            return False
+    return True
+
+
+def apply_labels_changed(labels: dict[str, str], data: dict[str, Any]) -> None:
+    """
+    Updates labels in place with the data of a `labelsChanged` event.
+
+    Parameters
+    ----------
+    labels : dict[str, str]
+        Labels of the device before the event.
+    data : dict[str, Any]
+        Unmodified data of the event, with "added", "modified"
+        and "removed" entries.
+
+    """
+
+    labels.update(data.get("added", {}))
+    labels.update(data.get("modified", {}))
+    for key in data.get("removed", []):
+        labels.pop(key, None)
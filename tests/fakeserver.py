@@ -0,0 +1,734 @@
+"""
+A local fake of the REST API, used to measure transport, pagination, and
+streaming end-to-end without network access.
+
+The server holds projects, devices, and event history in memory, and
+serves the endpoints the client uses for them, including the emulator,
+the token endpoint, and the newline-delimited JSON event stream. Latency,
+page sizes, error and 429 injection, and stream event rates are all
+configurable. Point the client at it using `base_url`.
+
+>>> with FakeServer(latency=0.01, page_size=100) as server:
+...     server.add_devices("project_id", 1000)
+...     devices = dt.Device.list_devices(
+...         "project_id",
+...         base_url=server.base_url,
+...     )
+
+"""
+
+from __future__ import annotations
+
+import re
+import json
+import time
+import queue
+import random
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# All API routes are served below this prefix, as on the real API.
+API_PREFIX = "/v2"
+
+
+def _timestamp(moment: Optional[datetime] = None) -> str:
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def _temperature_data(celsius: float, update_time: str) -> dict:
+    return {
+        "value": celsius,
+        "samples": [{"value": celsius, "sampleTime": update_time}],
+        "isBackfilled": False,
+        "updateTime": update_time,
+    }
+
+
+class FakeServer:
+    """
+    In-memory fake of the REST API served on a local port.
+
+    Attributes
+    ----------
+    latency : float
+        Seconds added before each response.
+    page_size : int
+        Maximum number of items per page, regardless of requested size.
+    error_rate : float
+        Fraction of requests answered with 503 Service Unavailable.
+    throttle_rate : float
+        Fraction of requests answered with 429 Too Many Requests.
+    retry_after : int
+        Seconds in the Retry-After header of throttled responses.
+    stream_rate : float
+        Synthetic temperature events per second on each stream.
+    ping_interval : float
+        Seconds between pings on an idle stream.
+    requests : dict[str, int]
+        Number of requests served by route name.
+
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        page_size: int = 1000,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 0,
+        stream_rate: float = 0.0,
+        ping_interval: float = 10.0,
+        seed: Optional[int] = None,
+        port: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stream_rate = stream_rate
+        self.ping_interval = ping_interval
+        self.requests: dict[str, int] = dict()
+
+        self.projects: dict[str, dict] = dict()
+        self.devices: dict[str, dict[str, dict]] = dict()
+        self.events: dict[tuple[str, str], list[dict]] = dict()
+
+        self._rng = random.Random(seed)
+        self._ids = itertools.count()
+        self._subscribers: list[tuple[str, queue.Queue]] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        setattr(self._httpd, "fake", self)
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> FakeServer:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def token_endpoint(self) -> str:
+        return self.base_url + "/oauth2/token"
+
+    def auth(self) -> Any:
+        """
+        Returns a service account authentication object that exchanges
+        its tokens with the fake token endpoint.
+
+        """
+
+        import disruptive
+
+        auth = disruptive.Auth.service_account("key_id", "secret", "email")
+        auth.token_endpoint = self.token_endpoint
+        return auth
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            # Poll often, such that stopping the server is quick.
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # ------------------------- State -------------------------
+    def add_project(self, project_id: str, display_name: str = "") -> dict:
+        with self._lock:
+            project = self.projects.setdefault(
+                project_id,
+                {
+                    "name": f"projects/{project_id}",
+                    "displayName": display_name or project_id,
+                    "organization": "organizations/fake",
+                    "organizationDisplayName": "fake",
+                    "sensorCount": 0,
+                    "cloudConnectorCount": 0,
+                    "inventory": False,
+                },
+            )
+            self.devices.setdefault(project_id, dict())
+        return project
+
+    def add_devices(
+        self,
+        project_id: str,
+        count: int,
+        device_type: str = "temperature",
+        labels: Optional[dict[str, str]] = None,
+        emulated: bool = False,
+    ) -> list[str]:
+        """
+        Adds devices to a project, creating the project if needed.
+        Returns the IDs of the new devices.
+
+        """
+
+        self.add_project(project_id)
+        # Emulated devices are recognized by their prefix and length.
+        prefix = "emu" if emulated else ""
+        device_ids = []
+        with self._lock:
+            for _ in range(count):
+                device_id = f"{prefix}c{next(self._ids):019d}"
+                self.devices[project_id][device_id] = {
+                    "name": f"projects/{project_id}/devices/{device_id}",
+                    "type": device_type,
+                    "productNumber": "",
+                    "labels": dict(labels or {}),
+                    "reported": {},
+                }
+                self.projects[project_id]["sensorCount"] += 1
+                device_ids.append(device_id)
+        return device_ids
+
+    def add_history(
+        self,
+        project_id: str,
+        device_id: str,
+        count: int,
+        start: Optional[datetime] = None,
+        interval: timedelta = timedelta(minutes=1),
+        samples: int = 1,
+    ) -> None:
+        """
+        Adds a history of temperature events to a device, starting at
+        `start` and spaced by `interval`. Each event carries `samples`
+        temperature samples.
+
+        """
+
+        start = start or datetime(2022, 1, 1, tzinfo=timezone.utc)
+        events = []
+        for i in range(count):
+            moment = start + i * interval
+            update_time = _timestamp(moment)
+            data = _temperature_data(round(20 + self._rng.random(), 2), "")
+            data["updateTime"] = update_time
+            data["samples"] = [
+                {
+                    "value": data["value"],
+                    "sampleTime": _timestamp(moment - j * interval / samples),
+                }
+                for j in range(samples)
+            ]
+            events.append(
+                self._event(project_id, device_id, "temperature", data, moment)
+            )
+
+        with self._lock:
+            history = self.events.setdefault((project_id, device_id), [])
+            history += events
+            history.sort(key=lambda e: e["timestamp"])
+
+    def publish(
+        self,
+        project_id: str,
+        device_id: str,
+        event_type: str,
+        data: dict,
+    ) -> dict:
+        """
+        Publishes an event from a device to its history and all streams.
+
+        """
+
+        event = self._event(project_id, device_id, event_type, data)
+        with self._lock:
+            self.events.setdefault((project_id, device_id), []).append(event)
+            device = self.devices.get(project_id, {}).get(device_id)
+            if device is not None and event_type != "labelsChanged":
+                device["reported"][event_type] = event["data"][event_type]
+            subscribers = [q for p, q in self._subscribers if p == project_id]
+        for subscriber in subscribers:
+            subscriber.put(event)
+        return event
+
+    def _event(
+        self,
+        project_id: str,
+        device_id: str,
+        event_type: str,
+        data: dict,
+        moment: Optional[datetime] = None,
+    ) -> dict:
+        timestamp = _timestamp(moment)
+        data = dict(data)
+        if event_type != "labelsChanged":
+            data.setdefault("updateTime", timestamp)
+
+        # Published events are given samples, as by the real emulator.
+        if event_type == "temperature" and "samples" not in data:
+            data["samples"] = [
+                {"value": data["value"], "sampleTime": data["updateTime"]}
+            ]
+            data.setdefault("isBackfilled", False)
+        if event_type == "humidity" and "samples" not in data:
+            data["samples"] = [
+                {
+                    "temperature": data["temperature"],
+                    "relativeHumidity": data["relativeHumidity"],
+                    "sampleTime": data["updateTime"],
+                }
+            ]
+            data.setdefault("isBackfilled", False)
+        return {
+            "eventId": f"evt{next(self._ids):012d}",
+            "targetName": f"projects/{project_id}/devices/{device_id}",
+            "eventType": event_type,
+            "data": {event_type: data},
+            "timestamp": timestamp,
+        }
+
+    # ------------------------- Routes -------------------------
+    def _routes(self) -> list[tuple[str, str, Callable]]:
+        # Routes are matched in order, so specific paths come first.
+        return [
+            ("POST", r"/oauth2/token", self._token),
+            ("GET", r"/projects", self._list_projects),
+            ("GET", r"/projects/([^/]+)", self._get_project),
+            ("GET", r"/projects/([^/]+)/devices:stream", self._stream),
+            ("POST", r"/projects/([^/]+)/devices:batchUpdate", self._labels),
+            ("POST", r"/projects/([^/]+)/devices:transfer", self._transfer),
+            ("GET", r"/projects/([^/]+)/devices", self._list_devices),
+            ("POST", r"/projects/([^/]+)/devices", self._create_device),
+            ("GET", r"/projects/([^/]+)/devices/([^/:]+)", self._get_device),
+            (
+                "DELETE",
+                r"/projects/([^/]+)/devices/([^/:]+)",
+                self._delete_device,
+            ),
+            (
+                "GET",
+                r"/projects/([^/]+)/devices/([^/:]+)/events",
+                self._list_events,
+            ),
+            (
+                "POST",
+                r"/projects/([^/]+)/devices/([^/:]+):publish",
+                self._publish,
+            ),
+        ]
+
+    def _paginate(self, items: list, params: dict, key: str) -> dict:
+        size = int(params.get("pageSize", [self.page_size])[0])
+        size = min(size, self.page_size)
+        offset = int(params.get("pageToken", ["0"])[0] or 0)
+        page = items[offset : offset + size]
+        more = offset + size < len(items)
+        return {key: page, "nextPageToken": str(offset + size) if more else ""}
+
+    def _token(self, params: dict, body: Any) -> tuple[int, dict]:
+        return 200, {
+            "access_token": "fake-access-token",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }
+
+    def _list_projects(self, params: dict, body: Any) -> tuple[int, dict]:
+        with self._lock:
+            projects = list(self.projects.values())
+        return 200, self._paginate(projects, params, "projects")
+
+    def _get_project(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+    ) -> tuple[int, dict]:
+        with self._lock:
+            project = self.projects.get(project_id)
+        if project is None:
+            return 404, {"error": "project not found", "code": 404}
+        return 200, project
+
+    def _list_devices(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+    ) -> tuple[int, dict]:
+        device_ids = set(params.get("device_ids", []))
+        device_types = set(params.get("device_types", []))
+        label_filters = [
+            f.split("=", 1) for f in params.get("label_filters", [])
+        ]
+
+        def matches(device: dict) -> bool:
+            if device_ids and device["name"].split("/")[-1] not in device_ids:
+                return False
+            if device_types and device["type"] not in device_types:
+                return False
+            for label in label_filters:
+                if label[0] not in device["labels"]:
+                    return False
+                if len(label) == 2 and label[1] != "":
+                    if device["labels"][label[0]] != label[1]:
+                        return False
+            return True
+
+        with self._lock:
+            devices = [
+                d
+                for d in self.devices.get(project_id, {}).values()
+                if matches(d)
+            ]
+        return 200, self._paginate(devices, params, "devices")
+
+    def _get_device(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+        device_id: str,
+    ) -> tuple[int, dict]:
+        with self._lock:
+            device = self.devices.get(project_id, {}).get(device_id)
+        if device is None:
+            return 404, {"error": "device not found", "code": 404}
+        return 200, device
+
+    def _create_device(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+    ) -> tuple[int, dict]:
+        device_id = self.add_devices(
+            project_id,
+            1,
+            device_type=body["type"],
+            labels=body.get("labels", {}),
+            emulated=True,
+        )[0]
+        return self._get_device(params, body, project_id, device_id)
+
+    def _delete_device(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+        device_id: str,
+    ) -> tuple[int, dict]:
+        with self._lock:
+            device = self.devices.get(project_id, {}).pop(device_id, None)
+        if device is None:
+            return 404, {"error": "device not found", "code": 404}
+        return 200, {}
+
+    def _publish(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+        device_id: str,
+    ) -> tuple[int, dict]:
+        with self._lock:
+            known = device_id in self.devices.get(project_id, {})
+        if not known:
+            return 404, {"error": "device not found", "code": 404}
+        for event_type, data in body.items():
+            self.publish(project_id, device_id, event_type, data)
+        return 200, {}
+
+    def _list_events(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+        device_id: str,
+    ) -> tuple[int, dict]:
+        event_types = set(params.get("eventTypes", []))
+        start = params.get("startTime", [None])[0]
+        end = params.get("endTime", [None])[0]
+        start_time = _parse_timestamp(start) if start else None
+        end_time = _parse_timestamp(end) if end else None
+
+        with self._lock:
+            history = list(self.events.get((project_id, device_id), []))
+
+        events = []
+        for event in history:
+            if event_types and event["eventType"] not in event_types:
+                continue
+            moment = _parse_timestamp(event["timestamp"])
+            if start_time is not None and moment < start_time:
+                continue
+            if end_time is not None and moment >= end_time:
+                continue
+            events.append(event)
+        return 200, self._paginate(events, params, "events")
+
+    def _labels(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+    ) -> tuple[int, dict]:
+        add = body.get("addLabels", {})
+        remove = body.get("removeLabels", [])
+
+        errors = []
+        changed = []
+        with self._lock:
+            devices = self.devices.get(project_id, {})
+            for name in body.get("devices", []):
+                device = devices.get(name.split("/")[-1])
+                if device is None:
+                    errors.append(
+                        {
+                            "device": name,
+                            "status": {
+                                "code": "NOT_FOUND",
+                                "message": "resource not found",
+                            },
+                        }
+                    )
+                    continue
+                labels = device["labels"]
+                change = {
+                    "added": {k: v for k, v in add.items() if k not in labels},
+                    "modified": {
+                        k: v
+                        for k, v in add.items()
+                        if k in labels and labels[k] != v
+                    },
+                    "removed": [k for k in remove if k in labels],
+                }
+                labels.update(add)
+                for key in remove:
+                    labels.pop(key, None)
+                if any(change.values()):
+                    changed.append((name.split("/")[-1], change))
+
+        # Label changes are published as events, as on the real API.
+        for device_id, change in changed:
+            self.publish(project_id, device_id, "labelsChanged", change)
+
+        return 200, {"batchErrors": errors}
+
+    def _transfer(
+        self,
+        params: dict,
+        body: Any,
+        target_project_id: str,
+    ) -> tuple[int, dict]:
+        self.add_project(target_project_id)
+
+        transferred = []
+        errors = []
+        with self._lock:
+            for name in body.get("devices", []):
+                source_project_id, device_id = name.split("/")[1::2]
+                source = self.devices.get(source_project_id, {})
+                device = source.pop(device_id, None)
+                if device is None:
+                    errors.append(
+                        {
+                            "device": name,
+                            "status": {
+                                "code": "NOT_FOUND",
+                                "message": "resource not found",
+                            },
+                        }
+                    )
+                    continue
+                device["name"] = (
+                    f"projects/{target_project_id}/devices/{device_id}"
+                )
+                self.devices[target_project_id][device_id] = device
+                transferred.append(name)
+        return 200, {
+            "transferredDevices": transferred,
+            "transferErrors": errors,
+        }
+
+    def _stream(
+        self,
+        params: dict,
+        body: Any,
+        project_id: str,
+    ) -> tuple[int, Any]:
+        subscriber: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.append((project_id, subscriber))
+            device_ids = list(self.devices.get(project_id, {}))
+
+        event_types = set(params.get("event_types", []))
+        wanted_ids = set(params.get("device_ids", []))
+
+        def lines() -> Any:
+            try:
+                next_synthetic = time.perf_counter()
+                last_sent = time.perf_counter()
+                while not self._stopping.is_set():
+                    # Deliver published events, waiting at most until the
+                    # next synthetic event or ping is due.
+                    now = time.perf_counter()
+                    if self.stream_rate > 0 and device_ids:
+                        timeout = max(0.0, next_synthetic - now)
+                    else:
+                        next_ping = last_sent + self.ping_interval
+                        timeout = max(0.0, next_ping - now)
+
+                    try:
+                        event = subscriber.get(timeout=min(timeout, 0.5))
+                    except queue.Empty:
+                        event = None
+
+                    now = time.perf_counter()
+                    if event is None and self.stream_rate > 0 and device_ids:
+                        if now >= next_synthetic:
+                            next_synthetic += 1 / self.stream_rate
+                            event = self._event(
+                                project_id,
+                                self._rng.choice(device_ids),
+                                "temperature",
+                                _temperature_data(
+                                    round(20 + self._rng.random(), 2),
+                                    _timestamp(),
+                                ),
+                            )
+
+                    if event is not None:
+                        xid = event["targetName"].split("/")[-1]
+                        event_type = event["eventType"]
+                        if event_types and event_type not in event_types:
+                            continue
+                        if wanted_ids and xid not in wanted_ids:
+                            continue
+                        last_sent = now
+                        yield {"result": {"event": event}}
+                    elif now - last_sent >= self.ping_interval:
+                        last_sent = now
+                        yield {"result": {"event": {"eventType": "ping"}}}
+            finally:
+                with self._lock:
+                    self._subscribers.remove((project_id, subscriber))
+
+        return 200, lines()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections open, as the client does with its sessions.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Silence the default per-request logging to stderr.
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        fake: FakeServer = getattr(self.server, "fake")
+
+        url = urlsplit(self.path)
+        path = url.path
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX) :]
+        params = parse_qs(url.query)
+
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length > 0 else b""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(raw or b"{}")
+        else:
+            body = parse_qs(raw.decode())
+
+        for route_method, pattern, handler in fake._routes():
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match is not None:
+                break
+        else:
+            self._respond(404, {"error": "not found", "code": 404})
+            return
+
+        name = handler.__name__.lstrip("_")
+        with fake._lock:
+            fake.requests[name] = fake.requests.get(name, 0) + 1
+
+        if fake.latency > 0:
+            time.sleep(fake.latency)
+
+        # Inject faults before doing any work, as an overloaded API would.
+        # Token exchanges are spared, such that faults hit the API itself.
+        roll = fake._rng.random() if name != "token" else 1.0
+        if roll < fake.error_rate:
+            self._respond(503, {"error": "unavailable", "code": 503})
+            return
+        if roll < fake.error_rate + fake.throttle_rate:
+            self._respond(
+                429,
+                {"error": "too many requests", "code": 429},
+                {"Retry-After": str(fake.retry_after)},
+            )
+            return
+
+        status, payload = handler(params, body, *match.groups())
+        if isinstance(payload, dict):
+            self._respond(status, payload)
+        else:
+            self._respond_stream(payload)
+
+    def _respond(
+        self,
+        status: int,
+        payload: dict,
+        headers: Optional[dict] = None,
+    ) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _respond_stream(self, lines: Any) -> None:
+        # Newline-delimited JSON until the client disconnects.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for line in lines:
+                self.wfile.write(json.dumps(line).encode() + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            lines.close()
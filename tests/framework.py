@@ -1,7 +1,12 @@
 import sys
+from datetime import datetime, timedelta, timezone
 
 import disruptive as dt
 from disruptive.authentication import Unauthenticated
+from disruptive.events.events import Event
+
+# Time zero of the events built by make_event.
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
 
 
 class RequestsReponseMock:
@@ -101,3 +106,51 @@ class RequestMock:
             timeout=timeout,
             stream=stream,
         )
+
+
+def iso_time(seconds):
+    """
+    Returns the ISO 8601 timestamp a number of seconds after START.
+
+    """
+
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def make_event(event_type, data, seconds, device_id="d1"):
+    """
+    Builds an event of a device in project "p1", with its data and
+    timestamp at a number of seconds after START.
+
+    """
+
+    return Event(
+        {
+            "eventId": f"{device_id}-{event_type}-{seconds}",
+            "eventType": event_type,
+            "targetName": f"projects/p1/devices/{device_id}",
+            "data": {event_type: {**data, "updateTime": iso_time(seconds)}},
+            "timestamp": iso_time(seconds),
+        }
+    )
+
+
+def make_labels_changed(device_id, added=None, removed=None, seconds=0):
+    """
+    Builds a labelsChanged event of a device in project "p1".
+
+    """
+
+    return Event(
+        {
+            "eventId": f"{device_id}-labels-{seconds}",
+            "eventType": "labelsChanged",
+            "targetName": f"projects/p1/devices/{device_id}",
+            "data": {
+                "added": added or {},
+                "modified": {},
+                "removed": removed or [],
+            },
+            "timestamp": iso_time(seconds),
+        }
+    )
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import disruptive.aggregate as dtaggregate
+import disruptive.errors as dterrors
+import tests.api_responses as dtapiresponses
+from disruptive.events.events import Event
+from disruptive.resources.eventhistory import EventHistory
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def _ts(seconds):
+    moment = START + timedelta(seconds=seconds)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _temperature(device, samples):
+    return Event(
+        {
+            "eventId": f"{device}-{samples[-1][0]}",
+            "targetName": f"projects/project_id/devices/{device}",
+            "eventType": "temperature",
+            "data": {
+                "temperature": {
+                    "value": samples[-1][1],
+                    "isBackfilled": False,
+                    "updateTime": _ts(samples[-1][0]),
+                    "samples": [
+                        {"value": value, "sampleTime": _ts(seconds)}
+                        for seconds, value in samples
+                    ],
+                }
+            },
+            "timestamp": _ts(samples[-1][0]),
+        }
+    )
+
+
+def _columns(samples):
+    # Samples as (device, metric, seconds, value).
+    return {
+        "device_id": [s[0] for s in samples],
+        "metric": [s[1] for s in samples],
+        "time": np.array(
+            [np.datetime64(_ts(s[2])[:-1], "ns") for s in samples]
+        ),
+        "value": [s[3] for s in samples],
+    }
+
+
+class TestAggregate:
+    def test_extract_samples(self):
+        history = EventHistory(
+            Event.from_mixed_list(
+                dtapiresponses.event_history_each_type["events"]
+            )
+        )
+
+        columns = dtaggregate.extract_samples(history)
+
+        assert set(columns["metric"]) == {
+            "temperature",
+            "relative_humidity",
+            "humidity_temperature",
+            "co2",
+            "pressure",
+            "touch_count",
+            "object_present_count",
+        }
+        assert columns["time"].dtype == np.dtype("datetime64[ns]")
+        co2 = columns["value"][columns["metric"] == "co2"]
+        assert list(co2) == [526]
+
+        only = dtaggregate.extract_samples(history, metrics=["pressure"])
+        assert list(only["metric"]) == ["pressure"]
+        assert list(only["value"]) == [99301]
+
+    def test_extract_every_sample(self):
+        history = EventHistory(
+            [
+                _temperature("d1", [(0, 20), (60, 21), (120, 22)]),
+                _temperature("d1", [(180, 23)]),
+            ]
+        )
+
+        columns = dtaggregate.extract_samples(history)
+
+        assert list(columns["value"]) == [20, 21, 22, 23]
+        assert list(columns["device_id"]) == ["d1"] * 4
+
+    def test_unknown_metric(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            dtaggregate.extract_samples([], metrics=["temp"])
+
+    def test_buckets(self):
+        columns = _columns(
+            [
+                ("d2", "co2", 30, 500),
+                ("d1", "temperature", 0, 20),
+                ("d1", "temperature", 300, 24),
+                ("d1", "temperature", 600, 30),
+                ("d1", "temperature", 120, 22),
+            ]
+        )
+
+        buckets = dtaggregate.aggregate_samples(
+            **columns,
+            interval=timedelta(minutes=5),
+        )
+
+        assert list(buckets) == dtaggregate.COLUMNS
+        assert list(buckets["device_id"]) == ["d1", "d1", "d1", "d2"]
+        assert list(buckets["count"]) == [2, 1, 1, 1]
+        assert list(buckets["min"]) == [20, 24, 30, 500]
+        assert list(buckets["max"]) == [22, 24, 30, 500]
+        assert list(buckets["mean"]) == [21, 24, 30, 500]
+
+        # The last value is by time, not by input order.
+        assert list(buckets["last"]) == [22, 24, 30, 500]
+        assert buckets["bucket"][1] == np.datetime64(_ts(300)[:-1], "ns")
+
+    def test_gaps_and_coverage(self):
+        # One sample a minute, with the second 5-minute bucket missing.
+        samples = [("d1", "temperature", s * 60, s) for s in range(5)]
+        samples += [("d1", "temperature", s * 60, s) for s in range(10, 13)]
+
+        buckets = dtaggregate.aggregate_samples(
+            **_columns(samples),
+            interval=300,
+        )
+
+        assert list(buckets["count"]) == [5, 0, 3]
+        assert np.isnan(buckets["mean"][1])
+        assert list(buckets["coverage"]) == [1.0, 0.0, 0.6]
+
+        unfilled = dtaggregate.aggregate_samples(
+            **_columns(samples),
+            interval=300,
+            fill_gaps=False,
+        )
+        assert list(unfilled["count"]) == [5, 3]
+
+    def test_time_range(self):
+        samples = [("d1", "temperature", s * 60, s) for s in range(10)]
+
+        buckets = dtaggregate.aggregate_samples(
+            **_columns(samples),
+            interval=300,
+            start_time=START - timedelta(minutes=5),
+            end_time=START + timedelta(minutes=8),
+            sample_interval=120,
+        )
+
+        # Gaps are reported across the requested range.
+        assert list(buckets["count"]) == [0, 5, 3]
+        assert list(buckets["coverage"]) == [0.0, 1.0, 1.0]
+        assert buckets["bucket"][0] == np.datetime64(_ts(-300)[:-1], "ns")
+
+    def test_unknown_sample_interval(self):
+        buckets = dtaggregate.aggregate_samples(
+            **_columns([("d1", "co2", 0, 400)]),
+            interval=300,
+        )
+
+        assert list(buckets["count"]) == [1]
+        assert np.isnan(buckets["coverage"][0])
+
+    def test_empty(self):
+        buckets = dtaggregate.aggregate_samples(
+            **_columns([]),
+            interval=300,
+        )
+
+        assert list(buckets) == dtaggregate.COLUMNS
+        assert all(len(column) == 0 for column in buckets.values())
+
+    def test_invalid_interval(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            dtaggregate.aggregate_samples(**_columns([]), interval=0)
+
+    def test_event_history_aggregate(self):
+        history = EventHistory(
+            [
+                _temperature("d1", [(0, 20), (60, 21), (120, 22)]),
+                _temperature("d1", [(180, 23), (240, 24), (300, 25)]),
+                _temperature("d2", [(0, 10)]),
+            ]
+        )
+
+        buckets = history.aggregate(interval=300)
+
+        assert list(buckets["device_id"]) == ["d1", "d1", "d2"]
+        assert list(buckets["count"]) == [5, 1, 1]
+        assert list(buckets["mean"]) == [22, 25, 10]
+        assert list(buckets["coverage"][:2]) == [1.0, 0.2]
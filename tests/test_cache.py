@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import disruptive
+import disruptive.cache as dtcache
+import disruptive.errors as dterrors
+from tests.fakeserver import FakeServer
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def _minutes(n):
+    return START + timedelta(minutes=n)
+
+
+@pytest.fixture()
+def server():
+    with FakeServer(page_size=1000, seed=1) as server:
+        disruptive.default_auth = server.auth()
+        yield server
+
+    disruptive.default_auth = disruptive.Auth.unauthenticated()
+
+
+class TestEventCache:
+    def test_incremental_fetch(self, server):
+        device_id = server.add_devices("project_id", 1)[0]
+        server.add_history("project_id", device_id, 300, start=START)
+
+        with disruptive.EventCache(":memory:") as cache:
+            h1 = disruptive.EventHistory.list_events(
+                device_id,
+                "project_id",
+                start_time=_minutes(0),
+                end_time=_minutes(100),
+                cache=cache,
+                base_url=server.base_url,
+            )
+
+            # Only the range not already cached should be requested.
+            assert cache.missing(
+                device_id,
+                "project_id",
+                start_time=_minutes(50),
+                end_time=_minutes(150),
+            ) == [(_minutes(100), _minutes(150))]
+            h2 = cache.list_events(
+                device_id,
+                "project_id",
+                start_time=_minutes(50),
+                end_time=_minutes(150),
+                base_url=server.base_url,
+            )
+            h3 = cache.list_events(
+                device_id,
+                "project_id",
+                start_time=_minutes(0),
+                end_time=_minutes(150),
+                base_url=server.base_url,
+            )
+
+            assert len(h1) == 100 and len(h2) == 100 and len(h3) == 150
+            assert h2[0].data.timestamp == _minutes(50)
+            assert h3[-1].data.timestamp == _minutes(149)
+            assert cache.fetches == 2
+            assert server.requests["list_events"] == 2
+
+    def test_event_types(self, server):
+        device_id = server.add_devices("project_id", 1)[0]
+        server.add_history("project_id", device_id, 10, start=START)
+
+        with disruptive.EventCache(":memory:") as cache:
+            kwargs = dict(start_time=_minutes(0), end_time=_minutes(10))
+            cache.list_events(
+                device_id,
+                "project_id",
+                event_types=["temperature"],
+                base_url=server.base_url,
+                **kwargs,
+            )
+
+            # Ranges of one type do not cover others.
+            assert cache.missing(device_id, "project_id", **kwargs) != []
+            history = cache.list_events(
+                device_id,
+                "project_id",
+                base_url=server.base_url,
+                **kwargs,
+            )
+            assert len(history) == 10
+
+            # Ranges of all types cover each single type.
+            missing = cache.missing(
+                device_id,
+                "project_id",
+                event_types=["touch"],
+                **kwargs,
+            )
+            assert missing == []
+
+    def test_settle_time(self, server):
+        device_id = server.add_devices("project_id", 1)[0]
+        now = datetime.now(timezone.utc)
+
+        with disruptive.EventCache(":memory:", settle_time=600) as cache:
+            cache.list_events(
+                device_id,
+                "project_id",
+                start_time=now - timedelta(hours=1),
+                end_time=now,
+                base_url=server.base_url,
+            )
+
+            # Recent events may still arrive, so they are fetched again.
+            missing = cache.missing(
+                device_id,
+                "project_id",
+                start_time=now - timedelta(hours=1),
+                end_time=now,
+            )
+            assert len(missing) == 1
+            assert missing[0][1] == now
+            assert abs(
+                missing[0][0] - (now - timedelta(minutes=10))
+            ) < timedelta(seconds=5)
+
+    def test_eviction(self, server):
+        device_ids = server.add_devices("project_id", 2)
+        for device_id in device_ids:
+            server.add_history("project_id", device_id, 100, start=START)
+
+        with disruptive.EventCache(":memory:") as cache:
+            kwargs = dict(start_time=_minutes(0), end_time=_minutes(100))
+            cache.list_events(
+                device_ids[0],
+                "project_id",
+                base_url=server.base_url,
+                **kwargs,
+            )
+            size = cache.size
+            assert size > 0
+
+            # Room for one device only, so the least recent is evicted.
+            cache.max_size = int(size * 1.5)
+            cache.list_events(
+                device_ids[1],
+                "project_id",
+                base_url=server.base_url,
+                **kwargs,
+            )
+
+            assert cache.evictions == 1
+            assert cache.size <= cache.max_size
+            assert cache.missing(device_ids[0], "project_id", **kwargs) != []
+            assert cache.missing(device_ids[1], "project_id", **kwargs) == []
+
+    def test_persistence_and_compaction(self, server, tmp_path):
+        device_id = server.add_devices("project_id", 1)[0]
+        server.add_history("project_id", device_id, 1000, start=START)
+        path = str(tmp_path / "events.sqlite")
+        kwargs = dict(
+            start_time=_minutes(0),
+            end_time=_minutes(1000),
+            base_url=server.base_url,
+        )
+
+        with disruptive.EventCache(path) as cache:
+            cache.list_events(device_id, "project_id", **kwargs)
+
+        # The history is read from disk after reopening.
+        with disruptive.EventCache(path) as cache:
+            assert len(cache.list_events(device_id, "project_id", **kwargs))
+            assert cache.fetches == 0
+
+            before = (tmp_path / "events.sqlite").stat().st_size
+            cache.evict(max_size=0)
+            cache.compact()
+            after = (tmp_path / "events.sqlite").stat().st_size
+
+        assert after < before
+
+    def test_configuration(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.EventCache(":memory:", max_size=-1)
+
+    def test_missing_timestamp(self):
+        # Events without a timestamp can not be placed in the cache.
+        with pytest.raises(dterrors.FormatError):
+            dtcache._to_epoch(None)
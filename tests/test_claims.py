@@ -0,0 +1,158 @@
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from tests.framework import RequestsReponseMock
+
+
+def _device(device_id, is_claimed=False):
+    return {
+        "deviceId": device_id,
+        "deviceType": "temperature",
+        "productNumber": "",
+        "isClaimed": is_claimed,
+    }
+
+
+CLAIM_INFO = {
+    "k1": {
+        "type": "KIT",
+        "kit": {
+            "kitId": "k1",
+            "displayName": "Starter Kit",
+            "devices": [_device("ka"), _device("kb")],
+        },
+    },
+    "qr-d1": {"type": "DEVICE", "device": _device("d1")},
+    "qr-d2": {"type": "DEVICE", "device": _device("d2", is_claimed=True)},
+    "qr-d4": {"type": "DEVICE", "device": _device("d4")},
+}
+
+
+class FakeClaimApi:
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.claims = []
+
+    def __call__(self, **kwargs):
+        url = kwargs["url"]
+        if "/claimInfo" in url:
+            identifier = url.split("identifier=")[1]
+            if identifier not in CLAIM_INFO:
+                return RequestsReponseMock({"error": "not found"}, 404, {})
+            return RequestsReponseMock(CLAIM_INFO[identifier], 200, {})
+
+        body = kwargs["json"]
+        dry_run = url.endswith("dryRun=true")
+        self.claims.append((url.split("/")[-2], dry_run, body))
+        errors = {"devices": [], "kits": []}
+        for device_id in body.get("deviceIds", []):
+            if device_id in self.rejected:
+                errors["devices"].append(
+                    {
+                        "deviceId": device_id,
+                        "code": "ALREADY_CLAIMED",
+                        "message": "The device was previously claimed",
+                    }
+                )
+        return RequestsReponseMock(
+            {"claimedDevices": [], "claimErrors": errors},
+            200,
+            {},
+        )
+
+
+class TestClaimPlan:
+    def test_create(self, request_mock):
+        request_mock.request_patcher.side_effect = FakeClaimApi()
+
+        plan = disruptive.ClaimPlan.create(
+            ["k1", "qr-d1", "qr-d2", "qr-d3"],
+            "p1",
+        )
+
+        assert list(plan.outcomes) == ["k1", "qr-d1", "qr-d2", "qr-d3"]
+        assert plan.projects == {"p1": {"KIT": ["k1"], "DEVICE": ["d1"]}}
+        assert plan.outcomes["k1"].device_ids == ["ka", "kb"]
+
+        # Identifiers that cannot be claimed fail without a claim request.
+        assert [o.identifier for o in plan.failed] == ["qr-d2", "qr-d3"]
+        assert isinstance(
+            plan.outcomes["qr-d2"].error,
+            dterrors.ClaimErrorDeviceAlreadyClaimed,
+        )
+        not_found = plan.outcomes["qr-d3"].error
+        assert isinstance(not_found, dterrors.ClaimErrorDeviceNotFound)
+        assert not_found.device_id == "qr-d3"
+        request_mock.assert_request_count(4)
+
+    def test_apply(self, request_mock):
+        api = FakeClaimApi(rejected=["d4"])
+        request_mock.request_patcher.side_effect = api
+
+        plan = disruptive.ClaimPlan.create(
+            {"k1": "p1", "qr-d1": "p2", "qr-d4": "p2"},
+            rate_limit=1000,
+        )
+        progress = []
+        outcomes = plan.apply(
+            max_workers=1,
+            progress_callback=lambda done, total: progress.append(done),
+        )
+
+        assert outcomes["k1"].status == disruptive.ClaimOutcome.CLAIMED
+        assert outcomes["qr-d1"].status == disruptive.ClaimOutcome.CLAIMED
+        assert outcomes["qr-d4"].status == disruptive.ClaimOutcome.FAILED
+        assert isinstance(
+            outcomes["qr-d4"].error,
+            dterrors.ClaimErrorDeviceAlreadyClaimed,
+        )
+
+        # A dry run per project first, then only what passed it.
+        assert api.claims == [
+            ("p1", True, {"kitIds": ["k1"]}),
+            ("p2", True, {"deviceIds": ["d1", "d4"]}),
+            ("p1", False, {"kitIds": ["k1"]}),
+            ("p2", False, {"deviceIds": ["d1"]}),
+        ]
+        assert progress == [1, 2]
+
+        # Applying again should not resubmit, nor fail, claimed outcomes.
+        api.rejected |= {"d1"}
+        outcomes = plan.apply(max_workers=1)
+
+        assert len(api.claims) == 4
+        assert outcomes["k1"].status == disruptive.ClaimOutcome.CLAIMED
+        assert outcomes["qr-d1"].status == disruptive.ClaimOutcome.CLAIMED
+
+    def test_dry_run_and_chunks(self, request_mock):
+        api = FakeClaimApi()
+        request_mock.request_patcher.side_effect = api
+
+        plan = disruptive.ClaimPlan.create(["k1", "qr-d1", "qr-d4"], "p1")
+        outcomes = plan.apply(dry_run=True, chunk_size=2, max_workers=1)
+
+        assert {o.status for o in outcomes.values()} == {
+            disruptive.ClaimOutcome.CLAIMABLE
+        }
+        assert [body for _, _, body in api.claims] == [
+            {"kitIds": ["k1"], "deviceIds": ["d1"]},
+            {"deviceIds": ["d4"]},
+        ]
+
+    def test_request_error(self, request_mock):
+        plan = disruptive.ClaimPlan.create([], "p1")
+        outcome = disruptive.ClaimOutcome("qr-d1", "p1")
+        outcome.type = "DEVICE"
+        outcome.claim_id = "d1"
+        plan.outcomes["qr-d1"] = outcome
+        request_mock.status_code = 403
+
+        plan.apply()
+
+        assert outcome.status == disruptive.ClaimOutcome.FAILED
+        assert isinstance(outcome.error, dterrors.Forbidden)
+
+    def test_missing_project(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.ClaimPlan.create(["k1"])
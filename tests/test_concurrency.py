@@ -0,0 +1,84 @@
+import pytest
+
+import disruptive
+import disruptive.concurrency as dtconcurrency
+import disruptive.errors as dterrors
+import tests.api_responses as dtapiresponses
+
+
+class TestRateLimiter:
+    def test_acquire(self, mocker):
+        # Drive the limiter with a fake clock that advances when sleeping.
+        clock = [0.0]
+        mocker.patch("time.monotonic", side_effect=lambda: clock[0])
+        sleep = mocker.patch(
+            "time.sleep",
+            side_effect=lambda s: clock.__setitem__(0, clock[0] + s),
+        )
+
+        limiter = dtconcurrency.RateLimiter(rate=2, burst=2)
+        for _ in range(6):
+            limiter.acquire()
+
+        # The burst is free, the remaining 4 are spaced at 2 per second.
+        assert clock[0] == pytest.approx(2.0)
+        assert sleep.call_count == 4
+
+    def test_invalid_arguments(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            dtconcurrency.RateLimiter(rate=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            dtconcurrency.RateLimiter(rate=1, burst=0)
+
+    def test_request_rate_limit(self, request_mock, mocker):
+        request_mock.json = dtapiresponses.touch_sensor
+        acquire = mocker.patch.object(dtconcurrency.RateLimiter, "acquire")
+
+        # No limiter by default.
+        disruptive.Device.get_device("device_id", "project_id")
+        assert acquire.call_count == 0
+
+        mocker.patch.object(disruptive, "request_rate_limit", 10)
+        disruptive.Device.get_device("device_id", "project_id")
+        disruptive.Device.get_device("device_id", "project_id")
+        assert acquire.call_count == 2
+
+        # The limiter is shared and follows the configured rate.
+        assert dtconcurrency.shared_rate_limiter().rate == 10
+        limiter = dtconcurrency.shared_rate_limiter()
+        assert dtconcurrency.shared_rate_limiter() is limiter
+
+        mocker.patch.object(disruptive, "request_rate_limit", 5)
+        assert dtconcurrency.shared_rate_limiter().rate == 5
+
+
+class TestConcurrency:
+    def test_chunked(self):
+        items = list(range(5))
+
+        assert dtconcurrency.chunked(items, None) == [items]
+        assert dtconcurrency.chunked(items, 2) == [[0, 1], [2, 3], [4]]
+        assert dtconcurrency.chunked([], 2) == []
+
+        with pytest.raises(dterrors.ConfigurationError):
+            dtconcurrency.chunked(items, 0)
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_run_concurrently(self, max_workers):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x * 10
+
+        results = dtconcurrency.run_concurrently(func, range(6), max_workers)
+
+        # Errors are yielded alongside results rather than raised.
+        outcomes = {item: (res, err) for item, res, err in results}
+        assert sorted(outcomes) == list(range(6))
+        assert outcomes[2] == (20, None)
+        assert outcomes[3][0] is None
+        assert isinstance(outcomes[3][1], ValueError)
+
+    def test_run_concurrently_invalid_workers(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            list(dtconcurrency.run_concurrently(str, [1, 2], 0))
@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+import disruptive
+import disruptive.counters as dtcounters
+import disruptive.errors as dterrors
+from disruptive.resources.eventhistory import EventHistory
+from tests.framework import START, make_event
+
+
+def _event(total, seconds, device_id="d1", event_type="touchCount"):
+    return make_event(event_type, {"total": total}, seconds, device_id)
+
+
+class TestCounterDeltas:
+    def test_deltas(self):
+        history = EventHistory(
+            [
+                _event(10, 0),
+                _event(16, 1800),
+                _event(20, 3600),
+                _event(5, 4000, device_id="d2"),
+            ]
+        )
+
+        buckets = history.counter_deltas(interval=3600)
+
+        assert list(buckets) == dtcounters.COLUMNS
+        assert list(buckets["device_id"]) == ["d1", "d1", "d2"]
+        assert list(buckets["delta"]) == [10, 0, 0]
+        assert list(buckets["covered"]) == [3600, 0, 0]
+        assert buckets["rate"][0] == pytest.approx(10 / 3600)
+        assert np.isnan(buckets["rate"][2])
+
+    def test_spread(self):
+        # One reading every two hours, split over the buckets between.
+        history = EventHistory([_event(0, 1800), _event(30, 1800 + 7200)])
+
+        buckets = history.counter_deltas(interval=3600)
+
+        assert list(buckets["delta"]) == [7.5, 15, 7.5]
+        assert list(buckets["covered"]) == [1800, 3600, 1800]
+
+    def test_reset(self):
+        history = EventHistory(
+            [_event(100, 0), _event(110, 600), _event(4, 1200)]
+        )
+
+        buckets = history.counter_deltas(interval=3600)
+
+        # The count after a restart is the new total itself.
+        assert list(buckets["delta"]) == [14]
+        assert list(buckets["resets"]) == [1]
+
+    def test_max_gap(self):
+        history = EventHistory(
+            [_event(0, 0), _event(10, 600), _event(50, 600 + 7200)]
+        )
+
+        buckets = history.counter_deltas(interval=3600, max_gap=3600)
+
+        # The increase across the gap is unknown, and left out.
+        assert list(buckets["delta"]) == [10, 0, 0]
+        assert list(buckets["covered"]) == [600, 0, 0]
+        assert np.isnan(buckets["rate"][1])
+
+    def test_metrics(self):
+        history = EventHistory(
+            [
+                _event(1, 0),
+                _event(3, 60),
+                _event(7, 0, event_type="objectPresentCount"),
+            ]
+        )
+
+        buckets = history.counter_deltas(3600, metrics=["touch_count"])
+        assert list(buckets["metric"]) == ["touch_count"]
+
+        buckets = history.counter_deltas(3600)
+        assert list(buckets["metric"]) == [
+            "object_present_count",
+            "touch_count",
+        ]
+
+        with pytest.raises(dterrors.ConfigurationError):
+            history.counter_deltas(3600, metrics=["temperature"])
+
+    def test_empty(self):
+        buckets = EventHistory().counter_deltas(interval=3600)
+        assert all(len(column) == 0 for column in buckets.values())
+
+
+class TestCounterTracker:
+    def test_deltas(self):
+        tracker = disruptive.CounterTracker(interval=3600)
+
+        assert tracker.add(_event(10, 0)) is None
+        assert tracker.add(_event(16, 1800)) == 6
+        assert tracker.add(_event(4, 5400)) == 4
+        assert tracker.resets == 1
+
+        deltas = tracker.deltas()[("d1", "touch_count")]
+        assert deltas == {
+            START: pytest.approx(8),
+            START + timedelta(hours=1): pytest.approx(2),
+        }
+        rates = tracker.rates()[("d1", "touch_count")]
+        assert rates[START] == pytest.approx(8 / 3600)
+
+    def test_max_gap_and_order(self):
+        tracker = disruptive.CounterTracker(max_gap=600)
+
+        tracker.add(_event(0, 0))
+        assert tracker.add(_event(10, 3600)) is None
+        assert tracker.add(_event(5, 60)) is None
+        assert tracker.skipped == 1
+        assert tracker.add(_event(12, 3660)) == 2
+
+    def test_same_time(self):
+        tracker = disruptive.CounterTracker()
+
+        tracker.add(_event(1, 0))
+        assert tracker.add(_event(3, 0)) == 2
+        assert tracker.deltas()[("d1", "touch_count")] == {START: 2}
+        assert tracker.rates()[("d1", "touch_count")] == {}
+
+    def test_max_buckets(self):
+        tracker = disruptive.CounterTracker(interval=60, max_buckets=3)
+
+        for i in range(10):
+            tracker.add(_event(i, i * 60))
+
+        deltas = tracker.deltas()[("d1", "touch_count")]
+        assert len(deltas) == 3
+        assert min(deltas) == START + timedelta(minutes=6)
+
+    def test_follow(self):
+        tracker = disruptive.CounterTracker(metrics=["object_present_count"])
+        events = [_event(1, 0), _event(3, 60)]
+
+        assert list(tracker.follow(events)) == events
+        assert tracker.readings == 0
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.CounterTracker(interval=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.CounterTracker(max_gap=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.CounterTracker(max_buckets=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.CounterTracker(metrics=["co2"])
@@ -0,0 +1,74 @@
+from unittest import mock
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+import tests.api_responses as dtapiresponses
+from disruptive.events.events import Event
+
+
+class TestEventDeduplicator:
+    def test_seen(self):
+        dedup = disruptive.EventDeduplicator()
+
+        assert not dedup.seen("e1")
+        assert dedup.seen("e1")
+        assert not dedup.seen("e2")
+
+        assert "e1" in dedup
+        assert "e3" not in dedup
+        assert len(dedup) == 2
+        assert dedup.hits == 1
+        assert dedup.misses == 2
+        assert dedup.hit_rate == 1 / 3
+
+    def test_max_size(self):
+        dedup = disruptive.EventDeduplicator(max_size=4)
+
+        for i in range(100):
+            dedup.seen(f"e{i}")
+            assert len(dedup) <= 4
+
+        # The most recent half of max_size is always remembered.
+        assert "e98" in dedup and "e99" in dedup
+        assert "e0" not in dedup
+        assert dedup.rotations == 50
+
+    def test_window(self):
+        with mock.patch("time.monotonic", return_value=0):
+            dedup = disruptive.EventDeduplicator(window=10)
+            dedup.seen("e1")
+
+        # Remembered for at least one window.
+        with mock.patch("time.monotonic", return_value=15):
+            assert dedup.seen("e1")
+        with mock.patch("time.monotonic", return_value=25):
+            assert "e1" in dedup
+
+        # Forgotten once it has not been seen for two windows.
+        with mock.patch("time.monotonic", return_value=35):
+            assert "e1" not in dedup
+            assert len(dedup) == 0
+
+    def test_discard(self):
+        dedup = disruptive.EventDeduplicator()
+        dedup.seen("e1")
+        dedup.discard("e1")
+
+        assert not dedup.seen("e1")
+
+    def test_filter(self):
+        events = Event.from_mixed_list(
+            dtapiresponses.event_history_each_type["events"]
+        )
+        dedup = disruptive.EventDeduplicator()
+
+        assert len(list(dedup.filter(events))) == len(events)
+        assert list(dedup.filter(events)) == []
+
+    def test_configuration(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.EventDeduplicator(window=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.EventDeduplicator(max_size=1)
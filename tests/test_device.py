@@ -1,9 +1,12 @@
 from unittest.mock import patch
 
+import pytest
+
 import disruptive
 import disruptive.errors as dterrors
 import disruptive.events.events as dtevents
 import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
 
 
 class TestDevice:
@@ -389,3 +392,147 @@ class TestDevice:
             device_dict = dtapiresponses.temperature_sensor
             device_dict["reported"] = event["data"]
             _ = disruptive.Device(device_dict)
+
+    def test_batch_update_labels_chunked(self, request_mock):
+        # Fail the device named "bad" in whichever chunk it is sent.
+        def side_effect_override(**kwargs):
+            errors = [
+                {
+                    "device": name,
+                    "status": {"code": "NOT_FOUND", "message": "not found"},
+                }
+                for name in kwargs["json"]["devices"]
+                if name.endswith("/bad")
+            ]
+            return RequestsReponseMock({"batchErrors": errors}, 200, {})
+
+        request_mock.request_patcher.side_effect = side_effect_override
+
+        progress = []
+        errors = disruptive.Device.batch_update_labels(
+            device_ids=["d1", "d2", "bad", "d4", "d5"],
+            project_id="project_id",
+            set_labels={"key": "value"},
+            chunk_size=2,
+            max_workers=1,
+            progress_callback=lambda done, total: progress.append(done),
+        )
+
+        # Verify the last chunk contains the remaining device.
+        url = disruptive.base_url + "/projects/project_id/devices:batchUpdate"
+        request_mock.assert_requested(
+            method="POST",
+            url=url,
+            body={
+                "devices": ["projects/project_id/devices/d5"],
+                "addLabels": {"key": "value"},
+            },
+        )
+
+        # One request per chunk, errors merged into a single list.
+        request_mock.assert_request_count(3)
+        assert [e.device_id for e in errors] == ["bad"]
+        assert progress == [2, 4, 5]
+
+    def test_batch_update_labels_parallel(self, request_mock):
+        request_mock.json = {"batchErrors": []}
+
+        device_ids = [f"d{i}" for i in range(20)]
+        errors = disruptive.Device.batch_update_labels(
+            device_ids=device_ids,
+            project_id="project_id",
+            remove_labels=["key"],
+            chunk_size=3,
+            max_workers=4,
+        )
+
+        # Every device should have been sent exactly once.
+        sent = []
+        for call in request_mock.request_patcher.call_args_list:
+            sent += [d.split("/")[-1] for d in call.kwargs["json"]["devices"]]
+        assert sorted(sent) == sorted(device_ids)
+        request_mock.assert_request_count(7)
+        assert errors == []
+
+    def test_batch_update_labels_chunk_attempts(self, request_mock):
+        # Let d2 time out once, then succeed.
+        responses = [
+            {
+                "batchErrors": [
+                    {
+                        "device": "projects/project_id/devices/d2",
+                        "status": {
+                            "code": "INTERNAL_ERROR",
+                            "message": "Operation timed out.",
+                        },
+                    }
+                ]
+            },
+            {"batchErrors": []},
+        ]
+        request_mock.request_patcher.side_effect = lambda **kwargs: (
+            RequestsReponseMock(responses.pop(0), 200, {})
+        )
+
+        errors = disruptive.Device.batch_update_labels(
+            device_ids=["d1", "d2"],
+            project_id="project_id",
+            set_labels={"key": "value"},
+            chunk_attempts=2,
+        )
+
+        # Only the failed device should be resubmitted.
+        url = disruptive.base_url + "/projects/project_id/devices:batchUpdate"
+        request_mock.assert_requested(
+            method="POST",
+            url=url,
+            body={
+                "devices": ["projects/project_id/devices/d2"],
+                "addLabels": {"key": "value"},
+            },
+        )
+        request_mock.assert_request_count(2)
+        assert errors == []
+
+    def test_transfer_devices_chunk_failure(self, request_mock):
+        # Make the chunk containing d3 fail with a server error.
+        def side_effect_override(**kwargs):
+            devices = kwargs["json"]["devices"]
+            if "projects/source_project/devices/d3" in devices:
+                return RequestsReponseMock({}, 503, {})
+            return RequestsReponseMock({"transferErrors": []}, 200, {})
+
+        request_mock.request_patcher.side_effect = side_effect_override
+
+        errors = disruptive.Device.transfer_devices(
+            device_ids=["d1", "d2", "d3", "d4"],
+            source_project_id="source_project",
+            target_project_id="target_project",
+            chunk_size=2,
+            max_workers=1,
+        )
+
+        # The failed chunk is reported per device instead of raised.
+        assert sorted(e.device_id for e in errors) == ["d3", "d4"]
+        for e in errors:
+            assert isinstance(e, dterrors.TransferDeviceError)
+            assert e.project_id == "source_project"
+            assert e.status_code == "INTERNAL_ERROR"
+
+        # The failed chunk was retried as any other request.
+        request_mock.assert_request_count(2 + disruptive.request_attempts)
+
+    def test_transfer_devices_chunk_usage_error(self, request_mock):
+        request_mock.status_code = 403
+
+        # Usage errors would fail every chunk, so they are raised.
+        with pytest.raises(dterrors.Forbidden):
+            disruptive.Device.transfer_devices(
+                device_ids=["d1", "d2", "d3", "d4"],
+                source_project_id="source_project",
+                target_project_id="target_project",
+                chunk_size=2,
+                max_workers=1,
+            )
+
+        request_mock.assert_request_count(1)
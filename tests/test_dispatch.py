@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from tests.framework import make_event, make_labels_changed
+
+
+def _temperature(seconds, device_id="d1"):
+    return make_event(
+        "temperature",
+        {"value": 20, "isBackfilled": False, "samples": []},
+        seconds,
+        device_id,
+    )
+
+
+def _water(seconds, device_id="d1"):
+    return make_event("waterPresent", {"state": "PRESENT"}, seconds, device_id)
+
+
+class TestPriorityDispatcher:
+    def test_lanes(self):
+        handled = []
+        leaks = disruptive.Lane("leaks", event_types=["waterPresent"])
+
+        with disruptive.PriorityDispatcher(handled.append, [leaks]) as d:
+            assert d.submit(_water(0)) is leaks
+            assert d.submit(_temperature(0)).name == "bulk"
+            d.join()
+
+        assert len(handled) == 2
+        stats = d.stats()
+        assert list(stats) == ["leaks", "bulk"]
+        assert stats["leaks"]["handled"] == 1
+        assert stats["bulk"]["received"] == 1
+        assert stats["leaks"]["latency"]["inf"] == 0
+        assert d.submitted == 2
+
+    def test_not_starved(self):
+        # The bulk handler is stuck behind a flood of temperature events.
+        release = threading.Event()
+        leak_handled = threading.Event()
+        leaks = disruptive.Lane(
+            "leaks",
+            event_types=["waterPresent"],
+            handler=lambda event: leak_handled.set(),
+        )
+        dispatcher = disruptive.PriorityDispatcher(
+            lambda event: release.wait(),
+            [leaks],
+        )
+
+        for i in range(1000):
+            dispatcher.submit(_temperature(i))
+        dispatcher.submit(_water(0))
+
+        assert leak_handled.wait(timeout=5)
+        assert dispatcher.lane("bulk").depth >= 998
+        assert leaks.handled == 1
+
+        release.set()
+        dispatcher.close()
+        assert dispatcher.lane("bulk").handled == 1000
+
+    def test_labels(self):
+        handled = []
+        fridges = disruptive.Lane("fridges", label_filters={"fridge": ""})
+        site = disruptive.Lane(
+            "site",
+            predicate=lambda event, labels: labels.get("site") == "oslo",
+        )
+        dispatcher = disruptive.PriorityDispatcher(
+            handled.append,
+            [fridges, site],
+        )
+        dispatcher.seed(
+            [
+                disruptive.Device(
+                    {
+                        "name": "projects/p1/devices/d1",
+                        "type": "temperature",
+                        "labels": {"fridge": "1"},
+                        "reported": {},
+                    }
+                ),
+            ]
+        )
+
+        assert dispatcher.submit(_temperature(0, "d1")) is fridges
+        assert dispatcher.submit(_temperature(0, "d2")).name == "bulk"
+
+        # Labels are kept current by labelsChanged events.
+        dispatcher.submit(make_labels_changed("d2", {"site": "oslo"}))
+        assert dispatcher.submit(_temperature(1, "d2")) is site
+        dispatcher.close()
+
+        assert len(handled) == 4
+
+    def test_overflow(self):
+        release = threading.Event()
+        dispatcher = disruptive.PriorityDispatcher(
+            lambda event: release.wait(),
+            max_queue=2,
+            overflow="drop_oldest",
+        )
+
+        for i in range(10):
+            dispatcher.submit(_temperature(i))
+        release.set()
+        dispatcher.close()
+
+        bulk = dispatcher.lane("bulk")
+        assert bulk.received == 10
+        assert bulk.handled + bulk.dropped == 10
+        assert bulk.dropped >= 7
+
+    def test_handler_error(self):
+        def handler(event):
+            raise ValueError("handler")
+
+        with disruptive.PriorityDispatcher(handler) as dispatcher:
+            dispatcher.run([_temperature(0), _temperature(1)])
+
+        assert dispatcher.lane("bulk").errors == 2
+
+        with pytest.raises(dterrors.ConfigurationError):
+            dispatcher.submit(_temperature(2))
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Lane("a", workers=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Lane("a", max_queue=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Lane("a", overflow="spill")
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.PriorityDispatcher(
+                print,
+                [disruptive.Lane("a"), disruptive.Lane("a")],
+            )
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.PriorityDispatcher(print).lane("a")
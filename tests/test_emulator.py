@@ -62,6 +62,19 @@ class TestEmulator:
         # Assert output is None.
         assert d is None
 
+    def test_base_url_override(self, request_mock):
+        # Any base URL, such as a local stand-in, may replace the emulator.
+        dt.Emulator.delete_device(
+            device_id="device_id",
+            project_id="project_id",
+            base_url="http://localhost:8080/v2",
+        )
+
+        request_mock.assert_requested(
+            method="DELETE",
+            url="http://localhost:8080/v2/projects/project_id/devices/device_id",
+        )
+
     def test_publish_event(self, request_mock):
         project_id = "test_project"
         device_id = "test_device"
@@ -1,11 +1,14 @@
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from unittest import mock
 
 import pytest
 
 import disruptive
+import disruptive.errors as dterrors
 import tests.api_responses as dtapiresponses
 from disruptive.events.events import Event
+from tests.fakeserver import FakeServer
 
 
 class TestEventHistory:
@@ -44,6 +47,27 @@ class TestEventHistory:
         for e in h:
             assert isinstance(e, Event)
 
+    def test_list_events_deduplicator(self, request_mock):
+        request_mock.json = dtapiresponses.event_history_each_type
+        dedup = disruptive.EventDeduplicator()
+
+        first = disruptive.EventHistory.list_events(
+            "device_id",
+            "project_id",
+            deduplicator=dedup,
+        )
+        second = disruptive.EventHistory.list_events(
+            "device_id",
+            "project_id",
+            deduplicator=dedup,
+        )
+
+        # Overlapping fetches should only return events once.
+        events = dtapiresponses.event_history_each_type["events"]
+        assert len(first) == len(events)
+        assert len(second) == 0
+        assert dedup.hit_rate == 0.5
+
     def test_to_pandas_polars(self, request_mock):
         cols = ["device_id", "event_id", "event_type"]
 
@@ -161,3 +185,157 @@ class TestEventHistory:
                 with mock.patch(patch, side_effect=ModuleNotFoundError):
                     with pytest.raises(ModuleNotFoundError):
                         test.give_events.to_polars()
+
+
+@pytest.fixture()
+def server():
+    with FakeServer(page_size=5, seed=1) as server:
+        disruptive.default_auth = server.auth()
+        yield server
+
+    disruptive.default_auth = disruptive.Auth.unauthenticated()
+
+
+class TestEventHistoryMany:
+    def test_list_events_many(self, server):
+        device_ids = server.add_devices("project_id", 20)
+        for device_id in device_ids:
+            server.add_history("project_id", device_id, 10)
+
+        history = disruptive.EventHistory.list_events_many(
+            "project_id",
+            device_ids=device_ids,
+            start_time="2022-01-01T00:00:00Z",
+            end_time="2022-01-02T00:00:00Z",
+            max_workers=4,
+            base_url=server.base_url,
+        )
+
+        assert len(history) == 200
+        assert history.errors == {}
+        assert {e.device_id for e in history} == set(device_ids)
+
+        # Each device is paginated by its worker.
+        assert server.requests["list_events"] == 40
+
+    def test_label_filters(self, server):
+        in_room = server.add_devices("project_id", 5, labels={"room": "1"})
+        others = server.add_devices("project_id", 5, labels={"room": "2"})
+        for device_id in in_room + others:
+            server.add_history("project_id", device_id, 3)
+
+        history = disruptive.EventHistory.list_events_many(
+            "project_id",
+            label_filters={"room": "1"},
+            start_time="2022-01-01T00:00:00Z",
+            base_url=server.base_url,
+        )
+
+        assert {e.device_id for e in history} == set(in_room)
+
+    def test_per_device_errors(self, server):
+        device_ids = server.add_devices("project_id", 20)
+        for device_id in device_ids:
+            server.add_history("project_id", device_id, 3)
+        server.error_rate = 0.5
+
+        history = disruptive.EventHistory.list_events_many(
+            "project_id",
+            device_ids=device_ids,
+            start_time="2022-01-01T00:00:00Z",
+            request_attempts=1,
+            base_url=server.base_url,
+        )
+
+        # Failed devices are reported without failing the others.
+        assert len(history.errors) > 0
+        assert all(
+            isinstance(e, dterrors.InternalServerError)
+            for e in history.errors.values()
+        )
+        succeeded = {e.device_id for e in history}
+        assert succeeded | set(history.errors) == set(device_ids)
+        assert len(history) == 3 * len(succeeded)
+
+    def test_iter_events_many(self, server):
+        device_ids = server.add_devices("project_id", 3)
+        for device_id in device_ids:
+            server.add_history("project_id", device_id, 2)
+
+        results = list(
+            disruptive.EventHistory.iter_events_many(
+                "project_id",
+                device_ids=device_ids,
+                start_time="2022-01-01T00:00:00Z",
+                max_workers=1,
+                base_url=server.base_url,
+            )
+        )
+
+        assert [r[0] for r in results] == device_ids
+        assert all(len(r[1]) == 2 and r[2] is None for r in results)
+
+    def test_iter_events_lazy(self, server):
+        device_id = server.add_devices("project_id", 1)[0]
+        server.add_history("project_id", device_id, 12)
+
+        events = disruptive.EventHistory.iter_events(
+            device_id,
+            "project_id",
+            start_time="2022-01-01T00:00:00Z",
+            base_url=server.base_url,
+        )
+        first = [next(events) for _ in range(5)]
+
+        # The next page is only requested once the first is consumed.
+        assert server.requests["list_events"] == 1
+        assert len(first + list(events)) == 12
+        assert server.requests["list_events"] == 3
+
+    def test_merge(self, server):
+        device_ids = server.add_devices("project_id", 3)
+        for i, device_id in enumerate(device_ids):
+            server.add_history(
+                "project_id",
+                device_id,
+                10,
+                start=datetime(2022, 1, 1, 0, 0, i, tzinfo=timezone.utc),
+            )
+
+        merged = disruptive.EventHistory.merge(
+            disruptive.EventHistory.iter_events(
+                device_id,
+                "project_id",
+                start_time="2022-01-01T00:00:00Z",
+                base_url=server.base_url,
+            )
+            for device_id in device_ids
+        )
+        first = next(merged)
+
+        # Only the first page of each device is needed to start.
+        assert first.device_id == device_ids[0]
+        assert server.requests["list_events"] == 3
+
+        events = [first] + list(merged)
+        assert len(events) == 30
+        assert [e.device_id for e in events[:6]] == device_ids * 2
+        timestamps = [e.timestamp for e in events]
+        assert timestamps == sorted(timestamps)
+
+    def test_merge_reverse(self):
+        events = Event.from_mixed_list(
+            dtapiresponses.event_history_each_type["events"]
+        )
+        newest_first = sorted(events, key=lambda e: e.timestamp)[::-1]
+
+        merged = list(
+            disruptive.EventHistory.merge(
+                [newest_first[::2], newest_first[1::2]],
+                reverse=True,
+            )
+        )
+
+        assert [e.timestamp for e in merged] == [
+            e.timestamp for e in newest_first
+        ]
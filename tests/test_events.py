@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from dataclasses import dataclass
 
 import disruptive
@@ -242,3 +242,18 @@ class TestEvents:
 
             y = eval(repr(x))
             assert x._raw == y._raw
+
+    def test_event_timestamp(self):
+        event = disruptive.events.Event(
+            {
+                "eventId": "e1",
+                "eventType": "touch",
+                "targetName": "projects/p1/devices/d1",
+                "data": {"touch": {"updateTime": "2022-01-01T00:00:01Z"}},
+                "timestamp": "2022-01-01T00:00:02Z",
+            }
+        )
+
+        # The event timestamp is preferred over the data timestamp.
+        want = datetime(2022, 1, 1, 0, 0, 2, tzinfo=timezone.utc)
+        assert event.timestamp == want
@@ -0,0 +1,167 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from tests.fakeserver import FakeServer
+
+
+@pytest.fixture()
+def server():
+    with FakeServer(page_size=100, seed=1) as server:
+        disruptive.default_auth = server.auth()
+        yield server
+
+    disruptive.default_auth = disruptive.Auth.unauthenticated()
+
+
+class TestFakeServer:
+    def test_list_devices_paginated(self, server):
+        server.add_devices("project_id", 250, labels={"room": "1"})
+        server.add_devices("project_id", 5, device_type="touch")
+
+        devices = disruptive.Device.list_devices(
+            "project_id",
+            base_url=server.base_url,
+        )
+        assert len(devices) == 255
+        assert server.requests["list_devices"] == 3
+
+        # Filters are applied by the server.
+        devices = disruptive.Device.list_devices(
+            "project_id",
+            device_types=["touch"],
+            base_url=server.base_url,
+        )
+        assert len(devices) == 5
+
+        devices = disruptive.Device.list_devices(
+            "project_id",
+            label_filters={"room": "1"},
+            base_url=server.base_url,
+        )
+        assert len(devices) == 250
+
+    def test_list_events(self, server):
+        device_id = server.add_devices("project_id", 1)[0]
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        server.add_history("project_id", device_id, 300, start=start)
+
+        history = disruptive.EventHistory.list_events(
+            device_id,
+            "project_id",
+            start_time=start + timedelta(minutes=10),
+            end_time=start + timedelta(minutes=260),
+            base_url=server.base_url,
+        )
+
+        assert len(history) == 250
+        assert history[0].data.timestamp == start + timedelta(minutes=10)
+        assert server.requests["list_events"] == 3
+
+    def test_batch_update_labels(self, server):
+        device_ids = server.add_devices("project_id", 3)
+
+        errors = disruptive.Device.batch_update_labels(
+            device_ids=device_ids + ["unknown"],
+            project_id="project_id",
+            set_labels={"room": "9"},
+            base_url=server.base_url,
+        )
+
+        assert [e.device_id for e in errors] == ["unknown"]
+        device = disruptive.Device.get_device(
+            device_ids[0],
+            "project_id",
+            base_url=server.base_url,
+        )
+        assert device.labels == {"room": "9"}
+
+    def test_emulator(self, server):
+        server.add_project("project_id")
+
+        device = disruptive.Emulator.create_device(
+            "project_id",
+            "temperature",
+            base_url=server.base_url,
+        )
+        assert device.is_emulated
+
+        disruptive.Emulator.publish_event(
+            device.device_id,
+            "project_id",
+            disruptive.events.Temperature(24),
+            base_url=server.base_url,
+        )
+        device = disruptive.Device.get_device(
+            device.device_id,
+            "project_id",
+            base_url=server.base_url,
+        )
+        assert device.reported.temperature.celsius == 24
+
+        disruptive.Emulator.delete_device(
+            device.device_id,
+            "project_id",
+            base_url=server.base_url,
+        )
+        with pytest.raises(dterrors.NotFound):
+            disruptive.Device.get_device(
+                device.device_id,
+                "project_id",
+                base_url=server.base_url,
+            )
+
+    def test_stream(self, server):
+        server.stream_rate = 200
+        server.add_devices("project_id", 10)
+
+        stream = disruptive.Stream.event_stream(
+            "project_id",
+            base_url=server.base_url,
+        )
+        events = list(itertools.islice(stream, 20))
+        stream.close()
+
+        assert len(events) == 20
+        assert all(e.event_type == "temperature" for e in events)
+
+    def test_error_injection(self, server):
+        server.error_rate = 1.0
+        server.add_project("project_id")
+
+        with pytest.raises(dterrors.InternalServerError):
+            disruptive.Project.get_project(
+                "project_id",
+                base_url=server.base_url,
+                request_attempts=1,
+            )
+        assert server.requests["get_project"] == 2
+
+    def test_throttle_injection(self, server):
+        server.throttle_rate = 0.5
+        server.add_devices("project_id", 500)
+
+        # Throttled requests carry Retry-After and are retried.
+        devices = disruptive.Device.list_devices(
+            "project_id",
+            base_url=server.base_url,
+            request_attempts=20,
+        )
+        assert len(devices) == 500
+        assert server.requests["list_devices"] > 5
+
+    def test_token_endpoint(self, server):
+        server.add_project("project_id")
+
+        auth = server.auth()
+        project = disruptive.Project.get_project(
+            "project_id",
+            base_url=server.base_url,
+            auth=auth,
+        )
+        assert project.project_id == "project_id"
+        assert auth.get_token() == "Bearer fake-access-token"
+        assert server.requests["token"] == 1
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Upper bound for the cumulative time spent importing the package.
+# Importing eagerly used to take ~100ms, while a lazy import takes ~2ms.
+IMPORT_TIME_BUDGET_US = 50_000
+
+
+def _run_python(code, env=None):
+    # Run in a fresh interpreter as the package is already imported here.
+    return subprocess.run(
+        [sys.executable, *code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+
+def _import_time_us():
+    result = _run_python(["-X", "importtime", "-c", "import disruptive"])
+    assert result.returncode == 0, result.stderr
+
+    # The last line reports the cumulative time of the top-level import.
+    for line in reversed(result.stderr.splitlines()):
+        if line.rstrip().endswith("| disruptive"):
+            return int(line.split("|")[1])
+
+    raise AssertionError("No import time reported for disruptive.")
+
+
+class TestImport:
+    def test_import_is_lazy(self):
+        result = _run_python(
+            [
+                "-c",
+                "import sys, disruptive; "
+                "print(','.join(m for m in sys.modules))",
+            ]
+        )
+        assert result.returncode == 0, result.stderr
+
+        # Neither the transport, resources, or events should be imported.
+        modules = result.stdout.strip().split(",")
+        for name in [
+            "requests",
+            "disruptive.authentication",
+            "disruptive.events.events",
+            "disruptive.resources.device",
+        ]:
+            assert name not in modules
+
+    def test_import_time_budget(self):
+        # Use the best of a few runs to reduce noise from the machine.
+        best = min(_import_time_us() for _ in range(3))
+        assert best < IMPORT_TIME_BUDGET_US
+
+    def test_lazy_attributes(self):
+        import disruptive
+
+        # Lazily imported names should resolve to the real objects.
+        from disruptive.events.events import Temperature, TOUCH
+        from disruptive.resources.device import Device
+
+        assert disruptive.Device is Device
+        assert disruptive.events.Temperature is Temperature
+        assert disruptive.events.TOUCH == TOUCH
+
+        # Lazy names should be discoverable.
+        for name in ["Device", "events", "default_auth"]:
+            assert name in dir(disruptive)
+
+        # Events are only reached through their module.
+        assert "Temperature" not in dir(disruptive)
+
+    def test_unknown_attribute(self):
+        import disruptive
+
+        with pytest.raises(AttributeError):
+            disruptive.NotAnAttribute
+
+    def test_default_auth_deferred(self):
+        # A missing credentials file should not fail the import itself,
+        # only the first access of the default authentication object.
+        env = {"DT_CREDENTIALS_FILE": "/path/that/does/not/exist.json"}
+
+        result = _run_python(["-c", "import disruptive"], env)
+        assert result.returncode == 0, result.stderr
+
+        result = _run_python(
+            ["-c", "import disruptive; disruptive.default_auth"],
+            env,
+        )
+        assert "FileNotFoundError" in result.stderr
+
+    def test_default_auth_from_environment(self):
+        env = {
+            "DT_SERVICE_ACCOUNT_KEY_ID": "key_id",
+            "DT_SERVICE_ACCOUNT_SECRET": "secret",
+            "DT_SERVICE_ACCOUNT_EMAIL": "email",
+        }
+
+        result = _run_python(
+            [
+                "-c",
+                "import disruptive; "
+                "print(type(disruptive.default_auth).__name__)",
+            ],
+            env,
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "ServiceAccountAuth"
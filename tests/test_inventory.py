@@ -0,0 +1,163 @@
+import copy
+from datetime import datetime, timezone
+
+import disruptive
+import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
+
+SMALL = "c15j9p094l47cdv0o3pg"
+EMPTY = "c10humqoss90036gu876"
+
+TAKEN = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def _api(**kwargs):
+    url = kwargs["url"]
+    if url.endswith(f"/projects/{EMPTY}/members"):
+        return RequestsReponseMock({}, 403, {})
+    if url.endswith("/projects"):
+        return RequestsReponseMock(dtapiresponses.projects, 200, {})
+    if url.endswith("/devices"):
+        response = dtapiresponses.paginated_device_response
+    elif url.endswith("/dataconnectors"):
+        response = dtapiresponses.paginated_data_connectors_response
+    elif url.endswith("/members"):
+        response = dtapiresponses.members
+    else:
+        response = dtapiresponses.service_accounts
+    if EMPTY in url:
+        response = {
+            key: "" if key == "nextPageToken" else [] for key in response
+        }
+    return RequestsReponseMock(response, 200, {})
+
+
+def _snapshot(**categories):
+    return disruptive.InventorySnapshot(TAKEN, **categories)
+
+
+def _device(project="p1", labels=None):
+    return {"project": project, "type": "touch", "labels": labels or {}}
+
+
+class TestInventorySnapshot:
+    def test_take(self, request_mock):
+        request_mock.request_patcher.side_effect = _api
+
+        snapshot = disruptive.InventorySnapshot.take()
+
+        assert list(snapshot.projects) == sorted([SMALL, EMPTY])
+        assert snapshot.projects[EMPTY]["inventory"] is True
+        assert len(snapshot.devices) == len(
+            dtapiresponses.paginated_device_response["devices"]
+        )
+        assert len(snapshot.data_connectors) == 2
+        assert len(snapshot.service_accounts) == 2
+        assert list(snapshot.members) == [
+            f"{SMALL}/9201",
+            f"{SMALL}/c17n9hn915gg00c8ievg",
+        ]
+
+        # Secrets are not stored.
+        assert "some-very-good-secret" not in str(snapshot.to_dict())
+
+        # The failed listing is recorded instead of raised.
+        assert len(snapshot.errors) == 1
+        assert snapshot.errors[0]["project"] == EMPTY
+        assert snapshot.errors[0]["category"] == "members"
+
+        # One listing of projects, then four per project.
+        request_mock.assert_request_count(9)
+
+    def test_project_ids(self, request_mock):
+        request_mock.request_patcher.side_effect = _api
+
+        snapshot = disruptive.InventorySnapshot.take(project_ids=[SMALL])
+
+        assert list(snapshot.projects) == [SMALL]
+        assert snapshot.errors == []
+
+    def test_serialise(self, tmp_path):
+        snapshot = _snapshot(
+            projects={"p1": {"name": "a"}},
+            devices={"d1": _device(labels={"room": "1"})},
+            errors=[{"project": "p1", "category": "members", "error": "e"}],
+        )
+
+        loaded = disruptive.InventorySnapshot.from_bytes(snapshot.to_bytes())
+        assert loaded.to_dict() == snapshot.to_dict()
+        assert loaded.taken == TAKEN
+
+        path = str(tmp_path / "inventory.json.gz")
+        snapshot.save(path)
+        assert disruptive.InventorySnapshot.load(path).devices == {
+            "d1": _device(labels={"room": "1"}),
+        }
+
+
+class TestInventoryDiff:
+    def test_diff(self):
+        old = _snapshot(
+            devices={
+                "d1": _device(labels={"room": "1", "floor": "2"}),
+                "d2": _device(),
+                "d3": _device(),
+            },
+            members={"p1/m1": {"project": "p1", "roles": ["user"]}},
+        )
+        new = _snapshot(
+            devices={
+                "d1": _device(labels={"room": "2", "site": "oslo"}),
+                "d3": _device(project="p2"),
+                "d4": _device(),
+            },
+            members={"p1/m1": {"project": "p1", "roles": ["admin"]}},
+        )
+
+        diff = old.diff(new)
+
+        assert diff
+        assert diff.devices == {
+            "added": ["d4"],
+            "removed": ["d2"],
+            "changed": ["d1", "d3"],
+        }
+        assert diff.labels == {
+            "d1": {
+                "added": {"site": "oslo"},
+                "modified": {"room": "2"},
+                "removed": ["floor"],
+            },
+        }
+        assert diff.members["changed"] == ["p1/m1"]
+        assert diff.summary()["devices"] == {
+            "added": 1,
+            "removed": 1,
+            "changed": 2,
+        }
+        assert not old.diff(copy.deepcopy(old))
+
+    def test_failed_listings(self):
+        old = _snapshot(devices={"d1": _device(), "d2": _device("p2")})
+        new = _snapshot(
+            devices={"d1": _device()},
+            errors=[{"project": "p2", "category": "devices", "error": "e"}],
+        )
+
+        # Devices of a project that failed to list are not removed.
+        assert not old.diff(new)
+
+    def test_failed_listing_moved_device(self):
+        old = _snapshot(devices={"d1": _device("p1"), "d2": _device("p1")})
+        new = _snapshot(
+            devices={"d1": _device("p2")},
+            errors=[{"project": "p1", "category": "devices", "error": "e"}],
+        )
+
+        # A device that moved out of the failed project is changed,
+        # not added, while the others in it are not removed.
+        assert old.diff(new).devices == {
+            "added": [],
+            "removed": [],
+            "changed": ["d1"],
+        }
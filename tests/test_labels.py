@@ -0,0 +1,291 @@
+import copy
+import threading
+
+import pytest
+
+import disruptive
+import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
+
+
+def _device(device_id, labels):
+    device = copy.deepcopy(dtapiresponses.touch_sensor)
+    device["name"] = f"projects/project_id/devices/{device_id}"
+    device["labels"] = labels
+    return disruptive.Device(device)
+
+
+class TestLabelPlan:
+    def test_create_groups_identical_diffs(self):
+        current = [
+            _device("d1", {"name": "a", "room": "1"}),
+            _device("d2", {"name": "b", "room": "1"}),
+            _device("d3", {"name": "c", "room": "2"}),
+            _device("d4", {"name": "d", "room": "3"}),
+        ]
+        desired = {
+            "d1": {"name": "a", "room": "2"},
+            "d2": {"name": "b", "room": "2"},
+            "d3": {"name": "c", "room": "2"},
+            "d4": {"name": "d", "room": "4"},
+            "unknown": {"room": "2"},
+        }
+
+        plan = disruptive.LabelPlan.create(desired, "project_id", current)
+
+        # Devices with the same diff share a batch, largest first.
+        assert [b.device_ids for b in plan.batches] == [["d1", "d2"], ["d4"]]
+        assert plan.batches[0].set_labels == {"room": "2"}
+        assert plan.batches[0].remove_labels == []
+        assert plan.unchanged == ["d3"]
+        assert plan.missing == ["unknown"]
+        assert plan.device_count == 3
+
+    def test_create_groups_identical_states(self):
+        # Each device differs from the desired state in a different way.
+        current = [
+            _device("d1", {"room": "1", "floor": "1"}),
+            _device("d2", {"room": "2", "old": "x"}),
+            _device("d3", {"floor": "3"}),
+        ]
+        desired = {
+            xid: {"room": "9", "floor": "9"} for xid in ["d1", "d2", "d3"]
+        }
+
+        plan = disruptive.LabelPlan.create(
+            desired,
+            "project_id",
+            current,
+            managed_keys=["room", "floor", "old"],
+        )
+
+        # A single call suffices, as setting equal values has no effect.
+        assert len(plan.batches) == 1
+        assert plan.batches[0].device_ids == ["d1", "d2", "d3"]
+        assert plan.batches[0].set_labels == {"floor": "9", "room": "9"}
+        assert plan.batches[0].remove_labels == ["old"]
+
+    def test_managed_keys(self):
+        current = [_device("d1", {"name": "a", "room": "1", "old": "x"})]
+
+        # Without managed keys, labels are never removed.
+        plan = disruptive.LabelPlan.create({"d1": {}}, "project_id", current)
+        assert plan.batches == []
+        assert plan.unchanged == ["d1"]
+
+        # Unmanaged keys are kept even if not desired.
+        plan = disruptive.LabelPlan.create(
+            {"d1": {"room": "1"}},
+            "project_id",
+            current,
+            managed_keys=["room", "old"],
+        )
+        assert plan.batches[0].set_labels == {}
+        assert plan.batches[0].remove_labels == ["old"]
+
+    def test_create_fetches_current(self, request_mock):
+        request_mock.json = copy.deepcopy(
+            dtapiresponses.paginated_device_response
+        )
+
+        plan = disruptive.LabelPlan.create(
+            {"c0pppd1qdqebrvv1iqp0": {"name": "temperature"}},
+            "project_id",
+        )
+
+        request_mock.assert_request_count(1)
+        assert plan.unchanged == ["c0pppd1qdqebrvv1iqp0"]
+
+    def test_apply(self, request_mock):
+        def side_effect_override(**kwargs):
+            # Fail d4 to verify errors are merged across batches.
+            errors = [
+                {
+                    "device": name,
+                    "status": {"code": "NOT_FOUND", "message": "not found"},
+                }
+                for name in kwargs["json"]["devices"]
+                if name.endswith("/d4")
+            ]
+            return RequestsReponseMock({"batchErrors": errors}, 200, {})
+
+        request_mock.request_patcher.side_effect = side_effect_override
+
+        current = [_device(f"d{i}", {"room": "1"}) for i in range(5)]
+        desired = {f"d{i}": {"room": "2"} for i in range(4)}
+        desired["d4"] = {}
+
+        plan = disruptive.LabelPlan.create(
+            desired,
+            "project_id",
+            current,
+            managed_keys=["room"],
+        )
+
+        progress = []
+        errors = plan.apply(
+            max_workers=1,
+            progress_callback=lambda done, total: progress.append(done),
+        )
+
+        # One request per batch.
+        url = disruptive.base_url + "/projects/project_id/devices:batchUpdate"
+        request_mock.assert_requested(
+            method="POST",
+            url=url,
+            body={
+                "devices": ["projects/project_id/devices/d4"],
+                "removeLabels": ["room"],
+            },
+        )
+        request_mock.assert_request_count(2)
+        assert [e.device_id for e in errors] == ["d4"]
+        assert progress == [4, 5]
+
+
+class TestLabelWriteBuffer:
+    def test_coalescing(self, request_mock):
+        request_mock.json = {"batchErrors": []}
+
+        # A long window, such that only explicit flushes send requests.
+        buffer = disruptive.LabelWriteBuffer(window=60)
+        futures = [
+            buffer.set_label("d1", "project_id", "room", "1"),
+            buffer.set_label("d1", "project_id", "room", "2"),
+            buffer.remove_label("d1", "project_id", "old"),
+            buffer.set_label("d2", "project_id", "room", "2"),
+            buffer.remove_label("d2", "project_id", "old"),
+        ]
+        request_mock.assert_request_count(0)
+
+        buffer.flush()
+
+        # Collapsed changes of both devices should be sent together.
+        url = disruptive.base_url + "/projects/project_id/devices:batchUpdate"
+        request_mock.assert_requested(
+            method="POST",
+            url=url,
+            body={
+                "devices": [
+                    "projects/project_id/devices/d1",
+                    "projects/project_id/devices/d2",
+                ],
+                "addLabels": {"room": "2"},
+                "removeLabels": ["old"],
+            },
+        )
+        request_mock.assert_request_count(1)
+        assert [f.result() for f in futures] == [[]] * 5
+
+        buffer.close()
+
+    def test_futures_resolve_per_device(self, request_mock):
+        request_mock.json = {
+            "batchErrors": [
+                {
+                    "device": "projects/project_id/devices/d2",
+                    "status": {"code": "NOT_FOUND", "message": "not found"},
+                }
+            ]
+        }
+
+        with disruptive.LabelWriteBuffer(window=60) as buffer:
+            f1 = buffer.set_label("d1", "project_id", "room", "1")
+            f2 = buffer.set_label("d2", "project_id", "room", "1")
+            f3 = buffer.set_label("d3", "project_id", "other", "1")
+
+        # Exiting the context should flush, one request per change group.
+        request_mock.assert_request_count(2)
+        assert f1.result() == []
+        assert [e.device_id for e in f2.result()] == ["d2"]
+        assert f3.result() == []
+
+    def test_request_error(self, request_mock):
+        request_mock.status_code = 403
+
+        with disruptive.LabelWriteBuffer(window=60) as buffer:
+            future = buffer.remove_label("d1", "project_id", "room")
+
+        assert isinstance(future.exception(), disruptive.errors.Forbidden)
+
+    def test_window(self, request_mock):
+        request_mock.json = {"batchErrors": []}
+
+        buffer = disruptive.LabelWriteBuffer(window=0.01)
+        future = buffer.set_label("d1", "project_id", "room", "1")
+
+        # The window should flush without an explicit call.
+        assert future.result(timeout=5) == []
+        request_mock.assert_request_count(1)
+
+        buffer.close()
+
+    def test_windows_sent_in_order(self, request_mock):
+        started = threading.Event()
+        release = threading.Event()
+        sent = []
+
+        def api(**kwargs):
+            # Hold the first request in flight until released.
+            if not started.is_set():
+                started.set()
+                release.wait(timeout=5)
+            sent.append(kwargs["json"])
+            return RequestsReponseMock({"batchErrors": []}, 200, {})
+
+        request_mock.request_patcher.side_effect = api
+
+        buffer = disruptive.LabelWriteBuffer(window=0.01)
+        first = buffer.set_label("d1", "project_id", "room", "1")
+        assert started.wait(timeout=5)
+
+        # The next window closes while the first is still in flight.
+        second = buffer.remove_label("d1", "project_id", "room")
+        threading.Event().wait(0.05)
+        release.set()
+
+        assert first.result(timeout=5) == []
+        assert second.result(timeout=5) == []
+        assert [body.get("removeLabels") for body in sent] == [
+            None,
+            ["room"],
+        ]
+
+        buffer.close()
+
+    def test_flush_waits_for_window(self, request_mock):
+        started = threading.Event()
+        release = threading.Event()
+
+        def api(**kwargs):
+            started.set()
+            release.wait(timeout=5)
+            return RequestsReponseMock({"batchErrors": []}, 200, {})
+
+        request_mock.request_patcher.side_effect = api
+
+        buffer = disruptive.LabelWriteBuffer(window=0.01)
+        future = buffer.set_label("d1", "project_id", "room", "1")
+        assert started.wait(timeout=5)
+
+        # The window took the change, but flush should still wait for it.
+        flushed = threading.Event()
+        thread = threading.Thread(
+            target=lambda: (buffer.flush(), flushed.set())
+        )
+        thread.start()
+        assert not flushed.wait(0.05)
+
+        release.set()
+        thread.join(timeout=5)
+        assert flushed.is_set()
+        assert future.done()
+
+        buffer.close()
+
+    def test_closed(self, request_mock):
+        buffer = disruptive.LabelWriteBuffer()
+        buffer.close()
+
+        with pytest.raises(RuntimeError):
+            buffer.set_label("d1", "project_id", "room", "1")
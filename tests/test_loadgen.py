@@ -0,0 +1,110 @@
+import copy
+import itertools
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
+
+
+def _emulator_side_effect():
+    # Created devices get unique IDs and the requested type.
+    counter = itertools.count()
+
+    def side_effect(**kwargs):
+        if kwargs["method"] == "POST" and kwargs["url"].endswith("/devices"):
+            device = copy.deepcopy(dtapiresponses.created_temperature_emulator)
+            device["name"] = f"projects/project_id/devices/emu{next(counter)}"
+            device["type"] = kwargs["json"]["type"]
+            return RequestsReponseMock(device, 200, {})
+        return RequestsReponseMock({}, 200, {})
+
+    return side_effect
+
+
+class TestLoadGenerator:
+    def test_create_fleet(self, request_mock):
+        request_mock.request_patcher.side_effect = _emulator_side_effect()
+
+        load = disruptive.LoadGenerator(
+            project_id="project_id",
+            rate=100,
+            event_types={"temperature": 3, "touch": 1},
+        )
+        devices = load.create_fleet(8)
+
+        # Devices should be distributed by the weight of the mix.
+        assert len(devices) == 8
+        assert len(load.devices["temperature"]) == 6
+        assert len(load.devices["touch"]) == 2
+        assert {d.device_type for d in devices} == {"temperature", "touch"}
+
+        load.delete_fleet()
+        request_mock.assert_request_count(16)
+        assert load.devices == {}
+
+    def test_run(self, request_mock):
+        request_mock.request_patcher.side_effect = _emulator_side_effect()
+
+        load = disruptive.LoadGenerator(
+            project_id="project_id",
+            rate=1000,
+            event_types={"temperature": 1, "co2": 1},
+            seed=1,
+            base_url="http://localhost:8080/v2",
+        )
+        load.create_fleet(4)
+        report = load.run(count=50)
+
+        # All events should be published to the configured base URL.
+        publishes = [
+            call.kwargs
+            for call in request_mock.request_patcher.call_args_list
+            if call.kwargs["url"].endswith(":publish")
+        ]
+        assert len(publishes) == 50
+        for kwargs in publishes:
+            assert kwargs["url"].startswith("http://localhost:8080/v2/")
+            assert list(kwargs["json"])[0] in ["temperature", "co2"]
+
+        assert report.sent == 50
+        assert report.failed == 0
+        assert report.achieved_rate > 0
+        assert set(report.latency) == {"p50", "p90", "p99", "max"}
+
+    def test_run_errors(self, request_mock):
+        request_mock.status_code = 404
+
+        load = disruptive.LoadGenerator("project_id", rate=1000)
+        load.use_devices(
+            [disruptive.Device(dtapiresponses.created_temperature_emulator)]
+        )
+        report = load.run(count=5)
+
+        assert report.sent == 0
+        assert report.failed == 5
+        assert report.errors == {"NotFound": 5}
+
+    def test_values_continue_per_device(self):
+        load = disruptive.LoadGenerator("project_id", rate=1, seed=1)
+
+        totals = [load._next_data("touchCount", "d1").total for _ in range(10)]
+        assert totals == sorted(totals)
+
+    def test_invalid_configuration(self, request_mock):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.LoadGenerator("project_id", rate=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.LoadGenerator(
+                "project_id", rate=1, event_types={"labelsChanged": 1}
+            )
+
+        # Running without a fleet or a stop condition is not possible.
+        load = disruptive.LoadGenerator("project_id", rate=1)
+        with pytest.raises(dterrors.ConfigurationError):
+            load.run(count=1)
+        load.devices["temperature"] = ["d1"]
+        with pytest.raises(dterrors.ConfigurationError):
+            load.run()
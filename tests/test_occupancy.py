@@ -0,0 +1,225 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+import disruptive.occupancy as dtoccupancy
+from disruptive.resources.eventhistory import EventHistory
+from tests.framework import START, make_event
+
+
+def _dt64(seconds):
+    return np.datetime64(
+        (START + timedelta(seconds=seconds)).replace(tzinfo=None),
+        "ns",
+    )
+
+
+def _event(state, seconds, device_id="d1", event_type="deskOccupancy"):
+    return make_event(
+        event_type,
+        {"state": state, "remarks": []},
+        seconds,
+        device_id,
+    )
+
+
+def _history(changes):
+    # Changes as (device, seconds, state), in any order.
+    return EventHistory(
+        [_event(state, seconds, device) for device, seconds, state in changes]
+    )
+
+
+class TestSessionize:
+    def test_intervals(self):
+        history = _history(
+            [
+                ("d1", 0, "OCCUPIED"),
+                ("d1", 600, "NOT_OCCUPIED"),
+                ("d2", 300, "OCCUPIED"),
+                ("d1", 300, "OCCUPIED"),
+                ("d1", 900, "OCCUPIED"),
+            ]
+        )
+
+        intervals = history.sessionize(end_time=START + timedelta(hours=1))
+
+        assert list(intervals) == dtoccupancy.SESSION_COLUMNS
+        assert list(intervals["device_id"]) == ["d1", "d1", "d1", "d2"]
+        assert list(intervals["state"]) == [
+            "OCCUPIED",
+            "NOT_OCCUPIED",
+            "OCCUPIED",
+            "OCCUPIED",
+        ]
+
+        # Repeated states are merged, and the last ends at end_time.
+        assert list(intervals["duration"]) == [600, 300, 2700, 3300]
+        assert intervals["start"][2] == _dt64(900)
+
+    def test_open_and_clipped(self):
+        history = _history(
+            [
+                ("d1", 0, "OCCUPIED"),
+                ("d1", 600, "NOT_OCCUPIED"),
+                ("d1", 1200, "OCCUPIED"),
+            ]
+        )
+
+        intervals = history.sessionize(start_time=START + timedelta(0, 900))
+
+        assert list(intervals["state"]) == ["NOT_OCCUPIED", "OCCUPIED"]
+        assert intervals["start"][0] == _dt64(900)
+        assert intervals["duration"][0] == 300
+        assert np.isnat(intervals["end"][1])
+        assert np.isnan(intervals["duration"][1])
+
+    def test_metrics(self):
+        history = EventHistory(
+            [
+                _event("PRESENT", 0, event_type="objectPresent"),
+                _event("MOTION_DETECTED", 0, event_type="motion"),
+                _event("OPEN", 0, event_type="contact"),
+            ]
+        )
+
+        intervals = history.sessionize(metrics=["motion"])
+        assert list(intervals["metric"]) == ["motion"]
+
+        intervals = history.sessionize()
+        assert sorted(intervals["metric"]) == ["motion", "object_present"]
+
+        with pytest.raises(dterrors.ConfigurationError):
+            history.sessionize(metrics=["contact"])
+
+    def test_empty(self):
+        intervals = EventHistory().sessionize()
+        assert all(len(column) == 0 for column in intervals.values())
+
+
+class TestUtilization:
+    def test_buckets(self):
+        history = _history(
+            [
+                ("d1", 0, "OCCUPIED"),
+                ("d1", 1800, "NOT_OCCUPIED"),
+                ("d1", 5400, "OCCUPIED"),
+                ("d2", 3600, "NOT_OCCUPIED"),
+            ]
+        )
+        intervals = history.sessionize()
+
+        buckets = dtoccupancy.utilization(
+            intervals,
+            interval=3600,
+            end_time=START + timedelta(hours=2),
+        )
+
+        assert list(buckets["device_id"]) == ["d1", "d1", "d2", "d2"]
+        assert list(buckets["occupied"]) == [1800, 1800, 0, 0]
+        assert list(buckets["observed"]) == [3600, 3600, 0, 3600]
+        assert buckets["utilization"][0] == 0.5
+
+        # Nothing is known about d2 before its first state change.
+        assert np.isnan(buckets["utilization"][2])
+        assert buckets["utilization"][3] == 0
+        assert buckets["bucket"][1] == _dt64(3600)
+
+    def test_groups(self):
+        history = _history(
+            [
+                ("d1", 0, "OCCUPIED"),
+                ("d2", 0, "NOT_OCCUPIED"),
+                ("d3", 0, "OCCUPIED"),
+            ]
+        )
+        intervals = history.sessionize(end_time=START + timedelta(hours=1))
+
+        buckets = dtoccupancy.utilization(
+            intervals,
+            interval=timedelta(hours=1),
+            groups={"d1": "floor-1", "d2": "floor-1"},
+        )
+
+        assert list(buckets["group"]) == ["floor-1"]
+        assert list(buckets["utilization"]) == [0.5]
+
+    def test_empty(self):
+        intervals = EventHistory().sessionize()
+        buckets = dtoccupancy.utilization(intervals, interval=3600)
+        assert len(buckets["utilization"]) == 0
+
+
+class TestOccupancyTracker:
+    def test_sessions(self):
+        closed = []
+        tracker = disruptive.OccupancyTracker(on_session=closed.append)
+
+        assert tracker.add(_event("OCCUPIED", 0)) is None
+        assert tracker.add(_event("OCCUPIED", 60)) is None
+        session = tracker.add(_event("NOT_OCCUPIED", 600))
+
+        assert session.state == "OCCUPIED"
+        assert session.occupied
+        assert session.end_time == START + timedelta(seconds=600)
+        assert closed == [session]
+        assert tracker.sessions == 1
+        assert [s.state for s in tracker.current()] == ["NOT_OCCUPIED"]
+
+        # Out of order state changes are skipped.
+        assert tracker.add(_event("OCCUPIED", 300)) is None
+        assert tracker.skipped == 1
+
+    def test_utilization(self):
+        tracker = disruptive.OccupancyTracker(interval=3600)
+
+        tracker.add(_event("OCCUPIED", 0))
+        tracker.add(_event("NOT_OCCUPIED", 1800))
+        tracker.add(_event("OCCUPIED", 5400))
+
+        assert tracker.utilization() == {
+            ("d1", "desk_occupancy"): {
+                START: 0.5,
+                START + timedelta(hours=1): 0.0,
+            },
+        }
+
+        # Ongoing sessions count until now.
+        utilization = tracker.utilization(now=START + timedelta(hours=2))
+        assert utilization[("d1", "desk_occupancy")] == {
+            START: 0.5,
+            START + timedelta(hours=1): 0.5,
+        }
+
+    def test_groups_and_max_buckets(self):
+        tracker = disruptive.OccupancyTracker(
+            interval=60,
+            groups={"d1": "room"},
+            max_buckets=2,
+        )
+
+        tracker.add(_event("OCCUPIED", 0, device_id="d1"))
+        tracker.add(_event("OCCUPIED", 0, device_id="d2"))
+        tracker.add(_event("NOT_OCCUPIED", 300, device_id="d1"))
+
+        utilization = tracker.utilization()
+        assert list(utilization) == [("room", "desk_occupancy")]
+        assert len(utilization[("room", "desk_occupancy")]) == 2
+
+    def test_follow(self):
+        tracker = disruptive.OccupancyTracker()
+        events = [_event("OCCUPIED", 0), _event("NOT_OCCUPIED", 60)]
+
+        assert list(tracker.follow(events)) == events
+        assert tracker.sessions == 1
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.OccupancyTracker(interval=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.OccupancyTracker(max_buckets=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.OccupancyTracker(metrics=["water_present"])
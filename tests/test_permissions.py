@@ -0,0 +1,180 @@
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+import disruptive.permissions as dtpermissions
+import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
+
+
+class FakePermissionApi:
+    def __init__(self, forbidden=()):
+        self.forbidden = set(forbidden)
+        self.urls = []
+
+    def __call__(self, **kwargs):
+        url = kwargs["url"].replace(disruptive.base_url, "")
+        self.urls.append(url)
+        if url in self.forbidden:
+            return RequestsReponseMock({}, 403, {})
+        if url.endswith("/permissions"):
+            response = dtapiresponses.project_permissions
+        elif url.endswith("/members"):
+            response = dtapiresponses.members
+        else:
+            response = dtapiresponses.paginated_device_response
+        return RequestsReponseMock(response, 200, {})
+
+
+@pytest.fixture
+def api(request_mock):
+    api = FakePermissionApi()
+    request_mock.request_patcher.side_effect = api
+    return api
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = disruptive.PermissionCache()
+    monkeypatch.setattr(disruptive, "permission_cache", cache)
+    return cache
+
+
+class TestRequiredPermission:
+    def test_required_permission(self):
+        tests = [
+            ("GET", "/projects/p1", ("projects/p1", "project.read")),
+            ("GET", "/projects/p1/devices", ("projects/p1", "sensor.read")),
+            (
+                "GET",
+                "/projects/p1/devices/d1/events",
+                ("projects/p1", "sensor.read"),
+            ),
+            (
+                "POST",
+                "/projects/p1/devices:batchUpdate",
+                ("projects/p1", "sensor.update"),
+            ),
+            (
+                "POST",
+                "/projects/p1/dataconnectors/c1:sync",
+                ("projects/p1", "dataconnector.update"),
+            ),
+            (
+                "DELETE",
+                "/projects/p1/serviceaccounts/s1/keys/k1",
+                ("projects/p1", "serviceaccount.key.delete"),
+            ),
+            (
+                "PATCH",
+                "/organizations/o1/members/m1",
+                ("organizations/o1", "membership.update"),
+            ),
+            ("POST", "/projects/p1/devices:claim", None),
+            ("GET", "/projects/p1/permissions", None),
+            ("GET", "/projects/-/devices/d1", None),
+            ("GET", "/claimInfo?identifier=a", None),
+            ("POST", "/projects", None),
+        ]
+
+        for method, url, want in tests:
+            assert dtpermissions.required_permission(method, url) == want, (
+                method,
+                url,
+            )
+
+
+class TestPermissionCache:
+    def test_list_permissions(self, api, cache):
+        first = disruptive.Project.list_permissions("p1")
+        second = disruptive.Project.list_permissions("p1")
+        disruptive.Organization.list_permissions("o1")
+
+        assert first == second
+        assert set(first) == set(
+            dtapiresponses.project_permissions["permissions"]
+        )
+        assert api.urls == [
+            "/projects/p1/permissions",
+            "/organizations/o1/permissions",
+        ]
+        assert cache.hits == 1
+        assert cache.misses == 2
+        assert len(cache) == 2
+
+    def test_precheck(self, api, cache):
+        disruptive.Device.list_devices("p1")
+
+        # Members can not be read with the cached permissions.
+        with pytest.raises(dterrors.Forbidden):
+            disruptive.Project.list_members("p1")
+
+        assert api.urls == [
+            "/projects/p1/permissions",
+            "/projects/p1/devices",
+        ]
+        assert cache.stats() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 1,
+            "avoided": 1,
+            "hit_rate": 0.5,
+        }
+
+    def test_forbidden_invalidates(self, api, cache):
+        api.forbidden.add("/projects/p1/devices")
+
+        with pytest.raises(dterrors.Forbidden):
+            disruptive.Device.list_devices("p1")
+
+        assert len(cache) == 0
+        assert cache.avoided == 0
+
+    def test_without_prefetch(self, api, cache):
+        cache.prefetch = False
+
+        # Only permissions already listed are checked.
+        disruptive.Project.list_members("p1")
+        assert api.urls == ["/projects/p1/members"]
+
+        disruptive.Project.list_permissions("p1")
+        with pytest.raises(dterrors.Forbidden):
+            disruptive.Project.list_members("p1")
+
+        # The cache can be bypassed per call.
+        disruptive.Project.list_members("p1", permission_cache=None)
+        assert len(api.urls) == 3
+
+    def test_unavailable_permissions(self, api, cache):
+        # The request decides if permissions can not be fetched.
+        api.forbidden.add("/projects/p1/permissions")
+
+        disruptive.Project.list_members("p1")
+
+        assert api.urls[-1] == "/projects/p1/members"
+        assert len(cache) == 0
+
+    def test_ttl_and_invalidate(self, api, mocker):
+        cache = disruptive.PermissionCache(ttl=60, max_size=2)
+        now = mocker.patch("time.monotonic", return_value=0)
+
+        cache.get("projects/p1")
+        cache.get("projects/p1")
+        now.return_value = 61
+        cache.get("projects/p1")
+        assert cache.misses == 2
+
+        cache.put("projects/p2", ["sensor.read"])
+        cache.put("projects/p3", ["sensor.read"])
+        assert len(cache) == 2
+
+        cache.invalidate("projects/p3")
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.PermissionCache(ttl=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.PermissionCache(max_size=0)
@@ -0,0 +1,161 @@
+import copy
+import math
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+import tests.api_responses as dtapiresponses
+from tests.framework import RequestsReponseMock
+
+
+def _connector(project_id, connector_id):
+    connector = copy.deepcopy(dtapiresponses.simple_data_connector)
+    connector["name"] = f"projects/{project_id}/dataconnectors/{connector_id}"
+    return connector
+
+
+class FakeMetricsApi:
+    def __init__(self, connectors):
+        # Connector IDs per project, and counts per connector.
+        self.connectors = connectors
+        self.counts = {}
+        self.failing = set()
+        self.requests = 0
+
+    def __call__(self, **kwargs):
+        self.requests += 1
+        url = kwargs["url"].replace(disruptive.base_url, "")
+        parts = url.strip("/").split("/")
+        if url.endswith("/projects"):
+            projects = [
+                dict(dtapiresponses.small_project, name=f"projects/{p}")
+                for p in self.connectors
+            ]
+            body = {"nextPageToken": "", "projects": projects}
+        elif url.endswith("/dataconnectors"):
+            body = {
+                "nextPageToken": "",
+                "dataConnectors": [
+                    _connector(parts[1], xid)
+                    for xid in self.connectors[parts[1]]
+                ],
+            }
+        else:
+            xid = parts[3].split(":")[0]
+            if xid in self.failing:
+                return RequestsReponseMock({}, 500, {})
+            success, errors = self.counts.get(xid, (0, 0))
+            body = {
+                "metrics": {
+                    "successCount": success,
+                    "errorCount": errors,
+                    "latency99p": "0.250s",
+                }
+            }
+        return RequestsReponseMock(body, 200, {})
+
+
+@pytest.fixture
+def api(request_mock):
+    api = FakeMetricsApi({"p1": ["c1", "c2"], "p2": ["c3"]})
+    request_mock.request_patcher.side_effect = api
+    return api
+
+
+class TestMetricsPoller:
+    def test_poll(self, api):
+        poller = disruptive.MetricsPoller(project_ids=["p1", "p2"])
+        api.counts = {"c1": (90, 10), "c2": (0, 0), "c3": (5, 0)}
+
+        samples = poller.poll()
+
+        assert sorted(samples) == ["c1", "c2", "c3"]
+        assert samples["c1"].error_rate == 0.1
+        assert samples["c1"].latency == 0.25
+        assert math.isnan(samples["c2"].error_rate)
+        assert len(poller) == 3
+        assert poller.polls == 1
+        assert poller.requests == 3
+
+        # Listing Data Connectors is not repeated on every poll.
+        poller.poll()
+        assert api.requests == 2 + 6
+
+    def test_organization(self, api):
+        poller = disruptive.MetricsPoller(organization_id="o1")
+        assert sorted(poller.discover()) == ["c1", "c2", "c3"]
+
+    def test_history_and_deltas(self, api):
+        poller = disruptive.MetricsPoller(project_ids=["p1"], max_samples=3)
+
+        for i in range(5):
+            api.counts = {"c1": (100, i * 10)}
+            poller.poll()
+
+        # Only the most recent samples are kept, oldest first.
+        history = poller.history("c1")
+        assert [s.error_count for s in history] == [20, 30, 40]
+        assert history[-1] == poller.latest()["c1"]
+        assert [d[2] for d in poller.deltas("c1")] == [10, 10]
+        assert [d[1] for d in poller.deltas("c1")] == [0, 0]
+        assert poller.history("unknown") == []
+
+    def test_trend(self, api, mocker):
+        poller = disruptive.MetricsPoller(project_ids=["p1"])
+        now = mocker.patch("time.time", return_value=0)
+
+        for hour, errors in enumerate([0, 10, 20, 30]):
+            now.return_value = hour * 3600
+            api.counts = {"c1": (100 - errors, errors), "c2": (10, 0)}
+            poller.poll()
+
+        assert [rate for _, rate in poller.error_rates("c1")] == [
+            0,
+            0.1,
+            0.2,
+            0.3,
+        ]
+        assert poller.trend("c1") == pytest.approx(0.1)
+        assert poller.trend("c2") == 0
+
+        summary = poller.summary()
+        assert summary["c1"]["error_rate"] == 0.3
+        assert summary["c1"]["trend"] == pytest.approx(0.1)
+        assert summary["c1"]["samples"] == 4
+        assert summary["c2"]["project_id"] == "p1"
+
+    def test_failures_and_discovery(self, api):
+        poller = disruptive.MetricsPoller(
+            project_ids=["p1"],
+            discover_interval=0,
+        )
+        api.failing = {"c2"}
+
+        samples = poller.poll()
+
+        assert list(samples) == ["c1"]
+        assert poller.failures == 1
+        assert poller.summary()["c2"]["failures"] == 1
+
+        # Data Connectors that are gone are dropped with their history.
+        api.connectors["p1"] = ["c1"]
+        poller.poll()
+        assert len(poller) == 1
+
+    def test_schedule(self, api):
+        poller = disruptive.MetricsPoller(project_ids=["p1"], interval=60)
+
+        with poller:
+            poller.start()
+            poller.start()
+        assert poller._thread is None
+        assert poller.polls <= 1
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.MetricsPoller()
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.MetricsPoller(project_ids=["p1"], interval=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.MetricsPoller(project_ids=["p1"], max_samples=1)
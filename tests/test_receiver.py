@@ -0,0 +1,264 @@
+import io
+import copy
+import json
+import asyncio
+import hashlib
+import threading
+from wsgiref.util import setup_testing_defaults
+
+import disruptive
+from disruptive.authentication import create_jwt
+import tests.api_responses as dtapiresponses
+
+SECRET = "good-secret"
+
+
+def _body(event_id, event_type="temperature"):
+    events = dtapiresponses.event_history_each_type["events"]
+    event = copy.deepcopy(
+        next(e for e in events if e["eventType"] == event_type)
+    )
+    event["eventId"] = event_id
+    return json.dumps(
+        {
+            "event": event,
+            "labels": {"room": "1"},
+            "metadata": {"deviceType": event_type},
+        }
+    ).encode()
+
+
+def _sign(body, secret=SECRET, claim="checksum_sha256"):
+    digest = hashlib.sha256 if claim == "checksum_sha256" else hashlib.sha1
+    return create_jwt(
+        payload={claim: digest(body).hexdigest()},
+        secret=secret,
+        algorithm="HS256",
+        headers={"alg": "HS256"},
+    )
+
+
+class TestVerifySignature:
+    def test_verify_signature(self):
+        body = _body("e1")
+        verify = disruptive.receiver.verify_signature
+
+        assert verify(body, _sign(body), SECRET)
+        assert verify(body, _sign(body, claim="checksum"), SECRET)
+        assert not verify(body + b" ", _sign(body), SECRET)
+        assert not verify(body, _sign(body, secret="bad"), SECRET)
+        assert not verify(body, "not.a.jwt", SECRET)
+        assert not verify(body, "", SECRET)
+
+
+class TestPushReceiver:
+    def test_batches_and_duplicates(self):
+        batches = []
+        receiver = disruptive.PushReceiver(
+            batches.append,
+            SECRET,
+            batch_size=3,
+            batch_window=60,
+        )
+
+        for event_id in ["e1", "e2", "e1", "e3", "e4"]:
+            body = _body(event_id)
+            assert receiver.handle(body, _sign(body)) == 200
+
+        # The batch fills without redelivered events.
+        assert len(batches) == 1
+        assert [e.event_id for e in batches[0]] == ["e1", "e2", "e3"]
+        assert isinstance(batches[0][0], disruptive.events.Event)
+
+        receiver.close()
+        assert [e.event_id for e in batches[1]] == ["e4"]
+        assert receiver.received == 5
+        assert receiver.duplicates == 1
+        assert receiver.batches == 2
+
+    def test_shared_deduplicator(self):
+        dedup = disruptive.EventDeduplicator()
+        dedup.seen("e1")
+
+        batches = []
+        with disruptive.PushReceiver(batches.append, deduplicator=dedup) as r:
+            for event_id in ["e1", "e2"]:
+                r.handle(_body(event_id))
+
+        # Events seen from other sources are also dropped.
+        assert [e.event_id for e in batches[0]] == ["e2"]
+        assert r.duplicates == 1
+        assert dedup.hits == 1
+
+    def test_rejected(self):
+        batches = []
+        with disruptive.PushReceiver(batches.append, SECRET) as receiver:
+            body = _body("e1")
+            assert receiver.handle(body) == 401
+            assert receiver.handle(body, _sign(body, secret="bad")) == 401
+            assert receiver.handle(b"{}", _sign(b"{}")) == 400
+            assert receiver.handle(b"[", _sign(b"[")) == 400
+
+        assert receiver.rejected == 4
+        assert batches == []
+
+    def test_raw_payloads(self):
+        batches = []
+        with disruptive.PushReceiver(batches.append, decode=False) as r:
+            r.handle(_body("e1"))
+
+        assert batches[0][0]["labels"] == {"room": "1"}
+        assert batches[0][0]["event"]["eventId"] == "e1"
+
+    def test_callback_error(self):
+        batches = []
+
+        def callback(batch):
+            batches.append(batch)
+            if len(batches) == 1:
+                raise RuntimeError("database unavailable")
+
+        receiver = disruptive.PushReceiver(callback, batch_size=1)
+        assert receiver.handle(_body("e1")) == 200
+
+        # The lost batch should be forgotten, so a redelivery is accepted.
+        assert receiver.handle(_body("e1")) == 200
+        assert [[e.event_id for e in b] for b in batches] == [["e1"]] * 2
+        assert receiver.duplicates == 0
+        receiver.close()
+
+    def test_batch_window(self):
+        delivered = threading.Event()
+        receiver = disruptive.PushReceiver(
+            lambda batch: delivered.set(),
+            batch_window=0.01,
+        )
+
+        receiver.handle(_body("e1"))
+
+        # The window should deliver a partial batch without a flush.
+        assert delivered.wait(timeout=5)
+        receiver.close()
+
+    def test_wsgi(self):
+        batches = []
+        receiver = disruptive.PushReceiver(batches.append, SECRET)
+        body = _body("e1")
+
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_X_DT_SIGNATURE": _sign(body),
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        receiver.wsgi(environ, lambda status, headers: statuses.append(status))
+
+        environ["REQUEST_METHOD"] = "GET"
+        receiver.wsgi(environ, lambda status, headers: statuses.append(status))
+
+        assert statuses == ["200 OK", "405 Method Not Allowed"]
+        receiver.close()
+        assert len(batches[0]) == 1
+
+    def test_asgi(self):
+        batches = []
+        threads = []
+
+        def callback(batch):
+            batches.append(batch)
+            threads.append(threading.current_thread())
+
+        receiver = disruptive.PushReceiver(callback, SECRET, batch_size=1)
+        body = _body("e1")
+        sent = []
+
+        # Deliver the body in two chunks.
+        messages = iter(
+            [
+                {"body": body[:10], "more_body": True},
+                {"body": body[10:], "more_body": False},
+            ]
+        )
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "headers": [(b"x-dt-signature", _sign(body).encode())],
+        }
+        asyncio.run(receiver.asgi(scope, receive, send))
+
+        assert sent[0]["status"] == 200
+        assert len(batches[0]) == 1
+
+        # The callback should not run in the thread of the event loop.
+        assert threads[0] is not threading.main_thread()
+        receiver.close()
+
+    def test_server(self):
+        batches = []
+        receiver = disruptive.PushReceiver(batches.append, SECRET)
+
+        async def post_twice():
+            server = await receiver.start_server("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            # Both requests are sent over the same connection.
+            responses = []
+            for event_id in ["e1", "e2"]:
+                body = _body(event_id)
+                writer.write(
+                    (
+                        "POST / HTTP/1.1\r\nHost: x\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"X-Dt-Signature: {_sign(body)}\r\n\r\n"
+                    ).encode()
+                    + body
+                )
+                await writer.drain()
+                responses.append(await reader.readuntil(b"\r\n\r\n"))
+
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return responses
+
+        responses = asyncio.run(post_twice())
+
+        assert all(r.startswith(b"HTTP/1.1 200 OK") for r in responses)
+        receiver.close()
+        assert [e.event_id for e in batches[0]] == ["e1", "e2"]
+
+    def test_server_method_not_allowed(self):
+        receiver = disruptive.PushReceiver(lambda batch: None)
+
+        async def get():
+            server = await receiver.start_server("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            writer.write(
+                b"GET / HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\n{}"
+            )
+            await writer.drain()
+
+            # The unread body must not be parsed as a next request.
+            response = await asyncio.wait_for(reader.read(), timeout=5)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response
+
+        response = asyncio.run(get())
+
+        assert response.startswith(b"HTTP/1.1 405 Method Not Allowed")
+        assert b"Connection: close" in response
+        receiver.close()
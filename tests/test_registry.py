@@ -0,0 +1,232 @@
+import copy
+
+import requests
+
+import disruptive
+import tests.api_responses as dtapiresponses
+from disruptive.events import Event
+
+TEMPERATURE_ID = "c0pppd1qdqebrvv1iqp0"
+TEMPERATURE_PROJECT = "c0md3mm0c7pet3vico8g"
+
+
+def _labels_changed(device_id, project_id, added, modified, removed):
+    return Event(
+        {
+            "eventId": "10",
+            "targetName": f"projects/{project_id}/devices/{device_id}",
+            "eventType": "labelsChanged",
+            "data": {
+                "added": added,
+                "modified": modified,
+                "removed": removed,
+            },
+            "timestamp": "1970-01-01T00:00:00Z",
+        }
+    )
+
+
+def _synced_registry(request_mock, **kwargs):
+    # Copy as the registry mutates labels of the devices it holds.
+    request_mock.json = copy.deepcopy(dtapiresponses.paginated_device_response)
+
+    registry = disruptive.DeviceRegistry("project_id", **kwargs)
+    registry.sync()
+    return registry
+
+
+class TestDeviceRegistry:
+    def test_sync(self, request_mock):
+        registry = _synced_registry(request_mock)
+
+        # Verify expected outgoing parameters in request.
+        request_mock.assert_requested(
+            method="GET",
+            url=disruptive.base_url + "/projects/project_id/devices",
+        )
+        request_mock.assert_request_count(1)
+
+        assert len(registry) == len(dtapiresponses.all_devices_list)
+        assert TEMPERATURE_ID in registry
+
+    def test_first_query_syncs(self, request_mock):
+        request_mock.json = copy.deepcopy(
+            dtapiresponses.paginated_device_response
+        )
+        registry = disruptive.DeviceRegistry("project_id")
+
+        # Construction should not send any requests.
+        request_mock.assert_request_count(0)
+
+        registry.query()
+        registry.query()
+        request_mock.assert_request_count(1)
+
+    def test_query(self, request_mock):
+        registry = _synced_registry(request_mock)
+
+        # No filters returns all devices.
+        assert len(registry.query()) == len(registry)
+
+        # Device types are combined with OR.
+        devices = registry.query(device_types=["temperature", "touch"])
+        assert sorted(d.device_type for d in devices) == [
+            "temperature",
+            "temperature",
+            "touch",
+        ]
+
+        # Label filters are combined with AND.
+        devices = registry.query(
+            label_filters={"new-label": "99", "virtual-sensor": ""},
+        )
+        assert sorted(d.device_type for d in devices) == ["humidity", "touch"]
+
+        # Key-only filters match any value.
+        devices = registry.query(label_filters={"test": None})
+        assert [d.device_id for d in devices] == [TEMPERATURE_ID]
+
+        # All filters combined.
+        devices = registry.query(
+            device_types=["temperature"],
+            label_filters={"virtual-sensor": ""},
+            project_id="c0md3mmpc7bet3vico8g",
+        )
+        assert len(devices) == 1
+
+        # No matches.
+        assert registry.query(label_filters={"missing": "x"}) == []
+        assert registry.query(project_id="missing") == []
+
+        # Queries are answered locally.
+        request_mock.assert_request_count(1)
+
+    def test_labels_changed(self, request_mock):
+        registry = _synced_registry(request_mock)
+
+        registry.apply(
+            _labels_changed(
+                TEMPERATURE_ID,
+                TEMPERATURE_PROJECT,
+                added={"room": "99"},
+                modified={"name": "renamed"},
+                removed=["test"],
+            )
+        )
+
+        devices = registry.query(label_filters={"room": "99"})
+        assert [d.device_id for d in devices] == [TEMPERATURE_ID]
+        assert devices[0].display_name == "renamed"
+        assert registry.query(label_filters={"test": ""}) == []
+        assert registry.query(label_filters={"name": "temperature"}) == []
+
+        # Removing the display name label resets it.
+        registry.apply(
+            _labels_changed(
+                TEMPERATURE_ID, TEMPERATURE_PROJECT, {}, {}, ["name"]
+            )
+        )
+        assert registry.get(TEMPERATURE_ID).display_name is None
+
+    def test_unknown_device_fetched(self, request_mock):
+        registry = _synced_registry(request_mock)
+
+        # Events from unknown devices should fetch and add the device.
+        device = copy.deepcopy(dtapiresponses.touch_sensor)
+        device["name"] = "projects/project_id/devices/new_device"
+        request_mock.json = device
+
+        event = copy.deepcopy(dtapiresponses.touch_event)
+        event["targetName"] = device["name"]
+        registry.apply(Event(event))
+
+        url = disruptive.base_url + "/projects/project_id/devices/new_device"
+        request_mock.assert_requested(method="GET", url=url)
+        request_mock.assert_request_count(2)
+        assert "new_device" in registry
+
+    def test_unknown_device_filtered(self, request_mock):
+        registry = _synced_registry(
+            request_mock,
+            device_types=[disruptive.Device.TEMPERATURE],
+        )
+
+        # A fetched device outside the filters should not be added.
+        device = copy.deepcopy(dtapiresponses.touch_sensor)
+        device["name"] = "projects/project_id/devices/new_device"
+        request_mock.json = device
+
+        event = copy.deepcopy(dtapiresponses.touch_event)
+        event["targetName"] = device["name"]
+        registry.apply(Event(event))
+
+        request_mock.assert_request_count(2)
+        assert "new_device" not in registry
+
+    def test_unknown_device_fetch_error(self, request_mock):
+        for status_code in [403, 500]:
+            registry = _synced_registry(request_mock)
+            request_mock.status_code = status_code
+
+            # A failed fetch should not end the stream, but mark a gap.
+            event = copy.deepcopy(dtapiresponses.touch_event)
+            event["targetName"] = "projects/project_id/devices/new_device"
+            assert len(list(registry.follow([Event(event)]))) == 1
+
+            assert "new_device" not in registry
+            assert registry._has_gap
+            request_mock.status_code = 200
+
+    def test_unknown_device_not_fetched(self, request_mock):
+        registry = _synced_registry(request_mock, fetch_unknown=False)
+
+        registry.apply(Event(copy.deepcopy(dtapiresponses.touch_event)))
+
+        request_mock.assert_request_count(1)
+        assert registry.get("device_id") is None
+
+    def test_gap_triggers_resync(self, request_mock):
+        registry = _synced_registry(request_mock)
+
+        registry.mark_gap()
+        registry.query()
+        registry.query()
+
+        request_mock.assert_request_count(2)
+
+    def test_max_staleness(self, request_mock):
+        registry = _synced_registry(request_mock, max_staleness=60)
+
+        registry.query()
+        request_mock.assert_request_count(1)
+
+        # Pretend the registry has not been updated in a while.
+        registry.last_sync -= 120
+        registry.query()
+        request_mock.assert_request_count(2)
+
+    def test_event_stream_reconnect_marks_gap(self, request_mock):
+        registry = _synced_registry(request_mock, fetch_unknown=False)
+
+        request_mock.iter_data = [dtapiresponses.stream_temperature_event]
+
+        # Make the first stream connection fail, then succeed.
+        attempts = []
+
+        def side_effect_override(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise requests.exceptions.ConnectionError
+            return request_mock._patched_requests_request(**kwargs)
+
+        request_mock.request_patcher.side_effect = side_effect_override
+
+        # A callback of the caller should be chained after the gap.
+        reconnects = []
+        for _ in registry.event_stream(
+            on_reconnect=lambda: reconnects.append(registry._has_gap)
+        ):
+            pass
+
+        assert registry._has_gap
+        assert reconnects == [True]
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from disruptive.events.events import Event
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def _event(event_id, seconds, device_id="d1"):
+    timestamp = (START + timedelta(seconds=seconds)).isoformat()
+    return Event(
+        {
+            "eventId": event_id,
+            "eventType": "touch",
+            "targetName": f"projects/p1/devices/{device_id}",
+            "data": {"touch": {"updateTime": timestamp}},
+            "timestamp": timestamp,
+        }
+    )
+
+
+class TestReorderBuffer:
+    def test_reorder(self):
+        buffer = disruptive.ReorderBuffer(allowed_lateness=10)
+
+        ready = []
+        for event_id, seconds in [("a", 0), ("c", 8), ("b", 5), ("d", 15)]:
+            ready += buffer.push(_event(event_id, seconds))
+
+        # The watermark at 5 seconds has only passed the first two.
+        assert [e.event_id for e in ready] == ["a", "b"]
+        assert buffer.watermark == START + timedelta(seconds=5)
+        assert len(buffer) == 2
+
+        ready += buffer.flush()
+        assert [e.event_id for e in ready] == ["a", "b", "c", "d"]
+        assert buffer.emitted == 4
+
+    def test_late_events(self):
+        late = []
+        buffer = disruptive.ReorderBuffer(
+            allowed_lateness=timedelta(seconds=10),
+            on_late=late.append,
+        )
+
+        buffer.push(_event("a", 100))
+        assert buffer.push(_event("b", 85)) == []
+        assert buffer.push(_event("c", 95)) == []
+
+        # Events behind the watermark go to the side channel.
+        assert [e.event_id for e in late] == ["b"]
+        assert buffer.late == 1
+        assert [e.event_id for e in buffer.flush()] == ["c", "a"]
+
+    def test_late_events_kept(self):
+        buffer = disruptive.ReorderBuffer(allowed_lateness=0, late_history=2)
+        buffer.push(_event("a", 10))
+        for event_id in ["b", "c", "d"]:
+            buffer.push(_event(event_id, 0))
+
+        assert [e.event_id for e in buffer.late_events] == ["c", "d"]
+        assert buffer.late == 3
+
+    def test_max_depth(self):
+        buffer = disruptive.ReorderBuffer(allowed_lateness=3600, max_depth=2)
+
+        ready = []
+        for i in range(5):
+            ready += buffer.push(_event(str(i), i))
+
+        # The oldest are emitted early, and hold back the watermark.
+        assert [e.event_id for e in ready] == ["0", "1", "2"]
+        assert buffer.watermark == START + timedelta(seconds=2)
+        assert buffer.push(_event("late", 1)) == []
+        assert buffer.late == 1
+
+    def test_follow(self):
+        stream = [_event(str(s), s) for s in [3, 1, 2, 0, 6, 4, 5]]
+        buffer = disruptive.ReorderBuffer(allowed_lateness=3)
+
+        events = list(buffer.follow(stream))
+
+        assert [e.event_id for e in events] == [str(s) for s in range(7)]
+
+    def test_histograms(self):
+        buffer = disruptive.ReorderBuffer(allowed_lateness=60)
+        for event_id, seconds in [("a", 0), ("b", 30), ("c", 25), ("d", 0)]:
+            buffer.push(_event(event_id, seconds))
+
+        assert buffer.lateness.to_dict() == {
+            "0": 2,
+            "1": 0,
+            "5": 1,
+            "10": 0,
+            "30": 1,
+            "60": 0,
+            "300": 0,
+            "900": 0,
+            "3600": 0,
+            "inf": 0,
+        }
+        assert buffer.depth.counts[:4] == [1, 1, 2, 0]
+        assert buffer.depth.total == 4
+
+    def test_configuration(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.ReorderBuffer(allowed_lateness=-1)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.ReorderBuffer(max_depth=0)
@@ -0,0 +1,139 @@
+import statistics
+from datetime import timedelta
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from tests.framework import START, iso_time, make_event
+
+
+def _co2(ppm, seconds, device_id="d1"):
+    return make_event("co2", {"ppm": ppm}, seconds, device_id)
+
+
+class TestRollingStats:
+    def test_window(self):
+        stats = disruptive.RollingStats(window=60)
+
+        values = [400, 410, 380, 450, 420]
+        for i, ppm in enumerate(values):
+            stats.add(_co2(ppm, i * 20))
+
+        # The window (20s, 80s] holds the last 3 samples.
+        window = stats.get("d1", "co2")
+        assert window.count == 3
+        assert window.min == 380
+        assert window.max == 450
+        assert window.last == 420
+        assert window.mean == pytest.approx(statistics.mean(values[2:]))
+        assert window.stddev == pytest.approx(statistics.pstdev(values[2:]))
+        assert window.start_time == START + timedelta(seconds=40)
+
+    def test_sliding_min_max(self):
+        stats = disruptive.RollingStats(window=3)
+
+        values = [5, 1, 4, 2, 8, 3, 3, 0, 9]
+        for i, value in enumerate(values):
+            stats.add(_co2(value, i))
+            window = stats.get("d1", "co2")
+            expected = values[max(0, i - 2) : i + 1]
+            assert window.min == min(expected)
+            assert window.max == max(expected)
+
+    def test_temperature_samples(self):
+        stats = disruptive.RollingStats(window=3600)
+
+        event = make_event(
+            "temperature",
+            {
+                "value": 22.0,
+                "isBackfilled": False,
+                "samples": [
+                    {"value": 22.0, "sampleTime": iso_time(120)},
+                    {"value": 20.0, "sampleTime": iso_time(0)},
+                    {"value": 21.0, "sampleTime": iso_time(60)},
+                ],
+            },
+            120,
+        )
+
+        assert stats.add(event) == 3
+        window = stats.get("d1", "temperature")
+        assert window.count == 3
+        assert window.mean == pytest.approx(21.0)
+        assert window.last == 22.0
+
+    def test_metrics(self):
+        stats = disruptive.RollingStats(metrics=["touch_count"])
+
+        assert stats.add(_co2(400, 0)) == 0
+        assert stats.add(make_event("touchCount", {"total": 7}, 0)) == 1
+        assert stats.get("d1", "touch_count").last == 7
+        assert stats.get("d1", "co2") is None
+
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.RollingStats(metrics=["co"])
+
+    def test_max_samples(self):
+        stats = disruptive.RollingStats(window=3600, max_samples=10)
+
+        for i in range(100):
+            stats.add(_co2(i, i))
+
+        window = stats.get("d1", "co2")
+        assert window.count == 10
+        assert window.min == 90
+        assert window.mean == pytest.approx(94.5)
+
+    def test_out_of_order(self):
+        stats = disruptive.RollingStats()
+
+        stats.add(_co2(400, 10))
+        assert stats.add(_co2(500, 5)) == 0
+        assert stats.skipped == 1
+        assert stats.samples == 1
+
+    def test_numerical_stability(self):
+        stats = disruptive.RollingStats(window=10)
+
+        values = [101325 + (i % 7) * 0.01 for i in range(10_000)]
+        for i, value in enumerate(values):
+            stats.add(make_event("pressure", {"pascal": value}, i))
+
+        window = stats.get("d1", "pressure")
+        assert window.stddev == pytest.approx(
+            statistics.pstdev(values[-10:]), rel=1e-6
+        )
+
+    def test_snapshot(self):
+        stats = disruptive.RollingStats(window=60)
+
+        stats.add(_co2(400, 0, device_id="d1"))
+        stats.add(_co2(500, 100, device_id="d2"))
+        stats.add(make_event("pressure", {"pascal": 1e5}, 100, device_id="d2"))
+
+        snapshot = stats.snapshot()
+        assert set(snapshot) == {"d1", "d2"}
+        assert set(snapshot["d2"]) == {"co2", "pressure"}
+        assert len(stats) == 3
+
+        # Devices that stopped reporting are expired.
+        snapshot = stats.snapshot(now=START + timedelta(seconds=120))
+        assert set(snapshot) == {"d2"}
+
+        stats.remove("d2")
+        assert stats.snapshot() == {}
+
+    def test_follow(self):
+        stats = disruptive.RollingStats()
+        events = [_co2(400, 0), _co2(420, 1)]
+
+        assert list(stats.follow(events)) == events
+        assert stats.get("d1", "co2").count == 2
+
+    def test_invalid(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.RollingStats(window=0)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.RollingStats(max_samples=0)
@@ -0,0 +1,239 @@
+from datetime import timedelta
+
+import pytest
+
+import disruptive
+import disruptive.errors as dterrors
+from tests.framework import START, make_event, make_labels_changed
+
+
+def _temperature(value, seconds, device_id="d1"):
+    return make_event(
+        "temperature",
+        {"value": value, "isBackfilled": False, "samples": []},
+        seconds,
+        device_id,
+    )
+
+
+class TestRuleEngine:
+    def test_threshold(self):
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("warm", "temperature", ">", 8)]
+        )
+
+        assert engine.evaluate(_temperature(5, 0)) == []
+        alerts = engine.evaluate(_temperature(9, 10))
+        assert len(alerts) == 1
+        assert alerts[0].firing
+        assert alerts[0].rule.name == "warm"
+        assert alerts[0].device_id == "d1"
+        assert engine.firing() == [("warm", "d1")]
+
+        # Still firing, so no new alert.
+        assert engine.evaluate(_temperature(10, 20)) == []
+
+        alerts = engine.evaluate(_temperature(7, 30))
+        assert not alerts[0].firing
+        assert alerts[0].since == START + timedelta(seconds=10)
+        assert engine.firing() == []
+
+    def test_duration(self):
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("warm", "temperature", ">", 8, duration=600)]
+        )
+
+        assert engine.evaluate(_temperature(9, 0)) == []
+        assert engine.evaluate(_temperature(9, 300)) == []
+
+        # A dip restarts the duration.
+        assert engine.evaluate(_temperature(7, 400)) == []
+        assert engine.evaluate(_temperature(9, 500)) == []
+        assert engine.evaluate(_temperature(9, 1000)) == []
+
+        alerts = engine.evaluate(_temperature(9, 1100))
+        assert alerts[0].firing
+        assert alerts[0].since == START + timedelta(seconds=500)
+
+    def test_hysteresis(self):
+        fired = []
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("cold", "temperature", "<", 2, hysteresis=1)],
+            on_alert=fired.append,
+        )
+
+        for seconds, value in enumerate([3, 1.9, 2.1, 2.9, 1.5, 3.0, 1.9]):
+            engine.evaluate(_temperature(value, seconds))
+
+        # Hovering just above the threshold does not resolve the alert.
+        assert [alert.firing for alert in fired] == [True, False, True]
+        assert engine.alerts == 3
+
+    def test_state_rule(self):
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("leak", "water_present", "==", "PRESENT")]
+        )
+
+        alerts = engine.evaluate(
+            make_event("waterPresent", {"state": "PRESENT"}, 0)
+        )
+        assert alerts[0].value == "PRESENT"
+
+    def test_label_filters(self):
+        engine = disruptive.RuleEngine(
+            [
+                disruptive.Rule(
+                    "fridge",
+                    "temperature",
+                    ">",
+                    8,
+                    label_filters={"fridge": "true", "site": None},
+                ),
+                disruptive.Rule("all", "temperature", ">", 30),
+            ]
+        )
+        engine.seed(
+            [
+                disruptive.Device(
+                    {
+                        "name": "projects/p1/devices/d1",
+                        "type": "temperature",
+                        "labels": {"fridge": "true", "site": "oslo"},
+                        "reported": {},
+                    }
+                ),
+            ]
+        )
+
+        assert len(engine.evaluate(_temperature(9, 0, "d1"))) == 1
+        assert engine.evaluate(_temperature(9, 0, "d2")) == []
+
+        # Only the rule without label filters applied to the unknown device.
+        assert engine.evaluations == 3
+
+        # Labels are kept current by labelsChanged events.
+        engine.evaluate(make_labels_changed("d2", added={"fridge": "true"}))
+        engine.evaluate(make_labels_changed("d2", added={"site": "bergen"}))
+        assert len(engine.evaluate(_temperature(9, 1, "d2"))) == 1
+
+        # The firing rule resolves once the device no longer matches it.
+        alerts = engine.evaluate(make_labels_changed("d1", removed=["fridge"]))
+        assert [(a.rule.name, a.firing, a.value) for a in alerts] == [
+            ("fridge", False, None)
+        ]
+        assert engine.firing() == [("fridge", "d2")]
+        assert engine.evaluate(_temperature(9, 2, "d1")) == []
+
+    def test_seed_resolves(self):
+        engine = disruptive.RuleEngine(
+            [
+                disruptive.Rule(
+                    "fridge",
+                    "temperature",
+                    ">",
+                    8,
+                    label_filters={"fridge": "true"},
+                ),
+            ]
+        )
+        engine.evaluate(make_labels_changed("d1", added={"fridge": "true"}))
+        assert len(engine.evaluate(_temperature(9, 0, "d1"))) == 1
+
+        alerts = []
+        engine.on_alert = alerts.append
+        engine.seed(
+            [
+                disruptive.Device(
+                    {
+                        "name": "projects/p1/devices/d1",
+                        "type": "temperature",
+                        "labels": {},
+                        "reported": {},
+                    }
+                ),
+            ]
+        )
+
+        assert [(a.device_id, a.firing) for a in alerts] == [("d1", False)]
+        assert engine.firing() == []
+
+    def test_indexed_cost(self):
+        rules = [
+            disruptive.Rule(
+                f"room-{i}",
+                "temperature",
+                ">",
+                25,
+                label_filters={"room": str(i)},
+            )
+            for i in range(1000)
+        ]
+        rules.append(disruptive.Rule("co2", "co2", ">", 1000))
+        engine = disruptive.RuleEngine(rules)
+        engine.seed(
+            [
+                disruptive.Device(
+                    {
+                        "name": f"projects/p1/devices/d{i}",
+                        "type": "temperature",
+                        "labels": {"room": str(i)},
+                        "reported": {},
+                    }
+                )
+                for i in range(10)
+            ]
+        )
+
+        for i in range(10):
+            engine.evaluate(_temperature(20, i, f"d{i}"))
+
+        # Each event is only checked against the rule of its room.
+        assert engine.events == 10
+        assert engine.evaluations_per_event == 1
+        assert engine.evaluation_time.total == 10
+        assert engine.seconds_per_event > 0
+
+    def test_add_remove_rule(self):
+        engine = disruptive.RuleEngine()
+        engine.add_rule(disruptive.Rule("warm", "temperature", ">", 8))
+        engine.evaluate(_temperature(9, 0))
+
+        with pytest.raises(dterrors.ConfigurationError):
+            engine.add_rule(disruptive.Rule("warm", "co2", ">", 8))
+
+        engine.remove_rule("warm")
+        assert len(engine) == 0
+        assert engine.firing() == []
+        assert engine.evaluate(_temperature(9, 1)) == []
+
+    def test_callback_error(self):
+        def on_alert(alert):
+            raise ValueError("callback")
+
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("warm", "temperature", ">", 8)],
+            on_alert=on_alert,
+        )
+
+        assert len(engine.evaluate(_temperature(9, 0))) == 1
+
+    def test_follow(self):
+        engine = disruptive.RuleEngine(
+            [disruptive.Rule("warm", "temperature", ">", 8)]
+        )
+        events = [_temperature(9, 0), _temperature(5, 1)]
+
+        assert list(engine.follow(events)) == events
+        assert engine.alerts == 2
+
+    def test_invalid_rule(self):
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Rule("r", "temp", ">", 8)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Rule("r", "water_present", ">", "PRESENT")
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Rule("r", "temperature", "~", 8)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Rule("r", "temperature", ">", 8, duration=-1)
+        with pytest.raises(dterrors.ConfigurationError):
+            disruptive.Rule("r", "temperature", "==", 8, hysteresis=1)
@@ -0,0 +1,178 @@
+import copy
+
+import disruptive
+import tests.api_responses as dtapiresponses
+from disruptive.events import Event
+from disruptive.resources.device import Reported
+
+TEMPERATURE_ID = "c0pppd1qdqebrvv1iqp0"
+
+# Kept local as other tests modify the shared api_responses devices.
+TEMPERATURE_SENSOR = {
+    "name": f"projects/project_id/devices/{TEMPERATURE_ID}",
+    "type": "temperature",
+    "productNumber": "102067",
+    "labels": {"name": "temperature"},
+    "reported": {
+        "batteryStatus": {
+            "percentage": 100,
+            "updateTime": "2021-03-13T16:05:49.380240Z",
+        },
+        "temperature": {
+            "value": -27,
+            "isBackfilled": False,
+            "samples": [
+                {"value": -27, "sampleTime": "2021-03-13T16:05:47.722334Z"}
+            ],
+            "updateTime": "2021-03-13T16:05:47.722334Z",
+        },
+    },
+}
+
+
+def _temperature_event(device_id, celsius, update_time):
+    return Event(
+        {
+            "eventId": "02",
+            "targetName": f"projects/project_id/devices/{device_id}",
+            "eventType": "temperature",
+            "data": {
+                "temperature": {
+                    "value": celsius,
+                    "isBackfilled": False,
+                    "samples": [{"value": celsius, "sampleTime": update_time}],
+                    "updateTime": update_time,
+                }
+            },
+            "timestamp": update_time,
+        }
+    )
+
+
+def _seeded_store():
+    devices = [
+        disruptive.Device(copy.deepcopy(d))
+        for d in [
+            TEMPERATURE_SENSOR,
+            dtapiresponses.null_reported_sensor,
+            dtapiresponses.touch_sensor,
+        ]
+    ]
+    return disruptive.ReportedStore.from_devices(devices)
+
+
+class TestReportedStore:
+    def test_seed(self):
+        store = _seeded_store()
+
+        # Values should be the same objects as in Device.reported.
+        data = store.get(TEMPERATURE_ID, disruptive.events.TEMPERATURE)
+        assert isinstance(data, disruptive.events.Temperature)
+        assert data.celsius == -27
+
+        # Unknown device or type returns None.
+        assert store.get("unknown", disruptive.events.TEMPERATURE) is None
+        assert store.get(TEMPERATURE_ID, disruptive.events.CO2) is None
+
+    def test_apply(self):
+        store = _seeded_store()
+
+        store.apply(
+            _temperature_event(TEMPERATURE_ID, 5, "2022-01-01T00:00:00Z")
+        )
+
+        data = store.get(TEMPERATURE_ID, disruptive.events.TEMPERATURE)
+        assert data.celsius == 5
+
+        # Other event types for the device are untouched.
+        data = store.get(TEMPERATURE_ID, disruptive.events.BATTERY_STATUS)
+        assert data.percentage == 100
+
+    def test_older_event_ignored(self):
+        store = disruptive.ReportedStore()
+
+        store.apply(_temperature_event("d1", 5, "2022-01-01T00:10:00Z"))
+        store.apply(_temperature_event("d1", 9, "2022-01-01T00:00:00Z"))
+
+        data = store.get("d1", disruptive.events.TEMPERATURE)
+        assert data.celsius == 5
+
+    def test_labels_changed_ignored(self):
+        store = disruptive.ReportedStore()
+
+        store.apply(Event(copy.deepcopy(dtapiresponses.labels_changed_event)))
+
+        assert len(store) == 0
+
+    def test_snapshot(self):
+        store = _seeded_store()
+        store.apply(_temperature_event("new", 1, "2022-01-01T00:00:00Z"))
+
+        # Null reported fields, as on emulated devices, are skipped.
+        snapshot = store.snapshot(disruptive.events.TEMPERATURE)
+        assert {xid: d.celsius for xid, d in snapshot.items()} == {
+            TEMPERATURE_ID: -27,
+            "new": 1,
+        }
+
+        # The snapshot is a copy and should not change with the store.
+        store.apply(_temperature_event("other", 1, "2022-01-01T00:00:00Z"))
+        assert "other" not in snapshot
+
+        assert store.snapshot("unknown") == {}
+
+    def test_reported(self):
+        store = _seeded_store()
+        store.apply(
+            _temperature_event(TEMPERATURE_ID, 5, "2022-01-01T00:00:00Z")
+        )
+
+        reported = store.reported(TEMPERATURE_ID)
+        assert reported.temperature.celsius == 5
+        assert reported.battery_status.percentage == 100
+        assert store.reported("unknown") is None
+
+    def test_to_raw(self):
+        store = _seeded_store()
+
+        raw = store.to_raw()
+        assert raw[TEMPERATURE_ID]["temperature"]["value"] == -27
+
+        # The raw format can be used to construct Reported objects.
+        reported = Reported(raw[TEMPERATURE_ID])
+        assert reported.temperature.celsius == -27
+        assert reported.battery_status.percentage == 100
+
+    def test_subscribe(self):
+        store = disruptive.ReportedStore()
+        changes = []
+
+        def callback(device_id, event_type, old, new):
+            changes.append((device_id, event_type, old, new))
+
+        unsubscribe = store.subscribe(callback, ["temperature"])
+
+        store.apply(_temperature_event("d1", 5, "2022-01-01T00:00:00Z"))
+        store.apply(Event(copy.deepcopy(dtapiresponses.touch_event)))
+        store.apply(_temperature_event("d1", 6, "2022-01-01T00:01:00Z"))
+
+        # Only temperature changes should have been notified.
+        assert len(changes) == 2
+        assert changes[0][2] is None
+        assert changes[1][2].celsius == 5
+        assert changes[1][3].celsius == 6
+
+        unsubscribe()
+        store.apply(_temperature_event("d1", 7, "2022-01-01T00:02:00Z"))
+        assert len(changes) == 2
+
+    def test_follow(self):
+        store = disruptive.ReportedStore()
+        stream = [
+            _temperature_event("d1", 5, "2022-01-01T00:00:00Z"),
+            _temperature_event("d2", 6, "2022-01-01T00:00:00Z"),
+        ]
+
+        # Events should pass through unchanged.
+        assert list(store.follow(stream)) == stream
+        assert len(store) == 2
@@ -97,6 +97,22 @@ class TestStream:
             # Compare stream event to expected events.
             assert e._raw == expected[i]._raw
 
+    def test_deduplicator(self, request_mock):
+        temp = dtapiresponses.stream_temperature_event
+        nstat = dtapiresponses.stream_networkstatus_event
+        request_mock.iter_data = [temp, nstat, temp]
+
+        # An event already seen elsewhere, such as in the event history.
+        dedup = disruptive.EventDeduplicator()
+        dedup.seen(json.loads(nstat)["result"]["event"]["eventId"])
+
+        events = list(
+            disruptive.Stream.event_stream("project_id", deduplicator=dedup)
+        )
+
+        assert [e.event_type for e in events] == ["temperature"]
+        assert dedup.hits == 2
+
     def test_retry_logic_readtimeout(self, request_mock):
         def side_effect_override(**kwargs):
             raise requests.exceptions.ReadTimeout
@@ -131,3 +131,25 @@ class TestTransforms:
         for test in tests:
             snake_case = dttrans.camel_to_snake_case(test.give_str)
             assert snake_case == test.want_str, test.name
+
+    def test_match_labels(self):
+        labels = {"room": "1", "site": "oslo"}
+
+        assert dttrans.match_labels(labels, {})
+        assert dttrans.match_labels(labels, {"room": "1", "site": None})
+        assert dttrans.match_labels(labels, {"site": ""})
+        assert not dttrans.match_labels(labels, {"room": "2"})
+        assert not dttrans.match_labels(labels, {"floor": None})
+
+    def test_apply_labels_changed(self):
+        labels = {"room": "1", "site": "oslo"}
+        dttrans.apply_labels_changed(
+            labels,
+            {
+                "added": {"floor": "2"},
+                "modified": {"room": "3"},
+                "removed": ["site", "unknown"],
+            },
+        )
+
+        assert labels == {"room": "3", "floor": "2"}